@@ -0,0 +1,71 @@
+"""Per-call overhead of binding the arguments of a decorated function.
+
+Compares the previous implementation (inspect.signature + bind + apply_defaults on every call)
+with an ArgumentBinder built once per function.
+
+Usage:
+    python -m benchmarks.bench_argument_binding
+"""
+
+import functools
+import inspect
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from resnap.helpers.signature import ArgumentBinder, get_attributes
+
+
+def legacy_get_function_signature(
+    func: Callable, args: tuple, kwargs: dict, considered_attributes: list[str] | None = None,
+) -> tuple[str, dict[str, Any]]:
+    considered_attributes = considered_attributes or []
+    bound_args = inspect.signature(func).bind(*args, **kwargs)
+    bound_args.apply_defaults()
+    arguments = {}
+    for i, (name, value) in enumerate(bound_args.arguments.items()):
+        if i == 0 and name in ("self", "cls"):
+            arguments.update(get_attributes(value, considered_attributes))
+            continue
+        arguments[name] = value
+    return func.__qualname__, arguments
+
+
+def function(x: int, y: int, scale: float = 1.0, name: str = "default") -> float:
+    return (x * y) * scale
+
+
+class Model:
+    threshold: float = 0.5
+
+    def __init__(self, version: int) -> None:
+        self.version = version
+
+    def predict(self, x: int, y: int = 2, **options: Any) -> float:
+        return x * y * self.threshold
+
+
+CASES: list[tuple[str, Callable, tuple, dict, list[str] | None]] = [
+    ("function", function, (1, 2), {"name": "toto"}, None),
+    ("method", Model.predict, (Model(1), 3), {"verbose": True}, ["threshold", "version"]),
+]
+
+
+def measure(func: Callable[[], Any], number: int) -> float:
+    """Return the best per-call time of func, in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main(number: int = 100_000) -> None:
+    print(f"{'case':<10} {'before (us)':>12} {'after (us)':>12} {'speedup':>8}")
+    for name, func, args, kwargs, attributes in CASES:
+        binder = ArgumentBinder(func, attributes)
+        assert binder.bind(args, kwargs) == legacy_get_function_signature(func, args, kwargs, attributes)[1]
+
+        before = measure(functools.partial(legacy_get_function_signature, func, args, kwargs, attributes), number)
+        after = measure(functools.partial(binder.bind, args, kwargs), number)
+        print(f"{name:<10} {before:>12.2f} {after:>12.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Throughput of hash_arguments with each hash algorithm.
+
+Hashes a float64 array argument of 1 MB, 100 MB and 1 GB. The array buffer is fed as is into the hash object,
+so the numbers measure the algorithms rather than the argument serialization.
+
+Usage:
+    python -m benchmarks.bench_hash_algorithms [max size in MB, 1024 by default]
+"""
+
+import functools
+import sys
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from resnap.helpers.hashing import HashAlgorithm, is_algorithm_available
+from resnap.helpers.utils import hash_arguments
+
+SIZES_MB: list[int] = [1, 100, 1024]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> float:
+    """Return the best time of func, in seconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(max_size_mb: int = 1024) -> None:
+    algorithms = [algorithm for algorithm in HashAlgorithm if is_algorithm_available(algorithm)]
+    print(f"{'payload':>8} " + " ".join(f"{algorithm.value + ' (MB/s)':>16}" for algorithm in algorithms))
+    for size_mb in SIZES_MB:
+        if size_mb > max_size_mb:
+            break
+        arguments = {"data": np.random.default_rng(0).random(size_mb * 2**20 // 8)}
+        repeat = 5 if size_mb < 1024 else 2
+        throughputs = [
+            size_mb / measure(functools.partial(hash_arguments, arguments, algorithm), repeat)
+            for algorithm in algorithms
+        ]
+        print(f"{str(size_mb) + ' MB':>8} " + " ".join(f"{throughput:>16.0f}" for throughput in throughputs))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""Parse throughput of metadata files with each JSON engine.
+
+Writes 100k compact metadata files, and the same metadata indented as they were written before the JSON engines,
+then reads and decodes them all into `MetadataSuccess` objects, like a lookup of `get_success_metadata` without
+index. The baseline is the previous path: `json.load` on the indented files, opened in text mode.
+
+Usage:
+    python -m benchmarks.bench_metadata_json [number of files, 100000 by default]
+"""
+
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from resnap.helpers.json_codec import (
+    JSON_ENGINES,
+    JsonEngine,
+    MsgspecJsonEngine,
+    OrjsonEngine,
+    StdlibJsonEngine,
+    is_engine_available,
+)
+from resnap.helpers.metadata import Metadata, MetadataSuccess
+from resnap.helpers.status import Status
+
+ENGINE_TYPES = {"orjson": OrjsonEngine, "msgspec": MsgspecJsonEngine, "json": StdlibJsonEngine}
+
+
+def new_metadata(i: int) -> MetadataSuccess:
+    return MetadataSuccess(
+        status=Status.SUCCESS,
+        event_time=datetime(2025, 7, 15) + timedelta(seconds=i),
+        hashed_arguments=f"{i:064x}",
+        result_path=f"output/func_{i}_resnap.parquet",
+        result_type="DataFrame",
+        result_format="parquet",
+        compression="zstd",
+        compression_level=3,
+        extra_metadata={"rows": i, "source": "benchmark"},
+    )
+
+
+def write_files(folder: Path, count: int) -> tuple[list[Path], list[Path]]:
+    compact, indented = [], []
+    for i in range(count):
+        metadata = new_metadata(i)
+        compact.append(folder / f"func_{i}.json")
+        compact[-1].write_bytes(StdlibJsonEngine().encode(metadata.to_dict()))
+        indented.append(folder / f"func_{i}.indented.json")
+        indented[-1].write_text(json.dumps(metadata.to_dict(), indent=4))
+    return compact, indented
+
+
+def measure_baseline(files: list[Path]) -> float:
+    start = time.perf_counter()
+    for file in files:
+        with open(file, "r") as json_file:
+            Metadata.from_dict(json.load(json_file))
+    return time.perf_counter() - start
+
+
+def measure_engine(engine: JsonEngine, files: list[Path]) -> float:
+    start = time.perf_counter()
+    for file in files:
+        with open(file, "rb") as json_file:
+            Metadata.from_dict(engine.decode(json_file.read()))
+    return time.perf_counter() - start
+
+
+def main(count: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        compact, indented = write_files(Path(folder), count)
+        size = sum(file.stat().st_size for file in compact) / count
+        indented_size = sum(file.stat().st_size for file in indented) / count
+        print(f"{count} files of {size:.0f} bytes ({indented_size:.0f} bytes indented)")
+        print(f"{'engine':>24} {'files/s':>12}")
+        print(f"{'json.load (indented)':>24} {count / measure_baseline(indented):>12.0f}")
+        for name in JSON_ENGINES:
+            if not is_engine_available(name):
+                print(f"{name:>24} {'not installed':>12}")
+                continue
+            print(f"{name:>24} {count / measure_engine(ENGINE_TYPES[name](), compact):>12.0f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,98 @@
+"""Latency and memory of the reads of saved results (cache hits) with each output format.
+
+Saves a DataFrame of 1M and 10M rows with the local service as parquet.gz, zstd-compressed parquet and Arrow IPC,
+then reads it back as the decorator does on a hit. The RSS growth of a read, holding the result, is measured in
+a fresh process so that the reads do not share their allocations; it is read from /proc, so on Linux only.
+The last row reads the Arrow file as a pyarrow Table, which keeps the columns in the memory map instead of copying
+them into a DataFrame.
+
+Usage:
+    python -m benchmarks.bench_result_formats [max rows in millions, 10 by default]
+"""
+
+import functools
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from resnap.helpers.config import ArrowCompression, Config, ParquetCompression
+from resnap.helpers.metadata import MetadataSuccess
+from resnap.services.local_service import LocalResnapService
+
+ROWS_M: list[int] = [1, 10]
+FORMATS: dict[str, dict[str, Any]] = {
+    "parquet.gz": {"compression": ParquetCompression.GZIP},
+    "parquet zstd": {"compression": ParquetCompression.ZSTD},
+    "arrow": {"output_format": "arrow", "arrow_compression": ArrowCompression.NONE},
+    "arrow lz4": {"output_format": "arrow", "arrow_compression": ArrowCompression.LZ4},
+    "arrow (Table)": {"output_format": "arrow", "arrow_compression": ArrowCompression.NONE, "as_table": True},
+}
+
+
+def measure(func: Callable[[], Any], repeat: int) -> float:
+    """Return the best time of func, in seconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def a_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "value": rng.random(rows),
+        "count": rng.integers(0, 1000, rows),
+        "category": rng.integers(0, 16, rows).astype(str),
+    })
+
+
+def save(service: LocalResnapService, frame: pd.DataFrame, as_table: bool = False, **options: Any) -> MetadataSuccess:
+    result = pa.Table.from_pandas(frame) if as_table else frame
+    result_path, event_time = service.save_result("bench", result, "", **options)
+    options.pop("output_format", None)
+    return service.save_success_metadata(
+        "bench", "", "", event_time, result_path, type(result).__name__, {}, update_index=False, **options,
+    )
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def read_rss_mb(config: Config, metadata: MetadataSuccess) -> float:
+    """Return the RSS growth of a read, in MB. Run in a fresh process."""
+    service = LocalResnapService(config)
+    before = rss_mb()
+    result = service.read_result(metadata)  # noqa: F841 the result is held while measuring
+    return rss_mb() - before
+
+
+def main(max_rows_m: int = 10) -> None:
+    context = multiprocessing.get_context("spawn")
+    print(f"{'rows':>6} {'format':>14} {'file (MB)':>10} {'hit (ms)':>9} {'RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as folder:
+        config = Config(enabled=True, output_base_path=folder, memory_cache_max_bytes=0)
+        service = LocalResnapService(config)
+        for rows_m in ROWS_M:
+            if rows_m > max_rows_m:
+                break
+            frame = a_frame(rows_m * 1_000_000)
+            for label, options in FORMATS.items():
+                metadata = save(service, frame, **options)
+                size_mb = os.path.getsize(metadata.result_path) / 2**20
+                latency_ms = measure(functools.partial(service.read_result, metadata), repeat=5) * 1000
+                with context.Pool(1) as pool:
+                    result_rss_mb = pool.apply(read_rss_mb, (config, metadata))
+                print(f"{str(rows_m) + 'M':>6} {label:>14} {size_mb:>10.1f} {latency_ms:>9.1f} {result_rss_mb:>14.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -2,9 +2,18 @@
 
 from .decorators import async_resnap, resnap
 from .exceptions import ResnapError
-from .factory import set_resnap_service
-from .helpers.config import Config, Services
+from .factory import set_async_resnap_service, set_resnap_service
+from .helpers.config import Config, Layout, Services
 from .helpers.context import add_metadata, add_multiple_metadata
+from .helpers.executor import set_async_executor
+from .helpers.hash_memo import freeze
+from .helpers.hashing import HashAlgorithm, register_hasher
+from .helpers.lazy import LazyResult
+from .helpers.memory_cache import EvictionPolicy
+from .helpers.table_handle import TableHandle
+from .helpers.tables import register_table_type
+from .helpers.write_behind import flush
+from .services.async_service import AsyncResnapService
 from .services.service import ResnapService
 from .version import VERSION
 
@@ -12,18 +21,33 @@ __version__ = VERSION
 __all__ = (
     # configuration
     "Config",
+    "EvictionPolicy",
+    "HashAlgorithm",
+    "Layout",
     "Services",
     # decorators
     "resnap",
     "async_resnap",
     # exceptions
     "ResnapError",
+    # write-behind
+    "flush",
     # factory
+    "set_async_executor",
+    "set_async_resnap_service",
     "set_resnap_service",
+    # hashing
+    "freeze",
+    "register_hasher",
     # metadata
     "add_metadata",
     "add_multiple_metadata",
+    # results
+    "LazyResult",
+    "TableHandle",
+    "register_table_type",
     # services
+    "AsyncResnapService",
     "ResnapService",
     # version
     "__version__",
@@ -5,8 +5,11 @@ if importlib.util.find_spec("boto3") is None:
 
 from .client import S3Client
 from .config import S3Config
+from .objects import S3ObjectReader, S3ObjectWriter
 
 __all__ = [
     "S3Client",
     "S3Config",
+    "S3ObjectReader",
+    "S3ObjectWriter",
 ]
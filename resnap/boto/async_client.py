@@ -0,0 +1,211 @@
+import importlib.util
+
+if importlib.util.find_spec("aiobotocore") is None:
+    raise ImportError("Please install aiobotocore to use the asynchronous S3 service: `pip install resnap[async-boto]`")
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import ClientCreatorContext, get_session
+from botocore.exceptions import ClientError
+
+from ..helpers.ssl import get_ca_bundle_path
+from .client import _NOT_IMPLEMENTED_CODES, _PRECONDITION_FAILED_CODES, _get_error_code
+from .config import S3Config
+from .tools import SEPARATOR, remove_separator_at_begin
+
+
+class AsyncS3Client:
+    """AsyncS3Client provides the coroutines of the asynchronous resnap service to interact with Amazon S3 or Ceph.
+    A connection is opened for each operation, so the client can be used from any event loop.
+
+    Attributes:
+        config (S3Config): Configuration object containing S3 connection details.
+    """
+
+    def __init__(self, config: S3Config) -> None:
+        self.config = config
+        self.bucket_name = config.bucket_name
+
+    def _get_connection(self) -> ClientCreatorContext:
+        return get_session().create_client(
+            "s3",
+            aws_access_key_id=self.config.access_key,
+            aws_secret_access_key=self.config.secret_key,
+            region_name=self.config.region_name,
+            endpoint_url=self.config.endpoint_url,
+            verify=get_ca_bundle_path() if not self.config.cert_file_path else self.config.cert_file_path,
+            config=AioConfig(
+                signature_version=self.config.signature_version,
+                s3={"addressing_style": "path" if self.config.force_path_style else "virtual"},
+                request_checksum_calculation="when_required",
+                response_checksum_validation="when_required",
+            ),
+        )
+
+    async def get_object(self, remote_path: str) -> bytes:
+        """Read the content of an object.
+
+        Args:
+            remote_path (str): S3 path (key) of the object.
+
+        Returns:
+            bytes: The content of the object.
+
+        Raises:
+            FileNotFoundError: If the object does not exist.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        async with self._get_connection() as connection:
+            try:
+                response = await connection.get_object(Bucket=self.bucket_name, Key=remote_path)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                    raise FileNotFoundError(f"The object '{remote_path}' doesn't exist.") from e
+                raise
+            async with response["Body"] as body:
+                return await body.read()
+
+    async def put_object(self, data: bytes, remote_path: str) -> None:
+        """Write an object, replacing it if it exists.
+
+        Args:
+            data (bytes): The content of the object.
+            remote_path (str): S3 path (key) of the object.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        async with self._get_connection() as connection:
+            await connection.put_object(Bucket=self.bucket_name, Key=remote_path, Body=data)
+
+    async def read_object(self, remote_path: str) -> tuple[bytes, str] | None:
+        """Read a small object with its ETag, for a later conditional write.
+
+        Args:
+            remote_path (str): S3 path (key) of the object.
+
+        Returns:
+            tuple[bytes, str] | None: The content and the ETag of the object, or None if the object does not exist.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        async with self._get_connection() as connection:
+            try:
+                response = await connection.get_object(Bucket=self.bucket_name, Key=remote_path)
+            except ClientError as e:
+                if _get_error_code(e) in ("404", "NoSuchKey"):
+                    return None
+                raise
+            async with response["Body"] as body:
+                return await body.read(), response["ETag"]
+
+    async def create_object(self, data: bytes, remote_path: str) -> bool:
+        """Create an object, unless it already exists, with a conditional write (`If-None-Match: *`).
+        On endpoints without conditional writes, the existence of the object is checked before the upload,
+        so that two concurrent creations may both succeed.
+
+        Args:
+            data (bytes): The content of the object.
+            remote_path (str): S3 path (key) of the object.
+
+        Returns:
+            bool: True if the object was created, False if it already exists.
+        """
+        is_written = await self._put_object_if(data, remote_path, IfNoneMatch="*")
+        if is_written is not None:
+            return is_written
+        if await self.object_exists(remote_path):
+            return False
+        await self.put_object(data, remote_path)
+        return True
+
+    async def replace_object(self, data: bytes, remote_path: str, etag: str) -> bool:
+        """Replace an object, unless it was modified since it was read, with a conditional write (`If-Match`).
+        On endpoints without conditional writes, the ETag of the object is checked before the upload.
+
+        Args:
+            data (bytes): The new content of the object.
+            remote_path (str): S3 path (key) of the object.
+            etag (str): The ETag of the object when it was read.
+
+        Returns:
+            bool: True if the object was replaced, False if it was modified or deleted meanwhile.
+        """
+        is_written = await self._put_object_if(data, remote_path, IfMatch=etag)
+        if is_written is not None:
+            return is_written
+        current = await self.read_object(remote_path)
+        if current is None or current[1] != etag:
+            return False
+        await self.put_object(data, remote_path)
+        return True
+
+    async def _put_object_if(self, data: bytes, remote_path: str, **condition: str) -> bool | None:
+        """Put an object with the given precondition.
+
+        Returns:
+            bool | None: True if the object was written, False if the precondition failed,
+                or None if the endpoint does not support conditional writes.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        async with self._get_connection() as connection:
+            try:
+                await connection.put_object(Bucket=self.bucket_name, Key=remote_path, Body=data, **condition)
+                return True
+            except ClientError as e:
+                code = _get_error_code(e)
+                if code in _PRECONDITION_FAILED_CODES:
+                    return False
+                if code in _NOT_IMPLEMENTED_CODES:
+                    return None
+                raise
+
+    async def object_exists(self, remote_path: str) -> bool:
+        """Check if an object exists.
+
+        Args:
+            remote_path (str): S3 path (key) of the object.
+
+        Returns:
+            bool: True if the object exists, False otherwise.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        async with self._get_connection() as connection:
+            try:
+                await connection.head_object(Bucket=self.bucket_name, Key=remote_path)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                    return False
+                raise
+            return True
+
+    async def list_files(self, remote_dir_path: str = "", recursive: bool = False) -> list[str]:
+        """List the files of a directory, without the directory markers.
+
+        Args:
+            remote_dir_path (str): The S3 path to the directory.
+            recursive (bool): Whether to list the sub directories too.
+
+        Returns:
+            list[str]: The keys of the files, or an empty list if the directory does not exist.
+        """
+        prefix = remove_separator_at_begin(remote_dir_path)
+        if prefix and not prefix.endswith(SEPARATOR):
+            prefix += SEPARATOR
+        operation_parameters = {"Bucket": self.bucket_name, "Prefix": prefix}
+        if not recursive:
+            operation_parameters["Delimiter"] = SEPARATOR
+
+        files: list[str] = []
+        async with self._get_connection() as connection:
+            async for page in connection.get_paginator("list_objects_v2").paginate(**operation_parameters):
+                files.extend(
+                    element["Key"] for element in page.get("Contents", []) if not element["Key"].endswith(SEPARATOR)
+                )
+        return files
+
+    async def mkdir(self, path: str) -> None:
+        """Create a directory. In S3, directories are represented by keys that end with a '/'.
+
+        Args:
+            path (str): The path to create.
+        """
+        if not path.endswith(SEPARATOR):
+            path += SEPARATOR
+        await self.put_object(b"", path)
@@ -1,13 +1,24 @@
 import io
+from datetime import datetime
 
+import numpy as np
 import pandas as pd
+from botocore.exceptions import ClientError
 
+from ..helpers.arrays import read_array_stream
 from .config import S3Config
 from .connection import get_s3_connection
 from .dataframes import get_dataframe_handler
+from .objects import S3ObjectReader, S3ObjectWriter
 from .tools import SEPARATOR, format_remote_path_folder_to_search, get_folders_and_files, remove_separator_at_begin
 
 _UNDEFINED_VALUE = object()
+_PRECONDITION_FAILED_CODES = ("412", "PreconditionFailed", "409", "ConditionalRequestConflict")
+_NOT_IMPLEMENTED_CODES = ("501", "NotImplemented")
+
+
+def _get_error_code(error: ClientError) -> str | None:
+    return error.response.get("Error", {}).get("Code")
 
 
 class S3Client:
@@ -114,6 +125,18 @@ class S3Client:
         with get_s3_connection(self.config) as connection:
             connection.delete_objects(Bucket=self.bucket_name, Delete={"Objects": objects})
 
+    def copy_object(self, source_path: str, target_path: str) -> None:
+        """Copy an object to another key of the bucket. Large objects are copied with a multipart copy.
+
+        Args:
+            source_path (str): The S3 path (key) of the object to copy.
+            target_path (str): The S3 path (key) of the copy.
+        """
+        source_path = remove_separator_at_begin(source_path)
+        target_path = remove_separator_at_begin(target_path)
+        with get_s3_connection(self.config) as connection:
+            connection.copy({"Bucket": self.bucket_name, "Key": source_path}, self.bucket_name, target_path)
+
     def object_exists(self, remote_path: str) -> bool:
         """Check if an object exists in S3.
 
@@ -136,6 +159,105 @@ class S3Client:
             except Exception:
                 return False
 
+    def get_last_modified(self, remote_path: str) -> datetime | None:
+        """Get the last modification time of an object in S3.
+
+        Args:
+            remote_path (str): The S3 path (key) of the object.
+
+        Returns:
+            datetime | None: The last modification time (timezone aware), or None if the object does not exist.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        with get_s3_connection(self.config) as connection:
+            try:
+                return connection.head_object(Bucket=self.bucket_name, Key=remote_path)["LastModified"]
+            except ClientError as e:
+                if _get_error_code(e) in ("404", "NoSuchKey"):
+                    return None
+                raise
+
+    def read_object(self, remote_path: str) -> tuple[bytes, str] | None:
+        """Read a small object from S3 with its ETag, for a later conditional write.
+
+        Args:
+            remote_path (str): The S3 path (key) of the object.
+
+        Returns:
+            tuple[bytes, str] | None: The content and the ETag of the object, or None if the object does not exist.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        with get_s3_connection(self.config) as connection:
+            try:
+                response = connection.get_object(Bucket=self.bucket_name, Key=remote_path)
+            except ClientError as e:
+                if _get_error_code(e) in ("404", "NoSuchKey"):
+                    return None
+                raise
+            return response["Body"].read(), response["ETag"]
+
+    def create_object(self, data: bytes, remote_path: str) -> bool:
+        """Create an object in S3, unless it already exists, with a conditional write (`If-None-Match: *`).
+        On endpoints without conditional writes, the existence of the object is checked before the upload,
+        so that two concurrent creations may both succeed.
+
+        Args:
+            data (bytes): The content of the object.
+            remote_path (str): The S3 path (key) of the object.
+
+        Returns:
+            bool: True if the object was created, False if it already exists.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        is_written = self._put_object_if(data, remote_path, IfNoneMatch="*")
+        if is_written is not None:
+            return is_written
+        if self.object_exists(remote_path):
+            return False
+        self.upload_file(io.BytesIO(data), remote_path)
+        return True
+
+    def replace_object(self, data: bytes, remote_path: str, etag: str) -> bool:
+        """Replace an object in S3, unless it was modified since it was read, with a conditional write (`If-Match`).
+        On endpoints without conditional writes, the ETag of the object is checked before the upload.
+
+        Args:
+            data (bytes): The new content of the object.
+            remote_path (str): The S3 path (key) of the object.
+            etag (str): The ETag of the object when it was read.
+
+        Returns:
+            bool: True if the object was replaced, False if it was modified or deleted meanwhile.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        is_written = self._put_object_if(data, remote_path, IfMatch=etag)
+        if is_written is not None:
+            return is_written
+        current = self.read_object(remote_path)
+        if current is None or current[1] != etag:
+            return False
+        self.upload_file(io.BytesIO(data), remote_path)
+        return True
+
+    def _put_object_if(self, data: bytes, remote_path: str, **condition: str) -> bool | None:
+        """Put an object with the given precondition.
+
+        Returns:
+            bool | None: True if the object was written, False if the precondition failed,
+                or None if the endpoint does not support conditional writes.
+        """
+        with get_s3_connection(self.config) as connection:
+            try:
+                connection.put_object(Bucket=self.bucket_name, Key=remote_path, Body=data, **condition)
+                return True
+            except ClientError as e:
+                code = _get_error_code(e)
+                if code in _PRECONDITION_FAILED_CODES:
+                    return False
+                if code in _NOT_IMPLEMENTED_CODES:
+                    return None
+                raise
+
     def mkdir(self, path: str) -> None:
         """Create a directory in S3. In S3, directories are represented by keys that end with a '/'.
 
@@ -178,6 +300,45 @@ class S3Client:
             bytes_object = connection.get_object(Bucket=self.bucket_name, Key=remote_path)["Body"]
             return df_handler.read_df(bytes_object, **kwargs)
 
+    def get_array_from_file(self, remote_path: str) -> np.ndarray:
+        """Read a `.npy` file from S3, streamed into an array allocated from its header.
+
+        Args:
+            remote_path (str): The S3 path to the file.
+
+        Returns:
+            np.ndarray: The array.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        with get_s3_connection(self.config) as connection:
+            body = connection.get_object(Bucket=self.bucket_name, Key=remote_path)["Body"]
+            return read_array_stream(body)
+
+    def open_object(self, remote_path: str) -> S3ObjectReader:
+        """Open an object of S3 for random access: only the ranges of the object which are read are downloaded.
+
+        Args:
+            remote_path (str): The S3 path (key) of the object.
+
+        Returns:
+            S3ObjectReader: The file of the object, holding its own connection.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        return S3ObjectReader(get_s3_connection(self.config).connection, self.bucket_name, remote_path)
+
+    def open_object_writer(self, remote_path: str) -> S3ObjectWriter:
+        """Create an object of S3 written sequentially: the object is uploaded in parts as it is written, and is
+        only created once the writer is closed.
+
+        Args:
+            remote_path (str): The S3 path (key) of the object.
+
+        Returns:
+            S3ObjectWriter: The file of the object, holding its own connection.
+        """
+        remote_path = remove_separator_at_begin(remote_path)
+        return S3ObjectWriter(get_s3_connection(self.config).connection, self.bucket_name, remote_path)
+
     def push_df_to_file(
         self,
         df: pd.DataFrame,
@@ -8,7 +8,7 @@ import pyarrow as pa
 
 BufferType = io.FileIO | io.BytesIO | io.StringIO
 _SUPPORTED_COMPRESSIONS = ["gzip"]
-AVAILABLE_COMPRESSIONS = {"gzip": [".gz"], "snappy": ["*"]}
+AVAILABLE_COMPRESSIONS = {"gzip": [".gz"], "snappy": ["*"], "lz4": ["*"], "zstd": ["*"]}
 
 
 class DataFrameHandler(ABC):
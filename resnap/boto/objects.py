@@ -0,0 +1,178 @@
+import io
+from typing import Any
+
+from botocore.client import BaseClient
+
+PART_SIZE = 8 * 1024 * 1024
+"""Size of the parts in which the objects written by a `S3ObjectWriter` are uploaded."""
+
+
+class S3ObjectReader(io.RawIOBase):
+    """A read-only, seekable file over an S3 object: each read downloads the requested bytes with a ranged GET,
+    so that a reader seeking through the object, such as a parquet reader, only downloads the parts it reads.
+
+    Args:
+        connection (BaseClient): The S3 connection, kept open by the reader.
+        bucket_name (str): The bucket of the object.
+        key (str): The key of the object.
+    """
+
+    def __init__(self, connection: BaseClient, bucket_name: str, key: str) -> None:
+        super().__init__()
+        self._connection = connection
+        self._bucket_name = bucket_name
+        self._key = key
+        self._size: int = connection.head_object(Bucket=bucket_name, Key=key)["ContentLength"]
+        self._position = 0
+
+    @property
+    def size(self) -> int:
+        """The size of the object."""
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        origins = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}
+        if whence not in origins:
+            raise ValueError(f"Invalid whence {whence}")
+        position = origins[whence] + offset
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def _read_range(self, size: int) -> bytes:
+        size = min(size, self._size - self._position)
+        if size <= 0:
+            return b""
+        response = self._connection.get_object(
+            Bucket=self._bucket_name, Key=self._key, Range=f"bytes={self._position}-{self._position + size - 1}",
+        )
+        data = response["Body"].read()
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        data = self._read_range(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readall(self) -> bytes:
+        # the rest of the object is downloaded with a single request
+        return self._read_range(self._size - self._position)
+
+
+class S3ObjectWriter(io.RawIOBase):
+    """A write-only file creating an S3 object: the written bytes are buffered, and uploaded as the parts of a
+    multipart upload as soon as a part is full, so that a large object is written with a bounded memory.
+    An object smaller than a part is uploaded with a single request. The object is only created when the file
+    is closed: a file aborted, left by an error raised in its `with` block, or closed after a failed write, does not
+    create a truncated object.
+
+    Args:
+        connection (BaseClient): The S3 connection, kept open by the writer.
+        bucket_name (str): The bucket of the object.
+        key (str): The key of the object.
+        part_size (int): The size of the uploaded parts, at least the 5 MiB required by S3 but the last one.
+    """
+
+    def __init__(self, connection: BaseClient, bucket_name: str, key: str, part_size: int = PART_SIZE) -> None:
+        super().__init__()
+        self._connection = connection
+        self._bucket_name = bucket_name
+        self._key = key
+        self._part_size = part_size
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: list[dict[str, Any]] = []
+        self._failed = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        data = memoryview(data).cast("B")
+        self._buffer += data
+        try:
+            while len(self._buffer) >= self._part_size:
+                self._upload_part(self._part_size)
+        except Exception:
+            # a part is missing, the object is not created when the file is closed
+            self._failed = True
+            raise
+        return data.nbytes
+
+    def _upload_part(self, size: int) -> None:
+        if self._upload_id is None:
+            self._upload_id = self._connection.create_multipart_upload(
+                Bucket=self._bucket_name, Key=self._key,
+            )["UploadId"]
+        part_number = len(self._parts) + 1
+        response = self._connection.upload_part(
+            Bucket=self._bucket_name,
+            Key=self._key,
+            PartNumber=part_number,
+            UploadId=self._upload_id,
+            Body=bytes(self._buffer[:size]),
+        )
+        del self._buffer[:size]
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def _complete(self) -> None:
+        if self._upload_id is None:
+            self._connection.put_object(Bucket=self._bucket_name, Key=self._key, Body=bytes(self._buffer))
+            return
+        try:
+            if self._buffer:
+                self._upload_part(len(self._buffer))
+            self._connection.complete_multipart_upload(
+                Bucket=self._bucket_name,
+                Key=self._key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        except Exception:
+            # the uploaded parts are not kept by the bucket
+            self._connection.abort_multipart_upload(Bucket=self._bucket_name, Key=self._key, UploadId=self._upload_id)
+            raise
+
+    def abort(self) -> None:
+        """Close the file without creating the object, the parts already uploaded are discarded."""
+        if self.closed:
+            return
+        try:
+            if self._upload_id is not None:
+                self._connection.abort_multipart_upload(
+                    Bucket=self._bucket_name, Key=self._key, UploadId=self._upload_id,
+                )
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self._failed:
+            self.abort()
+            return
+        try:
+            self._complete()
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+    def __exit__(self, exc_type: type[BaseException] | None, *args: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
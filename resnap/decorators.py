@@ -1,17 +1,59 @@
+import asyncio
+import contextlib
 import functools
+import inspect
 import logging
-from collections.abc import Callable, Coroutine
+import multiprocessing
+import time
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+)
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from typing import Any, ParamSpec, TypeVar, overload
 
 from .exceptions import ResnapError
 from .factory import ResnapServiceFactory
+from .helpers.batch import BatchWriter, as_call, call_decorated
+from .helpers.config import (
+    ArrowCompression,
+    FileCompression,
+    ParquetCompression,
+    get_compression_options,
+)
 from .helpers.context import clear_metadata, get_metadata, restore_metadata
-from .helpers.results_retriever import ResultsRetriever
+from .helpers.executor import get_async_executor, run_in_executor
+from .helpers.lazy import LazyResult
+from .helpers.results_retriever import (
+    AsyncResultsRetriever,
+    BatchResultsRetriever,
+    ResultsRetriever,
+)
+from .helpers.signature import ArgumentBinder
+from .helpers.single_flight import single_flight
+from .helpers.streams import StreamWriter
+from .helpers.table_handle import Filters, TableHandle
+from .helpers.tables import get_result_type, get_table_type
+from .helpers.write_behind import write_behind
+from .services.async_service import AsyncResnapService
 from .services.service import ResnapService
 
 logger = logging.getLogger("resnap")
 
+R = TypeVar("R")  # Return type
+P = ParamSpec("P")  # Parameter specification
+
+# the worker processes are spawned, as forking a process running the resnap threads may deadlock the children
+_MAP_EXECUTORS: dict[str, Callable[..., Executor]] = {
+    "thread": ThreadPoolExecutor,
+    "process": functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn")),
+}
+
 
 def _save(
     service: ResnapService,
@@ -21,27 +63,598 @@ def _save(
     result: Any,
     extra_metadata: dict,
     output_format: str | None = None,
-) -> None:
+    **compression: Any,
+) -> datetime:
     logger.debug("Saving result...")
-    result_path, event_time = service.save_result(func_name, result, output_folder, output_format)
+    result_path, event_time = service.save_result(
+        func_name, result, output_folder, output_format, hashed_arguments, **compression,
+    )
     service.save_success_metadata(
         func_name=func_name,
         output_folder=output_folder,
         hashed_arguments=hashed_arguments,
         event_time=event_time,
         result_path=result_path,
-        result_type=type(result).__name__,
+        result_type=get_result_type(result),
+        extra_metadata=extra_metadata,
+        **compression,
+    )
+    return event_time
+
+
+def _save_and_cache(
+    service: ResnapService,
+    results_retriever: ResultsRetriever,
+    result: Any,
+    extra_metadata: dict,
+    options: dict[str, Any],
+) -> None:
+    event_time = _save(
+        service=service,
+        func_name=results_retriever.func_name,
+        output_folder=results_retriever.output_folder,
+        hashed_arguments=results_retriever.hashed_arguments,
+        result=result,
+        extra_metadata=extra_metadata,
+        output_format=options.get("output_format"),
+        **get_compression_options(options),
+    )
+    results_retriever.cache_result(result, event_time)
+
+
+def _is_leased(options: dict[str, Any]) -> bool:
+    # the processes waiting for the lease get the result of its holder back, which needs the recovery
+    return options.get("lease", False) and options.get("enable_recovery", True)
+
+
+def _is_write_behind(options: dict[str, Any]) -> bool:
+    # the processes waiting for a lease look for the saved result, so a leased result is saved before it is returned
+    return options.get("write_behind", False) and not _is_leased(options)
+
+
+def _persist(
+    service: ResnapService,
+    results_retriever: ResultsRetriever,
+    result: Any,
+    extra_metadata: dict,
+    options: dict[str, Any],
+) -> None:
+    if not _is_write_behind(options):
+        _save_and_cache(service, results_retriever, result, extra_metadata, options)
+        return
+    write_behind.submit(
+        results_retriever.key,
+        result,
+        functools.partial(_save_and_cache, service, results_retriever, result, extra_metadata, options),
+        service.config.write_behind_max_workers,
+        service.config.write_behind_max_pending,
+    )
+
+
+async def _async_get_results(
+    service: ResnapService,
+    async_service: AsyncResnapService | None,
+    executor: Executor,
+    binder: ArgumentBinder,
+    args: tuple,
+    kwargs: dict,
+    options: dict[str, Any],
+) -> tuple[ResultsRetriever, Any, bool]:
+    if async_service is None:
+        results_retriever = ResultsRetriever(service, options)
+        result, is_recovery = await run_in_executor(executor, results_retriever.get_results, binder, args, kwargs)
+    else:
+        results_retriever = AsyncResultsRetriever(async_service, options)
+        result, is_recovery = await results_retriever.get_results(binder, args, kwargs)
+    return results_retriever, result, is_recovery
+
+
+async def _async_save_and_cache(
+    service: ResnapService,
+    async_service: AsyncResnapService | None,
+    executor: Executor,
+    results_retriever: ResultsRetriever,
+    result: Any,
+    extra_metadata: dict,
+    options: dict[str, Any],
+) -> None:
+    if async_service is None or _is_write_behind(options):
+        # the results saved in the background are saved by the writers of the synchronous service
+        await run_in_executor(executor, _persist, service, results_retriever, result, extra_metadata, options)
+        return
+
+    logger.debug("Saving result...")
+    result_path, event_time = await async_service.save_result(
+        results_retriever.func_name,
+        result,
+        results_retriever.output_folder,
+        options.get("output_format"),
+        results_retriever.hashed_arguments,
+        **get_compression_options(options),
+    )
+    await async_service.save_success_metadata(
+        func_name=results_retriever.func_name,
+        output_folder=results_retriever.output_folder,
+        hashed_arguments=results_retriever.hashed_arguments,
+        event_time=event_time,
+        result_path=result_path,
+        result_type=get_result_type(result),
         extra_metadata=extra_metadata,
+        **get_compression_options(options),
+    )
+    results_retriever.cache_result(result, event_time)
+
+
+def _get_failed_metadata(
+    service: ResnapService, results_retriever: ResultsRetriever, error: Exception, extra_metadata: dict,
+) -> dict[str, Any]:
+    return {
+        "func_name": results_retriever.func_name,
+        "output_folder": results_retriever.output_folder,
+        "hashed_arguments": results_retriever.hashed_arguments,
+        "event_time": datetime.now(service.config.timezone),
+        "error_message": str(error),
+        "data": error.data if isinstance(error, ResnapError) else {},
+        "extra_metadata": extra_metadata,
+    }
+
+
+async def _async_save_failed_metadata(
+    service: ResnapService,
+    async_service: AsyncResnapService | None,
+    executor: Executor,
+    failed_metadata: dict[str, Any],
+) -> None:
+    if async_service is None:
+        await run_in_executor(executor, service.save_failed_metadata, **failed_metadata)
+    else:
+        await async_service.save_failed_metadata(**failed_metadata)
+
+
+def _execute(
+    service: ResnapService,
+    results_retriever: ResultsRetriever,
+    options: dict[str, Any],
+    func: Callable[..., R],
+    args: tuple,
+    kwargs: dict,
+) -> R:
+    try:
+        logger.debug(f"Executing function {results_retriever.func_name}...")
+        result = func(*args, **kwargs)
+        _persist(service, results_retriever, result, get_metadata(), options)
+        return result
+
+    except Exception as e:
+        service.save_failed_metadata(**_get_failed_metadata(service, results_retriever, e, get_metadata()))
+        raise e
+
+
+async def _async_execute(
+    service: ResnapService,
+    async_service: AsyncResnapService | None,
+    executor: Executor,
+    results_retriever: ResultsRetriever,
+    options: dict[str, Any],
+    func: Callable[..., Coroutine[Any, Any, R]],
+    args: tuple,
+    kwargs: dict,
+) -> R:
+    try:
+        logger.debug(f"Executing function {results_retriever.func_name}...")
+        result = await func(*args, **kwargs)
+        await _async_save_and_cache(
+            service, async_service, executor, results_retriever, result, get_metadata(), options,
+        )
+        return result
+
+    except Exception as e:
+        failed_metadata = _get_failed_metadata(service, results_retriever, e, get_metadata())
+        await _async_save_failed_metadata(service, async_service, executor, failed_metadata)
+        raise e
+
+
+def _is_single_flight(service: ResnapService, options: dict[str, Any]) -> bool:
+    # a function without recovery is called again on purpose, its concurrent calls are not shared
+    return service.config.single_flight and options.get("enable_recovery", True)
+
+
+def _get_lease_ttl(service: ResnapService, options: dict[str, Any]) -> float:
+    return options.get("lease_ttl_seconds") or service.config.lease_ttl_seconds
+
+
+def _run_leased(
+    service: ResnapService, results_retriever: ResultsRetriever, options: dict[str, Any], execute: Callable[[], R],
+) -> R:
+    if not _is_leased(options):
+        return execute()
+    while True:
+        lease = service.acquire_lease(
+            results_retriever.func_name,
+            results_retriever.output_folder,
+            results_retriever.hashed_arguments,
+            _get_lease_ttl(service, options),
+        )
+        if lease is not None:
+            with lease:
+                # the previous holder of the lease may have saved the result since the first lookup
+                result, is_recovery = results_retriever.get_saved_result()
+                return result if is_recovery else execute()
+        logger.debug(f"Waiting for the result of {results_retriever.func_name} computed by another process...")
+        time.sleep(service.config.lease_poll_interval_seconds)
+        result, is_recovery = results_retriever.get_saved_result()
+        if is_recovery:
+            return result
+
+
+async def _async_get_saved_result(executor: Executor, results_retriever: ResultsRetriever) -> tuple[Any, bool]:
+    if isinstance(results_retriever, AsyncResultsRetriever):
+        return await results_retriever.get_saved_result()
+    return await run_in_executor(executor, results_retriever.get_saved_result)
+
+
+async def _async_run_leased(
+    service: ResnapService,
+    executor: Executor,
+    results_retriever: ResultsRetriever,
+    options: dict[str, Any],
+    execute: Callable[[], Awaitable[R]],
+) -> R:
+    if not _is_leased(options):
+        return await execute()
+    while True:
+        lease = await run_in_executor(
+            executor,
+            service.acquire_lease,
+            results_retriever.func_name,
+            results_retriever.output_folder,
+            results_retriever.hashed_arguments,
+            _get_lease_ttl(service, options),
+        )
+        if lease is not None:
+            try:
+                # the previous holder of the lease may have saved the result since the first lookup
+                result, is_recovery = await _async_get_saved_result(executor, results_retriever)
+                return result if is_recovery else await execute()
+            finally:
+                await run_in_executor(executor, lease.release)
+        logger.debug(f"Waiting for the result of {results_retriever.func_name} computed by another process...")
+        await asyncio.sleep(service.config.lease_poll_interval_seconds)
+        result, is_recovery = await _async_get_saved_result(executor, results_retriever)
+        if is_recovery:
+            return result
+
+
+def _run_once(
+    service: ResnapService, results_retriever: ResultsRetriever, options: dict[str, Any], execute: Callable[[], R],
+) -> R:
+    # the threads of the process share the call of the leader, which shares its result with the other processes
+    execute_leased = functools.partial(_run_leased, service, results_retriever, options, execute)
+    if not _is_single_flight(service, options):
+        return execute_leased()
+    return single_flight.run(results_retriever.key, execute_leased, service.config.single_flight_timeout_seconds)
+
+
+async def _async_run_once(
+    service: ResnapService,
+    executor: Executor,
+    results_retriever: ResultsRetriever,
+    options: dict[str, Any],
+    execute: Callable[[], Awaitable[R]],
+) -> R:
+    execute_leased = functools.partial(_async_run_leased, service, executor, results_retriever, options, execute)
+    if not _is_single_flight(service, options):
+        return await execute_leased()
+    return await single_flight.run_async(
+        results_retriever.key, execute_leased, service.config.single_flight_timeout_seconds,
     )
 
 
 def _clear(service: ResnapService) -> None:
     logger.debug("Clearing old saves...")
-    service.clear_old_saves()
+    service.clear_old_saves_if_due()
+
+
+def _open_stream(
+    service: ResnapService, results_retriever: ResultsRetriever, item: Any, options: dict[str, Any],
+) -> StreamWriter:
+    logger.debug("Saving items...")
+    return service.open_stream(
+        results_retriever.func_name,
+        item,
+        results_retriever.output_folder,
+        options.get("output_format"),
+        results_retriever.hashed_arguments,
+        **get_compression_options(options),
+    )
 
 
-R = TypeVar("R")  # Return type
-P = ParamSpec("P")  # Parameter specification
+def _commit_stream(
+    service: ResnapService,
+    results_retriever: ResultsRetriever,
+    writer: StreamWriter,
+    extra_metadata: dict,
+    options: dict[str, Any],
+) -> None:
+    writer.close()
+    service.save_success_metadata(
+        func_name=results_retriever.func_name,
+        output_folder=results_retriever.output_folder,
+        hashed_arguments=results_retriever.hashed_arguments,
+        event_time=writer.event_time,
+        result_path=writer.result_path,
+        result_type=writer.result_type,
+        extra_metadata=extra_metadata,
+        **get_compression_options(options),
+    )
+
+
+def _abort_stream(
+    service: ResnapService,
+    results_retriever: ResultsRetriever,
+    writer: StreamWriter | None,
+    error: BaseException,
+    extra_metadata: dict,
+) -> None:
+    # a generator closed before its end is not saved, and one which raised is recorded as failed
+    if writer is not None:
+        writer.abort()
+    if isinstance(error, Exception):
+        service.save_failed_metadata(**_get_failed_metadata(service, results_retriever, error, extra_metadata))
+
+
+def _record_stream(
+    service: ResnapService, results_retriever: ResultsRetriever, options: dict[str, Any], items: Iterator[R],
+) -> Iterator[R]:
+    writer: StreamWriter | None = None
+    try:
+        for item in items:
+            if writer is None:
+                writer = _open_stream(service, results_retriever, item, options)
+            writer.write(item)
+            yield item
+        if writer is None:
+            writer = _open_stream(service, results_retriever, None, options)
+        _commit_stream(service, results_retriever, writer, get_metadata(), options)
+    except BaseException as e:
+        _abort_stream(service, results_retriever, writer, e, get_metadata())
+        raise
+
+
+def _stream(
+    func: Callable[..., Iterator[R]], binder: ArgumentBinder, options: dict[str, Any], args: tuple, kwargs: dict,
+) -> Iterator[R]:
+    service: ResnapService = ResnapServiceFactory.get_service()
+    if not service.is_enabled:
+        yield from func(*args, **kwargs)
+        return
+    _clear(service)
+
+    results_retriever = ResultsRetriever(service, options)
+    metadata = results_retriever.find_saved_stream(binder, args, kwargs)
+    if metadata is not None:
+        logger.debug("Replaying saved items...")
+        yield from service.read_stream(metadata)
+        return
+
+    token = clear_metadata()
+    try:
+        logger.debug(f"Executing function {results_retriever.func_name}...")
+        with contextlib.closing(func(*args, **kwargs)) as items:
+            yield from _record_stream(service, results_retriever, options, items)
+    finally:
+        restore_metadata(token)
+
+
+_END = object()
+
+
+async def _async_record_stream(
+    service: ResnapService,
+    executor: Executor,
+    results_retriever: ResultsRetriever,
+    options: dict[str, Any],
+    items: AsyncIterator[R],
+) -> AsyncIterator[R]:
+    writer: StreamWriter | None = None
+    try:
+        async for item in items:
+            if writer is None:
+                writer = await run_in_executor(executor, _open_stream, service, results_retriever, item, options)
+            await run_in_executor(executor, writer.write, item)
+            yield item
+        if writer is None:
+            writer = await run_in_executor(executor, _open_stream, service, results_retriever, None, options)
+        await run_in_executor(executor, _commit_stream, service, results_retriever, writer, get_metadata(), options)
+    except BaseException as e:
+        await run_in_executor(executor, _abort_stream, service, results_retriever, writer, e, get_metadata())
+        raise
+
+
+async def _async_stream(
+    func: Callable[..., AsyncIterator[R]],
+    binder: ArgumentBinder,
+    options: dict[str, Any],
+    args: tuple,
+    kwargs: dict,
+) -> AsyncIterator[R]:
+    service: ResnapService = ResnapServiceFactory.get_service()
+    if not service.is_enabled:
+        async with contextlib.aclosing(func(*args, **kwargs)) as items:
+            async for item in items:
+                yield item
+        return
+    # the items are written and read by the synchronous service, in the executor
+    executor = get_async_executor(service.config.async_max_workers)
+    await run_in_executor(executor, _clear, service)
+
+    results_retriever = ResultsRetriever(service, options)
+    metadata = await run_in_executor(executor, results_retriever.find_saved_stream, binder, args, kwargs)
+    if metadata is not None:
+        logger.debug("Replaying saved items...")
+        with contextlib.closing(service.read_stream(metadata)) as saved_items:
+            while (item := await run_in_executor(executor, next, saved_items, _END)) is not _END:
+                yield item
+        return
+
+    token = clear_metadata()
+    try:
+        logger.debug(f"Executing function {results_retriever.func_name}...")
+        async with contextlib.aclosing(func(*args, **kwargs)) as items:
+            async for item in _async_record_stream(service, executor, results_retriever, options, items):
+                yield item
+    finally:
+        restore_metadata(token)
+
+
+def _stream_wrapper(
+    func: Callable[P, Iterator[R]], binder: ArgumentBinder, options: dict[str, Any],
+) -> Callable[P, Iterator[R]]:
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> Iterator[R]:
+        return (yield from _stream(func, binder, options, args, kwargs))
+
+    return wrapper
+
+
+def _async_stream_wrapper(
+    func: Callable[P, AsyncIterator[R]], binder: ArgumentBinder, options: dict[str, Any],
+) -> Callable[P, AsyncIterator[R]]:
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> AsyncIterator[R]:
+        async with contextlib.aclosing(_async_stream(func, binder, options, args, kwargs)) as items:
+            async for item in items:
+                yield item
+
+    return wrapper
+
+
+def _map_results(
+    decorated: Callable[..., R],
+    binder: ArgumentBinder,
+    options: dict[str, Any],
+    calls: list[tuple[tuple, dict]],
+    max_workers: int | None,
+    new_executor: Callable[..., Executor],
+) -> Iterator[R]:
+    service: ResnapService = ResnapServiceFactory.get_service()
+    if not service.is_enabled:
+        with new_executor(max_workers=max_workers) as executor:
+            computations = [executor.submit(call_decorated, decorated, args, kwargs) for args, kwargs in calls]
+            for computation in computations:
+                yield computation.result()[0]
+        return
+
+    _clear(service)
+    batch = BatchResultsRetriever(service, options)
+    results = batch.get_results(binder, calls, max_workers)
+    writer = BatchWriter(service, options, max_workers)
+    executor = new_executor(max_workers=max_workers)
+    try:
+        # the calls with the same arguments are computed once
+        computations = {}
+        for position, retriever in enumerate(batch.retrievers):
+            if position not in results and retriever.key not in computations:
+                computations[retriever.key] = executor.submit(call_decorated, decorated, *calls[position])
+                writer.save_when_done(retriever, computations[retriever.key])
+        logger.debug(f"{len(results)} saved results, {len(computations)} results to compute...")
+
+        for position, retriever in enumerate(batch.retrievers):
+            result = results[position] if position in results else computations[retriever.key].result()[0]
+            yield retriever.wrap_result(result)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if batch.retrievers:
+            writer.close(batch.retrievers[0].func_name, batch.retrievers[0].output_folder)
+
+
+def _map(
+    decorated: Callable[..., R],
+    binder: ArgumentBinder,
+    options: dict[str, Any],
+    items: Iterable[Any],
+    max_workers: int | None = None,
+    executor: str = "thread",
+    stream: bool = False,
+) -> list[R] | Iterator[R]:
+    """
+    Call the function on many argument sets: the saved results are looked up with a single read of the function
+    index and read concurrently, and only the missing results are computed, in parallel, then saved concurrently.
+
+    Args:
+        items (Iterable[Any]): The argument sets. A tuple holds the positional arguments, a mapping the keyword
+            arguments, and any other item is the single argument of the call.
+        max_workers (int | None): The number of workers computing the missing results, and of threads reading
+            and saving the results. If None, the default of the executor is used.
+        executor (str): "thread" to compute the missing results in threads, "process" in processes.
+            The function must then be defined at the top level of a module. Default is "thread".
+        stream (bool): If True, an iterator is returned, yielding the results in the order of the argument sets
+            as soon as they are available. Default is False.
+    Returns:
+        list[R] | Iterator[R]: The results, in the order of the argument sets.
+    """
+    if executor not in _MAP_EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {list(_MAP_EXECUTORS)}")
+    calls = [as_call(item) for item in items]
+    results = _map_results(decorated, binder, options, calls, max_workers, _MAP_EXECUTORS[executor])
+    return results if stream else list(results)
+
+
+def _open(
+    decorated: Callable[..., R], binder: ArgumentBinder, options: dict[str, Any], args: tuple, kwargs: dict,
+) -> TableHandle:
+    service: ResnapService = ResnapServiceFactory.get_service()
+    if service.is_enabled:
+        _clear(service)
+        handle = ResultsRetriever(service, options).open_saved_table(binder, args, kwargs)
+        if handle is not None:
+            return handle
+
+    # the result is computed and saved, or read whole, by a call of the function
+    result = decorated(*args, **kwargs)
+    if isinstance(result, LazyResult):
+        result = result.value
+    table_type = get_table_type(result)
+    if table_type is None:
+        raise TypeError(f"{binder.func_name} returned a {type(result).__name__}, which is not a table")
+    return TableHandle.from_result(result, table_type)
+
+
+def _load(
+    decorated: Callable[..., R],
+    binder: ArgumentBinder,
+    options: dict[str, Any],
+    *args: Any,
+    columns: list[str] | None = None,
+    filters: Filters | None = None,
+    lazy: bool = False,
+    **kwargs: Any,
+) -> R | TableHandle:
+    """
+    Get some columns and rows of the tabular result of a call. A result saved in parquet or arrow is read partially:
+    only the given columns are read, and the row groups of a parquet file whose column statistics exclude the rows
+    matching the filters are skipped, on the local backend and on S3 with ranged reads. Any other result is got
+    by a call of the function, which computes and saves it if needed, then restricted in memory.
+
+    Args:
+        *args: The positional arguments of the call.
+        columns (list[str] | None): The columns to read. If None, all the columns are read.
+        filters (Filters | None): The filters of the rows to read, a pyarrow expression or predicates in the
+            disjunctive normal form of `pyarrow.parquet`, such as `[("day", "=", "2025-07-15")]`.
+            If None, all the rows are read.
+        lazy (bool): If True, a `TableHandle` of the result is returned instead, which reads the columns and the
+            rows given to its `read` method. Default is False.
+        **kwargs: The keyword arguments of the call.
+    Returns:
+        R | TableHandle: The result restricted to the columns and the rows, in its type, or its handle.
+    Raises:
+        TypeError: If the result is not a table.
+    """
+    handle = _open(decorated, binder, options, args, kwargs)
+    if lazy:
+        return handle
+    with handle:
+        return handle.read(columns, filters)
 
 
 @overload
@@ -58,6 +671,15 @@ def resnap(
     enable_recovery: bool = True,
     consider_args: bool = True,
     considered_attributes: list[str] | None = None,
+    memory_cache: bool = True,
+    lease: bool = False,
+    lease_ttl_seconds: float | None = None,
+    write_behind: bool = False,
+    lazy: bool = False,
+    parquet_compression: ParquetCompression | str | None = None,
+    compression_level: int | None = None,
+    arrow_compression: ArrowCompression | str | None = None,
+    file_compression: FileCompression | str | None = None,
 ) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
 
 
@@ -68,10 +690,18 @@ def resnap(
     Decorator to save the result of a function and return it if the function has been called with the same arguments
     before and the result was saved successfully.
 
+    The items of a generator are saved as they are yielded, tables in the row groups of a parquet file and other
+    items pickled one after the other, and replayed one by one by the later calls. The snapshot is only recorded
+    once the generator is exhausted. `memory_cache`, `lease`, `write_behind`, `lazy`, `map` and `load` do not
+    apply to generators.
+
     Args:
         output_format (str): The format in which the result should be saved.
             If None, the result will be saved in the default format of the service.
-            Allowed formats for pd.DataFrame: "parquet" (default) and "csv".
+            Allowed formats for pd.DataFrame: "parquet" (default), "csv" and "arrow".
+            Allowed formats for pyarrow.Table and polars.DataFrame: "parquet" (default) and "arrow".
+            Allowed formats for np.ndarray: "npy" (default) and "pickle", and for dicts of arrays: "npz" (default)
+            and "pickle". Object arrays are always pickled.
             Allowed formats for other types: "pickle" (default), "txt" and "json".
         output_folder (str): The folder where the result should be saved.
             If None, the result will be saved in the default folder of the service.
@@ -81,8 +711,44 @@ def resnap(
             If False, the arguments are ignored and only the function name is considered. Default is True.
         considered_attributes (list[str]): The list of class/instance attributes to consider when hashing the function
             arguments. Warning: Do not use __slots__ in your classes if you want to use this feature.
+        memory_cache (bool): If True and the memory tier is enabled in the configuration, the result is also kept in
+            memory and later calls of the same process get it back without reading the store. Default is True.
+        lease (bool): If True, a process computing the result holds a lease in the store, and the other processes
+            calling the function with the same arguments wait for its result instead of computing it again.
+            The lease is implemented by the local and the S3 backends. Default is False.
+        lease_ttl_seconds (float): The time after which the lease of a process which died can be taken over.
+            If None, `lease_ttl_seconds` of the configuration is used.
+        write_behind (bool): If True, the result is returned as soon as it is computed and saved in the background
+            by a pool of `write_behind_max_workers` writers. The result is returned to the calls of the same process
+            until it is saved. A failed save is logged. Call `resnap.flush()` to wait for the pending saves.
+            Ignored with `lease=True`. Default is False.
+        lazy (bool): If True, a `LazyResult` proxy of the result is returned, and a saved result is only read on its
+            first use: an attribute access, an operator or its `value`. A proxy passed to another resnap function
+            is hashed with the key of the result instead of its content, so that it is not read. Default is False.
+        parquet_compression (ParquetCompression | str): The compression of the DataFrames saved in parquet:
+            "none", "snappy", "lz4", "zstd" or "gzip". It is recorded in the metadata of the result.
+            If None, `parquet_compression` of the configuration is used.
+        compression_level (int): The compression level of "lz4", "zstd" and "gzip". If None, `compression_level`
+            of the configuration is used with the compression of the configuration, and the codec default otherwise.
+        arrow_compression (ArrowCompression | str): The compression of the results saved in arrow (Arrow IPC):
+            "none", "lz4" or "zstd". Only uncompressed files are read without a copy from the local backend.
+            If None, `arrow_compression` of the configuration is used.
+        file_compression (FileCompression | str): The compression of the results saved in pickle, txt or json:
+            "none", "zstd", "lz4" or "gzip". The file is compressed as it is written and decompressed as it is read,
+            and its codec is recorded in the metadata of the result. If None, `file_compression` of the
+            configuration is used.
+
+    The decorated function gets a `map(items, max_workers=None, executor="thread", stream=False)` method calling it
+    on many argument sets: the saved results are looked up with a single read of the function index, and only the
+    missing ones are computed in parallel. See `_map`.
+    It also gets a `load(*args, columns=None, filters=None, lazy=False, **kwargs)` method reading only some
+    columns and rows of a tabular result. See `_load`.
     """
     def resnap_decorator(func: Callable[P, R]) -> Callable[P, R]:
+        binder = ArgumentBinder(func, options.get("considered_attributes"))
+        if inspect.isgeneratorfunction(func):
+            return _stream_wrapper(func, binder, options)
+
         @functools.wraps(func)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
             service: ResnapService = ResnapServiceFactory.get_service()
@@ -93,38 +759,18 @@ def resnap(
             token = clear_metadata()
 
             results_retriever = ResultsRetriever(service, options)
-            result, is_recovery = results_retriever.get_results(func, args, kwargs)
+            result, is_recovery = results_retriever.get_results(binder, args, kwargs)
             if is_recovery:
-                return result
+                return results_retriever.wrap_result(result)
 
+            execute = functools.partial(_execute, service, results_retriever, options, func, args, kwargs)
             try:
-                logger.debug(f"Executing function {results_retriever.func_name}...")
-                result = func(*args, **kwargs)
-                _save(
-                    service=service,
-                    func_name=results_retriever.func_name,
-                    output_folder=results_retriever.output_folder,
-                    hashed_arguments=results_retriever.hashed_arguments,
-                    result=result,
-                    extra_metadata=get_metadata(),
-                    output_format=options.get("output_format"),
-                )
-                return result
-
-            except Exception as e:
-                service.save_failed_metadata(
-                    func_name=results_retriever.func_name,
-                    output_folder=results_retriever.output_folder,
-                    hashed_arguments=results_retriever.hashed_arguments,
-                    event_time=datetime.now(service.config.timezone),
-                    error_message=str(e),
-                    data=e.data if isinstance(e, ResnapError) else {},
-                    extra_metadata=get_metadata(),
-                )
-                raise e
+                return results_retriever.wrap_result(_run_once(service, results_retriever, options, execute))
             finally:
                 restore_metadata(token)
 
+        wrapper.map = functools.partial(_map, wrapper, binder, options)
+        wrapper.load = functools.partial(_load, wrapper, binder, options)
         return wrapper
 
     if _func is None:
@@ -147,6 +793,15 @@ def async_resnap(
     enable_recovery: bool = True,
     consider_args: bool = True,
     considered_attributes: list[str] | None = None,
+    memory_cache: bool = True,
+    lease: bool = False,
+    lease_ttl_seconds: float | None = None,
+    write_behind: bool = False,
+    lazy: bool = False,
+    parquet_compression: ParquetCompression | str | None = None,
+    compression_level: int | None = None,
+    arrow_compression: ArrowCompression | str | None = None,
+    file_compression: FileCompression | str | None = None,
 ) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]: ...
 
 
@@ -161,10 +816,17 @@ def async_resnap(
     Decorator to save the result of an async function and return it if the function has been called
     with the same arguments before and the result was saved successfully.
 
+    The items of an async generator are saved as they are yielded, and replayed one by one by the later calls, like
+    the ones of a generator decorated with `resnap`. They are written and read by the synchronous service, in the
+    thread pool of the decorator.
+
     Args:
         output_format (str): The format in which the result should be saved.
             If None, the result will be saved in the default format of the service.
-            Allowed formats for pd.DataFrame: "parquet" (default) and "csv".
+            Allowed formats for pd.DataFrame: "parquet" (default), "csv" and "arrow".
+            Allowed formats for pyarrow.Table and polars.DataFrame: "parquet" (default) and "arrow".
+            Allowed formats for np.ndarray: "npy" (default) and "pickle", and for dicts of arrays: "npz" (default)
+            and "pickle". Object arrays are always pickled.
             Allowed formats for other types: "pickle" (default), "txt" and "json".
         output_folder (str): The folder where the result should be saved.
             If None, the result will be saved in the default folder of the service.
@@ -174,47 +836,63 @@ def async_resnap(
             If False, the arguments are ignored and only the function name is considered. Default is True.
         considered_attributes (list[str]): The list of class/instance attributes to consider when hashing the function
             arguments.
+        memory_cache (bool): If True and the memory tier is enabled in the configuration, the result is also kept in
+            memory and later calls of the same process get it back without reading the store. Default is True.
+        lease (bool): If True, a process computing the result holds a lease in the store, and the other processes
+            calling the function with the same arguments wait for its result instead of computing it again.
+            The lease is implemented by the local and the S3 backends. Default is False.
+        lease_ttl_seconds (float): The time after which the lease of a process which died can be taken over.
+            If None, `lease_ttl_seconds` of the configuration is used.
+        write_behind (bool): If True, the result is returned as soon as it is computed and saved in the background
+            by a pool of `write_behind_max_workers` writers. The result is returned to the calls of the same process
+            until it is saved. A failed save is logged. Call `resnap.flush()` to wait for the pending saves.
+            Ignored with `lease=True`. Default is False.
+        lazy (bool): If True, a `LazyResult` proxy of the result is returned, hashed with the key of the result
+            instead of its content when it is passed to another resnap function. Without an asynchronous service,
+            a saved result is only read on its first use, by the thread using it. Default is False.
+        parquet_compression (ParquetCompression | str): The compression of the DataFrames saved in parquet:
+            "none", "snappy", "lz4", "zstd" or "gzip". It is recorded in the metadata of the result.
+            If None, `parquet_compression` of the configuration is used.
+        compression_level (int): The compression level of "lz4", "zstd" and "gzip". If None, `compression_level`
+            of the configuration is used with the compression of the configuration, and the codec default otherwise.
+        arrow_compression (ArrowCompression | str): The compression of the results saved in arrow (Arrow IPC):
+            "none", "lz4" or "zstd". Only uncompressed files are read without a copy from the local backend.
+            If None, `arrow_compression` of the configuration is used.
+        file_compression (FileCompression | str): The compression of the results saved in pickle, txt or json:
+            "none", "zstd", "lz4" or "gzip". The file is compressed as it is written and decompressed as it is read,
+            and its codec is recorded in the metadata of the result. If None, `file_compression` of the
+            configuration is used.
     """
     def async_resnap_decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
+        binder = ArgumentBinder(func, options.get("considered_attributes"))
+        if inspect.isasyncgenfunction(func):
+            return _async_stream_wrapper(func, binder, options)
+
         @functools.wraps(func)
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
             service: ResnapService = ResnapServiceFactory.get_service()
 
             if not service.is_enabled:
                 return await func(*args, **kwargs)
-            _clear(service)
+            # the storage I/O and the hashing run in the executor, so that they do not block the event loop,
+            # or in the coroutines of the asynchronous service if one is configured
+            executor = get_async_executor(service.config.async_max_workers)
+            await run_in_executor(executor, _clear, service)
+            async_service: AsyncResnapService | None = ResnapServiceFactory.get_async_service()
             token = clear_metadata()
 
-            results_retriever = ResultsRetriever(service, options)
-            result, is_recovery = results_retriever.get_results(func, args, kwargs)
+            results_retriever, result, is_recovery = await _async_get_results(
+                service, async_service, executor, binder, args, kwargs, options,
+            )
             if is_recovery:
-                return result
+                return results_retriever.wrap_result(result)
 
+            execute = functools.partial(
+                _async_execute, service, async_service, executor, results_retriever, options, func, args, kwargs,
+            )
             try:
-                logger.debug(f"Executing function {results_retriever.func_name}...")
-                result = await func(*args, **kwargs)
-                _save(
-                    service=service,
-                    func_name=results_retriever.func_name,
-                    output_folder=results_retriever.output_folder,
-                    hashed_arguments=results_retriever.hashed_arguments,
-                    result=result,
-                    extra_metadata=get_metadata(),
-                    output_format=options.get("output_format"),
-                )
-                return result
-
-            except Exception as e:
-                service.save_failed_metadata(
-                    func_name=results_retriever.func_name,
-                    output_folder=results_retriever.output_folder,
-                    hashed_arguments=results_retriever.hashed_arguments,
-                    event_time=datetime.now(service.config.timezone),
-                    error_message=str(e),
-                    data=e.data if isinstance(e, ResnapError) else {},
-                    extra_metadata=get_metadata(),
-                )
-                raise e
+                result = await _async_run_once(service, executor, results_retriever, options, execute)
+                return results_retriever.wrap_result(result)
             finally:
                 restore_metadata(token)
 
@@ -1,12 +1,15 @@
 import os
 
 from .helpers.config import Config, Services
+from .services.async_local_service import AsyncLocalResnapService
+from .services.async_service import AsyncResnapService
 from .services.local_service import LocalResnapService
 from .services.service import ResnapService
 from .settings import get_config_data
 
 _resnap_config: Config | None = None
 _service: ResnapService | None = None
+_async_service: AsyncResnapService | None = None
 
 _CONFIG_FILE_PATH_ENV_VAR = "RESNAP_CONFIG_FILE"
 
@@ -37,6 +40,19 @@ def set_resnap_service(service: ResnapService) -> None:
     _service = service
 
 
+def set_async_resnap_service(service: AsyncResnapService) -> None:
+    """
+    Set the asynchronous resnap service, used by `@async_resnap` functions.
+
+    Args:
+        service (AsyncResnapService): Asynchronous resnap service.
+    """
+    if not isinstance(service, AsyncResnapService):
+        raise TypeError(f"Expected AsyncResnapService, got {type(service)}")
+    global _async_service
+    _async_service = service
+
+
 class ResnapServiceFactory:
     @classmethod
     def get_service(cls) -> ResnapService:
@@ -59,3 +75,28 @@ class ResnapServiceFactory:
         else:
             raise NotImplementedError(f"Resnap service {config.save_to} is not implemented")
         return _service
+
+    @classmethod
+    def get_async_service(cls) -> AsyncResnapService | None:
+        """
+        Get the asynchronous resnap service, if one was set or if `async_native_io` is enabled in the configuration.
+
+        Returns:
+            AsyncResnapService | None: Asynchronous resnap service, or None if the `@async_resnap` functions must run
+                the synchronous service in the executor.
+        """
+        global _async_service
+        if _async_service is not None:
+            return _async_service
+
+        config = get_config()
+        if not config.async_native_io:
+            return None
+        if config.save_to == Services.LOCAL:
+            _async_service = AsyncLocalResnapService(config)
+        elif config.save_to == Services.S3:
+            from .services.async_boto_service import AsyncBotoResnapService
+            _async_service = AsyncBotoResnapService(config)
+        else:
+            raise NotImplementedError(f"Resnap service {config.save_to} is not implemented")
+        return _async_service
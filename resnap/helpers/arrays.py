@@ -0,0 +1,69 @@
+from typing import Any, Protocol
+
+import numpy as np
+
+CHUNK_SIZE = 8 * 2**20
+"""Size of the chunks in which a streamed `.npy` file is copied into its array."""
+
+
+class ReadableStream(Protocol):
+    def read(self, size: int = -1, /) -> bytes: ...
+
+
+def is_plain_array(value: Any) -> bool:
+    """
+    Tell whether a value is a NumPy array which can be saved in a `.npy` file and memory-mapped back: subclasses
+    such as masked arrays would lose their extra state, and object arrays can only be pickled.
+
+    Args:
+        value (Any): The value.
+    Returns:
+        bool: True if the value is a plain array of a fixed-size dtype.
+    """
+    return type(value) is np.ndarray and not value.dtype.hasobject
+
+
+def is_array_dict(value: Any) -> bool:
+    """
+    Tell whether a value is a non-empty dict of plain arrays with string keys, which can be saved in a `.npz` file.
+
+    Args:
+        value (Any): The value.
+    Returns:
+        bool: True if the value can be saved in a `.npz` file.
+    """
+    return (
+        type(value) is dict
+        and bool(value)
+        and all(isinstance(key, str) and is_plain_array(array) for key, array in value.items())
+    )
+
+
+def read_array_stream(stream: ReadableStream) -> np.ndarray:
+    """
+    Read a `.npy` file from a stream into an array allocated from its header, without buffering the whole file:
+    the peak memory of the read is the array and a chunk.
+
+    Args:
+        stream (ReadableStream): The stream of the file, such as the body of an S3 object.
+    Returns:
+        np.ndarray: The array.
+    Raises:
+        ValueError: If the stream is not a `.npy` file or ends before the data of the array.
+    """
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    array = np.empty(shape, dtype=dtype, order="F" if fortran_order else "C")
+    # the transpose of a Fortran-ordered array is C-contiguous, with its bytes in the order of the file
+    data = (array.T if fortran_order else array).reshape(-1).view(np.uint8)
+    offset = 0
+    while offset < data.size:
+        chunk = stream.read(min(CHUNK_SIZE, data.size - offset))
+        if not chunk:
+            raise ValueError(f"The array stream ended after {offset} of {data.size} bytes")
+        data[offset:offset + len(chunk)] = np.frombuffer(chunk, dtype=np.uint8)
+        offset += len(chunk)
+    return array
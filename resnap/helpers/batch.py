@@ -0,0 +1,147 @@
+import logging
+import threading
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+from ..exceptions import ResnapError
+from ..services.service import ResnapService
+from .config import get_compression_options
+from .context import clear_metadata, get_metadata, restore_metadata
+from .metadata import Metadata
+from .results_retriever import ResultsRetriever
+from .tables import get_result_type
+
+logger = logging.getLogger("resnap")
+
+
+def as_call(item: Any) -> tuple[tuple, dict]:
+    """
+    Get the arguments of a call of `.map` from an item of its iterable: a tuple holds the positional arguments,
+    a mapping the keyword arguments, and any other item is the single argument of the call.
+
+    Args:
+        item (Any): The item.
+    Returns:
+        tuple[tuple, dict]: The positional and keyword arguments.
+    """
+    if isinstance(item, tuple):
+        return item, {}
+    if isinstance(item, Mapping):
+        return (), dict(item)
+    return (item,), {}
+
+
+def call_decorated(decorated: Callable[..., Any], args: tuple, kwargs: dict) -> tuple[Any, dict]:
+    """
+    Call the undecorated function of a decorated function, in a worker of `.map`.
+    The decorated function is passed rather than the undecorated one, as only the former can be pickled for
+    the worker processes. The metadata added by the call are sent back with its result.
+
+    Args:
+        decorated (Callable[..., Any]): The decorated function.
+        args (tuple): The positional arguments.
+        kwargs (dict): The keyword arguments.
+    Returns:
+        tuple[Any, dict]: The result and the metadata added by the call.
+    """
+    token = clear_metadata()
+    try:
+        return decorated.__wrapped__(*args, **kwargs), get_metadata()
+    finally:
+        restore_metadata(token)
+
+
+class BatchWriter:
+    """
+    Saves the results computed by `.map` concurrently, as soon as each one is computed, and registers all their
+    metadata in the function index with a single write once the batch is done.
+    """
+
+    def __init__(self, service: ResnapService, options: dict[str, Any], max_workers: int | None = None) -> None:
+        self._service = service
+        self._options = options
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resnap-map-writer")
+        self._saves: list[Future] = []
+        self._last_event_time: datetime | None = None
+        self._lock = threading.Lock()
+
+    def _new_event_time(self) -> datetime:
+        # the snapshots of a batch get distinct event times, so that they never share a path with the flat layout
+        with self._lock:
+            event_time = datetime.now(self._service.config.timezone)
+            if self._last_event_time is not None and event_time <= self._last_event_time:
+                event_time = self._last_event_time + timedelta(microseconds=1)
+            self._last_event_time = event_time
+            return event_time
+
+    def save_when_done(self, retriever: ResultsRetriever, computation: Future) -> None:
+        """
+        Save the result of a computation once it is done, or its failed metadata if it raised.
+
+        Args:
+            retriever (ResultsRetriever): The retriever of the call, holding its hashed arguments.
+            computation (Future): The computation of the result and of its extra metadata.
+        """
+        def submit(done: Future) -> None:
+            if not done.cancelled():
+                self._saves.append(self._executor.submit(self._save, retriever, done))
+
+        computation.add_done_callback(submit)
+
+    def _save(self, retriever: ResultsRetriever, computation: Future) -> Metadata:
+        event_time = self._new_event_time()
+        error = computation.exception()
+        if error is not None:
+            return self._service.save_failed_metadata(
+                func_name=retriever.func_name,
+                output_folder=retriever.output_folder,
+                hashed_arguments=retriever.hashed_arguments,
+                event_time=event_time,
+                error_message=str(error),
+                data=error.data if isinstance(error, ResnapError) else {},
+                extra_metadata={},
+                update_index=False,
+            )
+
+        result, extra_metadata = computation.result()
+        result_path, event_time = self._service.save_result(
+            retriever.func_name,
+            result,
+            retriever.output_folder,
+            self._options.get("output_format"),
+            retriever.hashed_arguments,
+            event_time,
+            **get_compression_options(self._options),
+        )
+        metadata = self._service.save_success_metadata(
+            func_name=retriever.func_name,
+            output_folder=retriever.output_folder,
+            hashed_arguments=retriever.hashed_arguments,
+            event_time=event_time,
+            result_path=result_path,
+            result_type=get_result_type(result),
+            extra_metadata=extra_metadata,
+            update_index=False,
+            **get_compression_options(self._options),
+        )
+        retriever.cache_result(result, event_time)
+        return metadata
+
+    def close(self, func_name: str, output_folder: str) -> None:
+        """
+        Wait for the saves, and register their metadata in the function index. A failed save is logged.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        """
+        self._executor.shutdown(wait=True)
+        saved: list[Metadata] = []
+        for save in self._saves:
+            if save.exception() is None:
+                saved.append(save.result())
+            else:
+                logger.error(f"Save of a result of {func_name} failed", exc_info=save.exception())
+        self._service.add_to_index(func_name, output_folder, saved)
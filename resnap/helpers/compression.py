@@ -0,0 +1,96 @@
+import io
+import shutil
+from typing import IO
+
+import pyarrow as pa
+
+from .config import FileCompression
+
+CHUNK_SIZE = 1024 * 1024
+"""Size of the chunks in which a compressed file is decompressed into memory."""
+
+STREAMED_FORMATS = ("pkl", "json", "txt", "pkls")
+"""Formats of the results which can be compressed with a `FileCompression`, including the streams of pickles."""
+
+
+def compress_stream(file: IO[bytes] | pa.NativeFile, compression: FileCompression) -> IO[bytes] | pa.NativeFile:
+    """
+    Wrap a binary file in a stream compressing what is written to it chunk by chunk, so that neither the raw nor
+    the compressed content is held in memory. Closing the stream ends the compressed frame and closes the file.
+
+    Args:
+        file (IO[bytes] | pa.NativeFile): The binary file, opened for writing.
+        compression (FileCompression): The compression, the file itself is returned without one.
+    Returns:
+        IO[bytes] | pa.NativeFile: The stream to write to.
+    """
+    if compression == FileCompression.NONE:
+        return file
+    return pa.CompressedOutputStream(file, compression.value)
+
+
+def decompress_stream(file: IO[bytes] | pa.NativeFile, compression: FileCompression) -> IO[bytes] | pa.NativeFile:
+    """
+    Wrap a binary file in a stream decompressing what is read from it chunk by chunk.
+    Closing the stream closes the file.
+
+    Args:
+        file (IO[bytes] | pa.NativeFile): The binary file, opened for reading.
+        compression (FileCompression): The compression, the file itself is returned without one.
+    Returns:
+        IO[bytes] | pa.NativeFile: The stream to read from.
+    """
+    if compression == FileCompression.NONE:
+        return file
+    return pa.CompressedInputStream(file, compression.value)
+
+
+def read_decompressed(file: IO[bytes] | pa.NativeFile, compression: FileCompression) -> memoryview:
+    """
+    Decompress a whole binary file into a writable buffer, as `load_pickle` requires to rebuild the out-of-band
+    buffers of a pickle container without copying them again.
+
+    Args:
+        file (IO[bytes] | pa.NativeFile): The binary file, opened for reading. It is closed.
+        compression (FileCompression): The compression of the file.
+    Returns:
+        memoryview: The decompressed content.
+    """
+    buffer = io.BytesIO()
+    with decompress_stream(file, compression) as stream:
+        shutil.copyfileobj(stream, buffer, CHUNK_SIZE)
+    return buffer.getbuffer()
+
+
+def compress_bytes(data: bytes, compression: FileCompression) -> bytes:
+    """
+    Compress some data in the format written by `compress_stream`.
+
+    Args:
+        data (bytes): The data.
+        compression (FileCompression): The compression.
+    Returns:
+        bytes: The compressed data.
+    """
+    if compression == FileCompression.NONE:
+        return data
+    sink = pa.BufferOutputStream()
+    with compress_stream(sink, compression) as stream:
+        stream.write(data)
+    return sink.getvalue().to_pybytes()
+
+
+def decompress_bytes(data: bytes, compression: FileCompression) -> bytes:
+    """
+    Decompress some data written by `compress_stream` or `compress_bytes`.
+
+    Args:
+        data (bytes): The compressed data.
+        compression (FileCompression): The compression.
+    Returns:
+        bytes: The data.
+    """
+    if compression == FileCompression.NONE:
+        return data
+    with decompress_stream(pa.BufferReader(data), compression) as stream:
+        return stream.read()
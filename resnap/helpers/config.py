@@ -1,10 +1,13 @@
 import datetime
 from enum import Enum
+from typing import Any
 from zoneinfo import ZoneInfo
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing_extensions import Self
 
+from .hashing import HashAlgorithm, is_algorithm_available
+from .memory_cache import EvictionPolicy
 from .time_utils import TimeUnit, get_timezone_from_string
 
 
@@ -13,6 +16,77 @@ class Services(str, Enum):
     S3 = "s3"
 
 
+class Layout(str, Enum):
+    FLAT = "flat"
+    HASHED = "hashed"
+
+
+class ParquetCompression(str, Enum):
+    NONE = "none"
+    SNAPPY = "snappy"
+    LZ4 = "lz4"
+    ZSTD = "zstd"
+    GZIP = "gzip"
+
+    @property
+    def codec(self) -> str | None:
+        """The codec name given to pandas, None for uncompressed files."""
+        return None if self == ParquetCompression.NONE else self.value
+
+    @property
+    def extension(self) -> str:
+        """The extension of the parquet files: gzip files keep the `.parquet.gz` suffix they always had."""
+        return "parquet.gz" if self == ParquetCompression.GZIP else "parquet"
+
+    @property
+    def supports_level(self) -> bool:
+        """Whether a compression level can be set."""
+        return self in (ParquetCompression.LZ4, ParquetCompression.ZSTD, ParquetCompression.GZIP)
+
+
+class ArrowCompression(str, Enum):
+    NONE = "none"
+    LZ4 = "lz4"
+    ZSTD = "zstd"
+
+    @property
+    def codec(self) -> str:
+        """The codec name given to `pyarrow.feather`."""
+        return "uncompressed" if self == ArrowCompression.NONE else self.value
+
+
+class FileCompression(str, Enum):
+    NONE = "none"
+    ZSTD = "zstd"
+    LZ4 = "lz4"
+    GZIP = "gzip"
+
+    @property
+    def suffix(self) -> str:
+        """The suffix appended to the extension of the compressed files, such as `.pkl.zst`."""
+        return {FileCompression.ZSTD: ".zst", FileCompression.LZ4: ".lz4", FileCompression.GZIP: ".gz"}.get(self, "")
+
+
+def get_compression_options(options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Get the compression options of a decorated function, to pass to `save_result` and
+    `save_success_metadata`. The options which are not set are left to the configuration.
+
+    Args:
+        options (dict[str, Any]): The options of the decorator.
+    Returns:
+        dict[str, Any]: The `compression`, `compression_level`, `arrow_compression` and `file_compression`
+            arguments which are set.
+    """
+    compression = {
+        "compression": options.get("parquet_compression"),
+        "compression_level": options.get("compression_level"),
+        "arrow_compression": options.get("arrow_compression"),
+        "file_compression": options.get("file_compression"),
+    }
+    return {key: value for key, value in compression.items() if value is not None}
+
+
 class Config(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -24,6 +98,27 @@ class Config(BaseModel):
     max_history_files_length: int = Field(gt=0, default=3)
     max_history_files_time_unit: TimeUnit = TimeUnit.DAY
     timezone: datetime.timezone | ZoneInfo | None = None
+    layout: Layout = Layout.FLAT
+    memory_cache_max_bytes: int = Field(ge=0, default=0)
+    memory_cache_policy: EvictionPolicy = EvictionPolicy.LRU
+    cleanup_interval_seconds: int = Field(ge=0, default=60)
+    cleanup_in_background: bool = False
+    hash_algorithm: HashAlgorithm = HashAlgorithm.SHA256
+    hash_memo: bool = False
+    async_max_workers: int = Field(gt=0, default=4)
+    async_native_io: bool = False
+    single_flight: bool = True
+    single_flight_timeout_seconds: float | None = Field(gt=0, default=None)
+    lease_ttl_seconds: float = Field(gt=0, default=60)
+    lease_poll_interval_seconds: float = Field(gt=0, default=1)
+    write_behind_max_workers: int = Field(gt=0, default=2)
+    write_behind_max_pending: int = Field(gt=0, default=8)
+    parquet_compression: ParquetCompression = ParquetCompression.GZIP
+    parquet_row_group_size: int = Field(gt=0, default=131072)
+    compression_level: int | None = None
+    arrow_compression: ArrowCompression = ArrowCompression.NONE
+    file_compression: FileCompression = FileCompression.NONE
+    mmap_arrays: bool = False
 
     @field_validator("timezone", mode="before")
     def validate_timezone(cls, value: str | datetime.timezone | None) -> datetime.timezone | ZoneInfo | None:
@@ -31,6 +126,18 @@ class Config(BaseModel):
             return value
         return get_timezone_from_string(value)
 
+    @field_validator("hash_algorithm")
+    def validate_hash_algorithm(cls, value: HashAlgorithm) -> HashAlgorithm:
+        if not is_algorithm_available(value):
+            raise ValueError(f"the xxhash package is required to use the {value.value} hash algorithm")
+        return value
+
+    @model_validator(mode="after")
+    def check_compression_level(self) -> Self:
+        if self.compression_level is not None and not self.parquet_compression.supports_level:
+            raise ValueError(f"the {self.parquet_compression.value} compression does not support a compression level")
+        return self
+
     @model_validator(mode="after")
     def check_secrets_file_name(self) -> Self:
         if self.enabled and self.save_to != Services.LOCAL and not self.secrets_file_name:
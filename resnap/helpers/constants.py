@@ -1,3 +1,7 @@
 EXT = ".resnap"
 META_EXT = f"{EXT}_meta.json"
+INDEX_EXT = ".index.json"
 SEPARATOR = "/"
+CLEANUP_LOCK = "resnap_cleanup.lock"
+LEASE_EXT = ".lease"
+LOCK_EXT = ".lock"
@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def set_async_executor(executor: Executor | None) -> None:
+    """
+    Set the executor running the storage I/O and the hashing of `@async_resnap` functions, off the event loop.
+    The executor is not shut down by resnap.
+
+    Args:
+        executor (Executor | None): The executor. If None, a thread pool of `async_max_workers` threads is used.
+    """
+    if executor is not None and not isinstance(executor, Executor):
+        raise TypeError(f"Expected Executor, got {type(executor)}")
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def get_async_executor(max_workers: int) -> Executor:
+    """
+    Get the executor of `@async_resnap` functions, created on the first call if none was set.
+
+    Args:
+        max_workers (int): The number of threads of the default thread pool, which bounds the number of
+            storage operations running at the same time.
+    Returns:
+        Executor: The executor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resnap-async")
+        return _executor
+
+
+async def run_in_executor(executor: Executor, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function in the executor without blocking the event loop.
+    The function runs in a copy of the current context, so that it sees the context variables of the caller.
+
+    Args:
+        executor (Executor): The executor.
+        func (Callable[..., T]): The function.
+        *args (Any): The positional arguments of the function.
+        **kwargs (Any): The keyword arguments of the function.
+    Returns:
+        T: The result of the function.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(context.run, func, *args, **kwargs),
+    )
@@ -0,0 +1,192 @@
+import functools
+import hashlib
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+MEMO_MIN_BYTES = 1 << 20
+"""Arguments smaller than this are not memoized unless frozen: hashing them is as cheap as checking them."""
+FINGERPRINT_SAMPLES = 64
+
+MEMOIZABLE_TYPES = (np.ndarray, pd.Series, pd.DataFrame)
+
+
+@dataclass(kw_only=True)
+class _MemoEntry:
+    ref: weakref.ref
+    frozen: bool = False
+    fingerprint: bytes | None = None
+    digests: dict[str, bytes] = field(default_factory=dict)
+
+
+def get_nbytes(value: np.ndarray | pd.Series | pd.DataFrame) -> int:
+    """
+    Get the size of the buffers of an array or a pandas object, without the objects referenced by its cells.
+
+    Args:
+        value (np.ndarray | pd.Series | pd.DataFrame): The value.
+    Returns:
+        int: The size in bytes.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return int(value.memory_usage(index=True, deep=False).sum())
+
+
+def _sample_positions(length: int) -> np.ndarray:
+    return np.unique(np.linspace(0, length - 1, num=min(length, FINGERPRINT_SAMPLES)).astype(np.intp))
+
+
+def fingerprint(value: np.ndarray | pd.Series | pd.DataFrame) -> bytes | None:
+    """
+    Compute a cheap fingerprint of an array or a pandas object: its type, shape, dtypes, labels and a few evenly
+    spaced rows. It detects most replacements and mutations, but not a mutation of rows outside of the sample.
+
+    Args:
+        value (np.ndarray | pd.Series | pd.DataFrame): The value.
+    Returns:
+        bytes | None: The fingerprint, or None if the sampled rows can not be hashed.
+    """
+    hash_object = hashlib.sha256(f"{type(value).__qualname__}{value.shape}".encode())
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return None
+        hash_object.update(f"{value.dtype.str}{value.__array_interface__['data'][0]}".encode("ascii"))
+        hash_object.update(np.ascontiguousarray(value.flat[_sample_positions(value.size)]).tobytes())
+        return hash_object.digest()
+    hash_object.update(str(value.dtypes if isinstance(value, pd.DataFrame) else value.dtype).encode("utf-8"))
+    try:
+        hashes = pd.util.hash_pandas_object(value.iloc[_sample_positions(len(value))], index=True)
+        if isinstance(value, pd.DataFrame):
+            hashes = pd.concat([hashes, pd.util.hash_pandas_object(value.columns.to_series(), index=False)])
+    except TypeError:
+        return None
+    hash_object.update(hashes.to_numpy().tobytes())
+    return hash_object.digest()
+
+
+class HashMemo:
+    """
+    Digests of large array and pandas arguments, keyed by object identity.
+    The objects are referenced through weakrefs, so an entry is evicted as soon as its object is garbage-collected.
+    The digest of a frozen object is always reused, the digest of another object only if its fingerprint did not change.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[int, _MemoEntry] = {}
+        # reentrant, the garbage collector may run an eviction callback while the lock is held
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def freeze(self, value: Any) -> None:
+        """
+        Mark an object as immutable, so that its digest is computed once and reused by all the calls.
+
+        Args:
+            value (Any): The object, a NumPy array, a Series or a DataFrame.
+        Raises:
+            TypeError: If the object can not be frozen.
+        """
+        if not isinstance(value, MEMOIZABLE_TYPES):
+            raise TypeError(f"{type(value).__name__} can not be frozen, only arrays, Series and DataFrames can")
+        with self._lock:
+            self._entry(value).frozen = True
+
+    def get(self, value: Any, algorithm: str, enabled: bool) -> tuple[bytes | None, bytes | None]:
+        """
+        Get the memoized digest of an object.
+
+        Args:
+            value (Any): The object.
+            algorithm (str): The name of the hash algorithm of the digest.
+            enabled (bool): Whether the digests of objects which are not frozen can be reused.
+        Returns:
+            tuple[bytes | None, bytes | None]: The digest, or None if it must be computed, and the fingerprint to save
+                with the computed digest (None for frozen objects).
+        """
+        with self._lock:
+            entry = self._get(value)
+            if entry is not None and entry.frozen:
+                return entry.digests.get(algorithm), None
+        if not enabled or not isinstance(value, MEMOIZABLE_TYPES) or get_nbytes(value) < MEMO_MIN_BYTES:
+            return None, None
+
+        value_fingerprint = fingerprint(value)
+        with self._lock:
+            entry = self._get(value)
+            if entry is not None and value_fingerprint is not None and entry.fingerprint == value_fingerprint:
+                return entry.digests.get(algorithm), value_fingerprint
+        return None, value_fingerprint
+
+    def put(self, value: Any, algorithm: str, digest: bytes, value_fingerprint: bytes | None) -> None:
+        """
+        Memoize the digest of an object, if it is frozen or if it has a fingerprint.
+
+        Args:
+            value (Any): The object.
+            algorithm (str): The name of the hash algorithm of the digest.
+            digest (bytes): The digest.
+            value_fingerprint (bytes | None): The fingerprint returned by `get`.
+        """
+        with self._lock:
+            entry = self._get(value)
+            if entry is not None and entry.frozen:
+                entry.digests[algorithm] = digest
+                return
+            if value_fingerprint is None:
+                return
+            entry = self._entry(value)
+            if entry.fingerprint != value_fingerprint:
+                entry.fingerprint = value_fingerprint
+                entry.digests.clear()
+            entry.digests[algorithm] = digest
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, value: Any) -> _MemoEntry | None:
+        entry = self._entries.get(id(value))
+        if entry is None or entry.ref() is not value:
+            return None
+        return entry
+
+    def _entry(self, value: Any) -> _MemoEntry:
+        entry = self._get(value)
+        if entry is None:
+            entry = _MemoEntry(ref=weakref.ref(value, functools.partial(self._evict, id(value))))
+            self._entries[id(value)] = entry
+        return entry
+
+    def _evict(self, key: int, ref: weakref.ref) -> None:
+        # the id of the dead object may already be reused by a new entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.ref is ref:
+                del self._entries[key]
+
+
+hash_memo = HashMemo()
+
+
+def freeze(value: Any) -> Any:
+    """
+    Mark an argument as immutable: its digest is computed on the first call and reused by all the following calls
+    with the same object, without any check. Do not modify a frozen object in place.
+
+    Args:
+        value (Any): The object, a NumPy array, a Series or a DataFrame.
+    Returns:
+        Any: The same object.
+    Raises:
+        TypeError: If the object can not be frozen.
+    """
+    hash_memo.freeze(value)
+    return value
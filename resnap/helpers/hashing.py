@@ -0,0 +1,314 @@
+import hashlib
+import importlib.util
+import json
+import struct
+from collections.abc import Callable
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from functools import singledispatch
+from typing import Any, Protocol
+
+import numpy as np
+import pandas as pd
+
+from .hash_memo import hash_memo
+from .lazy import LazyResult
+
+KEY_VERSION = 2
+"""Version of the way the arguments are turned into bytes. Version 1 hashed their JSON representation."""
+
+
+class HashAlgorithm(str, Enum):
+    SHA256 = "sha256"
+    BLAKE2B = "blake2b"
+    XXH3_128 = "xxh3_128"
+
+
+class HashObject(Protocol):
+    def update(self, data: bytes, /) -> None: ...
+
+    def digest(self) -> bytes: ...
+
+    def hexdigest(self) -> str: ...
+
+
+class ArgumentHasher:
+    """
+    Feed values into an incremental hash object without building an intermediate representation.
+    Each value is written as a type tag followed by length-prefixed data, so that different values never produce the
+    same stream of bytes. Values are dispatched on their type with the registry filled by `register_hasher`.
+    """
+
+    def __init__(self, algorithm: HashAlgorithm = HashAlgorithm.SHA256, memo: bool = False) -> None:
+        self.algorithm = algorithm
+        self.memo = memo
+        self.hash_object: HashObject = new_hash_object(algorithm)
+
+    def write(self, tag: bytes, data: bytes = b"") -> None:
+        """
+        Write raw data with its type tag and length.
+
+        Args:
+            tag (bytes): The type tag, one byte.
+            data (bytes): The data.
+        """
+        self.hash_object.update(tag + struct.pack("<Q", len(data)))
+        if data:
+            self.hash_object.update(data)
+
+    def update(self, value: Any) -> None:
+        """
+        Feed a value into the hash object.
+
+        Args:
+            value (Any): The value.
+        """
+        _hash_value(value, self)
+
+    def hexdigest(self) -> str:
+        return self.hash_object.hexdigest()
+
+
+def is_algorithm_available(algorithm: HashAlgorithm) -> bool:
+    """
+    Check if the given hash algorithm can be used: xxh3_128 requires the optional xxhash package.
+
+    Args:
+        algorithm (HashAlgorithm): The hash algorithm.
+    Returns:
+        bool: True if the algorithm is available.
+    """
+    return algorithm != HashAlgorithm.XXH3_128 or importlib.util.find_spec("xxhash") is not None
+
+
+def new_hash_object(algorithm: HashAlgorithm = HashAlgorithm.SHA256) -> HashObject:
+    """
+    Create an incremental hash object for the given algorithm.
+    All the algorithms produce 256-bit digests, except xxh3_128 which is non-cryptographic and produces 128-bit ones.
+
+    Args:
+        algorithm (HashAlgorithm): The hash algorithm.
+    Returns:
+        HashObject: The hash object.
+    Raises:
+        ImportError: If the algorithm requires a package which is not installed.
+    """
+    if algorithm == HashAlgorithm.BLAKE2B:
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == HashAlgorithm.XXH3_128:
+        if not is_algorithm_available(algorithm):
+            raise ImportError("Please install xxhash to use the xxh3_128 hash algorithm: `pip install resnap[xxhash]`")
+        import xxhash
+
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+def digest(value: Any) -> bytes:
+    """
+    Get the digest of a single value, used to sort the items of unordered containers.
+
+    Args:
+        value (Any): The value.
+    Returns:
+        bytes: The SHA-256 digest of the value.
+    """
+    hasher = ArgumentHasher()
+    hasher.update(value)
+    return hasher.hash_object.digest()
+
+
+def register_hasher(cls: type, func: Callable[[Any, ArgumentHasher], None]) -> None:
+    """
+    Register how the arguments of the given type (and its subclasses) are hashed.
+
+    Args:
+        cls (type): The type.
+        func (Callable[[Any, ArgumentHasher], None]): The function feeding a value of this type into the hasher,
+            with `hasher.write(tag, data)` for raw bytes or `hasher.update(value)` for values of other types.
+    """
+    _hash_value.register(cls)(func)
+
+
+def _write_memoized(value: Any, hasher: ArgumentHasher, write_value: Callable[[Any, ArgumentHasher], None]) -> None:
+    # large values are hashed on their own, so that their digest can be reused by the next calls (see HashMemo)
+    algorithm = hasher.algorithm.value
+    value_digest, value_fingerprint = hash_memo.get(value, algorithm, hasher.memo)
+    if value_digest is None:
+        nested = ArgumentHasher(hasher.algorithm, hasher.memo)
+        write_value(value, nested)
+        value_digest = nested.hash_object.digest()
+        hash_memo.put(value, algorithm, value_digest, value_fingerprint)
+    hasher.write(b"H", value_digest)
+
+
+_JSON_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+_JSON_TYPES = _JSON_SCALAR_TYPES | {list, dict}
+
+
+def _is_json_tree(value: list | tuple | dict) -> bool:
+    # JSON turns dict keys into strings, tuples into lists and subclasses (IntEnum...) into their base type,
+    # so only the containers made of the exact JSON types are serialized without ambiguity
+    if type(value) is dict:
+        if not set(map(type, value)) <= {str}:
+            return False
+        value = value.values()
+    types = set(map(type, value))
+    if types <= _JSON_SCALAR_TYPES:
+        return True
+    return types <= _JSON_TYPES and all(_is_json_tree(item) for item in value if type(item) in (list, dict))
+
+
+def _write_json(tag: bytes, value: Any, hasher: ArgumentHasher) -> bool:
+    # containers of JSON scalars are serialized by the C encoder, much faster than a per-item dispatch
+    if not _is_json_tree(value):
+        return False
+    hasher.write(tag, json.dumps(value, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    return True
+
+
+@singledispatch
+def _hash_value(value: Any, hasher: ArgumentHasher) -> None:
+    if is_dataclass(value) and not isinstance(value, type):
+        hasher.write(b"C", type(value).__qualname__.encode("utf-8"))
+        hasher.update({field.name: getattr(value, field.name) for field in fields(value)})
+        return
+    try:
+        attributes = vars(value)
+    except TypeError:
+        hasher.write(b"R", str(value).encode("utf-8"))
+        return
+    hasher.write(b"O", type(value).__qualname__.encode("utf-8"))
+    hasher.update(attributes)
+
+
+@_hash_value.register(type(None))
+def _(value: None, hasher: ArgumentHasher) -> None:
+    hasher.write(b"N")
+
+
+@_hash_value.register(bool)
+def _(value: bool, hasher: ArgumentHasher) -> None:
+    hasher.write(b"B", b"\x01" if value else b"\x00")
+
+
+@_hash_value.register(int)
+def _(value: int, hasher: ArgumentHasher) -> None:
+    hasher.write(b"I", str(value).encode("ascii"))
+
+
+@_hash_value.register(float)
+def _(value: float, hasher: ArgumentHasher) -> None:
+    hasher.write(b"F", struct.pack("<d", value))
+
+
+@_hash_value.register(str)
+def _(value: str, hasher: ArgumentHasher) -> None:
+    hasher.write(b"S", value.encode("utf-8", "surrogatepass"))
+
+
+@_hash_value.register(bytes)
+@_hash_value.register(bytearray)
+@_hash_value.register(memoryview)
+def _(value: bytes | bytearray | memoryview, hasher: ArgumentHasher) -> None:
+    hasher.write(b"Y", bytes(value))
+
+
+@_hash_value.register(Enum)
+def _(value: Enum, hasher: ArgumentHasher) -> None:
+    hasher.write(b"M", type(value).__qualname__.encode("utf-8"))
+    hasher.update(value.value)
+
+
+@_hash_value.register(LazyResult)
+def _(value: LazyResult, hasher: ArgumentHasher) -> None:
+    # the result of a lazy function is identified by its key, and is not read to be hashed
+    hasher.write(b"K", "\0".join(value.key).encode("utf-8"))
+
+
+@_hash_value.register(list)
+@_hash_value.register(tuple)
+def _(value: list | tuple, hasher: ArgumentHasher) -> None:
+    tag = b"L" if isinstance(value, list) else b"T"
+    if _write_json(tag, value, hasher):
+        return
+    hasher.write(tag.lower(), struct.pack("<Q", len(value)))
+    for item in value:
+        hasher.update(item)
+
+
+@_hash_value.register(set)
+@_hash_value.register(frozenset)
+def _(value: set | frozenset, hasher: ArgumentHasher) -> None:
+    hasher.write(b"E", b"".join(sorted(digest(item) for item in value)))
+
+
+@_hash_value.register(dict)
+def _(value: dict, hasher: ArgumentHasher) -> None:
+    if _write_json(b"D", value, hasher):
+        return
+    hasher.write(b"d", struct.pack("<Q", len(value)))
+    for key, item in sorted(value.items(), key=lambda key_item: digest(key_item[0])):
+        hasher.update(key)
+        hasher.update(item)
+
+
+def _write_ndarray(value: np.ndarray, hasher: ArgumentHasher) -> None:
+    if value.dtype.hasobject:
+        hasher.write(b"a", str(value.shape).encode("ascii"))
+        hasher.update(value.tolist())
+        return
+    hasher.write(b"A", f"{value.dtype.str}{value.shape}".encode("ascii"))
+    hasher.write(b"Y", memoryview(np.ascontiguousarray(value)).cast("B"))
+
+
+@_hash_value.register(np.ndarray)
+def _(value: np.ndarray, hasher: ArgumentHasher) -> None:
+    _write_memoized(value, hasher, _write_ndarray)
+
+
+@_hash_value.register(np.generic)
+def _(value: np.generic, hasher: ArgumentHasher) -> None:
+    hasher.update(np.asarray(value))
+
+
+def _hash_pandas(value: pd.Series | pd.Index, hasher: ArgumentHasher) -> None:
+    hasher.write(b"P", str(value.dtype).encode("utf-8"))
+    try:
+        hashes = pd.util.hash_pandas_object(value, index=False).to_numpy()
+    except TypeError:
+        # unhashable cells (lists, dicts...) are hashed one by one
+        hasher.update(value.tolist())
+        return
+    hasher.write(b"Y", memoryview(hashes).cast("B"))
+
+
+def _write_series(value: pd.Series, hasher: ArgumentHasher) -> None:
+    hasher.write(b"Q")
+    hasher.update(value.name)
+    _hash_pandas(value.index, hasher)
+    _hash_pandas(value, hasher)
+
+
+@_hash_value.register(pd.Series)
+def _(value: pd.Series, hasher: ArgumentHasher) -> None:
+    _write_memoized(value, hasher, _write_series)
+
+
+@_hash_value.register(pd.Index)
+def _(value: pd.Index, hasher: ArgumentHasher) -> None:
+    _hash_pandas(value, hasher)
+
+
+def _write_dataframe(value: pd.DataFrame, hasher: ArgumentHasher) -> None:
+    # the columns are hashed in name order, so that the column order does not change the hash
+    hasher.write(b"G", struct.pack("<Q", value.shape[1]))
+    _hash_pandas(value.index, hasher)
+    for position in sorted(range(value.shape[1]), key=lambda i: str(value.columns[i])):
+        hasher.update(value.columns[position])
+        _hash_pandas(value.iloc[:, position], hasher)
+
+
+@_hash_value.register(pd.DataFrame)
+def _(value: pd.DataFrame, hasher: ArgumentHasher) -> None:
+    _write_memoized(value, hasher, _write_dataframe)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from typing_extensions import Self
+
+from .metadata import Metadata, MetadataSuccess
+from .status import Status
+
+INDEX_VERSION = 1
+
+
+@dataclass(kw_only=True)
+class MetadataIndex:
+    """
+    Per-function manifest mapping hashed arguments to the latest metadata saved for them.
+    Entries are kept serialized and only parsed when they are looked up.
+    """
+
+    success: dict[str, dict[str, Any]] = field(default_factory=dict)
+    fail: dict[str, dict[str, Any]] = field(default_factory=dict)
+    latest: str | None = None
+
+    @classmethod
+    def from_metadata(cls, metadata: list[Metadata]) -> Self:
+        """
+        Build an index from a list of metadata.
+
+        Args:
+            metadata (list[Metadata]): The metadata, sorted from the oldest to the most recent.
+        Returns:
+            MetadataIndex: The built index.
+        """
+        index = cls()
+        for entry in metadata:
+            index.add(entry)
+        return index
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self | None:
+        """
+        Load an index from its serialized form.
+
+        Args:
+            data (dict[str, Any]): The serialized index.
+        Returns:
+            MetadataIndex | None: The index, or None if it was written with another index version.
+        """
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(
+            success=data.get("success", {}),
+            fail=data.get("fail", {}),
+            latest=data.get("latest"),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "latest": self.latest,
+            "success": self.success,
+            "fail": self.fail,
+        }
+
+    def add(self, metadata: Metadata) -> None:
+        """
+        Register metadata in the index. It replaces the previous entry saved for the same hashed arguments.
+
+        Args:
+            metadata (Metadata): The metadata to register.
+        """
+        if metadata.status == Status.SUCCESS:
+            self.success[metadata.hashed_arguments] = metadata.to_dict()
+            self.latest = metadata.hashed_arguments
+        else:
+            self.fail[metadata.hashed_arguments] = metadata.to_dict()
+
+    def get(self, hashed_arguments: str | None = None) -> MetadataSuccess | None:
+        """
+        Get the latest success metadata saved for the given hashed arguments.
+
+        Args:
+            hashed_arguments (str | None): The hashed arguments. If None, the latest success metadata is returned
+                whatever the arguments.
+        Returns:
+            MetadataSuccess | None: The success metadata, or None if not found.
+        """
+        key = self.latest if hashed_arguments is None else hashed_arguments
+        entry = self.success.get(key) if key else None
+        if entry is None:
+            return None
+        return MetadataSuccess.from_dict(entry)
+
+    def prune(self, limit_time: datetime) -> bool:
+        """
+        Remove the entries older than the given limit time.
+
+        Args:
+            limit_time (datetime): The limit time.
+        Returns:
+            bool: True if at least one entry was removed.
+        """
+        pruned = False
+        for entries in (self.success, self.fail):
+            expired = [
+                key for key, entry in entries.items()
+                if datetime.fromisoformat(entry["event_time"]) < limit_time
+            ]
+            for key in expired:
+                del entries[key]
+            pruned = pruned or bool(expired)
+
+        if self.latest not in self.success:
+            self.latest = max(self.success, key=lambda key: self.success[key]["event_time"], default=None)
+        return pruned
@@ -0,0 +1,199 @@
+import functools
+import importlib
+import importlib.util
+import json
+import math
+from abc import ABC, abstractmethod
+from typing import Any
+
+JSON_ENGINES: tuple[str, ...] = ("orjson", "msgspec", "json")
+"""The JSON engines, by order of preference: the first installed one is used."""
+
+
+class JsonEngine(ABC):
+    """
+    A JSON encoder and decoder. The output is compact, and the values which are valid for the standard `json` module
+    only, such as integers of more than 64 bits or the `NaN` literal, are encoded and decoded by it.
+
+    Attributes:
+        name (str): The name of the package of the engine.
+    """
+
+    name: str
+
+    @abstractmethod
+    def _encode(self, value: Any) -> bytes:  # pragma: no cover
+        raise NotImplementedError
+
+    @abstractmethod
+    def _decode(self, data: bytes | str) -> Any:  # pragma: no cover
+        raise NotImplementedError
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Encode a value in compact JSON.
+
+        Args:
+            value (Any): The value, made of JSON types.
+        Returns:
+            bytes: The UTF-8 JSON document.
+        """
+        try:
+            return self._encode(value)
+        except (TypeError, ValueError):
+            return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes | str) -> Any:
+        """
+        Decode a JSON document.
+
+        Args:
+            data (bytes | str): The JSON document.
+        Returns:
+            Any: The decoded value.
+        Raises:
+            json.JSONDecodeError: If the document is not valid JSON, whatever the engine.
+        """
+        try:
+            return self._decode(data)
+        except ValueError:
+            # the errors of the engines (msgspec.DecodeError...) are all ValueError, and the document is parsed again
+            # by the json module, which accepts more documents and raises the error expected by the callers
+            pass
+        try:
+            return json.loads(data)
+        except UnicodeDecodeError as error:
+            document = data.decode("utf-8", "replace") if isinstance(data, bytes) else data
+            raise json.JSONDecodeError(f"Invalid UTF-8: {error.reason}", document, error.start) from error
+
+
+_FINITE_SCALAR_TYPES = frozenset({str, int, bool, type(None)})
+_CONTAINER_TYPES = (dict, list, tuple)
+
+
+def _has_non_finite_float(value: Any) -> bool:
+    # a loop over the items instead of a recursive call per value, since it runs before each fast encoding
+    isfinite = math.isfinite
+    containers: list = [(value,)]
+    while containers:
+        container = containers.pop()
+        for item in container.values() if isinstance(container, dict) else container:
+            if type(item) in _FINITE_SCALAR_TYPES:
+                continue
+            if isinstance(item, float):
+                if not isfinite(item):
+                    return True
+            elif isinstance(item, _CONTAINER_TYPES):
+                containers.append(item)
+    return False
+
+
+def _check_finite(value: Any) -> None:
+    # orjson and msgspec encode NaN and the infinities as null, so these values are encoded by the json module,
+    # which writes them as NaN and Infinity
+    if _has_non_finite_float(value):
+        raise ValueError("Non-finite floats are encoded as null")
+
+
+class StdlibJsonEngine(JsonEngine):
+    """The engine of the standard `json` module."""
+
+    name = "json"
+
+    def _encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def _decode(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+class OrjsonEngine(JsonEngine):
+    """The engine of the optional orjson package. Dict keys which are not strings are converted like by `json`."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        self._orjson = importlib.import_module("orjson")
+
+    def _encode(self, value: Any) -> bytes:
+        _check_finite(value)
+        return self._orjson.dumps(value, option=self._orjson.OPT_NON_STR_KEYS)
+
+    def _decode(self, data: bytes | str) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecJsonEngine(JsonEngine):
+    """The engine of the optional msgspec package, with a reused encoder and decoder."""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        msgspec = importlib.import_module("msgspec")
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def _encode(self, value: Any) -> bytes:
+        _check_finite(value)
+        return self._encoder.encode(value)
+
+    def _decode(self, data: bytes | str) -> Any:
+        return self._decoder.decode(data)
+
+
+_ENGINE_TYPES: dict[str, type[JsonEngine]] = {
+    "orjson": OrjsonEngine,
+    "msgspec": MsgspecJsonEngine,
+    "json": StdlibJsonEngine,
+}
+
+
+def is_engine_available(name: str) -> bool:
+    """
+    Check if a JSON engine can be used: orjson and msgspec are optional packages.
+
+    Args:
+        name (str): The name of the engine.
+    Returns:
+        bool: True if the engine is available.
+    """
+    return name == "json" or importlib.util.find_spec(name) is not None
+
+
+@functools.cache
+def get_json_engine() -> JsonEngine:
+    """
+    Get the JSON engine of the metadata, the indexes and the JSON results: orjson or msgspec when installed,
+    the standard `json` module otherwise.
+
+    Returns:
+        JsonEngine: The engine.
+    """
+    name = next(name for name in JSON_ENGINES if is_engine_available(name))
+    return _ENGINE_TYPES[name]()
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    Encode a value in compact JSON with the JSON engine.
+
+    Args:
+        value (Any): The value, made of JSON types.
+    Returns:
+        bytes: The UTF-8 JSON document.
+    """
+    return get_json_engine().encode(value)
+
+
+def decode_json(data: bytes | str) -> Any:
+    """
+    Decode a JSON document with the JSON engine.
+
+    Args:
+        data (bytes | str): The JSON document.
+    Returns:
+        Any: The decoded value.
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON.
+    """
+    return get_json_engine().decode(data)
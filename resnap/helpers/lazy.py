@@ -0,0 +1,145 @@
+import operator
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from typing_extensions import Self
+
+_NOT_LOADED = object()
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class LazyResult:
+    """
+    A result of a `@resnap(lazy=True)` function: a proxy reading the saved result on its first use.
+    Attribute access, item access, iteration, comparisons and arithmetic operators are forwarded to the result, which
+    is read once, then kept by the proxy. `value` returns the result itself, to pass it to code checking its type.
+
+    An argument holding a proxy is hashed with the key of the result, its function name, output folder and hashed
+    arguments, instead of its content: passing the result of a function to another one does not read it.
+
+    Attributes:
+        key (tuple[str, str, str]): The key of the result: the function name, the output folder and
+            the hashed arguments.
+    """
+
+    __slots__ = ("_load", "_lock", "_value", "key")
+
+    def __init__(self, key: tuple[str, str, str], load: Callable[[], Any]) -> None:
+        self.key = key
+        self._load = load
+        self._value = _NOT_LOADED
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, key: tuple[str, str, str], value: Any) -> Self:
+        """
+        Wrap a result already in memory, such as a computed result, so that it is hashed like a saved one.
+
+        Args:
+            key (tuple[str, str, str]): The key of the result.
+            value (Any): The result.
+        Returns:
+            LazyResult: The proxy of the result.
+        """
+        proxy = cls(key, lambda: value)
+        proxy._value = value
+        return proxy
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the result has been read."""
+        return self._value is not _NOT_LOADED
+
+    @property
+    def value(self) -> Any:
+        """The result, read on the first access."""
+        if self._value is _NOT_LOADED:
+            with self._lock:
+                if self._value is _NOT_LOADED:
+                    self._value = self._load()
+        return self._value
+
+    def __getattr__(self, name: str) -> Any:
+        # an attribute of the proxy itself raising an AttributeError, such as a slot not set yet, is not forwarded
+        if name in _OWN_ATTRIBUTES:
+            raise AttributeError(name)
+        return getattr(self.value, name)
+
+    def __repr__(self) -> str:
+        if not self.is_loaded:
+            return f"<LazyResult of {self.key[0]} (not loaded)>"
+        return repr(self._value)
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # a pickled or copied proxy is its result
+        return _identity, (self.value,)
+
+    def __bool__(self) -> bool:
+        return bool(self.value)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.value)
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self.value
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.value[key]
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.value(*args, **kwargs)
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+
+_OWN_ATTRIBUTES = frozenset([*LazyResult.__slots__, "is_loaded", "value"])
+
+
+def _forward_unary(function: Callable[[Any], Any]) -> Callable[[LazyResult], Any]:
+    return lambda self: function(self.value)
+
+
+def _forward_binary(function: Callable[[Any, Any], Any]) -> Callable[[LazyResult, Any], Any]:
+    return lambda self, other: function(self.value, other)
+
+
+def _forward_reflected(function: Callable[[Any, Any], Any]) -> Callable[[LazyResult, Any], Any]:
+    return lambda self, other: function(other, self.value)
+
+
+_UNARY_OPERATORS = {"neg": operator.neg, "pos": operator.pos, "abs": operator.abs, "invert": operator.invert}
+_COMPARISONS = {
+    "eq": operator.eq, "ne": operator.ne, "lt": operator.lt, "le": operator.le, "gt": operator.gt, "ge": operator.ge,
+}
+_BINARY_OPERATORS = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "matmul": operator.matmul,
+    "truediv": operator.truediv,
+    "floordiv": operator.floordiv,
+    "mod": operator.mod,
+    "pow": operator.pow,
+    "and": operator.and_,
+    "or": operator.or_,
+    "xor": operator.xor,
+}
+
+for _name, _function in _UNARY_OPERATORS.items():
+    setattr(LazyResult, f"__{_name}__", _forward_unary(_function))
+for _name, _function in _COMPARISONS.items():
+    setattr(LazyResult, f"__{_name}__", _forward_binary(_function))
+for _name, _function in _BINARY_OPERATORS.items():
+    setattr(LazyResult, f"__{_name}__", _forward_binary(_function))
+    setattr(LazyResult, f"__r{_name}__", _forward_reflected(_function))
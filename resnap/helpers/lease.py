@@ -0,0 +1,67 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections.abc import Callable
+from types import TracebackType
+
+from typing_extensions import Self
+
+logger = logging.getLogger("resnap")
+
+
+def new_lease_owner() -> str:
+    """
+    Get a new lease owner id, unique across the hosts and the processes sharing a store.
+
+    Returns:
+        str: The owner id.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+
+class Lease:
+    """
+    Compute lease of a result held by this process: other processes wait for the result instead of computing it.
+    The lease is renewed every third of its time to live in a daemon thread, until it is released, so that it only
+    expires if the process dies or hangs.
+    """
+
+    def __init__(self, renew: Callable[[], bool], release: Callable[[], None], ttl_seconds: float) -> None:
+        """
+        Args:
+            renew (Callable[[], bool]): Renews the lease, returns False if the lease was lost.
+            release (Callable[[], None]): Releases the lease.
+            ttl_seconds (float): The time to live of the lease.
+        """
+        self._renew = renew
+        self._release = release
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._run_heartbeat, args=(ttl_seconds / 3,), name="resnap-lease", daemon=True,
+        )
+        self._heartbeat.start()
+
+    def _run_heartbeat(self, interval_seconds: float) -> None:
+        while not self._stopped.wait(interval_seconds):
+            try:
+                if not self._renew():
+                    logger.warning("The compute lease was taken over by another process")
+                    return
+            except Exception:
+                logger.exception("Renewal of the compute lease failed")
+
+    def release(self) -> None:
+        """Stop renewing the lease and release it."""
+        self._stopped.set()
+        self._heartbeat.join()
+        self._release()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None,
+    ) -> None:
+        self.release()
@@ -0,0 +1,187 @@
+import itertools
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .tables import get_table_type
+
+
+class EvictionPolicy(str, Enum):
+    LRU = "lru"
+    LFU = "lfu"
+
+
+@dataclass(kw_only=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size_bytes: int = 0
+    entries: int = 0
+
+
+@dataclass(kw_only=True)
+class _Entry:
+    value: Any
+    size: int
+    event_time: datetime
+    uses: int = 0
+
+
+def get_size(value: Any, limit: int | None = None) -> int:
+    """
+    Estimate the memory footprint of a value without serializing it: the deep memory usage for pandas DataFrames,
+    the size of the buffers for NumPy arrays and the other tabular results, and `sys.getsizeof` otherwise, plus
+    the size of the items of containers and of the attributes of objects. The size of the items of a large container
+    is extrapolated from its first items.
+
+    Args:
+        value (Any): The value.
+        limit (int | None): The size from which the value is no longer measured, as it can not fit anyway.
+    Returns:
+        int: The size in bytes, or a size larger than the limit.
+    """
+    if isinstance(value, pd.DataFrame):
+        # the deep memory usage reads every string of the object columns
+        size = int(value.memory_usage(deep=False).sum())
+        return size if limit is not None and size > limit else int(value.memory_usage(deep=True).sum())
+    table_type = get_table_type(value)
+    if table_type is not None:
+        return table_type.to_arrow(value).nbytes
+    return _get_object_size(value, limit, _MAX_DEPTH)
+
+
+_SAMPLE_SIZE = 32
+"""The number of items of a container measured to estimate the size of all its items."""
+_MAX_DEPTH = 3
+"""The number of levels of nested containers and objects measured."""
+# objects referenced by a value which are shared with the rest of the program, and are not counted in its size
+_SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+def _get_object_size(value: Any, limit: int | None, depth: int) -> int:
+    if isinstance(value, _SHARED_TYPES):
+        return 0
+    # a view does not count the buffer of its base in sys.getsizeof
+    size = value.nbytes if isinstance(value, np.ndarray) else sys.getsizeof(value)
+    if depth == 0 or (limit is not None and size > limit):
+        return size
+    count, items = _get_referenced_objects(value)
+    sample = list(itertools.islice(items, _SAMPLE_SIZE))
+    if sample:
+        size += sum(_get_object_size(item, limit, depth - 1) for item in sample) * count // len(sample)
+    return size
+
+
+def _get_referenced_objects(value: Any) -> tuple[int, Iterator[Any]]:
+    if isinstance(value, np.ndarray):
+        return (value.size, value.flat) if value.dtype == object else (0, iter(()))
+    if isinstance(value, dict):
+        return 2 * len(value), itertools.chain.from_iterable(value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return len(value), iter(value)
+    if hasattr(value, "__dict__") and type(value).__sizeof__ is object.__sizeof__:
+        # the objects measuring themselves, such as Series or Arrow tables, include their buffers already
+        return 1, iter((vars(value),))
+    return 0, iter(())
+
+
+class MemoryCache:
+    """
+    Byte-bounded in-process cache of function results.
+    All the operations are guarded by a lock and never await, so the cache can be shared by threads and event loops.
+    The values are not copied: a cached value is the same object for every caller getting it.
+    """
+
+    def __init__(self, max_bytes: int, policy: EvictionPolicy = EvictionPolicy.LRU) -> None:
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+
+    def get(self, key: Hashable, limit_time: datetime | None = None) -> tuple[bool, Any]:
+        """
+        Get a value from the cache.
+
+        Args:
+            key (Hashable): The key.
+            limit_time (datetime | None): Entries saved before this time are expired and removed.
+        Returns:
+            tuple[bool, Any]: Whether the key was found, and the cached value. The value is shared with the other
+                callers, and must not be modified in place.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and limit_time is not None and entry.event_time < limit_time:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return False, None
+
+            entry.uses += 1
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return True, entry.value
+
+    def put(self, key: Hashable, value: Any, event_time: datetime) -> bool:
+        """
+        Put a value in the cache, evicting other entries if the byte budget is exceeded. The size of the value is
+        estimated with `get_size`, which stops measuring it once it exceeds the budget.
+
+        Args:
+            key (Hashable): The key.
+            value (Any): The value.
+            event_time (datetime): The time the value was saved.
+        Returns:
+            bool: True if the value was cached, False if it is larger than the whole budget.
+        """
+        size = get_size(value, self.max_bytes)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+
+            while self._stats.size_bytes + size > self.max_bytes:
+                self._remove(self._victim())
+                self._stats.evictions += 1
+            self._entries[key] = _Entry(value=value, size=size, event_time=event_time)
+            self._stats.size_bytes += size
+            self._stats.entries += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats()
+
+    def _victim(self) -> Hashable:
+        if self.policy == EvictionPolicy.LFU:
+            # min returns the first of the least used entries, which is also the least recently used of them
+            return min(self._entries, key=lambda key: self._entries[key].uses)
+        return next(iter(self._entries))
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._stats.size_bytes -= entry.size
+        self._stats.entries -= 1
@@ -7,8 +7,28 @@ from typing import Any
 
 from typing_extensions import Self
 
+from .config import FileCompression
+from .hashing import KEY_VERSION, HashAlgorithm
+from .json_codec import decode_json, encode_json
 from .status import Status
 
+LEGACY_KEY_VERSION = 1
+
+
+def get_result_format(result_path: str) -> str:
+    """
+    Get the format of a result file from its suffix. Parquet files used to be saved with a `.parquet.gz` suffix,
+    and compressed files end with the suffix of their `FileCompression`, such as `.pkl.zst`.
+
+    Args:
+        result_path (str): The result path.
+    Returns:
+        str: The format of the result file.
+    """
+    if result_path.endswith(tuple(compression.suffix for compression in FileCompression if compression.suffix)):
+        result_path = result_path.rsplit(".", 1)[0]
+    return result_path.rsplit(".", 1)[-1]
+
 
 @dataclass(frozen=True, kw_only=True)
 class Metadata(ABC):
@@ -16,6 +36,8 @@ class Metadata(ABC):
     event_time: datetime
     hashed_arguments: str
     extra_metadata: dict[str, Any] | None = None
+    hash_algorithm: HashAlgorithm = HashAlgorithm.SHA256
+    key_version: int = KEY_VERSION
 
     @classmethod
     def from_dict(cls, data: dict) -> MetadataSuccess | MetadataFail:
@@ -23,6 +45,50 @@ class Metadata(ABC):
             return MetadataSuccess.from_dict(data)
         return MetadataFail.from_dict(data)
 
+    @classmethod
+    def from_json(cls, data: bytes | str) -> MetadataSuccess | MetadataFail:
+        """
+        Decode a metadata file with the JSON engine, into the metadata of its status.
+
+        Args:
+            data (bytes | str): The content of the file.
+        Returns:
+            MetadataSuccess | MetadataFail: The metadata.
+        """
+        return Metadata.from_dict(decode_json(data))
+
+    def to_json(self) -> bytes:
+        """
+        Encode the metadata in compact JSON with the JSON engine.
+
+        Returns:
+            bytes: The content of the metadata file.
+        """
+        return encode_json(self.to_dict())
+
+    @staticmethod
+    def _key_from_dict(data: dict[str, Any]) -> dict[str, Any]:
+        # metadata saved before the key scheme was recorded were hashed with sha256 from the JSON of the arguments
+        return {
+            "hash_algorithm": HashAlgorithm(data.get("hash_algorithm", HashAlgorithm.SHA256.value)),
+            "key_version": data.get("key_version", LEGACY_KEY_VERSION),
+        }
+
+    def _key_to_dict(self) -> dict[str, Any]:
+        return {"hash_algorithm": self.hash_algorithm.value, "key_version": self.key_version}
+
+    def is_keyed_with(self, hash_algorithm: HashAlgorithm, key_version: int = KEY_VERSION) -> bool:
+        """
+        Check if the hashed arguments were computed with the given key scheme, so that they can be compared.
+
+        Args:
+            hash_algorithm (HashAlgorithm): The hash algorithm.
+            key_version (int): The version of the way the arguments are turned into bytes.
+        Returns:
+            bool: True if the metadata were keyed with the same algorithm and version.
+        """
+        return self.hash_algorithm == hash_algorithm and self.key_version == key_version
+
     @abstractmethod
     def to_dict(self) -> dict[str, Any]:
         raise NotImplementedError  # pragma: no cover
@@ -32,6 +98,14 @@ class Metadata(ABC):
 class MetadataSuccess(Metadata):
     result_path: str
     result_type: str
+    result_format: str | None = None
+    compression: str | None = None
+    compression_level: int | None = None
+
+    @property
+    def file_format(self) -> str:
+        """The format of the result file, from its suffix for the metadata saved before it was recorded."""
+        return self.result_format or get_result_format(self.result_path)
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> Self:
@@ -41,7 +115,11 @@ class MetadataSuccess(Metadata):
             hashed_arguments=data["hashed_arguments"],
             result_path=data["result_path"],
             result_type=data["result_type"],
+            result_format=data.get("result_format"),
+            compression=data.get("compression"),
+            compression_level=data.get("compression_level"),
             extra_metadata=data.get("extra_metadata", {}),
+            **cls._key_from_dict(data),
         )
 
     def to_dict(self) -> dict[str, Any]:
@@ -51,7 +129,14 @@ class MetadataSuccess(Metadata):
             "hashed_arguments": self.hashed_arguments,
             "result_path": self.result_path,
             "result_type": self.result_type,
+            **self._key_to_dict(),
+        }
+        optional = {
+            "result_format": self.result_format,
+            "compression": self.compression,
+            "compression_level": self.compression_level,
         }
+        metadata.update({key: value for key, value in optional.items() if value is not None})
         if self.extra_metadata:
             metadata["extra_metadata"] = self.extra_metadata
         return metadata
@@ -71,6 +156,7 @@ class MetadataFail(Metadata):
             error_message=data["error_message"],
             data=data.get("data", {}),
             extra_metadata=data.get("extra_metadata", {}),
+            **cls._key_from_dict(data),
         )
 
     def to_dict(self) -> dict[str, Any]:
@@ -79,6 +165,7 @@ class MetadataFail(Metadata):
             "event_time": self.event_time.isoformat(),
             "hashed_arguments": self.hashed_arguments,
             "error_message": self.error_message,
+            **self._key_to_dict(),
         }
         if self.data:
             metadata["data"] = self.data
@@ -0,0 +1,102 @@
+import io
+import pickle
+import struct
+from typing import IO, Any
+
+CONTAINER_MAGIC = b"RESNAPK5"
+"""Prefix of the pickle containers. Plain pickles of protocol 2 and above start with the PROTO opcode instead."""
+
+ALIGNMENT = 64
+"""Alignment of the out-of-band buffers in a container, enough for any NumPy dtype and for SIMD loads."""
+
+OUT_OF_BAND_MIN_BYTES = 64 * 1024
+"""Size from which a buffer is stored out-of-band: smaller ones are cheaper to copy than to reference."""
+
+_COUNT = struct.Struct("<Q")
+_SEGMENT = struct.Struct("<QQ")
+
+
+def is_pickle_container(data: bytes | memoryview) -> bool:
+    """
+    Tell whether some data, or their first bytes, are a pickle container rather than a plain pickle.
+
+    Args:
+        data (bytes | memoryview): The data, or at least their first bytes.
+    Returns:
+        bool: True if the data are a pickle container.
+    """
+    return bytes(data[:len(CONTAINER_MAGIC)]) == CONTAINER_MAGIC
+
+
+def write_pickle(obj: Any, file: IO[bytes]) -> None:
+    """
+    Pickle an object with protocol 5 into a container, in which the large buffers exposed by the object, such as
+    those of NumPy arrays and Arrow tables, are written as is after the pickle stream instead of being copied into it.
+
+    The container holds `CONTAINER_MAGIC`, the pickle stream, the out-of-band buffers aligned on `ALIGNMENT` bytes,
+    then the table of the (offset, size) of the stream and of the buffers, and the number of entries of the table.
+    The table is written last so that the pickle stream is streamed to the file.
+
+    Args:
+        obj (Any): The object.
+        file (IO[bytes]): A new binary file.
+    """
+    buffers: list[memoryview] = []
+
+    def keep_in_band(buffer: pickle.PickleBuffer) -> bool:
+        raw = buffer.raw()
+        if raw.nbytes < OUT_OF_BAND_MIN_BYTES:
+            return True
+        buffers.append(raw)
+        return False
+
+    file.write(CONTAINER_MAGIC)
+    pickle.Pickler(file, protocol=5, buffer_callback=keep_in_band).dump(obj)
+    position = file.tell()
+    segments = [(len(CONTAINER_MAGIC), position - len(CONTAINER_MAGIC))]
+    for raw in buffers:
+        padding = -position % ALIGNMENT
+        file.write(bytes(padding))
+        segments.append((position + padding, raw.nbytes))
+        file.write(raw)
+        position += padding + raw.nbytes
+    file.write(b"".join(_SEGMENT.pack(*segment) for segment in segments))
+    file.write(_COUNT.pack(len(segments)))
+
+
+def dumps_pickle(obj: Any) -> bytes:
+    """
+    Pickle an object into the bytes of a container. See `write_pickle`.
+
+    Args:
+        obj (Any): The object.
+    Returns:
+        bytes: The container.
+    """
+    with io.BytesIO() as buffer:
+        write_pickle(obj, buffer)
+        return buffer.getvalue()
+
+
+def load_pickle(data: bytes | bytearray | memoryview | Any) -> Any:
+    """
+    Unpickle a container written by `write_pickle`, or a plain pickle. The out-of-band buffers are views of the
+    data, which are not copied when they are writable, such as a copy-on-write memory map or a downloaded buffer:
+    the rebuilt objects, such as NumPy arrays, keep them alive.
+
+    Args:
+        data (bytes | bytearray | memoryview | Any): The data, or any object exposing them with the buffer protocol.
+    Returns:
+        Any: The object.
+    """
+    view = memoryview(data)
+    if not is_pickle_container(view):
+        return pickle.loads(view)
+    if view.readonly:
+        # the objects rebuilt from read-only buffers, such as NumPy arrays, would be read-only
+        view = memoryview(bytearray(view))
+    table_end = len(view) - _COUNT.size
+    (count,) = _COUNT.unpack_from(view, table_end)
+    table = view[table_end - count * _SEGMENT.size:table_end]
+    pickled, *buffers = (view[offset:offset + size] for offset, size in _SEGMENT.iter_unpack(table))
+    return pickle.loads(pickled, buffers=buffers)
@@ -1,31 +1,50 @@
+import functools
 import logging
-from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
 
+from ..services.async_service import AsyncResnapService
 from ..services.service import ResnapService
-from .metadata import Metadata
-from .signature import get_function_signature
+from .executor import get_async_executor, run_in_executor
+from .lazy import LazyResult
+from .metadata import MetadataSuccess
+from .signature import ArgumentBinder
+from .streams import is_stream_type
+from .table_handle import TableHandle
 from .utils import hash_arguments
+from .write_behind import write_behind
 
 logger = logging.getLogger("resnap")
 
 
+def _log_missing_result(metadata: MetadataSuccess) -> None:
+    logger.warning(f"The saved result {metadata.result_path} does not exist anymore, calling again...")
+
+
 class ResultsRetriever:
     def __init__(self, service: ResnapService, options: dict[str, Any]) -> None:
         self._service = service
-        self._considered_attributes: list[str] = options.get("considered_attributes", [])
         self._enable_recovery: bool = options.get("enable_recovery", True)
         self._consider_args: bool = options.get("consider_args", True)
+        self._use_memory_cache: bool = self._consider_args and options.get("memory_cache", True)
+        self._lazy: bool = options.get("lazy", False)
 
         self.output_folder: str = options.get("output_folder", "")
         self.func_name: str = ""
         self.hashed_arguments: str = ""
 
-    def get_results(self, func: Callable, args: tuple, kwargs: dict) -> tuple[Any, bool]:
+    @property
+    def key(self) -> tuple[str, str, str]:
+        """The key of the result: the function name, the output folder and the hashed arguments."""
+        return self.func_name, self.output_folder, self.hashed_arguments
+
+    def get_results(self, binder: ArgumentBinder, args: tuple, kwargs: dict) -> tuple[Any, bool]:
         """
         Get the results from the resnap service.
 
         Args:
-            func (Callable): The function to get the signature from.
+            binder (ArgumentBinder): The argument binder of the function.
             args (tuple): The arguments passed to the function.
             kwargs (dict): The keyword arguments passed to the function.
 
@@ -33,24 +52,320 @@ class ResultsRetriever:
             tuple[Any, bool]: The result of the function and a boolean indicating if the result was recovered.
         """
         self._service.create_output_folder(self.output_folder)
-        self.func_name, arguments = get_function_signature(func, args, kwargs, self._considered_attributes)
-        self.hashed_arguments: str = hash_arguments(arguments)
-        return self._get_saved_result()
+        self._hash_arguments(binder, args, kwargs)
+        return self.get_saved_result()
+
+    def _hash_arguments(self, binder: ArgumentBinder, args: tuple, kwargs: dict) -> None:
+        self.func_name = binder.func_name
+        self.hashed_arguments = hash_arguments(
+            binder.bind(args, kwargs), self._service.config.hash_algorithm, self._service.config.hash_memo,
+        )
+
+    def cache_result(self, result: Any, event_time: datetime) -> None:
+        """
+        Keep the result in the memory tier of the service, if enabled for the function.
+
+        Args:
+            result (Any): The result of the function.
+            event_time (datetime): The event time of the saved result.
+        """
+        if self._use_memory_cache:
+            self._service.cache_result(self.func_name, self.output_folder, self.hashed_arguments, result, event_time)
+
+    def _get_cached_result(self) -> tuple[bool, Any]:
+        if not self._use_memory_cache:
+            return False, None
+        is_cached, result = self._service.get_cached_result(self.func_name, self.output_folder, self.hashed_arguments)
+        if is_cached:
+            logger.debug("Returning result from memory...")
+        return is_cached, result
+
+    def _get_pending_result(self) -> tuple[bool, Any]:
+        if not self._consider_args:
+            return False, None
+        is_pending, result = write_behind.get(self.key)
+        if is_pending:
+            logger.debug("Returning result being saved...")
+        return is_pending, result
+
+    def get_saved_result(self) -> tuple[Any, bool]:
+        """
+        Get the saved result of the hashed arguments, from the memory tier or from the store.
 
-    def _get_saved_result(self) -> tuple[Any, bool]:
+        Returns:
+            tuple[Any, bool]: The saved result and a boolean indicating if it was found.
+                A result still being saved in the background is also returned. A result whose file was deleted
+                since it was indexed is not found.
+        """
         if not self._enable_recovery:
             return None, False
 
-        metadata: list[Metadata] = self._service.get_success_metadata(self.func_name, self.output_folder)
-        if not metadata:
+        result, is_local = self.get_local_result()
+        if is_local:
+            return result, True
+
+        metadata = self._find_saved_metadata()
+        if metadata is None:
+            return None, False
+        try:
+            return self.read_saved_result(metadata), True
+        except FileNotFoundError:
+            _log_missing_result(metadata)
             return None, False
 
-        if not self._consider_args:
-            return self._service.read_result(metadata[0]), True
+    def _find_saved_metadata(self) -> MetadataSuccess | None:
+        return self._service.find_success_metadata(
+            self.func_name,
+            self.output_folder,
+            self.hashed_arguments if self._consider_args else None,
+        )
+
+    def open_saved_table(self, binder: ArgumentBinder, args: tuple, kwargs: dict) -> TableHandle | None:
+        """
+        Open the saved tabular result of the arguments in the store, to read some of its columns and rows.
 
-        for metadata_entry in metadata:
-            if metadata_entry.hashed_arguments == self.hashed_arguments:
-                logger.debug("Returning saved result...")
-                return self._service.read_result(metadata_entry), True
+        Args:
+            binder (ArgumentBinder): The argument binder of the function.
+            args (tuple): The arguments passed to the function.
+            kwargs (dict): The keyword arguments passed to the function.
+
+        Returns:
+            TableHandle | None: The handle of the saved result, or None if the result is in memory, is not saved,
+                or is not a table saved in a format read partially.
+        """
+        self._service.create_output_folder(self.output_folder)
+        self._hash_arguments(binder, args, kwargs)
+        if not self._enable_recovery or self.get_local_result()[1]:
+            return None
+        metadata = self._find_saved_metadata()
+        if metadata is None:
+            return None
+        logger.debug("Opening saved result...")
+        try:
+            return self._service.open_result(metadata)
+        except FileNotFoundError:
+            _log_missing_result(metadata)
+            return None
+
+    def find_saved_stream(self, binder: ArgumentBinder, args: tuple, kwargs: dict) -> MetadataSuccess | None:
+        """
+        Find the saved items of a generator called with the arguments, replayed with `read_stream` of the service.
+        The items of a generator are never kept in memory.
+
+        Args:
+            binder (ArgumentBinder): The argument binder of the function.
+            args (tuple): The arguments passed to the function.
+            kwargs (dict): The keyword arguments passed to the function.
+
+        Returns:
+            MetadataSuccess | None: The metadata of the saved items, or None if they are not saved, or if the saved
+                result is not the one of a generator.
+        """
+        self._service.create_output_folder(self.output_folder)
+        self._hash_arguments(binder, args, kwargs)
+        if not self._enable_recovery:
+            return None
+        metadata = self._find_saved_metadata()
+        if metadata is None or not is_stream_type(metadata.result_type):
+            return None
+        if not self._service.result_exists(metadata):
+            _log_missing_result(metadata)
+            return None
+        return metadata
+
+    def get_local_result(self) -> tuple[Any, bool]:
+        """
+        Get the result from the memory tier, or the result still being saved in the background, without reading
+        the store.
+
+        Returns:
+            tuple[Any, bool]: The result and a boolean indicating if it was found.
+        """
+        is_found, result = self._get_cached_result()
+        if not is_found:
+            is_found, result = self._get_pending_result()
+        return result, is_found
+
+    def read_saved_result(self, metadata: MetadataSuccess) -> Any:
+        """
+        Read the saved result of the given metadata, and keep it in the memory tier.
+        The result of a lazy function is read on its first use.
+
+        Args:
+            metadata (MetadataSuccess): The success metadata of the result.
+        Returns:
+            Any: The saved result, or its `LazyResult` for a lazy function.
+        Raises:
+            FileNotFoundError: If the result file does not exist.
+        """
+        if self._lazy:
+            if not self._service.result_exists(metadata):
+                raise FileNotFoundError(f"The saved result {metadata.result_path} does not exist")
+            return LazyResult(self.key, functools.partial(self._read_saved_result, metadata))
+        return self._read_saved_result(metadata)
+
+    def _read_saved_result(self, metadata: MetadataSuccess) -> Any:
+        logger.debug("Returning saved result...")
+        result = self._service.read_result(metadata)
+        self.cache_result(result, metadata.event_time)
+        return result
+
+    def wrap_result(self, result: Any) -> Any:
+        """
+        Wrap the result returned by a lazy function, computed or already in memory, in a `LazyResult`, so that it is
+        hashed with its key like a result read on its first use.
 
-        return None, False
+        Args:
+            result (Any): The result.
+        Returns:
+            Any: The `LazyResult` of the result for a lazy function, the result otherwise.
+        """
+        if not self._lazy or isinstance(result, LazyResult):
+            return result
+        return LazyResult.of(self.key, result)
+
+
+class AsyncResultsRetriever(ResultsRetriever):
+    """Results retriever of the `@async_resnap` functions using an asynchronous service."""
+
+    def __init__(self, service: AsyncResnapService, options: dict[str, Any]) -> None:
+        super().__init__(service, options)
+        self._service: AsyncResnapService = service
+
+    async def get_results(self, binder: ArgumentBinder, args: tuple, kwargs: dict) -> tuple[Any, bool]:
+        """
+        Get the results from the asynchronous resnap service. The arguments are hashed in the executor.
+
+        Args:
+            binder (ArgumentBinder): The argument binder of the function.
+            args (tuple): The arguments passed to the function.
+            kwargs (dict): The keyword arguments passed to the function.
+
+        Returns:
+            tuple[Any, bool]: The result of the function and a boolean indicating if the result was recovered.
+        """
+        await self._service.create_output_folder(self.output_folder)
+        executor = get_async_executor(self._service.config.async_max_workers)
+        await run_in_executor(executor, self._hash_arguments, binder, args, kwargs)
+        return await self.get_saved_result()
+
+    async def get_saved_result(self) -> tuple[Any, bool]:
+        """
+        Get the saved result of the hashed arguments, from the memory tier or from the store.
+
+        Returns:
+            tuple[Any, bool]: The saved result and a boolean indicating if it was found.
+                A result still being saved in the background is also returned.
+        """
+        if not self._enable_recovery:
+            return None, False
+
+        result, is_local = self.get_local_result()
+        if is_local:
+            return result, True
+
+        metadata: MetadataSuccess | None = await self._service.find_success_metadata(
+            self.func_name,
+            self.output_folder,
+            self.hashed_arguments if self._consider_args else None,
+        )
+        if metadata is None:
+            return None, False
+        try:
+            return await self.read_saved_result(metadata), True
+        except FileNotFoundError:
+            _log_missing_result(metadata)
+            return None, False
+
+    async def read_saved_result(self, metadata: MetadataSuccess) -> Any:
+        """
+        Read the saved result of the given metadata, and keep it in the memory tier.
+
+        Args:
+            metadata (MetadataSuccess): The success metadata of the result.
+        Returns:
+            Any: The saved result.
+        Raises:
+            FileNotFoundError: If the result file does not exist.
+        """
+        logger.debug("Returning saved result...")
+        result = await self._service.read_result(metadata)
+        self.cache_result(result, metadata.event_time)
+        return result
+
+
+class BatchResultsRetriever:
+    """
+    Results retriever of the calls of `.map`: the saved results of all the calls are looked up with a single read
+    of the function index, and read concurrently.
+    """
+
+    def __init__(self, service: ResnapService, options: dict[str, Any]) -> None:
+        self._service = service
+        self._options = options
+        self._enable_recovery: bool = options.get("enable_recovery", True)
+        self._consider_args: bool = options.get("consider_args", True)
+        self.retrievers: list[ResultsRetriever] = []
+
+    def get_results(
+        self, binder: ArgumentBinder, calls: list[tuple[tuple, dict]], max_workers: int | None = None,
+    ) -> dict[int, Any]:
+        """
+        Get the saved results of the given calls.
+
+        Args:
+            binder (ArgumentBinder): The argument binder of the function.
+            calls (list[tuple[tuple, dict]]): The arguments and keyword arguments of each call.
+            max_workers (int | None): The number of threads reading the saved results.
+        Returns:
+            dict[int, Any]: The recovered results, by position of their call. A result whose file was deleted since
+                it was indexed is not recovered. A retriever of each call, holding its hashed arguments, is kept
+                in `retrievers`.
+        """
+        self._service.create_output_folder(self._options.get("output_folder", ""))
+        self.retrievers = []
+        for args, kwargs in calls:
+            retriever = ResultsRetriever(self._service, self._options)
+            retriever._hash_arguments(binder, args, kwargs)
+            self.retrievers.append(retriever)
+        if not self._enable_recovery:
+            return {}
+
+        results: dict[int, Any] = {}
+        for position, retriever in enumerate(self.retrievers):
+            result, is_local = retriever.get_local_result()
+            if is_local:
+                results[position] = result
+
+        saved = self._find_saved_metadata([p for p in range(len(self.retrievers)) if p not in results])
+        if saved:
+            results.update(self._read_saved_results(saved, max_workers))
+        return results
+
+    def _read_saved_results(self, saved: dict[int, MetadataSuccess], max_workers: int | None) -> dict[int, Any]:
+        # a result saved for several calls is read once
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resnap-map") as executor:
+            reads = {}
+            for position, metadata in saved.items():
+                if metadata.result_path not in reads:
+                    reads[metadata.result_path] = executor.submit(
+                        self.retrievers[position].read_saved_result, metadata,
+                    )
+        results: dict[int, Any] = {}
+        for position, metadata in saved.items():
+            try:
+                results[position] = reads[metadata.result_path].result()
+            except FileNotFoundError:
+                _log_missing_result(metadata)
+        return results
+
+    def _find_saved_metadata(self, positions: list[int]) -> dict[int, MetadataSuccess]:
+        if not positions:
+            return {}
+        func_name, output_folder = self.retrievers[0].func_name, self.retrievers[0].output_folder
+        if not self._consider_args:
+            metadata = self._service.find_success_metadata(func_name, output_folder)
+            return {} if metadata is None else dict.fromkeys(positions, metadata)
+        hashed_arguments = {p: self.retrievers[p].hashed_arguments for p in positions}
+        found = self._service.find_many_success_metadata(func_name, output_folder, list(hashed_arguments.values()))
+        return {p: found[hashed] for p, hashed in hashed_arguments.items() if hashed in found}
@@ -1,6 +1,112 @@
 import inspect
 from typing import Any, Callable
 
+_SELF_NAMES = ("self", "cls")
+
+
+class ArgumentBinder:
+    """
+    Bind the arguments of a function call to its parameters.
+    Everything that only depends on the function (signature, default values, self/cls detection) is computed once,
+    so that binding a call only builds the arguments dict.
+    """
+
+    def __init__(self, func: Callable, considered_attributes: list[str] | None = None) -> None:
+        """
+        Args:
+            func (Callable): The function whose calls are bound.
+            considered_attributes (list[str] | None): The list of class/instance attributes to consider when hashing
+            the function arguments.
+        """
+        self.func_name: str = func.__qualname__
+        self._signature = inspect.signature(func)
+        self._considered_attributes: frozenset[str] = frozenset(considered_attributes or [])
+
+        parameters = list(self._signature.parameters.values())
+        self._self_name: str | None = parameters[0].name if parameters and parameters[0].name in _SELF_NAMES else None
+        self._positional: tuple[str, ...] = tuple(
+            p.name for p in parameters if p.kind == inspect.Parameter.POSITIONAL_OR_KEYWORD
+        )
+        self._names: frozenset[str] = frozenset(
+            p.name for p in parameters
+            if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        )
+        self._defaults: tuple[tuple[str, Any], ...] = tuple(
+            (p.name, p.default) for p in parameters if p.default is not inspect.Parameter.empty
+        )
+        self._var_positional: str | None = next(
+            (p.name for p in parameters if p.kind == inspect.Parameter.VAR_POSITIONAL), None
+        )
+        self._var_keyword: str | None = next(
+            (p.name for p in parameters if p.kind == inspect.Parameter.VAR_KEYWORD), None
+        )
+        self._parameters_count: int = len(parameters)
+        # positional-only parameters are rare: their calls are bound by inspect
+        self._is_fast: bool = all(p.kind != inspect.Parameter.POSITIONAL_ONLY for p in parameters)
+
+    def bind(self, args: tuple, kwargs: dict) -> dict[str, Any]:
+        """
+        Get the arguments of a call, default values included.
+        If the function is a method, the first argument is replaced by the considered attributes of the instance/class.
+
+        Args:
+            args (tuple): The arguments passed to the function.
+            kwargs (dict): The keyword arguments passed to the function.
+        Returns:
+            dict[str, Any]: The arguments.
+        Raises:
+            TypeError: If the arguments do not match the signature of the function.
+        """
+        arguments = self._fast_bind(args, kwargs) if self._is_fast else None
+        if arguments is None:
+            bound_args = self._signature.bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            arguments = bound_args.arguments
+
+        if self._self_name is None or self._self_name not in arguments:
+            return arguments
+        instance = arguments.pop(self._self_name)
+        if not self._considered_attributes:
+            return arguments
+        return {**get_attributes(instance, self._considered_attributes), **arguments}
+
+    def _fast_bind(self, args: tuple, kwargs: dict) -> dict[str, Any] | None:
+        """
+        Bind a call without inspect. Returns None if the call is invalid, so that inspect raises the right error.
+        """
+        positional_count = len(self._positional)
+        if len(args) > positional_count and self._var_positional is None:
+            return None
+
+        arguments = dict(zip(self._positional, args))
+        if self._var_positional is not None:
+            arguments[self._var_positional] = args[positional_count:]
+
+        if not self._bind_keywords(arguments, kwargs):
+            return None
+
+        if len(arguments) < self._parameters_count:
+            for name, default in self._defaults:
+                arguments.setdefault(name, default)
+            if len(arguments) < self._parameters_count:
+                return None
+        return arguments
+
+    def _bind_keywords(self, arguments: dict[str, Any], kwargs: dict) -> bool:
+        extra_kwargs = {}
+        for name, value in kwargs.items():
+            if name in self._names:
+                if name in arguments:
+                    return False
+                arguments[name] = value
+            elif self._var_keyword is not None:
+                extra_kwargs[name] = value
+            else:
+                return False
+        if self._var_keyword is not None:
+            arguments[self._var_keyword] = extra_kwargs
+        return True
+
 
 def get_function_signature(
     func: Callable,
@@ -11,6 +117,7 @@ def get_function_signature(
     """
     Get the function name and arguments from the function signature.
     If the function is a method, the first argument is skipped and name is composed from the class and method name.
+    Prefer an ArgumentBinder built once when the same function is called several times.
 
     Args:
         func (Callable): The function to get the signature from.
@@ -21,23 +128,13 @@ def get_function_signature(
     Returns:
         tuple[str, dict[str, Any]]: The function name and the arguments.
     """
-    considered_attributes = considered_attributes or []
-    sig = inspect.signature(func)
-    bound_args = sig.bind(*args, **kwargs)
-    bound_args.apply_defaults()
-    func_name = ""
-    arguments = {}
-    for i, (name, value) in enumerate(bound_args.arguments.items()):
-        if i == 0 and name in ("self", "cls"):
-            arguments.update(get_attributes(value, considered_attributes))
-            continue
-        arguments[name] = value
-
-    func_name = func.__qualname__
-    return func_name, arguments
-
-
-def _get_attributes(instance_attributes: dict[str, Any], considered_attributes: list[str]) -> dict[str, Any]:
+    binder = ArgumentBinder(func, considered_attributes)
+    return binder.func_name, binder.bind(args, kwargs)
+
+
+def _get_attributes(
+    instance_attributes: dict[str, Any], considered_attributes: list[str] | frozenset[str],
+) -> dict[str, Any]:
     """
     Get the attributes of an instance.
 
@@ -57,7 +154,7 @@ def _get_attributes(instance_attributes: dict[str, Any], considered_attributes:
     }
 
 
-def get_attributes(instance: Any, considered_attributes: list[str]) -> dict[str, Any]:
+def get_attributes(instance: Any, considered_attributes: list[str] | frozenset[str]) -> dict[str, Any]:
     """
     Get the attributes of an instance.
 
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent import futures
+from concurrent.futures import Future
+from typing import TypeVar
+
+logger = logging.getLogger("resnap")
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplication of concurrent calls of the same key in a process: the first caller (the leader) runs the call,
+    the callers arriving while it runs wait for it and get its result, or its exception.
+    Threads and asyncio tasks of any event loop can wait for the same call.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return future, False
+            future = self._flights[key] = Future()
+            return future, True
+
+    def _land(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    @staticmethod
+    def _log_timeout(timeout: float | None) -> None:
+        logger.warning(f"A concurrent call with the same arguments is still running after {timeout}s, calling again...")
+
+    def run(self, key: Hashable, func: Callable[[], T], timeout: float | None = None) -> T:
+        """
+        Run a function once for all the concurrent callers of the same key.
+
+        Args:
+            key (Hashable): The key of the call.
+            func (Callable[[], T]): The function, run by the leader only.
+            timeout (float | None): The maximum number of seconds a caller waits for the leader. After it, the caller
+                runs the function itself. If None, it waits until the leader is done.
+        Returns:
+            T: The result of the function.
+        """
+        future, is_leader = self._join(key)
+        if not is_leader:
+            try:
+                return future.result(timeout)
+            except (futures.TimeoutError, TimeoutError):
+                # before Python 3.11, the timeout error of the future is not the builtin one
+                if future.done():
+                    raise
+                self._log_timeout(timeout)
+                return func()
+
+        try:
+            result = func()
+        except BaseException as e:
+            self._land(key, future)
+            future.set_exception(e)
+            raise
+        self._land(key, future)
+        future.set_result(result)
+        return result
+
+    async def run_async(self, key: Hashable, func: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        """
+        Run a coroutine function once for all the concurrent callers of the same key, without blocking the event loop
+        while waiting.
+
+        Args:
+            key (Hashable): The key of the call.
+            func (Callable[[], Awaitable[T]]): The coroutine function, run by the leader only.
+            timeout (float | None): The maximum number of seconds a caller waits for the leader. After it, the caller
+                runs the coroutine function itself. If None, it waits until the leader is done.
+        Returns:
+            T: The result of the coroutine function.
+        """
+        future, is_leader = self._join(key)
+        if not is_leader:
+            try:
+                # shielded, so that a timeout does not cancel the call of the leader
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except (asyncio.TimeoutError, TimeoutError):
+                # before Python 3.11, the timeout error of asyncio is not the builtin one
+                if future.done():
+                    raise
+                self._log_timeout(timeout)
+                return await func()
+
+        try:
+            result = await func()
+        except BaseException as e:
+            self._land(key, future)
+            future.set_exception(e)
+            raise
+        self._land(key, future)
+        future.set_result(result)
+        return result
+
+
+single_flight = SingleFlight()
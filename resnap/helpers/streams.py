@@ -0,0 +1,223 @@
+import io
+import logging
+import pickle
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from datetime import datetime
+from typing import IO, Any
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import parquet as pq
+
+from .compression import CHUNK_SIZE, compress_stream, decompress_stream
+from .config import FileCompression, ParquetCompression
+from .tables import TableType
+
+logger = logging.getLogger("resnap")
+
+STREAM_FORMAT = "pkls"
+"""Format of the streams of items which are not tables: a sequence of pickles."""
+
+_STREAM_TYPE = "Iterator"
+
+
+def get_stream_type(item_type: str | None = None) -> str:
+    """
+    Get the result type recorded in the metadata of a stream of items, such as `Iterator[DataFrame]`.
+
+    Args:
+        item_type (str | None): The registered name of the table type of the items, None for pickled items.
+    Returns:
+        str: The result type.
+    """
+    return _STREAM_TYPE if item_type is None else f"{_STREAM_TYPE}[{item_type}]"
+
+
+def is_stream_type(result_type: str) -> bool:
+    """
+    Check if a recorded result type is the one of a stream of items.
+
+    Args:
+        result_type (str): The result type.
+    Returns:
+        bool: True for a stream.
+    """
+    return result_type == _STREAM_TYPE or result_type.startswith(f"{_STREAM_TYPE}[")
+
+
+def get_item_type(result_type: str) -> str | None:
+    """
+    Get the table type of the items of a stream from its recorded result type.
+
+    Args:
+        result_type (str): The result type of the stream.
+    Returns:
+        str | None: The registered name of the table type of the items, None for pickled items.
+    """
+    return result_type[len(_STREAM_TYPE) + 1:-1] or None
+
+
+class StreamWriter(ABC):
+    """
+    The items of a generator written one by one to a result file, which is only complete once the writer is closed.
+    An aborted stream is deleted.
+
+    Attributes:
+        result_path (str): The path of the result file.
+        event_time (datetime): The event time of the snapshot.
+        result_type (str): The result type of the stream, to record in its metadata.
+    """
+
+    def __init__(
+        self, file: IO[bytes], result_path: str, event_time: datetime, result_type: str, delete: Callable[[], None],
+    ) -> None:
+        self._file = file
+        self._delete = delete
+        self._is_closed = False
+        self.result_path = result_path
+        self.event_time = event_time
+        self.result_type = result_type
+
+    @abstractmethod
+    def write(self, item: Any) -> None:  # pragma: no cover
+        """
+        Write an item to the file.
+
+        Args:
+            item (Any): The item.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _finish(self) -> None:  # pragma: no cover
+        """Write the end of the stream, and close the file."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Complete the file of the stream."""
+        if not self._is_closed:
+            self._is_closed = True
+            self._finish()
+
+    def abort(self) -> None:
+        """
+        Close the file of the stream, then delete it. A file only created once closed, such as an S3 object, is
+        aborted first, so that the truncated stream is never published.
+        """
+        try:
+            abort_file = getattr(self._file, "abort", None)
+            if abort_file is not None:
+                abort_file()
+            self.close()
+        except Exception:
+            logger.debug("Closing aborted stream failed", exc_info=True)
+        self._delete()
+
+
+class PickleStreamWriter(StreamWriter):
+    """Writer of a stream of items pickled one after the other, and compressed as they are written."""
+
+    def __init__(
+        self,
+        file: IO[bytes],
+        result_path: str,
+        event_time: datetime,
+        result_type: str,
+        delete: Callable[[], None],
+        compression: FileCompression = FileCompression.NONE,
+    ) -> None:
+        super().__init__(file, result_path, event_time, result_type, delete)
+        self._stream = compress_stream(file, compression)
+
+    def write(self, item: Any) -> None:
+        pickle.dump(item, self._stream, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _finish(self) -> None:
+        self._stream.close()
+
+
+class TableStreamWriter(StreamWriter):
+    """
+    Writer of a stream of tables in a parquet file, each table in its own row group, so that the tables are read back
+    one by one. The tables are cast to the schema of the first one, and the index of each DataFrame is stored.
+    """
+
+    def __init__(
+        self,
+        file: IO[bytes],
+        result_path: str,
+        event_time: datetime,
+        result_type: str,
+        delete: Callable[[], None],
+        table_type: TableType,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+    ) -> None:
+        super().__init__(file, result_path, event_time, result_type, delete)
+        self._table_type = table_type
+        self._compression = compression
+        self._compression_level = compression_level
+        self._writer: pq.ParquetWriter | None = None
+
+    def _to_arrow(self, item: Any) -> pa.Table:
+        schema = None if self._writer is None else self._writer.schema
+        if isinstance(item, pd.DataFrame):
+            # a range index is recorded in the schema, which is the one of the first DataFrame
+            return pa.Table.from_pandas(item, schema=schema, preserve_index=True)
+        table = self._table_type.to_arrow(item)
+        return table if schema is None or table.schema.equals(schema) else table.cast(schema)
+
+    def write(self, item: Any) -> None:
+        table = self._to_arrow(item)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                self._file,
+                table.schema,
+                compression=self._compression.codec or "none",
+                compression_level=self._compression_level,
+                write_statistics=True,
+            )
+        self._writer.write_table(table, row_group_size=max(table.num_rows, 1))
+
+    def _finish(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._file.close()
+
+
+def read_pickles(file: IO[bytes] | pa.NativeFile, compression: FileCompression = FileCompression.NONE) -> Iterator[Any]:
+    """
+    Read the items of a stream of pickles one by one. The file is closed when the items are exhausted.
+
+    Args:
+        file (IO[bytes] | pa.NativeFile): The file, opened for reading.
+        compression (FileCompression): The compression of the file.
+    Returns:
+        Iterator[Any]: The items.
+    """
+    if isinstance(file, io.RawIOBase):
+        # the small reads of the unpickler are served from a buffer, not from the file
+        file = io.BufferedReader(file, CHUNK_SIZE)
+    with decompress_stream(file, compression) as stream:
+        while True:
+            try:
+                yield pickle.load(stream)
+            except EOFError:
+                return
+
+
+def read_tables(file: IO[bytes] | pa.NativeFile, table_type: TableType) -> Iterator[Any]:
+    """
+    Read the tables of a parquet stream one by one, a row group at a time. The file is closed when the tables are
+    exhausted.
+
+    Args:
+        file (IO[bytes] | pa.NativeFile): The file, opened for random access.
+        table_type (TableType): The type of the tables.
+    Returns:
+        Iterator[Any]: The tables.
+    """
+    with file, pq.ParquetFile(file) as parquet_file:
+        for row_group in range(parquet_file.num_row_groups):
+            yield table_type.from_arrow(parquet_file.read_row_group(row_group))
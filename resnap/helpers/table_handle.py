@@ -0,0 +1,142 @@
+from types import TracebackType
+from typing import IO, Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import parquet as pq
+from typing_extensions import Self
+
+from .tables import TableType
+
+Filters = pc.Expression | list[tuple] | list[list[tuple]]
+"""Row filters: a pyarrow expression, or predicates in the disjunctive normal form of `pyarrow.parquet`, such as
+`[("day", "=", "2025-07-15"), ("price", ">", 10)]`."""
+
+# the row groups of a parquet file are skipped according to their column statistics, and only the record batches
+# of an arrow file holding the requested columns are read
+_FILE_FORMATS: dict[str, ds.FileFormat] = {"parquet": ds.ParquetFileFormat(), "arrow": ds.IpcFileFormat()}
+
+PARTIAL_FORMATS = tuple(_FILE_FORMATS)
+"""Formats of the tabular results which are read partially."""
+
+
+def to_expression(filters: Filters | None) -> pc.Expression | None:
+    """
+    Convert row filters to a pyarrow expression.
+
+    Args:
+        filters (Filters | None): The filters.
+    Returns:
+        pc.Expression | None: The expression, or None without filters.
+    """
+    if filters is None or isinstance(filters, pc.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+class TableHandle:
+    """
+    A tabular result read on demand: each read only gets the requested columns, and the rows matching its filters.
+    The filters are pushed down to the file: the row groups of a parquet file whose column statistics exclude any
+    match are not read. A handle keeps its file open until it is closed, and can be used as a context manager.
+
+    Attributes:
+        table_type (TableType): The type in which the result is read.
+    """
+
+    def __init__(
+        self,
+        source: ds.Dataset | ds.Fragment,
+        schema: pa.Schema,
+        table_type: TableType,
+        file: IO[bytes] | pa.NativeFile | None = None,
+    ) -> None:
+        self._source = source
+        self._schema = schema
+        self._file = file
+        self.table_type = table_type
+
+    @classmethod
+    def from_file(cls, file: IO[bytes] | pa.NativeFile, result_format: str, table_type: TableType) -> Self:
+        """
+        Open a result file. Only the footer of a parquet file, or of an arrow file, is read.
+
+        Args:
+            file (IO[bytes] | pa.NativeFile): The file, opened for random access. It is closed with the handle.
+            result_format (str): The format of the file, one of `PARTIAL_FORMATS`.
+            table_type (TableType): The type of the result.
+        Returns:
+            TableHandle: The handle of the file.
+        """
+        fragment = _FILE_FORMATS[result_format].make_fragment(file)
+        return cls(fragment, fragment.physical_schema, table_type, file)
+
+    @classmethod
+    def from_result(cls, result: Any, table_type: TableType) -> Self:
+        """
+        Wrap a result already in memory, read with the same projection and filters as a file.
+
+        Args:
+            result (Any): The result.
+            table_type (TableType): The type of the result.
+        Returns:
+            TableHandle: The handle of the result.
+        """
+        table = table_type.to_arrow(result)
+        return cls(ds.dataset(table), table.schema, table_type)
+
+    @property
+    def schema(self) -> pa.Schema:
+        """The Arrow schema of the result, including the index columns of a pandas DataFrame."""
+        return self._schema
+
+    @property
+    def columns(self) -> list[str]:
+        """The names of the columns of the result."""
+        index_columns = self._get_index_columns()
+        return [name for name in self._schema.names if name not in index_columns]
+
+    def _get_index_columns(self) -> list[str]:
+        # a range index is only recorded in the pandas metadata, other indexes are stored as columns
+        pandas_metadata = self._schema.pandas_metadata or {}
+        return [column for column in pandas_metadata.get("index_columns", []) if isinstance(column, str)]
+
+    def count_rows(self, filters: Filters | None = None) -> int:
+        """
+        Count the rows of the result, from the metadata of the file without filters.
+
+        Args:
+            filters (Filters | None): The filters of the rows to count.
+        Returns:
+            int: The number of rows.
+        """
+        return self._source.count_rows(filter=to_expression(filters))
+
+    def read(self, columns: list[str] | None = None, filters: Filters | None = None) -> Any:
+        """
+        Read the result in its type.
+
+        Args:
+            columns (list[str] | None): The columns to read. If None, all the columns are read.
+                The index of a pandas DataFrame is always read.
+            filters (Filters | None): The filters of the rows to read. If None, all the rows are read.
+        Returns:
+            Any: The result, restricted to the columns and the rows.
+        """
+        if columns is not None:
+            columns = list(dict.fromkeys([*columns, *self._get_index_columns()]))
+        return self.table_type.from_arrow(self._source.to_table(columns=columns, filter=to_expression(filters)))
+
+    def close(self) -> None:
+        """Close the file of the result."""
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,119 @@
+import importlib.util
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+
+TABLE_FORMATS = ("parquet", "arrow", "csv")
+"""Formats of the tabular results. Only pandas DataFrames are saved in csv."""
+
+
+@dataclass(frozen=True)
+class TableType:
+    """
+    A type of tabular results, saved in parquet or arrow files and read back in the same type.
+
+    Attributes:
+        cls (type): The type of the results.
+        name (str): The result type recorded in the metadata.
+        to_arrow (Callable[[Any], pa.Table]): The conversion of a result to a pyarrow Table, without a copy if possible.
+        from_arrow (Callable[[pa.Table], Any]): The conversion of a read pyarrow Table to a result.
+    """
+    cls: type
+    name: str
+    to_arrow: Callable[[Any], pa.Table]
+    from_arrow: Callable[[pa.Table], Any]
+
+
+_TYPES_BY_CLASS: dict[type, TableType] = {}
+_TYPES_BY_NAME: dict[str, TableType] = {}
+
+
+def register_table_type(
+    cls: type, name: str, to_arrow: Callable[[Any], pa.Table], from_arrow: Callable[[pa.Table], Any],
+) -> None:
+    """
+    Register a type of tabular results (and its subclasses): they are saved in parquet, or in arrow with
+    `output_format="arrow"`, from the pyarrow Table they convert to, and read back in the same type.
+
+    Args:
+        cls (type): The type of the results.
+        name (str): The result type recorded in the metadata, unique among the registered types.
+        to_arrow (Callable[[Any], pa.Table]): The conversion of a result to a pyarrow Table.
+        from_arrow (Callable[[pa.Table], Any]): The conversion of a pyarrow Table to a result.
+    """
+    table_type = TableType(cls, name, to_arrow, from_arrow)
+    _TYPES_BY_CLASS[cls] = table_type
+    _TYPES_BY_NAME[name] = table_type
+
+
+def _register_polars() -> None:
+    import polars as pl
+
+    register_table_type(pl.DataFrame, "polars.DataFrame", pl.DataFrame.to_arrow, pl.from_arrow)
+
+
+# the types of optional packages are registered on first use, so that resnap does not import them
+_LAZY_TYPES: dict[str, Callable[[], None]] = {"polars": _register_polars}
+
+
+def _load_lazy_types(module_name: str) -> None:
+    package = module_name.split(".", 1)[0]
+    if package in _LAZY_TYPES and importlib.util.find_spec(package) is not None:
+        _LAZY_TYPES.pop(package)()
+
+
+def get_table_type(result: Any) -> TableType | None:
+    """
+    Get the registered type of a tabular result.
+
+    Args:
+        result (Any): The result.
+    Returns:
+        TableType | None: The type of the result, or None if it is not tabular.
+    """
+    _load_lazy_types(type(result).__module__)
+    for cls in type(result).__mro__:
+        if cls in _TYPES_BY_CLASS:
+            return _TYPES_BY_CLASS[cls]
+    return None
+
+
+def find_table_type(result_type: str) -> TableType | None:
+    """
+    Find the registered type of a tabular result from the result type recorded in its metadata.
+    The results recorded with the name of a DataFrame subclass, or of a type whose package is not installed
+    anymore, are read as pandas DataFrames.
+
+    Args:
+        result_type (str): The recorded result type.
+    Returns:
+        TableType | None: The type of the result, or None if it is not tabular.
+    """
+    _load_lazy_types(result_type)
+    if result_type in _TYPES_BY_NAME:
+        return _TYPES_BY_NAME[result_type]
+    return _TYPES_BY_NAME["DataFrame"] if "DataFrame" in result_type else None
+
+
+def get_result_type(result: Any) -> str:
+    """
+    Get the result type recorded in the metadata of a result: the name of its class, or the registered name of
+    its type for tabular results, which tells apart types with the same class name such as pandas and Polars
+    DataFrames. The subclasses of pandas DataFrames keep their class name, as recorded by previous versions.
+
+    Args:
+        result (Any): The result.
+    Returns:
+        str: The result type.
+    """
+    table_type = get_table_type(result)
+    if table_type is not None and (table_type.cls is type(result) or table_type.cls is not pd.DataFrame):
+        return table_type.name
+    return type(result).__name__
+
+
+register_table_type(pd.DataFrame, "DataFrame", pa.Table.from_pandas, pa.Table.to_pandas)
+register_table_type(pa.Table, "Table", lambda table: table, lambda table: table)
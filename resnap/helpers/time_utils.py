@@ -103,7 +103,7 @@ def get_datetime_from_filename(filename: Path | str) -> datetime:
     Returns:
         datetime: The datetime from the given filename.
     """
-    filename_without_ext: str = str(filename).split(EXT)[0]
+    filename_without_ext: str = Path(filename).name.split(EXT)[0]
     extract_day, extract_time = filename_without_ext.split("_")[-1].split("T")
     extract_time = extract_time.replace("-", ":")
     return datetime.fromisoformat(f"{extract_day}T{extract_time}")
@@ -1,13 +1,12 @@
-import hashlib
 import json
 from configparser import ConfigParser, SectionProxy
-from dataclasses import asdict, is_dataclass
 from enum import Enum
 from typing import Any
 
-import pandas as pd
 import yaml
 
+from .hashing import ArgumentHasher, HashAlgorithm
+
 
 class Extensions(str, Enum):
     YML = ".yml"
@@ -17,63 +16,23 @@ class Extensions(str, Enum):
     JSON = ".json"
 
 
-def make_json_serializable(obj: Any) -> Any:
-    """
-    Convert an object to a JSON-serializable format.
-    This function handles various types of objects, including pandas DataFrames,
-    dataclasses, dictionaries, lists, tuples, sets, and primitive types.
-
-    Args:
-        obj (Any): The object to convert to a JSON-serializable format.
-    Returns:
-        Any: The JSON-serializable representation of the object.
-    """
-    match obj:
-        case pd.DataFrame():
-            # Sort DataFrame by index and columns to ensure stable output
-            # and reset index to avoid issues with non-serializable index types
-            df = obj.sort_index(axis=1).sort_index().reset_index(drop=True)
-            return make_json_serializable(df.to_dict(orient="records"))  # Stable, JSON-compatible format
-
-        case _ if is_dataclass(obj):
-            return make_json_serializable(asdict(obj))
-
-        case dict():
-            return {str(k): make_json_serializable(v) for k, v in sorted(obj.items())}
-
-        case list():
-            return [make_json_serializable(v) for v in obj]
-
-        case tuple():
-            return tuple(make_json_serializable(v) for v in obj)
-
-        case set():
-            return sorted(make_json_serializable(v) for v in obj)
-
-        case int() | float() | str() | bool() | None:
-            return obj
-
-        case _:
-            try:
-                return make_json_serializable(vars(obj))
-            except TypeError:
-                return str(obj)
-
-
-def hash_arguments(args: dict[str, Any]) -> str:
+def hash_arguments(args: dict[str, Any], algorithm: HashAlgorithm = HashAlgorithm.SHA256, memo: bool = False) -> str:
     """
     Hash the given arguments to create a unique identifier.
-    This function converts the arguments to a JSON-serializable format,
-    serializes them to a JSON string, and then computes the SHA-256 hash.
+    The arguments are fed into an incremental hash object, type by type (see `resnap.register_hasher`),
+    so that large DataFrames or arrays are hashed from their buffers without being converted to JSON.
 
     Args:
         args (dict[str, Any]): The arguments to hash.
+        algorithm (HashAlgorithm): The hash algorithm. Defaults to SHA-256.
+        memo (bool): Whether to reuse the digests of large arrays and DataFrames already hashed, if their fingerprint
+            did not change. The digests of objects marked with `resnap.freeze` are always reused.
     Returns:
-        str: The SHA-256 hash of the JSON-serializable arguments.
+        str: The hexadecimal hash of the arguments.
     """
-    serializable_args = make_json_serializable(args)
-    json_string = json.dumps(serializable_args, separators=(",", ":"), sort_keys=True)
-    return hashlib.sha256(json_string.encode("utf-8")).hexdigest()
+    hasher = ArgumentHasher(algorithm, memo)
+    hasher.update(args)
+    return hasher.hexdigest()
 
 
 def load_file(file_path: str, key: str | None = None) -> dict | ConfigParser | SectionProxy:
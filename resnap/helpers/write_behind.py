@@ -0,0 +1,142 @@
+import atexit
+import logging
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger("resnap")
+
+
+@dataclass(kw_only=True)
+class WriteBehindStats:
+    submitted: int = 0
+    saved: int = 0
+    failed: int = 0
+    pending: int = 0
+
+
+@dataclass(eq=False)
+class _PendingWrite:
+    result: Any
+
+
+class WriteBehind:
+    """
+    Bounded pool of background writers saving the results of the `write_behind` functions after they were returned.
+    A result stays readable by the process in the pending map until its save is done.
+    When `max_pending` saves are queued, the callers wait for a free slot, so that the results waiting to be saved
+    do not fill the memory.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: threading.BoundedSemaphore | None = None
+        self._pending: dict[Hashable, _PendingWrite] = {}
+        self._stats = WriteBehindStats()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def stats(self) -> WriteBehindStats:
+        with self._lock:
+            return WriteBehindStats(**vars(self._stats))
+
+    def _start(self, max_workers: int, max_pending: int) -> tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resnap-writer")
+                self._slots = threading.BoundedSemaphore(max_pending)
+            return self._executor, self._slots
+
+    def submit(
+        self, key: Hashable, result: Any, save: Callable[[], None], max_workers: int, max_pending: int,
+    ) -> None:
+        """
+        Save a result in the background. The pool is created on the first call.
+
+        Args:
+            key (Hashable): The key of the result, under which it is readable until it is saved.
+            result (Any): The result.
+            save (Callable[[], None]): Saves the result.
+            max_workers (int): The number of writer threads.
+            max_pending (int): The number of saves queued or running before the callers wait.
+        """
+        executor, slots = self._start(max_workers, max_pending)
+        if not slots.acquire(blocking=False):
+            logger.debug("The write-behind queue is full, waiting for a pending save...")
+            slots.acquire()
+
+        write = _PendingWrite(result)
+        with self._lock:
+            self._pending[key] = write
+            self._stats.submitted += 1
+            self._stats.pending += 1
+        try:
+            executor.submit(self._write, key, write, save, slots)
+        except RuntimeError:
+            # the interpreter is shutting down and no longer starts threads: the result is saved by the caller
+            self._write(key, write, save, slots)
+
+    def _write(
+        self, key: Hashable, write: _PendingWrite, save: Callable[[], None], slots: threading.BoundedSemaphore,
+    ) -> None:
+        is_saved = False
+        try:
+            save()
+            is_saved = True
+        except Exception:
+            logger.exception(f"Write-behind save of {key} failed, the result is not saved")
+        finally:
+            with self._lock:
+                if self._pending.get(key) is write:
+                    del self._pending[key]
+                self._stats.pending -= 1
+                self._stats.saved += is_saved
+                self._stats.failed += not is_saved
+                self._idle.notify_all()
+            slots.release()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """
+        Get a result which is not saved yet.
+
+        Args:
+            key (Hashable): The key of the result.
+        Returns:
+            tuple[bool, Any]: Whether the result is being saved, and the result.
+        """
+        with self._lock:
+            write = self._pending.get(key)
+        if write is None:
+            return False, None
+        return True, write.result
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until all the submitted saves are done.
+
+        Args:
+            timeout (float | None): The maximum wait in seconds. If None, waits until the saves are done.
+        Returns:
+            bool: True if all the saves are done, False if the timeout expired.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._stats.pending == 0, timeout)
+
+
+write_behind = WriteBehind()
+atexit.register(write_behind.flush)
+
+
+def flush(timeout: float | None = None) -> bool:
+    """
+    Wait until the results of the `write_behind` functions are saved. Called at exit.
+
+    Args:
+        timeout (float | None): The maximum wait in seconds. If None, waits until the saves are done.
+    Returns:
+        bool: True if all the results are saved or failed to be saved, False if the timeout expired.
+    """
+    return write_behind.flush(timeout)
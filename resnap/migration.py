@@ -0,0 +1,38 @@
+"""Command line tool moving the snapshots of the configured store to another layout.
+
+Usage:
+    python -m resnap.migration hashed
+"""
+
+import argparse
+import logging
+
+from .factory import ResnapServiceFactory
+from .helpers.config import Layout
+
+logger = logging.getLogger("resnap")
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Migrate the snapshots of the configured store to the given layout.
+
+    Args:
+        argv (list[str] | None): The command line arguments. If None, sys.argv is used.
+    Returns:
+        int: The number of migrated snapshots.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m resnap.migration",
+        description="Move the snapshots of the configured resnap store to another layout.",
+    )
+    parser.add_argument("layout", choices=[layout.value for layout in Layout], help="The target layout.")
+    args = parser.parse_args(argv)
+
+    migrated = ResnapServiceFactory.get_service().migrate_layout(Layout(args.layout))
+    logger.info(f"{migrated} snapshots migrated to the {args.layout} layout")
+    return migrated
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
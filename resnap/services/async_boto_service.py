@@ -0,0 +1,68 @@
+import json
+from collections.abc import Awaitable, Callable
+
+from ..boto import S3Config
+from ..boto.async_client import AsyncS3Client
+from ..helpers.config import Config
+from ..helpers.constants import SEPARATOR
+from ..helpers.index import MetadataIndex
+from ..helpers.json_codec import decode_json, encode_json
+from ..helpers.utils import load_file
+from .async_service import AsyncResnapService
+
+
+class AsyncBotoResnapService(AsyncResnapService):
+    """
+    Asynchronous service of S3, based on aiobotocore: the requests do not hold any thread while waiting for S3.
+    """
+
+    def __init__(self, config: Config) -> None:
+        super().__init__(config)
+        self._client: AsyncS3Client = AsyncS3Client(
+            S3Config(**load_file(config.secrets_file_name, key="resnap"))
+        )
+
+    @staticmethod
+    def _format_path(path: str) -> str:
+        return path if path.endswith(SEPARATOR) else f"{path}{SEPARATOR}"
+
+    async def _read_file(self, path: str) -> bytes:
+        return await self._client.get_object(path)
+
+    async def _write_file(self, path: str, data: bytes) -> None:
+        await self._client.put_object(data, path)
+
+    @staticmethod
+    def _decode_index(data: bytes) -> MetadataIndex | None:
+        try:
+            return MetadataIndex.from_dict(decode_json(data))
+        except json.JSONDecodeError:
+            return None
+
+    async def _modify_index_file(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], Awaitable[MetadataIndex | None]],
+    ) -> MetadataIndex | None:
+        while True:
+            current = await self._client.read_object(index_path)
+            index = await modify(self._decode_index(current[0]) if current is not None else None)
+            if index is None:
+                return None
+            data = encode_json(index.to_dict())
+            if current is None:
+                is_written = await self._client.create_object(data, index_path)
+            else:
+                is_written = await self._client.replace_object(data, index_path, current[1])
+            if is_written:
+                return index
+            # the index was updated by another process since it was read: the modification is applied again
+
+    async def _list_files(self, folder_path: str, recursive: bool = False) -> list[str]:
+        return await self._client.list_files(folder_path, recursive)
+
+    async def _create_folder(self, path: str, folder_name: str) -> None:
+        if path and not await self._client.object_exists(self._format_path(path)):
+            await self._client.mkdir(path)
+        if folder_name:
+            output_path = SEPARATOR.join([path, folder_name])
+            if not await self._client.object_exists(self._format_path(output_path)):
+                await self._client.mkdir(output_path)
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from ..helpers.constants import LOCK_EXT
+from ..helpers.index import MetadataIndex
+from .async_service import AsyncResnapService
+from .local_service import (
+    INDEX_LOCK_POLL_SECONDS,
+    INDEX_LOCK_TIMEOUT_SECONDS,
+    LocalResnapService,
+)
+
+
+class AsyncLocalResnapService(AsyncResnapService):
+    """
+    Asynchronous service of the local file system. The operating system has no asynchronous file I/O, so the file
+    operations run in the executor of `@async_resnap`: the event loop is never blocked, but each operation holds
+    one of its threads.
+    """
+
+    async def _read_file(self, path: str) -> bytes:
+        return await self._run_blocking(Path(path).read_bytes)
+
+    async def _write_file(self, path: str, data: bytes) -> None:
+        await self._run_blocking(self._replace_file, path, data)
+
+    @staticmethod
+    def _replace_file(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    async def _modify_index_file(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], Awaitable[MetadataIndex | None]],
+    ) -> MetadataIndex | None:
+        async with self._lock_index(index_path):
+            index = await modify(await self._load_index(index_path))
+            if index is not None:
+                await self._write_index(index_path, index.to_dict())
+            return index
+
+    @asynccontextmanager
+    async def _lock_index(self, index_path: str) -> AsyncIterator[None]:
+        # the lock file of LocalResnapService, so that the synchronous services of the store wait for it too
+        lock_path = f"{index_path}{LOCK_EXT}"
+        while not await self._run_blocking(LocalResnapService._create_lease_file, lock_path, str(os.getpid())):
+            if await self._run_blocking(LocalResnapService._is_lease_expired, lock_path, INDEX_LOCK_TIMEOUT_SECONDS):
+                # the process holding the lock died while updating the index
+                await self._run_blocking(Path(lock_path).unlink, missing_ok=True)
+            else:
+                await asyncio.sleep(INDEX_LOCK_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            await self._run_blocking(Path(lock_path).unlink, missing_ok=True)
+
+    async def _list_files(self, folder_path: str, recursive: bool = False) -> list[str]:
+        return await self._run_blocking(self._scan_files, folder_path, recursive)
+
+    @staticmethod
+    def _scan_files(folder_path: str, recursive: bool) -> list[str]:
+        if recursive:
+            return [str(f) for f in Path(folder_path).rglob("*") if f.is_file()]
+        try:
+            with os.scandir(folder_path) as entries:
+                return [entry.path for entry in entries if entry.is_file()]
+        except FileNotFoundError:
+            return []
+
+    async def _create_folder(self, path: str, folder_name: str) -> None:
+        await self._run_blocking((Path(path) / folder_name).mkdir, exist_ok=True)
+
+    async def _create_parent_folder(self, path: str) -> None:
+        await self._run_blocking(Path(path).parent.mkdir, parents=True, exist_ok=True)
@@ -0,0 +1,585 @@
+import asyncio
+import io
+import json
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any, TypeVar
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from pyarrow import parquet as pq
+
+from ..helpers.arrays import is_array_dict, is_plain_array
+from ..helpers.compression import compress_bytes, decompress_bytes
+from ..helpers.config import (
+    ArrowCompression,
+    Config,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from ..helpers.constants import META_EXT, SEPARATOR
+from ..helpers.executor import get_async_executor, run_in_executor
+from ..helpers.index import MetadataIndex
+from ..helpers.json_codec import decode_json, encode_json
+from ..helpers.metadata import Metadata, MetadataFail, MetadataSuccess
+from ..helpers.pickling import dumps_pickle, load_pickle
+from ..helpers.singleton import SingletonABCMeta
+from ..helpers.status import Status
+from ..helpers.tables import TABLE_FORMATS, TableType, find_table_type, get_table_type
+from .base import BaseResnapService
+
+T = TypeVar("T")
+
+
+def _serialize_table(
+    result: pd.DataFrame | pa.Table,
+    output_format: str | None,
+    compression: ParquetCompression,
+    compression_level: int | None,
+    arrow_compression: ArrowCompression,
+    row_group_size: int | None,
+) -> tuple[bytes, str]:
+    """Serialize a tabular result, a pandas DataFrame or the pyarrow Table of another type. See `serialize_result`."""
+    if output_format == "csv" and isinstance(result, pd.DataFrame):
+        return result.to_csv(index=False).encode(), "csv"
+    with io.BytesIO() as buffer:
+        if output_format == "arrow":
+            feather.write_feather(result, buffer, compression=arrow_compression.codec)
+            return buffer.getvalue(), "arrow"
+        options = {"row_group_size": row_group_size, "write_statistics": True}
+        if isinstance(result, pd.DataFrame):
+            result.to_parquet(buffer, compression=compression.codec, compression_level=compression_level, **options)
+        else:
+            pq.write_table(result, buffer, compression=compression.codec, compression_level=compression_level, **options)
+        return buffer.getvalue(), compression.extension
+
+
+def _deserialize_table(data: bytes, table_type: TableType, result_format: str) -> Any:
+    """Deserialize a tabular result in its type. See `deserialize_result`."""
+    if result_format == "arrow":
+        return table_type.from_arrow(pa.ipc.open_file(pa.py_buffer(data)).read_all())
+    if table_type.cls is pd.DataFrame:
+        if result_format == "csv":
+            return pd.read_csv(io.BytesIO(data), index_col=False)
+        return pd.read_parquet(io.BytesIO(data))
+    if result_format == "parquet":
+        return table_type.from_arrow(pq.read_table(pa.py_buffer(data)))
+    raise NotImplementedError(f"Unsupported result type: {table_type.name}")
+
+
+def serialize_result(
+    result: Any,
+    output_format: str | None = None,
+    compression: ParquetCompression = ParquetCompression.GZIP,
+    compression_level: int | None = None,
+    arrow_compression: ArrowCompression = ArrowCompression.NONE,
+    file_compression: FileCompression = FileCompression.NONE,
+    row_group_size: int | None = None,
+) -> tuple[bytes, str]:
+    """
+    Serialize a result in the given output format, as the synchronous services write it.
+
+    Args:
+        result (Any): The result.
+        output_format (str | None): The output format.
+        compression (ParquetCompression): The compression of a DataFrame saved in parquet.
+        compression_level (int | None): The compression level, None for the codec default.
+        arrow_compression (ArrowCompression): The compression of a DataFrame or a pyarrow Table saved in arrow.
+        file_compression (FileCompression): The compression of a result saved in pkl, json or txt.
+        row_group_size (int | None): The maximum number of rows of a row group of a parquet file, None for the
+            writer default.
+    Returns:
+        tuple[bytes, str]: The serialized result and its file extension.
+    """
+    table_type = get_table_type(result)
+    if table_type is not None:
+        if not isinstance(result, pd.DataFrame):
+            result = table_type.to_arrow(result)
+        return _serialize_table(
+            result, output_format, compression, compression_level, arrow_compression, row_group_size,
+        )
+    if is_plain_array(result) and output_format in (None, "npy"):
+        with io.BytesIO() as buffer:
+            np.save(buffer, result, allow_pickle=False)
+            return buffer.getvalue(), "npy"
+    if is_array_dict(result) and output_format in (None, "npz"):
+        with io.BytesIO() as buffer:
+            np.savez(buffer, **result)
+            return buffer.getvalue(), "npz"
+    if output_format == "txt":
+        data, output_ext = str(result).encode(), "txt"
+    elif output_format == "json":
+        data, output_ext = json.dumps(result, indent=4).encode(), "json"
+    else:
+        data, output_ext = dumps_pickle(result), "pkl"
+    return compress_bytes(data, file_compression), f"{output_ext}{file_compression.suffix}"
+
+
+def deserialize_result(data: bytes, metadata: MetadataSuccess) -> Any:
+    """
+    Deserialize a result saved by a synchronous or an asynchronous service.
+
+    Args:
+        data (bytes): The content of the result file.
+        metadata (MetadataSuccess): The metadata of the result.
+    Returns:
+        Any: The result.
+    """
+    result_format: str = metadata.file_format
+    result_type: str = metadata.result_type
+    table_type = find_table_type(result_type)
+    if table_type is not None and result_format in TABLE_FORMATS:
+        return _deserialize_table(data, table_type, result_format)
+    if result_format == "npy":
+        return np.load(io.BytesIO(data), allow_pickle=False)
+    if result_format == "npz":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return dict(arrays)
+    data = decompress_bytes(data, FileCompression(metadata.compression or FileCompression.NONE))
+    if result_format == "txt":
+        var_type = eval(result_type)
+        return var_type(data.decode())
+    if result_format == "json":
+        return decode_json(data)
+    if result_format == "pkl":
+        return load_pickle(data)
+    raise NotImplementedError(f"Unsupported result type: {result_type}")
+
+
+class AsyncResnapService(BaseResnapService, ABC, metaclass=SingletonABCMeta):
+    """
+    Asynchronous counterpart of `ResnapService`: the store is accessed with coroutines, so that many lookups and
+    saves can run concurrently on one event loop. Results are serialized in the executor of `@async_resnap`.
+    The index updates are serialized with those of the synchronous services of the same store, and the cleanup of
+    old files is left to them.
+    """
+
+    def __init__(self, config: Config) -> None:
+        super().__init__(config)
+        # an asyncio lock can only be awaited in one event loop, so each loop gets its own locks
+        self._index_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Lock]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._index_locks_guard = threading.Lock()
+
+    async def _run_blocking(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_executor(get_async_executor(self.config.async_max_workers), func, *args, **kwargs)
+
+    @abstractmethod
+    async def _read_file(self, path: str) -> bytes:  # pragma: no cover
+        """
+        Read the content of a file.
+
+        Args:
+            path (str): The file path.
+        Returns:
+            bytes: The content of the file.
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _write_file(self, path: str, data: bytes) -> None:  # pragma: no cover
+        """
+        Write the content of a file, replacing it if it exists. Readers never see a partially written file.
+
+        Args:
+            path (str): The file path.
+            data (bytes): The content of the file.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _list_files(self, folder_path: str, recursive: bool = False) -> list[str]:  # pragma: no cover
+        """
+        List the files of the given folder.
+
+        Args:
+            folder_path (str): The folder path.
+            recursive (bool): Whether to list the sub folders too.
+        Returns:
+            list[str]: The file paths, or an empty list if the folder does not exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _create_folder(self, path: str, folder_name: str) -> None:  # pragma: no cover
+        """
+        Create the output folder based on the configuration.
+
+        Args:
+            path (str): The path to create the folder.
+            folder_name (str): The name of the folder.
+        """
+        raise NotImplementedError
+
+    async def _create_parent_folder(self, path: str) -> None:
+        """
+        Create the parent folders of the given file path, if the backend needs it.
+
+        Args:
+            path (str): The file path.
+        """
+
+    async def create_output_folder(self, output_folder: str) -> None:
+        """
+        Create the output folder based on the configuration.
+
+        Args:
+            output_folder (str): The output folder.
+        """
+        if self.config.output_base_path:
+            await self._create_folder("", self.config.output_base_path)
+        if output_folder:
+            await self._create_folder(self.config.output_base_path, output_folder)
+
+    async def _read_metadata(self, metadata_path: str) -> Metadata:
+        return Metadata.from_json(await self._read_file(metadata_path))
+
+    async def _list_metadata_files(self, folder_path: str, recursive: bool = False) -> list[str]:
+        return [file for file in await self._list_files(folder_path, recursive) if file.endswith(META_EXT)]
+
+    async def get_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
+        """
+        Get all metadata based on the function name, from the most recent to the oldest. The files are read
+        concurrently.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            list[Metadata]: The metadata based on the function name.
+        """
+        if self.config.layout == Layout.HASHED:
+            function_folder = SEPARATOR.join(p for p in (self._get_output_path(output_folder), func_name) if p)
+            files = await self._list_metadata_files(function_folder, True)
+        else:
+            files = [
+                file for file in await self._list_metadata_files(self._get_output_path(output_folder))
+                if func_name in file.split(SEPARATOR)[-1]
+            ]
+        files = sorted(files, key=lambda file: file.split(SEPARATOR)[-1], reverse=True)
+        return list(await asyncio.gather(*(self._read_metadata(file) for file in files)))
+
+    async def get_success_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
+        """
+        Get all success metadata based on the function name.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            list[Metadata]: The success metadata based on the function name.
+        """
+        return [m for m in await self.get_metadata(func_name, output_folder) if m.status == Status.SUCCESS]
+
+    async def _read_index(self, index_path: str) -> dict | None:
+        try:
+            return decode_json(await self._read_file(index_path))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    async def _write_index(self, index_path: str, index: dict) -> None:
+        await self._write_file(index_path, encode_json(index))
+
+    @abstractmethod
+    async def _modify_index_file(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], Awaitable[MetadataIndex | None]],
+    ) -> MetadataIndex | None:  # pragma: no cover
+        """
+        Read, modify and write the index, so that concurrent updates of the other processes sharing the store,
+        with a synchronous or an asynchronous service, are never overwritten.
+
+        Args:
+            index_path (str): The index path.
+            modify (Callable[[MetadataIndex | None], Awaitable[MetadataIndex | None]]): Called with the current index,
+                or None if it does not exist or is unreadable, it returns the index to write, or None to leave it
+                unchanged. It may be called again if the index was updated by another process meanwhile.
+        Returns:
+            MetadataIndex | None: The written index, or None if it was left unchanged.
+        """
+        raise NotImplementedError
+
+    async def _modify_index(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], Awaitable[MetadataIndex | None]],
+    ) -> MetadataIndex | None:
+        """
+        Read, modify and write the index, one task of the event loop at a time. See `_modify_index_file`.
+
+        Args:
+            index_path (str): The index path.
+            modify (Callable[[MetadataIndex | None], Awaitable[MetadataIndex | None]]): The modification of the index.
+        Returns:
+            MetadataIndex | None: The written index, or None if it was left unchanged.
+        """
+        with self._index_locks_guard:
+            locks = self._index_locks.setdefault(asyncio.get_running_loop(), {})
+            lock = locks.setdefault(index_path, asyncio.Lock())
+        async with lock:
+            return await self._modify_index_file(index_path, modify)
+
+    async def _load_index(self, index_path: str) -> MetadataIndex | None:
+        data = await self._read_index(index_path)
+        return MetadataIndex.from_dict(data) if data else None
+
+    async def _build_index(self, func_name: str, output_folder: str) -> MetadataIndex:
+        metadata: list[Metadata] = await self.get_metadata(func_name, output_folder)
+        return MetadataIndex.from_metadata(list(reversed(metadata)))
+
+    async def rebuild_index(self, func_name: str, output_folder: str) -> MetadataIndex:
+        """
+        Rebuild the function index from the metadata files and save it.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            MetadataIndex: The rebuilt index.
+        """
+        return await self._modify_index(
+            self.index_path(func_name, output_folder), lambda _: self._build_index(func_name, output_folder),
+        )
+
+    async def get_index(self, func_name: str, output_folder: str) -> MetadataIndex:
+        """
+        Get the function index. It is rebuilt from the metadata files if it does not exist yet.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            MetadataIndex: The function index.
+        """
+        index_path = self.index_path(func_name, output_folder)
+        index = await self._load_index(index_path)
+        if index is None:
+
+            async def build_if_missing(current: MetadataIndex | None) -> MetadataIndex:
+                # the index may have been rebuilt by another task or process while waiting for the update
+                return current if current is not None else await self._build_index(func_name, output_folder)
+
+            index = await self._modify_index(index_path, build_if_missing)
+        return index
+
+    async def find_success_metadata(
+        self, func_name: str, output_folder: str, hashed_arguments: str | None = None,
+    ) -> MetadataSuccess | None:
+        """
+        Find the latest success metadata saved for the given hashed arguments with a single index read.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str | None): The hashed arguments. If None, the latest success metadata is returned
+                whatever the arguments.
+        Returns:
+            MetadataSuccess | None: The success metadata, or None if not found.
+        """
+        index = await self.get_index(func_name, output_folder)
+        metadata = index.get(hashed_arguments)
+        if metadata is not None and hashed_arguments and not metadata.is_keyed_with(self.config.hash_algorithm):
+            metadata = None
+        if metadata is None and hashed_arguments and self.config.layout == Layout.HASHED:
+            metadata = await self._find_snapshot_metadata(func_name, output_folder, hashed_arguments)
+            if metadata is not None:
+                await self.add_to_index(func_name, output_folder, [metadata])
+        return metadata
+
+    async def _find_snapshot_metadata(
+        self, func_name: str, output_folder: str, hashed_arguments: str,
+    ) -> MetadataSuccess | None:
+        folder = self.snapshot_folder(func_name, output_folder, hashed_arguments)
+        for metadata_path in sorted(await self._list_metadata_files(folder), reverse=True):
+            metadata = await self._read_metadata(metadata_path)
+            if metadata.status == Status.SUCCESS and metadata.is_keyed_with(self.config.hash_algorithm):
+                return metadata
+        return None
+
+    async def read_result(self, metadata: MetadataSuccess) -> Any:
+        """
+        Read the result based on the metadata.
+
+        Args:
+            metadata (MetadataSuccess): The metadata to read the result.
+        Returns:
+            Any: The read result.
+        """
+        data = await self._read_file(metadata.result_path)
+        return await self._run_blocking(deserialize_result, data, metadata)
+
+    async def save_result(
+        self,
+        func_name: str,
+        result: Any,
+        output_folder: str,
+        output_format: str | None = None,
+        hashed_arguments: str = "",
+        compression: ParquetCompression | str | None = None,
+        compression_level: int | None = None,
+        arrow_compression: ArrowCompression | str | None = None,
+        file_compression: FileCompression | str | None = None,
+    ) -> tuple[str, datetime]:
+        """
+        Save the result based on the function name and result.
+
+        Args:
+            func_name (str): The function name.
+            result (Any): The result to save.
+            output_folder (str): The output folder.
+            output_format (str | None): The output format.
+            hashed_arguments (str): The hashed arguments, required with the hashed layout.
+            compression (ParquetCompression | str | None): The compression of a DataFrame saved in parquet.
+                If None, `parquet_compression` of the configuration is used.
+            compression_level (int | None): The compression level. If None, the level of the configuration is
+                used with its compression, and the codec default with another one.
+            arrow_compression (ArrowCompression | str | None): The compression of a DataFrame or a pyarrow Table
+                saved in arrow. If None, `arrow_compression` of the configuration is used.
+            file_compression (FileCompression | str | None): The compression of a result saved in pkl, json or txt.
+                If None, `file_compression` of the configuration is used.
+        Returns:
+            tuple[str, datetime]: The result path and event time.
+        """
+        compression, compression_level = self.get_parquet_codec(compression, compression_level)
+        data, output_ext = await self._run_blocking(
+            serialize_result,
+            result,
+            output_format,
+            compression,
+            compression_level,
+            self.get_arrow_compression(arrow_compression),
+            self.get_file_compression(file_compression),
+            self.config.parquet_row_group_size,
+        )
+        event_time: datetime = datetime.now(self.config.timezone)
+        result_path = self.result_path(func_name, event_time, output_folder, output_ext, hashed_arguments)
+        if self.config.layout == Layout.HASHED:
+            await self._create_parent_folder(result_path)
+        await self._write_file(result_path, data)
+        return result_path, event_time
+
+    async def _write_metadata(self, metadata_path: str, metadata: Metadata) -> None:
+        """
+        Write metadata to the given metadata path.
+
+        Args:
+            metadata_path (str): The metadata path to write the metadata.
+            metadata (Metadata): The metadata to write.
+        """
+        await self._write_file(metadata_path, metadata.to_json())
+
+    async def _save_metadata(self, func_name: str, metadata: Metadata, output_folder: str) -> None:
+        metadata_path: str = self.metadata_path(
+            func_name, metadata.event_time, output_folder, metadata.hashed_arguments,
+        )
+        if self.config.layout == Layout.HASHED:
+            await self._create_parent_folder(metadata_path)
+        await self._write_metadata(metadata_path, metadata)
+        await self.add_to_index(func_name, output_folder, [metadata])
+
+    async def add_to_index(self, func_name: str, output_folder: str, metadata: list[Metadata]) -> None:
+        """
+        Register many saved metadata in the function index with a single write.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            metadata (list[Metadata]): The saved metadata.
+        """
+        if not metadata:
+            return
+
+        async def add(index: MetadataIndex | None) -> MetadataIndex:
+            if index is None:
+                index = await self._build_index(func_name, output_folder)
+            for entry in sorted(metadata, key=lambda m: m.event_time):
+                index.add(entry)
+            return index
+
+        await self._modify_index(self.index_path(func_name, output_folder), add)
+
+    async def save_success_metadata(
+        self,
+        func_name: str,
+        output_folder: str,
+        hashed_arguments: str,
+        event_time: datetime,
+        result_path: str,
+        result_type: str,
+        extra_metadata: dict,
+        compression: ParquetCompression | str | None = None,
+        compression_level: int | None = None,
+        arrow_compression: ArrowCompression | str | None = None,
+        file_compression: FileCompression | str | None = None,
+    ) -> None:
+        """
+        Save success metadata based on the function name, arguments, event time, and result path.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+            event_time (datetime): The event time.
+            result_path (str): The result path.
+            result_type (str): The result type.
+            extra_metadata (dict): The extra metadata.
+            compression (ParquetCompression | str | None): The compression given to `save_result`,
+                recorded for parquet files.
+            compression_level (int | None): The compression level given to `save_result`.
+            arrow_compression (ArrowCompression | str | None): The compression given to `save_result`,
+                recorded for arrow files.
+            file_compression (FileCompression | str | None): The compression given to `save_result`,
+                recorded for pkl, json and txt files.
+        """
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=event_time,
+            hashed_arguments=hashed_arguments,
+            result_path=result_path,
+            result_type=result_type,
+            extra_metadata=extra_metadata,
+            hash_algorithm=self.config.hash_algorithm,
+            **self._get_format_metadata(
+                result_path, compression, compression_level, arrow_compression, file_compression,
+            ),
+        )
+        await self._save_metadata(func_name, metadata, output_folder)
+
+    async def save_failed_metadata(
+        self,
+        func_name: str,
+        output_folder: str,
+        hashed_arguments: str,
+        event_time: datetime,
+        error_message: str,
+        data: dict,
+        extra_metadata: dict,
+    ) -> None:
+        """
+        Save failed metadata based on the function name, arguments, event time, error message, and data.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The function's hashed arguments.
+            event_time (datetime): The event time.
+            error_message (str): The error message.
+            data (dict): The data to save.
+            extra_metadata (dict): The extra metadata.
+        """
+        metadata = MetadataFail(
+            status=Status.FAIL,
+            event_time=event_time,
+            hashed_arguments=hashed_arguments,
+            error_message=error_message,
+            data=data,
+            extra_metadata=extra_metadata,
+            hash_algorithm=self.config.hash_algorithm,
+        )
+        await self._save_metadata(func_name, metadata, output_folder)
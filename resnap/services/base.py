@@ -0,0 +1,259 @@
+from datetime import datetime
+from typing import Any
+
+from ..helpers.compression import STREAMED_FORMATS
+from ..helpers.config import (
+    ArrowCompression,
+    Config,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from ..helpers.constants import EXT, INDEX_EXT, LEASE_EXT, META_EXT, SEPARATOR
+from ..helpers.memory_cache import MemoryCache
+from ..helpers.metadata import get_result_format
+from ..helpers.time_utils import calculate_datetime_from_now
+
+
+class BaseResnapService:
+    """
+    Configuration, paths and memory tier shared by the synchronous and the asynchronous services, which never
+    access the store. Both kinds of services lay out the snapshots the same way, so they can share a store.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config: Config = config
+        self.memory_cache = MemoryCache(config.memory_cache_max_bytes, config.memory_cache_policy)
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.config.enabled
+
+    def get_cached_result(self, func_name: str, output_folder: str, hashed_arguments: str) -> tuple[bool, Any]:
+        """
+        Get a result from the in-process memory tier, without reading the store.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+        Returns:
+            tuple[bool, Any]: Whether the result was found, and the result.
+        """
+        if not self.memory_cache.is_enabled:
+            return False, None
+        return self.memory_cache.get((func_name, output_folder, hashed_arguments), self._get_limit_time())
+
+    def cache_result(
+        self, func_name: str, output_folder: str, hashed_arguments: str, result: Any, event_time: datetime,
+    ) -> None:
+        """
+        Keep a result in the in-process memory tier.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+            result (Any): The result.
+            event_time (datetime): The event time of the saved result.
+        """
+        if self.memory_cache.is_enabled:
+            self.memory_cache.put((func_name, output_folder, hashed_arguments), result, event_time)
+
+    def get_parquet_codec(
+        self, compression: ParquetCompression | str | None = None, compression_level: int | None = None,
+    ) -> tuple[ParquetCompression, int | None]:
+        """
+        Get the compression and the compression level of the parquet files: those of the function if given,
+        else those of the configuration. The level of the configuration only applies to its compression.
+
+        Args:
+            compression (ParquetCompression | str | None): The compression of the function.
+            compression_level (int | None): The compression level of the function.
+        Returns:
+            tuple[ParquetCompression, int | None]: The compression, and the level or None for the codec default.
+        Raises:
+            ValueError: If the compression is unknown or does not support a compression level.
+        """
+        compression = ParquetCompression(compression or self.config.parquet_compression)
+        if compression_level is None and compression == self.config.parquet_compression:
+            compression_level = self.config.compression_level
+        if compression_level is not None and not compression.supports_level:
+            raise ValueError(f"The {compression.value} compression does not support a compression level")
+        return compression, compression_level
+
+    def get_arrow_compression(self, compression: ArrowCompression | str | None = None) -> ArrowCompression:
+        """
+        Get the compression of the Arrow IPC files: that of the function if given, else that of the configuration.
+
+        Args:
+            compression (ArrowCompression | str | None): The compression of the function.
+        Returns:
+            ArrowCompression: The compression.
+        """
+        return ArrowCompression(compression or self.config.arrow_compression)
+
+    def get_file_compression(self, compression: FileCompression | str | None = None) -> FileCompression:
+        """
+        Get the compression of the pickle, JSON and text files: that of the function if given, else that of the
+        configuration.
+
+        Args:
+            compression (FileCompression | str | None): The compression of the function.
+        Returns:
+            FileCompression: The compression.
+        """
+        return FileCompression(compression or self.config.file_compression)
+
+    def _get_format_metadata(
+        self,
+        result_path: str,
+        compression: ParquetCompression | str | None,
+        compression_level: int | None,
+        arrow_compression: ArrowCompression | str | None,
+        file_compression: FileCompression | str | None,
+    ) -> dict[str, Any]:
+        """
+        Get the format of a saved result, and the compression of the parquet, Arrow, pickle, JSON and text files,
+        to record in its metadata.
+        """
+        result_format = get_result_format(result_path)
+        if result_format == "parquet":
+            compression, compression_level = self.get_parquet_codec(compression, compression_level)
+            return {"result_format": result_format, "compression": compression.value, "compression_level": compression_level}
+        if result_format == "arrow":
+            return {"result_format": result_format, "compression": self.get_arrow_compression(arrow_compression).value}
+        if result_format in STREAMED_FORMATS:
+            return {"result_format": result_format, "compression": self.get_file_compression(file_compression).value}
+        return {"result_format": result_format}
+
+    def _snapshot_parts(
+        self, func_name: str, output_folder: str, hashed_arguments: str, layout: Layout | None = None,
+    ) -> tuple[list[str], str]:
+        """
+        Get the folder parts and the file name prefix of a snapshot based on the layout.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+            layout (Layout | None): The layout. If None, the layout of the configuration is used.
+        Returns:
+            tuple[list[str], str]: The folder parts and the file name prefix.
+        """
+        parts = []
+        if self.config.output_base_path:
+            parts.append(self.config.output_base_path)
+        if output_folder:
+            parts.append(output_folder)
+        if (layout or self.config.layout) == Layout.HASHED:
+            if not hashed_arguments:
+                raise ValueError(f"hashed_arguments is required with the {Layout.HASHED.value} layout")
+            parts.extend([func_name, hashed_arguments[:2], hashed_arguments])
+            return parts, ""
+        return parts, f"{func_name}_"
+
+    def snapshot_folder(self, func_name: str, output_folder: str, hashed_arguments: str) -> str:
+        """
+        Get the folder holding all the snapshots of the given hashed arguments (hashed layout only).
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+        Returns:
+            str: The snapshot folder.
+        """
+        parts, _ = self._snapshot_parts(func_name, output_folder, hashed_arguments, Layout.HASHED)
+        return SEPARATOR.join(parts)
+
+    def metadata_path(
+        self,
+        func_name: str,
+        event_time: datetime,
+        output_folder: str,
+        hashed_arguments: str = "",
+        layout: Layout | None = None,
+    ) -> str:
+        """
+        Get the metadata path based on the function name and event time.
+
+        Args:
+            func_name (str): The function name.
+            event_time (datetime): The event time.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments, required with the hashed layout.
+            layout (Layout | None): The layout. If None, the layout of the configuration is used.
+        Returns:
+            str: The metadata path.
+        """
+        parts, prefix = self._snapshot_parts(func_name, output_folder, hashed_arguments, layout)
+        parts.append(f"{prefix}{event_time.isoformat().replace(':', '-')}{META_EXT}")
+        return SEPARATOR.join(parts)
+
+    def result_path(
+        self,
+        func_name: str,
+        event_time: datetime,
+        output_folder: str,
+        output_ext: str,
+        hashed_arguments: str = "",
+        layout: Layout | None = None,
+    ) -> str:
+        """
+        Get the result path based on the function name, event time, and output extension.
+
+        Args:
+            func_name (str): The function name.
+            event_time (datetime): The event time.
+            output_folder (str): The output folder.
+            output_ext (str): The output extension.
+            hashed_arguments (str): The hashed arguments, required with the hashed layout.
+            layout (Layout | None): The layout. If None, the layout of the configuration is used.
+        Returns:
+            str: The result path.
+        """
+        parts, prefix = self._snapshot_parts(func_name, output_folder, hashed_arguments, layout)
+        parts.append(f"{prefix}{event_time.isoformat().replace(':', '-')}{EXT}.{output_ext}")
+        return SEPARATOR.join(parts)
+
+    def lease_path(self, func_name: str, output_folder: str, hashed_arguments: str) -> str:
+        """
+        Get the path of the compute lease of the given hashed arguments, next to their snapshots.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+        Returns:
+            str: The lease path.
+        """
+        parts, prefix = self._snapshot_parts(func_name, output_folder, hashed_arguments)
+        parts.append(f"{prefix}{hashed_arguments}{LEASE_EXT}")
+        return SEPARATOR.join(parts)
+
+    def index_path(self, func_name: str, output_folder: str) -> str:
+        """
+        Get the path of the function index based on the function name.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            str: The index path.
+        """
+        parts = []
+        if self.config.output_base_path:
+            parts.append(self.config.output_base_path)
+        if output_folder:
+            parts.append(output_folder)
+        parts.append(f"{func_name}{INDEX_EXT}")
+        return SEPARATOR.join(parts)
+
+    def _get_limit_time(self) -> datetime:
+        return calculate_datetime_from_now(
+            self.config.max_history_files_length, self.config.max_history_files_time_unit, self.config.timezone,
+        )
+
+    def _get_output_path(self, output_folder: str) -> str:
+        return SEPARATOR.join(part for part in (self.config.output_base_path, output_folder) if part)
@@ -1,21 +1,40 @@
 import io
 import json
-import pickle
-from datetime import datetime
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from botocore.exceptions import ClientError
+from pyarrow import feather
+from pyarrow import parquet as pq
 
-from ..boto import S3Client, S3Config
-from ..helpers.config import Config
-from ..helpers.constants import EXT, META_EXT, SEPARATOR
-from ..helpers.metadata import Metadata
-from ..helpers.status import Status
-from ..helpers.time_utils import calculate_datetime_from_now, get_datetime_from_filename
+from ..boto import S3Client, S3Config, S3ObjectReader, S3ObjectWriter
+from ..helpers.compression import compress_stream, decompress_stream, read_decompressed
+from ..helpers.config import (
+    ArrowCompression,
+    Config,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from ..helpers.constants import CLEANUP_LOCK, EXT, INDEX_EXT, META_EXT, SEPARATOR
+from ..helpers.index import MetadataIndex
+from ..helpers.json_codec import decode_json, encode_json
+from ..helpers.metadata import Metadata, MetadataSuccess
+from ..helpers.pickling import load_pickle, write_pickle
+from ..helpers.table_handle import TableHandle
+from ..helpers.time_utils import get_datetime_from_filename
 from ..helpers.utils import load_file
 from .service import ResnapService
 
 
+def _is_not_found(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey")
+
+
 class BotoResnapService(ResnapService):
     def __init__(self, config: Config) -> None:
         super().__init__(config)
@@ -31,16 +50,63 @@ class BotoResnapService(ResnapService):
         if not self._client.object_exists(self._format_path(self.config.output_base_path)):
             return
 
+        limit_time: datetime = self._get_limit_time()
         contents = self._client.list_objects(self.config.output_base_path, True)
-        empty_folders: list[str] = self._clear_files(contents)
+        # the indexes are pruned first, so that they never point to a deleted file
+        self._prune_indexes([file for file in contents if file.endswith(INDEX_EXT)], limit_time)
+        empty_folders: list[str] = self._clear_files(contents, limit_time)
         if empty_folders:
             self._clear_folders(empty_folders)
 
-    def _clear_files(self, files: list[str]) -> list[str]:
-        limit_time: datetime = calculate_datetime_from_now(
-            self.config.max_history_files_length, self.config.max_history_files_time_unit, self.config.timezone,
-        )
+    def _acquire_cleanup_lock(self, interval_seconds: int) -> bool:
+        # two processes reading an expired lock at the same time may both run the cleanup,
+        # which is harmless as the cleanup is idempotent
+        lock_path = SEPARATOR.join(part for part in (self.config.output_base_path, CLEANUP_LOCK) if part)
+        last_modified = self._client.get_last_modified(lock_path)
+        if last_modified is not None and (datetime.now(timezone.utc) - last_modified).total_seconds() < interval_seconds:
+            return False
+        self._client.upload_file(io.BytesIO(b""), lock_path)
+        return True
+
+    @staticmethod
+    def _lease_body(owner: str, ttl_seconds: float) -> bytes:
+        heartbeat = datetime.now(timezone.utc)
+        return json.dumps({
+            "owner": owner,
+            "ttl_seconds": ttl_seconds,
+            "heartbeat": heartbeat.isoformat(),
+            "expires_at": (heartbeat + timedelta(seconds=ttl_seconds)).isoformat(),
+        }).encode()
 
+    def _create_lease(self, lease_path: str, owner: str, ttl_seconds: float) -> bool:
+        if self._client.create_object(self._lease_body(owner, ttl_seconds), lease_path):
+            return True
+        current = self._client.read_object(lease_path)
+        if current is None:
+            # the lease was released meanwhile, it is taken on the next attempt
+            return False
+        data, etag = current
+        if datetime.fromisoformat(json.loads(data)["expires_at"]) > datetime.now(timezone.utc):
+            return False
+        # the conditional replace lets a single process take over the expired lease
+        return self._client.replace_object(self._lease_body(owner, ttl_seconds), lease_path, etag)
+
+    def _renew_lease(self, lease_path: str, owner: str) -> bool:
+        current = self._client.read_object(lease_path)
+        if current is None:
+            return False
+        data, etag = current
+        lease = json.loads(data)
+        if lease["owner"] != owner:
+            return False
+        return self._client.replace_object(self._lease_body(owner, lease["ttl_seconds"]), lease_path, etag)
+
+    def _delete_lease(self, lease_path: str, owner: str) -> None:
+        current = self._client.read_object(lease_path)
+        if current is not None and json.loads(current[0])["owner"] == owner:
+            self._client.delete_object(lease_path)
+
+    def _clear_files(self, files: list[str], limit_time: datetime) -> list[str]:
         folders: set = set()
         to_delete: list = []
         for file in files:
@@ -76,11 +142,14 @@ class BotoResnapService(ResnapService):
 
     def _read_metadata(self, metadata_path: str) -> Metadata:
         with self._get_buffer_for_read_file(metadata_path) as buffer:
-            data = json.load(buffer)
+            return Metadata.from_json(buffer.getvalue())
 
-        return Metadata.from_dict(data)
+    def get_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
+        if self.config.layout == Layout.HASHED:
+            function_folder = SEPARATOR.join(p for p in (self._get_output_path(output_folder), func_name) if p)
+            files = sorted(self._list_metadata_files(function_folder, True), key=lambda f: f.split(SEPARATOR)[-1])
+            return [self._read_metadata(f) for f in reversed(files)]
 
-    def get_success_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
         files: list[str] = [
             file for file in self._client.list_objects(self._get_output_path(output_folder))
             if func_name in file and file.endswith(META_EXT)
@@ -89,8 +158,58 @@ class BotoResnapService(ResnapService):
         if not files:
             return []
 
-        metadata: list[Metadata] = [self._read_metadata(f) for f in sorted(files, reverse=True)]
-        return [m for m in metadata if m.status == Status.SUCCESS]
+        return [self._read_metadata(f) for f in sorted(files, reverse=True)]
+
+    def _list_metadata_files(self, folder_path: str, recursive: bool = False) -> list[str]:
+        try:
+            _, files = self._client.list_folders_and_files(folder_path, recursive)
+        except FileNotFoundError:
+            return []
+        return [file for file in files if file.endswith(META_EXT)]
+
+    def _move_file(self, source_path: str, target_path: str) -> None:
+        self._client.copy_object(source_path, target_path)
+        self._client.delete_object(source_path)
+
+    def _read_index(self, index_path: str) -> dict | None:
+        try:
+            with self._get_buffer_for_read_file(index_path) as buffer:
+                return decode_json(buffer.getvalue())
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+        except json.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def _decode_index(data: bytes) -> MetadataIndex | None:
+        try:
+            return MetadataIndex.from_dict(decode_json(data))
+        except json.JSONDecodeError:
+            return None
+
+    def _modify_index_file(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], MetadataIndex | None],
+    ) -> MetadataIndex | None:
+        while True:
+            current = self._client.read_object(index_path)
+            index = modify(self._decode_index(current[0]) if current is not None else None)
+            if index is None:
+                return None
+            data = encode_json(index.to_dict())
+            if current is None:
+                is_written = self._client.create_object(data, index_path)
+            else:
+                is_written = self._client.replace_object(data, index_path, current[1])
+            if is_written:
+                return index
+            # the index was updated by another process since it was read: the modification is applied again
+
+    def _write_index(self, index_path: str, index: dict) -> None:
+        with io.BytesIO() as buffer:
+            buffer.write(encode_json(index))
+            self._client.upload_file(buffer, index_path)
 
     def _read_parquet_to_dataframe(self, file_path: str) -> pd.DataFrame:
         return self._client.get_df_from_file(file_path, file_format="parquet")
@@ -104,40 +223,147 @@ class BotoResnapService(ResnapService):
         buffer.seek(0)
         return buffer
 
-    def _read_pickle(self, file_path: str) -> Any:
+    def _read_parquet_to_table(self, file_path: str) -> pa.Table:
         with self._get_buffer_for_read_file(file_path) as buffer:
-            return pickle.loads(buffer.read())
+            return pq.read_table(buffer)
 
-    def _read_text(self, file_path: str) -> str:
+    def _read_arrow(self, file_path: str) -> pa.Table:
         with self._get_buffer_for_read_file(file_path) as buffer:
-            return buffer.read().decode()
+            return pa.ipc.open_file(pa.py_buffer(buffer.getvalue())).read_all()
 
-    def _read_json(self, file_path: str) -> Any:
-        with self._get_buffer_for_read_file(file_path) as buffer:
-            return json.load(buffer)
+    def _open_file(self, file_path: str) -> S3ObjectReader:
+        return self._client.open_object(file_path)
+
+    def _create_file(self, file_path: str) -> S3ObjectWriter:
+        return self._client.open_object_writer(file_path)
+
+    def _file_exists(self, file_path: str) -> bool:
+        return self._client.object_exists(file_path)
+
+    def read_result(self, metadata: MetadataSuccess) -> Any:
+        try:
+            return super().read_result(metadata)
+        except ClientError as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(f"File {metadata.result_path} not exists in bucket") from e
+            raise
+
+    def open_result(self, metadata: MetadataSuccess) -> TableHandle | None:
+        try:
+            return super().open_result(metadata)
+        except ClientError as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(f"File {metadata.result_path} not exists in bucket") from e
+            raise
+
+    def _delete_file(self, file_path: str) -> None:
+        self._client.delete_object(file_path)
+
+    def _read_array(self, file_path: str) -> np.ndarray:
+        return self._client.get_array_from_file(file_path)
+
+    def _read_arrays(self, file_path: str) -> dict[str, np.ndarray]:
+        with self._get_buffer_for_read_file(file_path) as buffer, np.load(buffer, allow_pickle=False) as arrays:
+            return dict(arrays)
+
+    def _read_pickle(self, file_path: str, compression: FileCompression = FileCompression.NONE) -> Any:
+        if compression != FileCompression.NONE:
+            return load_pickle(read_decompressed(self._get_buffer_for_read_file(file_path), compression))
+        # the out-of-band buffers of the result are views of the downloaded object, which is not copied again
+        return load_pickle(self._get_buffer_for_read_file(file_path).getbuffer())
+
+    def _open_text(self, file_path: str, compression: FileCompression) -> io.TextIOWrapper:
+        return io.TextIOWrapper(
+            decompress_stream(self._get_buffer_for_read_file(file_path), compression), encoding="utf-8",
+        )
+
+    def _read_text(self, file_path: str, compression: FileCompression = FileCompression.NONE) -> str:
+        with self._open_text(file_path, compression) as f:
+            return f.read()
+
+    def _read_json(self, file_path: str, compression: FileCompression = FileCompression.NONE) -> Any:
+        with decompress_stream(self._get_buffer_for_read_file(file_path), compression) as stream:
+            return decode_json(stream.read())
 
     def _save_dataframe_to_csv(self, result: pd.DataFrame, result_path: str) -> None:
         self._client.push_df_to_file(result, result_path, file_format="csv")
 
-    def _save_dataframe_to_parquet(self, result: pd.DataFrame, result_path: str) -> None:
-        self._client.push_df_to_file(result, result_path, compression="gzip", file_format="parquet")
+    def _save_dataframe_to_parquet(
+        self,
+        result: pd.DataFrame,
+        result_path: str,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+        row_group_size: int | None = None,
+    ) -> None:
+        self._client.push_df_to_file(
+            result,
+            result_path,
+            compression=compression.codec,
+            file_format="parquet",
+            compression_level=compression_level,
+            row_group_size=row_group_size,
+            write_statistics=True,
+        )
 
-    def _save_to_pickle(self, result: Any, result_path: str) -> None:
+    def _save_table_to_parquet(
+        self,
+        result: pa.Table,
+        result_path: str,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+        row_group_size: int | None = None,
+    ) -> None:
+        sink = pa.BufferOutputStream()
+        pq.write_table(
+            result,
+            sink,
+            compression=compression.codec,
+            compression_level=compression_level,
+            row_group_size=row_group_size,
+            write_statistics=True,
+        )
+        self._client.upload_file(pa.BufferReader(sink.getvalue()), result_path)
+
+    def _save_to_arrow(
+        self, result: pd.DataFrame | pa.Table, result_path: str, compression: ArrowCompression = ArrowCompression.NONE,
+    ) -> None:
         with io.BytesIO() as buffer:
-            pickle.dump(result, buffer)
+            feather.write_feather(result, buffer, compression=compression.codec)
             self._client.upload_file(buffer, result_path)
 
-    def _save_to_text(self, result: Any, result_path: str) -> None:
+    def _save_array(self, result: np.ndarray, result_path: str) -> None:
         with io.BytesIO() as buffer:
-            buffer.write(str(result).encode())
+            np.save(buffer, result, allow_pickle=False)
             self._client.upload_file(buffer, result_path)
 
-    def _save_to_json(self, result: Any, result_path: str) -> None:
+    def _save_arrays(self, result: dict[str, np.ndarray], result_path: str) -> None:
         with io.BytesIO() as buffer:
-            buffer.write(json.dumps(result, indent=4).encode())
+            np.savez(buffer, **result)
             self._client.upload_file(buffer, result_path)
 
+    def _save_to_pickle(
+        self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> None:
+        # the uploaded buffer only holds the compressed content, the stream is compressed as it is written
+        sink = pa.BufferOutputStream()
+        with compress_stream(sink, compression) as stream:
+            write_pickle(result, stream)
+        self._client.upload_file(pa.BufferReader(sink.getvalue()), result_path)
+
+    def _save_to_text(self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE) -> None:
+        sink = pa.BufferOutputStream()
+        with io.TextIOWrapper(compress_stream(sink, compression), encoding="utf-8") as f:
+            f.write(str(result))
+        self._client.upload_file(pa.BufferReader(sink.getvalue()), result_path)
+
+    def _save_to_json(self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE) -> None:
+        sink = pa.BufferOutputStream()
+        with io.TextIOWrapper(compress_stream(sink, compression), encoding="utf-8") as f:
+            json.dump(result, f, indent=4)
+        self._client.upload_file(pa.BufferReader(sink.getvalue()), result_path)
+
     def _write_metadata(self, metadata_path: str, metadata: Metadata) -> None:
         with io.BytesIO() as buffer:
-            buffer.write(json.dumps(metadata.to_dict(), indent=4).encode())
+            buffer.write(metadata.to_json())
             self._client.upload_file(buffer, metadata_path)
@@ -1,48 +1,193 @@
+import io
 import json
+import mmap
+import os
 import pickle
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from pyarrow import parquet as pq
 
-from ..helpers.constants import EXT, META_EXT
+from ..helpers.compression import compress_stream, decompress_stream, read_decompressed
+from ..helpers.config import (
+    ArrowCompression,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from ..helpers.constants import CLEANUP_LOCK, EXT, INDEX_EXT, LOCK_EXT, META_EXT
+from ..helpers.index import MetadataIndex
+from ..helpers.json_codec import decode_json, encode_json
 from ..helpers.metadata import Metadata
-from ..helpers.status import Status
-from ..helpers.time_utils import calculate_datetime_from_now, get_datetime_from_filename
+from ..helpers.pickling import (
+    CONTAINER_MAGIC,
+    is_pickle_container,
+    load_pickle,
+    write_pickle,
+)
+from ..helpers.time_utils import get_datetime_from_filename
 from .service import ResnapService
 
+INDEX_LOCK_TIMEOUT_SECONDS = 30.0
+"""The age after which the lock file of an index is considered left by a process which died while updating it."""
+INDEX_LOCK_POLL_SECONDS = 0.005
+
 
 class LocalResnapService(ResnapService):
     def clear_old_saves(self) -> None:
-        limit_time: datetime = calculate_datetime_from_now(
-            self.config.max_history_files_length, self.config.max_history_files_time_unit, self.config.timezone,
-        )
+        limit_time: datetime = self._get_limit_time()
         folders: set[Path] = set()
+        indexes: list[str] = []
+        old_files: list[Path] = []
         for f in Path(self.config.output_base_path).rglob("*"):
             if f.is_dir():
                 folders.add(f)
                 continue
-            if f.is_file() and EXT in f.name:
+            if f.is_file() and f.name.endswith(INDEX_EXT):
+                indexes.append(str(f))
+            elif f.is_file() and EXT in f.name:
                 file_time = get_datetime_from_filename(f.name)
                 if file_time < limit_time:
-                    f.unlink()
-        for folder in folders:
+                    old_files.append(f)
+        # the indexes are pruned first, so that they never point to a deleted file
+        self._prune_indexes(indexes, limit_time)
+        for f in old_files:
+            f.unlink(missing_ok=True)
+        for folder in sorted(folders, key=lambda folder: len(folder.parts), reverse=True):
             contents = list(folder.iterdir())
             if not contents:
                 folder.rmdir()
 
+    def _acquire_cleanup_lock(self, interval_seconds: int) -> bool:
+        lock_path = Path(self.config.output_base_path) / CLEANUP_LOCK
+        try:
+            age = time.time() - lock_path.stat().st_mtime
+        except FileNotFoundError:
+            age = None
+        if age is not None:
+            if age < interval_seconds:
+                return False
+            # two processes taking over an expired lock at the same time may both run the cleanup,
+            # which is harmless as the cleanup is idempotent
+            lock_path.unlink(missing_ok=True)
+
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except (FileExistsError, FileNotFoundError):
+            # another process took the lock first, or the output folder does not exist yet
+            return False
+        with os.fdopen(fd, "w") as lock_file:
+            lock_file.write(str(os.getpid()))
+        return True
+
+    def _create_lease(self, lease_path: str, owner: str, ttl_seconds: float) -> bool:
+        if self._create_lease_file(lease_path, owner):
+            return True
+        if not self._is_lease_expired(lease_path, ttl_seconds):
+            return False
+        # the takeover is guarded, so that two processes never both replace the same expired lease
+        guard_path = f"{lease_path}.takeover"
+        if not self._create_lease_file(guard_path, owner):
+            if self._is_lease_expired(guard_path, ttl_seconds):
+                # a process died while taking the lease over
+                Path(guard_path).unlink(missing_ok=True)
+            return False
+        try:
+            if not self._is_lease_expired(lease_path, ttl_seconds):
+                return False
+            tmp_path = f"{lease_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w") as lease_file:
+                lease_file.write(owner)
+            os.replace(tmp_path, lease_path)
+            return True
+        finally:
+            Path(guard_path).unlink(missing_ok=True)
+
+    @staticmethod
+    def _create_lease_file(lease_path: str, owner: str) -> bool:
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as lease_file:
+            lease_file.write(owner)
+        return True
+
+    @staticmethod
+    def _is_lease_expired(lease_path: str, ttl_seconds: float) -> bool:
+        try:
+            return time.time() - os.stat(lease_path).st_mtime >= ttl_seconds
+        except FileNotFoundError:
+            return True
+
+    @staticmethod
+    def _read_lease_owner(lease_path: str) -> str | None:
+        try:
+            with open(lease_path, "r") as lease_file:
+                return lease_file.read()
+        except FileNotFoundError:
+            return None
+
+    def _renew_lease(self, lease_path: str, owner: str) -> bool:
+        if self._read_lease_owner(lease_path) != owner:
+            return False
+        os.utime(lease_path)
+        return True
+
+    def _delete_lease(self, lease_path: str, owner: str) -> None:
+        if self._read_lease_owner(lease_path) == owner:
+            Path(lease_path).unlink(missing_ok=True)
+
+    def _modify_index_file(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], MetadataIndex | None],
+    ) -> MetadataIndex | None:
+        with self._lock_index(index_path):
+            index = modify(self._load_index(index_path))
+            if index is not None:
+                self._write_index(index_path, index.to_dict())
+            return index
+
+    @contextmanager
+    def _lock_index(self, index_path: str) -> Iterator[None]:
+        lock_path = f"{index_path}{LOCK_EXT}"
+        while not self._create_lease_file(lock_path, str(os.getpid())):
+            if self._is_lease_expired(lock_path, INDEX_LOCK_TIMEOUT_SECONDS):
+                # the process holding the lock died while updating the index
+                Path(lock_path).unlink(missing_ok=True)
+            else:
+                time.sleep(INDEX_LOCK_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            Path(lock_path).unlink(missing_ok=True)
+
     def _create_folder(self, path: str, folder_name: str) -> None:
         folder_path = Path(path) / folder_name
         folder_path.mkdir(exist_ok=True)
 
+    def _create_parent_folder(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
     @staticmethod
-    def _read_metadata(metadata_path: Path) -> Metadata:
-        with open(metadata_path, "r") as json_file:
-            data = json.load(json_file)
-        return Metadata.from_dict(data)
+    def _read_metadata(metadata_path: Path | str) -> Metadata:
+        with open(metadata_path, "rb") as json_file:
+            return Metadata.from_json(json_file.read())
+
+    def get_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
+        if self.config.layout == Layout.HASHED:
+            function_folder = Path(self._get_output_path(output_folder)) / func_name
+            files = sorted(self._list_metadata_files(str(function_folder), True), key=lambda f: Path(f).name)
+            return [self._read_metadata(f) for f in reversed(files)]
 
-    def get_success_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
         files: list[Path] = [
             Path(x) for x in Path(self._get_output_path(output_folder)).rglob(f"*{META_EXT}*")
             if x.is_file() and func_name in x.name
@@ -51,48 +196,165 @@ class LocalResnapService(ResnapService):
         if not files:
             return []
 
-        metadata: list[Metadata] = [self._read_metadata(f) for f in sorted(files, reverse=True)]
-        return [m for m in metadata if m.status == Status.SUCCESS]
+        return [self._read_metadata(f) for f in sorted(files, reverse=True)]
+
+    def _list_metadata_files(self, folder_path: str, recursive: bool = False) -> list[str]:
+        if recursive:
+            return [str(f) for f in Path(folder_path).rglob(f"*{META_EXT}") if f.is_file()]
+        try:
+            with os.scandir(folder_path) as entries:
+                return [entry.path for entry in entries if entry.is_file() and entry.name.endswith(META_EXT)]
+        except FileNotFoundError:
+            return []
+
+    def _move_file(self, source_path: str, target_path: str) -> None:
+        os.replace(source_path, target_path)
+
+    def _read_index(self, index_path: str) -> dict | None:
+        try:
+            with open(index_path, "rb") as json_file:
+                return decode_json(json_file.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_index(self, index_path: str, index: dict) -> None:
+        tmp_path = f"{index_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as json_file:
+            json_file.write(encode_json(index))
+        os.replace(tmp_path, index_path)
 
     def _read_parquet_to_dataframe(self, file_path: str) -> pd.DataFrame:
         return pd.read_parquet(file_path)
 
+    def _read_parquet_to_table(self, file_path: str) -> pa.Table:
+        return pq.read_table(file_path, memory_map=True)
+
+    def _read_arrow(self, file_path: str) -> pa.Table:
+        # the buffers of an uncompressed file are views of the memory map, so nothing is copied when reading it
+        with pa.memory_map(file_path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _open_file(self, file_path: str) -> pa.MemoryMappedFile:
+        return pa.memory_map(file_path, "r")
+
+    def _create_file(self, file_path: str) -> io.BufferedWriter:
+        return open(file_path, "wb")
+
+    def _delete_file(self, file_path: str) -> None:
+        Path(file_path).unlink(missing_ok=True)
+
+    def _file_exists(self, file_path: str) -> bool:
+        return os.path.exists(file_path)
+
+    def _read_array(self, file_path: str) -> np.ndarray:
+        # a memory-mapped array is paged in lazily, and its pages are shared by the processes reading the same file
+        # until they are modified: the map is copy-on-write, so the array is writable and the file is never changed
+        return np.load(file_path, mmap_mode="c" if self.config.mmap_arrays else None, allow_pickle=False)
+
+    def _read_arrays(self, file_path: str) -> dict[str, np.ndarray]:
+        with np.load(file_path, allow_pickle=False) as arrays:
+            return dict(arrays)
+
     def _read_csv_to_dataframe(self, file_path: str) -> pd.DataFrame:
         return pd.read_csv(file_path, index_col=False)
 
-    def _read_pickle(self, file_path: str) -> Any:
+    def _read_pickle(self, file_path: str, compression: FileCompression = FileCompression.NONE) -> Any:
+        if compression != FileCompression.NONE:
+            return load_pickle(read_decompressed(open(file_path, "rb"), compression))
         with open(file_path, "rb") as f:
-            return pickle.load(f)
+            if not is_pickle_container(f.read(len(CONTAINER_MAGIC))):
+                f.seek(0)
+                return pickle.load(f)
+            # a copy-on-write map: the out-of-band buffers of the result are writable views of the pages of the file
+            return load_pickle(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
 
-    def _read_text(self, file_path: str) -> str:
-        with open(file_path, "r") as f:
+    @staticmethod
+    def _open_text(file_path: str, compression: FileCompression) -> io.TextIOWrapper:
+        return io.TextIOWrapper(decompress_stream(open(file_path, "rb"), compression), encoding="utf-8")
+
+    def _read_text(self, file_path: str, compression: FileCompression = FileCompression.NONE) -> str:
+        with self._open_text(file_path, compression) as f:
             return f.read()
 
-    def _read_json(self, file_path: str) -> Any:
-        with open(file_path, "r") as f:
-            return json.load(f)
+    def _read_json(self, file_path: str, compression: FileCompression = FileCompression.NONE) -> Any:
+        with decompress_stream(open(file_path, "rb"), compression) as stream:
+            return decode_json(stream.read())
 
     @staticmethod
     def _save_dataframe_to_csv(result: pd.DataFrame, result_path: str) -> None:
         result.to_csv(result_path, index=False)
 
     @staticmethod
-    def _save_dataframe_to_parquet(result: pd.DataFrame, result_path: str) -> None:
-        result.to_parquet(result_path, compression="gzip")
+    def _save_dataframe_to_parquet(
+        result: pd.DataFrame,
+        result_path: str,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+        row_group_size: int | None = None,
+    ) -> None:
+        result.to_parquet(
+            result_path,
+            compression=compression.codec,
+            compression_level=compression_level,
+            row_group_size=row_group_size,
+            write_statistics=True,
+        )
+
+    @staticmethod
+    def _save_table_to_parquet(
+        result: pa.Table,
+        result_path: str,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+        row_group_size: int | None = None,
+    ) -> None:
+        pq.write_table(
+            result,
+            result_path,
+            compression=compression.codec,
+            compression_level=compression_level,
+            row_group_size=row_group_size,
+            write_statistics=True,
+        )
+
+    @staticmethod
+    def _save_to_arrow(
+        result: pd.DataFrame | pa.Table, result_path: str, compression: ArrowCompression = ArrowCompression.NONE,
+    ) -> None:
+        feather.write_feather(result, result_path, compression=compression.codec)
 
-    def _save_to_pickle(self, result: Any, result_path: str) -> None:
-        with open(result_path, "wb") as f:
-            pickle.dump(result, f)
+    @staticmethod
+    def _save_array(result: np.ndarray, result_path: str) -> None:
+        np.save(result_path, result, allow_pickle=False)
+
+    @staticmethod
+    def _save_arrays(result: dict[str, np.ndarray], result_path: str) -> None:
+        np.savez(result_path, **result)
+
+    def _save_to_pickle(
+        self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> None:
+        with compress_stream(open(result_path, "wb"), compression) as f:
+            write_pickle(result, f)
+
+    @staticmethod
+    def _create_text(result_path: str, compression: FileCompression) -> io.TextIOWrapper:
+        # the text is encoded and compressed chunk by chunk, as json.dump writes it
+        return io.TextIOWrapper(compress_stream(open(result_path, "wb"), compression), encoding="utf-8")
 
-    def _save_to_text(self, result: Any, result_path: str) -> None:
-        with open(result_path, "w") as f:
+    def _save_to_text(self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE) -> None:
+        with self._create_text(result_path, compression) as f:
             f.write(str(result))
 
-    def _save_to_json(self, result: Any, result_path: str) -> None:
-        with open(result_path, "w") as f:
+    def _save_to_json(self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE) -> None:
+        with self._create_text(result_path, compression) as f:
             json.dump(result, f, indent=4)
 
     @staticmethod
     def _write_metadata(metadata_path: str, metadata: Metadata) -> None:
-        with open(metadata_path, "w") as json_file:
-            json.dump(metadata.to_dict(), json_file, indent=4)
+        # the metadata are written to a temporary file and renamed, so that readers never see a partial file;
+        # its name does not end with the metadata extension, so that it is never listed as metadata
+        tmp_path = f"{metadata_path.removesuffix(META_EXT)}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as json_file:
+            json_file.write(metadata.to_json())
+        os.replace(tmp_path, metadata_path)
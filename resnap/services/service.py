@@ -1,75 +1,181 @@
+import functools
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from dataclasses import replace
 from datetime import datetime
-from typing import Any
+from pathlib import Path
+from typing import IO, Any
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
-from ..helpers.config import Config
+from ..helpers.arrays import is_array_dict, is_plain_array
+from ..helpers.compression import STREAMED_FORMATS
+from ..helpers.config import (
+    ArrowCompression,
+    Config,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
 from ..helpers.constants import EXT, META_EXT, SEPARATOR
+from ..helpers.index import MetadataIndex
+from ..helpers.lease import Lease, new_lease_owner
 from ..helpers.metadata import Metadata, MetadataFail, MetadataSuccess
 from ..helpers.singleton import SingletonABCMeta
 from ..helpers.status import Status
+from ..helpers.streams import (
+    STREAM_FORMAT,
+    PickleStreamWriter,
+    StreamWriter,
+    TableStreamWriter,
+    get_item_type,
+    get_stream_type,
+    is_stream_type,
+    read_pickles,
+    read_tables,
+)
+from ..helpers.table_handle import PARTIAL_FORMATS, TableHandle
+from ..helpers.tables import TABLE_FORMATS, TableType, find_table_type, get_table_type
+from .base import BaseResnapService
 
+logger = logging.getLogger("resnap")
 
-class ResnapService(ABC, metaclass=SingletonABCMeta):
+
+class ResnapService(BaseResnapService, ABC, metaclass=SingletonABCMeta):
     def __init__(self, config: Config) -> None:
-        self.config: Config = config
+        super().__init__(config)
+        self._cleanup_lock = threading.Lock()
+        self._last_cleanup: float | None = None
+        self._index_locks: dict[str, threading.Lock] = {}
+        self._index_locks_guard = threading.Lock()
 
-    @property
-    def is_enabled(self) -> bool:
-        return self.config.enabled
+    @abstractmethod
+    def clear_old_saves(self) -> None:  # pragma: no cover
+        """
+        Clear old saves (metadata and saved files) based on the configuration.
+        """
+        raise NotImplementedError
 
-    def metadata_path(self, func_name: str, event_time: datetime, output_folder: str) -> str:
+    @abstractmethod
+    def _acquire_cleanup_lock(self, interval_seconds: int) -> bool:  # pragma: no cover
         """
-        Get the metadata path based on the function name and event time.
+        Take the cross-process cleanup lock of the store, unless another process took it less than
+        `interval_seconds` ago. The lock is never released: its age tells other processes when the last cleanup ran.
 
         Args:
-            func_name (str): The function name.
-            event_time (datetime): The event time.
-            output_folder (str): The output folder.
+            interval_seconds (int): The minimum interval between two cleanups of the store.
         Returns:
-            str: The metadata path.
+            bool: True if the lock was taken and the cleanup can run.
         """
-        parts = []
-        if self.config.output_base_path:
-            parts.append(self.config.output_base_path)
-        if output_folder:
-            parts.append(output_folder)
-        parts.append(f"{func_name}_{event_time.isoformat().replace(':', '-')}{META_EXT}")
-        return SEPARATOR.join(parts)
+        raise NotImplementedError
+
+    def clear_old_saves_if_due(self) -> bool:
+        """
+        Clear the old saves at most once per `cleanup_interval_seconds`, whatever the number of threads and processes
+        sharing the store.
+
+        Returns:
+            bool: True if a cleanup was started.
+        """
+        interval = self.config.cleanup_interval_seconds
+        with self._cleanup_lock:
+            now = time.monotonic()
+            if self._last_cleanup is not None and now - self._last_cleanup < interval:
+                return False
+            self._last_cleanup = now
+
+        if not self._acquire_cleanup_lock(interval):
+            return False
+        if self.config.cleanup_in_background:
+            threading.Thread(target=self._run_cleanup, name="resnap-janitor", daemon=True).start()
+        else:
+            self.clear_old_saves()
+        return True
+
+    def _run_cleanup(self) -> None:
+        try:
+            self.clear_old_saves()
+        except Exception:
+            logger.exception("Background cleanup of old saves failed")
 
-    def result_path(self, func_name: str, event_time: datetime, output_folder: str, output_ext: str) -> str:
+    def _prune_indexes(self, index_paths: list[str], limit_time: datetime) -> None:
         """
-        Get the result path based on the function name, event time, and output extension.
+        Remove the entries older than the limit time from the given indexes.
+
+        Args:
+            index_paths (list[str]): The index paths.
+            limit_time (datetime): The limit time.
+        """
+        for index_path in index_paths:
+            self._modify_index(
+                index_path, lambda index: index if index is not None and index.prune(limit_time) else None,
+            )
+
+    def acquire_lease(
+        self, func_name: str, output_folder: str, hashed_arguments: str, ttl_seconds: float,
+    ) -> Lease | None:
+        """
+        Take the compute lease of the given hashed arguments, unless another process holds it.
 
         Args:
             func_name (str): The function name.
-            event_time (datetime): The event time.
             output_folder (str): The output folder.
-            output_ext (str): The output extension.
+            hashed_arguments (str): The hashed arguments.
+            ttl_seconds (float): The time after which a lease which is not renewed can be taken over.
         Returns:
-            str: The result path.
+            Lease | None: The lease, renewed until it is released, or None if another process holds it.
         """
-        parts = []
-        if self.config.output_base_path:
-            parts.append(self.config.output_base_path)
-        if output_folder:
-            parts.append(output_folder)
-        parts.append(f"{func_name}_{event_time.isoformat().replace(':', '-')}{EXT}.{output_ext}")
-        return SEPARATOR.join(parts)
+        lease_path = self.lease_path(func_name, output_folder, hashed_arguments)
+        owner = new_lease_owner()
+        if self.config.layout == Layout.HASHED:
+            self._create_parent_folder(lease_path)
+        if not self._create_lease(lease_path, owner, ttl_seconds):
+            return None
+        return Lease(
+            functools.partial(self._renew_lease, lease_path, owner),
+            functools.partial(self._delete_lease, lease_path, owner),
+            ttl_seconds,
+        )
 
-    @abstractmethod
-    def clear_old_saves(self) -> None:  # pragma: no cover
+    def _create_lease(self, lease_path: str, owner: str, ttl_seconds: float) -> bool:
         """
-        Clear old saves (metadata and saved files) based on the configuration.
+        Create the lease file, or take it over if it was not renewed for `ttl_seconds`.
+        Backends without leases always succeed: every process computes the result.
+
+        Args:
+            lease_path (str): The lease path.
+            owner (str): The owner id of the lease.
+            ttl_seconds (float): The time to live of the lease.
+        Returns:
+            bool: True if the lease was taken.
         """
-        raise NotImplementedError
+        return True
 
-    def _get_output_path(self, output_folder: str) -> str:
-        output_path = self.config.output_base_path
-        if output_folder:
-            output_path += f"/{output_folder}"
-        return output_path
+    def _renew_lease(self, lease_path: str, owner: str) -> bool:
+        """
+        Renew the lease file, if it is still owned by the given owner.
+
+        Args:
+            lease_path (str): The lease path.
+            owner (str): The owner id of the lease.
+        Returns:
+            bool: False if the lease was taken over by another owner.
+        """
+        return True
+
+    def _delete_lease(self, lease_path: str, owner: str) -> None:
+        """
+        Delete the lease file, if it is still owned by the given owner.
+
+        Args:
+            lease_path (str): The lease path.
+            owner (str): The owner id of the lease.
+        """
 
     @abstractmethod
     def _create_folder(self, path: str, folder_name: str) -> None:  # pragma: no cover
@@ -81,6 +187,14 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         """
         raise NotImplementedError
 
+    def _create_parent_folder(self, path: str) -> None:
+        """
+        Create the parent folders of the given file path, if the backend needs it.
+
+        Args:
+            path (str): The file path.
+        """
+
     def create_output_folder(self, output_folder: str) -> None:
         """
         Create the output folder based on the configuration.
@@ -94,7 +208,19 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             self._create_folder(self.config.output_base_path, output_folder)
 
     @abstractmethod
-    def get_success_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:  # pragma: no cover
+    def get_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:  # pragma: no cover
+        """
+        Get all metadata based on the function name, from the most recent to the oldest.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            list[Metadata]: The metadata based on the function name.
+        """
+        raise NotImplementedError
+
+    def get_success_metadata(self, func_name: str, output_folder: str) -> list[Metadata]:
         """
         Get all success metadata based on the function name.
 
@@ -104,8 +230,279 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         Returns:
             list[Metadata]: The success metadata based on the function name.
         """
+        return [m for m in self.get_metadata(func_name, output_folder) if m.status == Status.SUCCESS]
+
+    @abstractmethod
+    def _read_index(self, index_path: str) -> dict | None:  # pragma: no cover
+        """
+        Read the index from the given index path.
+
+        Args:
+            index_path (str): The index path.
+        Returns:
+            dict | None: The serialized index, or None if it does not exist or is unreadable.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _write_index(self, index_path: str, index: dict) -> None:  # pragma: no cover
+        """
+        Write the index to the given index path.
+
+        Args:
+            index_path (str): The index path.
+            index (dict): The serialized index.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _modify_index_file(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], MetadataIndex | None],
+    ) -> MetadataIndex | None:  # pragma: no cover
+        """
+        Read, modify and write the index, so that concurrent updates of the other processes sharing the store
+        are never overwritten.
+
+        Args:
+            index_path (str): The index path.
+            modify (Callable[[MetadataIndex | None], MetadataIndex | None]): Called with the current index, or None
+                if it does not exist or is unreadable, it returns the index to write, or None to leave it unchanged.
+                It may be called again if the index was updated by another process meanwhile.
+        Returns:
+            MetadataIndex | None: The written index, or None if it was left unchanged.
+        """
+        raise NotImplementedError
+
+    def _modify_index(
+        self, index_path: str, modify: Callable[[MetadataIndex | None], MetadataIndex | None],
+    ) -> MetadataIndex | None:
+        """
+        Read, modify and write the index, one thread at a time. See `_modify_index_file`.
+
+        Args:
+            index_path (str): The index path.
+            modify (Callable[[MetadataIndex | None], MetadataIndex | None]): The modification of the index.
+        Returns:
+            MetadataIndex | None: The written index, or None if it was left unchanged.
+        """
+        with self._index_locks_guard:
+            lock = self._index_locks.setdefault(index_path, threading.Lock())
+        with lock:
+            return self._modify_index_file(index_path, modify)
+
+    def _load_index(self, index_path: str) -> MetadataIndex | None:
+        data = self._read_index(index_path)
+        return MetadataIndex.from_dict(data) if data else None
+
+    def _build_index(self, func_name: str, output_folder: str) -> MetadataIndex:
+        metadata: list[Metadata] = self.get_metadata(func_name, output_folder)
+        return MetadataIndex.from_metadata(list(reversed(metadata)))
+
+    def rebuild_index(self, func_name: str, output_folder: str) -> MetadataIndex:
+        """
+        Rebuild the function index from the metadata files and save it.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            MetadataIndex: The rebuilt index.
+        """
+        return self._modify_index(
+            self.index_path(func_name, output_folder), lambda _: self._build_index(func_name, output_folder),
+        )
+
+    def get_index(self, func_name: str, output_folder: str) -> MetadataIndex:
+        """
+        Get the function index. It is rebuilt from the metadata files if it does not exist yet.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+        Returns:
+            MetadataIndex: The function index.
+        """
+        index_path = self.index_path(func_name, output_folder)
+        index = self._load_index(index_path)
+        if index is None:
+            # the index may have been rebuilt by another thread or process while waiting for the update
+            index = self._modify_index(
+                index_path,
+                lambda current: current if current is not None else self._build_index(func_name, output_folder),
+            )
+        return index
+
+    def find_success_metadata(
+        self, func_name: str, output_folder: str, hashed_arguments: str | None = None,
+    ) -> MetadataSuccess | None:
+        """
+        Find the latest success metadata saved for the given hashed arguments with a single index read.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str | None): The hashed arguments. If None, the latest success metadata is returned
+                whatever the arguments.
+        Returns:
+            MetadataSuccess | None: The success metadata, or None if not found.
+        """
+        index = self.get_index(func_name, output_folder)
+        metadata = self._get_indexed_metadata(index, hashed_arguments)
+        if metadata is None and hashed_arguments and self.config.layout == Layout.HASHED:
+            metadata = self._find_snapshot_metadata(func_name, output_folder, hashed_arguments)
+            if metadata is not None:
+                self.add_to_index(func_name, output_folder, [metadata])
+        return metadata
+
+    def find_many_success_metadata(
+        self, func_name: str, output_folder: str, hashed_arguments: list[str],
+    ) -> dict[str, MetadataSuccess]:
+        """
+        Find the latest success metadata saved for many hashed arguments with a single index read.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (list[str]): The hashed arguments.
+        Returns:
+            dict[str, MetadataSuccess]: The success metadata found, by hashed arguments.
+        """
+        index = self.get_index(func_name, output_folder)
+        found: dict[str, MetadataSuccess] = {}
+        unindexed: list[Metadata] = []
+        for hashed in dict.fromkeys(hashed_arguments):
+            metadata = self._get_indexed_metadata(index, hashed)
+            if metadata is None and self.config.layout == Layout.HASHED:
+                metadata = self._find_snapshot_metadata(func_name, output_folder, hashed)
+                if metadata is not None:
+                    unindexed.append(metadata)
+            if metadata is not None:
+                found[hashed] = metadata
+        self.add_to_index(func_name, output_folder, unindexed)
+        return found
+
+    def _get_indexed_metadata(self, index: MetadataIndex, hashed_arguments: str | None) -> MetadataSuccess | None:
+        metadata = index.get(hashed_arguments)
+        if metadata is not None and hashed_arguments and not metadata.is_keyed_with(self.config.hash_algorithm):
+            # hashes computed with another algorithm or key version can not be compared
+            return None
+        return metadata
+
+    @abstractmethod
+    def _read_metadata(self, metadata_path: str) -> Metadata:  # pragma: no cover
+        """
+        Read metadata from the given metadata path.
+
+        Args:
+            metadata_path (str): The metadata path.
+        Returns:
+            Metadata: The read metadata.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _list_metadata_files(self, folder_path: str, recursive: bool = False) -> list[str]:  # pragma: no cover
+        """
+        List the metadata files of the given folder.
+
+        Args:
+            folder_path (str): The folder path.
+            recursive (bool): Whether to list the sub folders too.
+        Returns:
+            list[str]: The metadata paths, or an empty list if the folder does not exist.
+        """
         raise NotImplementedError
 
+    def _find_snapshot_metadata(
+        self, func_name: str, output_folder: str, hashed_arguments: str,
+    ) -> MetadataSuccess | None:
+        """
+        Find the latest success metadata by listing the snapshot folder of the hashed arguments (hashed layout only).
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            hashed_arguments (str): The hashed arguments.
+        Returns:
+            MetadataSuccess | None: The success metadata, or None if not found.
+        """
+        folder = self.snapshot_folder(func_name, output_folder, hashed_arguments)
+        for metadata_path in sorted(self._list_metadata_files(folder), reverse=True):
+            metadata = self._read_metadata(metadata_path)
+            if metadata.status == Status.SUCCESS and metadata.is_keyed_with(self.config.hash_algorithm):
+                return metadata
+        return None
+
+    @abstractmethod
+    def _move_file(self, source_path: str, target_path: str) -> None:  # pragma: no cover
+        """
+        Move a file from the source path to the target path.
+
+        Args:
+            source_path (str): The source path.
+            target_path (str): The target path.
+        """
+        raise NotImplementedError
+
+    def _parse_metadata_path(self, metadata_path: str) -> tuple[str, str, Layout]:
+        """
+        Get the function name, the output folder and the layout of a metadata path.
+
+        Args:
+            metadata_path (str): The metadata path.
+        Returns:
+            tuple[str, str, Layout]: The function name, the output folder and the layout.
+        """
+        parts = Path(metadata_path).parts
+        relative = parts[len(Path(self.config.output_base_path).parts):]
+        if len(relative) >= 4 and len(relative[-3]) == 2 and relative[-2].startswith(relative[-3]):
+            return relative[-4], SEPARATOR.join(relative[:-4]), Layout.HASHED
+        func_name = relative[-1][: -len(META_EXT)].rsplit("_", 1)[0]
+        return func_name, SEPARATOR.join(relative[:-1]), Layout.FLAT
+
+    def migrate_layout(self, layout: Layout) -> int:
+        """
+        Move all the snapshots of the store to the given layout, then rebuild the function indexes.
+        Snapshots already stored with the given layout are left untouched, so an interrupted migration can be resumed.
+
+        Args:
+            layout (Layout): The target layout.
+        Returns:
+            int: The number of migrated snapshots.
+        """
+        functions: set[tuple[str, str]] = set()
+        migrated = 0
+        for metadata_path in self._list_metadata_files(self.config.output_base_path, recursive=True):
+            func_name, output_folder, current_layout = self._parse_metadata_path(metadata_path)
+            functions.add((func_name, output_folder))
+            if current_layout == layout:
+                continue
+
+            metadata = self._read_metadata(metadata_path)
+            target_path = self.metadata_path(
+                func_name, metadata.event_time, output_folder, metadata.hashed_arguments, layout,
+            )
+            self._create_parent_folder(target_path)
+            if isinstance(metadata, MetadataSuccess):
+                result_path = self.result_path(
+                    func_name,
+                    metadata.event_time,
+                    output_folder,
+                    metadata.result_path.split(EXT)[-1].lstrip("."),
+                    metadata.hashed_arguments,
+                    layout,
+                )
+                self._move_file(metadata.result_path, result_path)
+                metadata = replace(metadata, result_path=result_path)
+            self._move_file(metadata_path, target_path)
+            self._write_metadata(target_path, metadata)
+            migrated += 1
+
+        self.config.layout = layout
+        for func_name, output_folder in functions:
+            self.rebuild_index(func_name, output_folder)
+        return migrated
+
     @abstractmethod
     def _read_parquet_to_dataframe(self, file_path: str) -> pd.DataFrame:  # pragma: no cover
         """
@@ -118,6 +515,112 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def _read_parquet_to_table(self, file_path: str) -> pa.Table:  # pragma: no cover
+        """
+        Read parquet file to a pyarrow Table from the given file path.
+
+        Args:
+            file_path (str): The file path to read the parquet file.
+        Returns:
+            pa.Table: The read parquet file.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read_arrow(self, file_path: str) -> pa.Table:  # pragma: no cover
+        """
+        Read Arrow IPC file from the given file path.
+
+        Args:
+            file_path (str): The file path to read the Arrow IPC file.
+        Returns:
+            pa.Table: The read table.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _open_file(self, file_path: str) -> IO[bytes] | pa.NativeFile:  # pragma: no cover
+        """
+        Open a file for random access, without reading it.
+
+        Args:
+            file_path (str): The file path.
+        Returns:
+            IO[bytes] | pa.NativeFile: The file, opened for reading.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _create_file(self, file_path: str) -> IO[bytes]:  # pragma: no cover
+        """
+        Create a file to write sequentially, complete once it is closed.
+
+        Args:
+            file_path (str): The file path.
+        Returns:
+            IO[bytes]: The file, opened for writing.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _delete_file(self, file_path: str) -> None:  # pragma: no cover
+        """
+        Delete a file, if it exists.
+
+        Args:
+            file_path (str): The file path.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _file_exists(self, file_path: str) -> bool:  # pragma: no cover
+        """
+        Check if a file exists.
+
+        Args:
+            file_path (str): The file path.
+        Returns:
+            bool: True if the file exists.
+        """
+        raise NotImplementedError
+
+    def result_exists(self, metadata: MetadataSuccess) -> bool:
+        """
+        Check if the result file of the metadata exists: it may have been deleted by the cleanup of another process
+        after the metadata was found.
+
+        Args:
+            metadata (MetadataSuccess): The metadata of the result.
+        Returns:
+            bool: True if the result file exists.
+        """
+        return self._file_exists(metadata.result_path)
+
+    @abstractmethod
+    def _read_array(self, file_path: str) -> np.ndarray:  # pragma: no cover
+        """
+        Read npy file from the given file path.
+
+        Args:
+            file_path (str): The file path to read the npy file.
+        Returns:
+            np.ndarray: The read array.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read_arrays(self, file_path: str) -> dict[str, np.ndarray]:  # pragma: no cover
+        """
+        Read npz file from the given file path.
+
+        Args:
+            file_path (str): The file path to read the npz file.
+        Returns:
+            dict[str, np.ndarray]: The read arrays, by name.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def _read_csv_to_dataframe(self, file_path: str) -> pd.DataFrame:  # pragma: no cover
         """
@@ -131,44 +634,76 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         raise NotImplementedError
 
     @abstractmethod
-    def _read_pickle(self, file_path: str) -> Any:  # pragma: no cover
+    def _read_pickle(
+        self, file_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> Any:  # pragma: no cover
         """
         Read pickle file from the given file path.
 
         Args:
             file_path (str): The file path to read the pickle file.
+            compression (FileCompression): The compression of the file.
         Returns:
             Any: The read pickle file.
         """
         raise NotImplementedError
 
     @abstractmethod
-    def _read_text(self, file_path: str) -> Any:  # pragma: no cover
+    def _read_text(
+        self, file_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> Any:  # pragma: no cover
         """
         Read pickle file from the given file path.
 
         Args:
             file_path (str): The file path to read the pickle file.
+            compression (FileCompression): The compression of the file.
         Returns:
             Any: The read pickle file.
         """
         raise NotImplementedError
 
     @abstractmethod
-    def _read_json(self, file_path: str) -> Any:  # pragma: no cover
+    def _read_json(
+        self, file_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> Any:  # pragma: no cover
         """
         Read json file from the given file path.
 
         Args:
             file_path (str): The file path to read the json file.
+            compression (FileCompression): The compression of the file.
         Returns:
             Any: The read json file.
         """
         raise NotImplementedError
 
+    def _read_table(self, table_type: TableType, file_path: str, result_format: str) -> Any:
+        """
+        Read a tabular result in its type: pandas DataFrames are read by pandas, the other types from the
+        pyarrow Table of the file.
+
+        Args:
+            table_type (TableType): The type of the result.
+            file_path (str): The file path.
+            result_format (str): The format of the file.
+        Returns:
+            Any: The read result.
+        """
+        if result_format == "arrow":
+            return table_type.from_arrow(self._read_arrow(file_path))
+        if table_type.cls is pd.DataFrame:
+            if result_format == "csv":
+                return self._read_csv_to_dataframe(file_path)
+            return self._read_parquet_to_dataframe(file_path)
+        if result_format == "parquet":
+            return table_type.from_arrow(self._read_parquet_to_table(file_path))
+        raise NotImplementedError(f"Unsupported result type: {table_type.name}")
+
     def read_result(self, metadata: MetadataSuccess) -> Any:
         """
-        Read the result based on the metadata.
+        Read the result based on the metadata. The items of a saved generator are replayed lazily,
+        see `read_stream`.
 
         Args:
             metadata (MetadataSuccess): The metadata to read the result.
@@ -177,31 +712,133 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         """
         file_path: str = metadata.result_path
         result_type: str = metadata.result_type
-        need_cast: bool = False
-
-        if "DataFrame" in result_type:
-            if file_path.endswith(".gz"):
-                func = self._read_parquet_to_dataframe
-            elif file_path.endswith(".csv"):
-                func = self._read_csv_to_dataframe
-            else:
-                raise NotImplementedError(f"Unsupported result type: {result_type}")
-        elif file_path.endswith(".txt"):
-            need_cast: bool = True
-            func = self._read_text
-        elif file_path.endswith(".json"):
-            func = self._read_json
-        elif file_path.endswith(".pkl"):
-            func = self._read_pickle
-        else:
+        result_format: str = metadata.file_format
+
+        if is_stream_type(result_type):
+            return self.read_stream(metadata)
+        table_type = find_table_type(result_type)
+        if table_type is not None and result_format in TABLE_FORMATS:
+            return self._read_table(table_type, file_path, result_format)
+        # the files saved before their compression was recorded are not compressed
+        compression = FileCompression(metadata.compression or FileCompression.NONE)
+        readers = {
+            "txt": functools.partial(self._read_text, compression=compression),
+            "json": functools.partial(self._read_json, compression=compression),
+            "pkl": functools.partial(self._read_pickle, compression=compression),
+            "npy": self._read_array,
+            "npz": self._read_arrays,
+        }
+        if result_format not in readers:
             raise NotImplementedError(f"Unsupported result type: {result_type}")
 
-        result = func(file_path)
-        if need_cast:
+        result = readers[result_format](file_path)
+        if result_format == "txt":
             var_type = eval(result_type)
             result = var_type(result)
         return result
 
+    def open_result(self, metadata: MetadataSuccess) -> TableHandle | None:
+        """
+        Open a tabular result saved in parquet or arrow, to read some of its columns and rows without reading
+        the whole file. See `TableHandle`.
+
+        Args:
+            metadata (MetadataSuccess): The metadata of the result.
+        Returns:
+            TableHandle | None: The handle of the result, or None if the result is not a table saved in a format
+                read partially.
+        """
+        if is_stream_type(metadata.result_type):
+            return None
+        table_type = find_table_type(metadata.result_type)
+        if table_type is None or metadata.file_format not in PARTIAL_FORMATS:
+            return None
+        file = self._open_file(metadata.result_path)
+        try:
+            return TableHandle.from_file(file, metadata.file_format, table_type)
+        except Exception:
+            file.close()
+            raise
+
+    def read_stream(self, metadata: MetadataSuccess) -> Iterator[Any]:
+        """
+        Replay the items of a saved generator one by one: the file is opened when the first item is requested,
+        and only the item being read is held in memory. The tables are read a row group at a time.
+
+        Args:
+            metadata (MetadataSuccess): The metadata of the stream.
+        Returns:
+            Iterator[Any]: The items.
+        """
+        item_type = get_item_type(metadata.result_type)
+        file = self._open_file(metadata.result_path)
+        if item_type is not None:
+            yield from read_tables(file, find_table_type(item_type))
+        else:
+            yield from read_pickles(file, FileCompression(metadata.compression or FileCompression.NONE))
+
+    def open_stream(
+        self,
+        func_name: str,
+        item: Any,
+        output_folder: str,
+        output_format: str | None = None,
+        hashed_arguments: str = "",
+        compression: ParquetCompression | str | None = None,
+        compression_level: int | None = None,
+        arrow_compression: ArrowCompression | str | None = None,
+        file_compression: FileCompression | str | None = None,
+    ) -> StreamWriter:
+        """
+        Create the result file of a generator, to write its items as they are yielded. The stream is written in
+        parquet, a row group per item, if its first item is a table and the output format is parquet or None,
+        and as a sequence of pickles otherwise. The snapshot is committed by saving its success metadata once
+        the writer is closed.
+
+        Args:
+            func_name (str): The function name.
+            item (Any): The first item of the generator, None for an empty generator.
+            output_folder (str): The output folder.
+            output_format (str | None): The output format, "parquet" or "pickle".
+            hashed_arguments (str): The hashed arguments, required with the hashed layout.
+            compression (ParquetCompression | str | None): The compression of a stream of tables.
+                If None, `parquet_compression` of the configuration is used.
+            compression_level (int | None): The compression level of a stream of tables.
+            arrow_compression (ArrowCompression | str | None): Unused, streams are not saved in arrow.
+            file_compression (FileCompression | str | None): The compression of a stream of pickles.
+                If None, `file_compression` of the configuration is used.
+        Returns:
+            StreamWriter: The writer of the items.
+        """
+        table_type = get_table_type(item)
+        if table_type is not None and output_format in (None, "parquet"):
+            compression, compression_level = self.get_parquet_codec(compression, compression_level)
+            extension = compression.extension
+            new_writer = functools.partial(
+                TableStreamWriter,
+                result_type=get_stream_type(table_type.name),
+                table_type=table_type,
+                compression=compression,
+                compression_level=compression_level,
+            )
+        else:
+            file_compression = self.get_file_compression(file_compression)
+            extension = f"{STREAM_FORMAT}{file_compression.suffix}"
+            new_writer = functools.partial(
+                PickleStreamWriter, result_type=get_stream_type(), compression=file_compression,
+            )
+
+        event_time = datetime.now(self.config.timezone)
+        result_path = self.result_path(func_name, event_time, output_folder, extension, hashed_arguments)
+        if self.config.layout == Layout.HASHED:
+            self._create_parent_folder(result_path)
+        return new_writer(
+            self._create_file(result_path),
+            result_path=result_path,
+            event_time=event_time,
+            delete=functools.partial(self._delete_file, result_path),
+        )
+
     @abstractmethod
     def _save_dataframe_to_csv(self, result: pd.DataFrame, result_path: str) -> None:  # pragma: no cover
         """
@@ -214,55 +851,171 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         raise NotImplementedError
 
     @abstractmethod
-    def _save_dataframe_to_parquet(self, result: pd.DataFrame, result_path: str) -> None:  # pragma: no cover
+    def _save_dataframe_to_parquet(
+        self,
+        result: pd.DataFrame,
+        result_path: str,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+        row_group_size: int | None = None,
+    ) -> None:  # pragma: no cover
         """
         Save dataframe to parquet file from the given result and result path.
 
         Args:
             result (pd.DataFrame): The result.
             result_path (str): The result path.
+            compression (ParquetCompression): The compression of the file.
+            compression_level (int | None): The compression level, None for the codec default.
+            row_group_size (int | None): The maximum number of rows of a row group, None for the writer default.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _save_table_to_parquet(
+        self,
+        result: pa.Table,
+        result_path: str,
+        compression: ParquetCompression = ParquetCompression.GZIP,
+        compression_level: int | None = None,
+        row_group_size: int | None = None,
+    ) -> None:  # pragma: no cover
+        """
+        Save pyarrow Table to parquet file from the given result and result path.
+
+        Args:
+            result (pa.Table): The result.
+            result_path (str): The result path.
+            compression (ParquetCompression): The compression of the file.
+            compression_level (int | None): The compression level, None for the codec default.
+            row_group_size (int | None): The maximum number of rows of a row group, None for the writer default.
         """
         raise NotImplementedError
 
     @abstractmethod
-    def _save_to_pickle(self, result: Any, result_path: str) -> None:  # pragma: no cover
+    def _save_to_arrow(
+        self, result: pd.DataFrame | pa.Table, result_path: str, compression: ArrowCompression = ArrowCompression.NONE,
+    ) -> None:  # pragma: no cover
+        """
+        Save dataframe or table to Arrow IPC file (Feather v2) from the given result and result path.
+
+        Args:
+            result (pd.DataFrame | pa.Table): The result.
+            result_path (str): The result path.
+            compression (ArrowCompression): The compression of the file.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _save_array(self, result: np.ndarray, result_path: str) -> None:  # pragma: no cover
+        """
+        Save array to npy file from the given result and result path.
+
+        Args:
+            result (np.ndarray): The result.
+            result_path (str): The result path.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _save_arrays(self, result: dict[str, np.ndarray], result_path: str) -> None:  # pragma: no cover
+        """
+        Save arrays to npz file from the given result and result path.
+
+        Args:
+            result (dict[str, np.ndarray]): The result.
+            result_path (str): The result path.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _save_to_pickle(
+        self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> None:  # pragma: no cover
         """
         Save pickle file from the given result and result path.
 
         Args:
             result (Any): The result.
             result_path (str): The result path.
+            compression (FileCompression): The compression of the file.
         """
         raise NotImplementedError
 
     @abstractmethod
-    def _save_to_text(self, result: Any, result_path: str) -> None:  # pragma: no cover
+    def _save_to_text(
+        self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> None:  # pragma: no cover
         """
         Save text file from the given result and result path.
 
         Args:
             result (Any): The result.
             result_path (str): The result path.
+            compression (FileCompression): The compression of the file.
         """
         raise NotImplementedError
 
     @abstractmethod
-    def _save_to_json(self, result: Any, result_path: str) -> None:  # pragma: no cover
+    def _save_to_json(
+        self, result: Any, result_path: str, compression: FileCompression = FileCompression.NONE,
+    ) -> None:  # pragma: no cover
         """
         Save json file from the given result and result path.
 
         Args:
             result (Any): The result.
             result_path (str): The result path.
+            compression (FileCompression): The compression of the file.
         """
         raise NotImplementedError
 
+    def _get_table_writer(
+        self,
+        result: pd.DataFrame | pa.Table,
+        output_format: str | None,
+        compression: ParquetCompression | str | None,
+        compression_level: int | None,
+        arrow_compression: ArrowCompression | str | None,
+    ) -> tuple[Callable[..., None], str]:
+        """
+        Get the function saving a tabular result, and the extension of its file. See `save_result`.
+
+        Args:
+            result (pd.DataFrame | pa.Table): The result, a pandas DataFrame or the pyarrow Table of another type.
+            output_format (str | None): The output format.
+            compression (ParquetCompression | str | None): The compression of a result saved in parquet.
+            compression_level (int | None): The compression level.
+            arrow_compression (ArrowCompression | str | None): The compression of a result saved in arrow.
+        Returns:
+            tuple[Callable[..., None], str]: The saving function and the file extension.
+        """
+        if output_format == "arrow":
+            return functools.partial(self._save_to_arrow, compression=self.get_arrow_compression(arrow_compression)), "arrow"
+        if output_format == "csv" and isinstance(result, pd.DataFrame):
+            return self._save_dataframe_to_csv, "csv"
+        compression, compression_level = self.get_parquet_codec(compression, compression_level)
+        save = self._save_dataframe_to_parquet if isinstance(result, pd.DataFrame) else self._save_table_to_parquet
+        save = functools.partial(
+            save,
+            compression=compression,
+            compression_level=compression_level,
+            row_group_size=self.config.parquet_row_group_size,
+        )
+        return save, compression.extension
+
     def save_result(
         self,
         func_name: str,
         result: Any,
         output_folder: str,
         output_format: str | None = None,
+        hashed_arguments: str = "",
+        event_time: datetime | None = None,
+        compression: ParquetCompression | str | None = None,
+        compression_level: int | None = None,
+        arrow_compression: ArrowCompression | str | None = None,
+        file_compression: FileCompression | str | None = None,
     ) -> tuple[str, datetime]:
         """
         Save the result based on the function name and result.
@@ -272,15 +1025,32 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             result (Any): The result to save.
             output_folder (str): The output folder.
             output_format (str | None): The output format.
+            hashed_arguments (str): The hashed arguments, required with the hashed layout.
+            event_time (datetime | None): The event time of the snapshot. If None, the current time is used.
+            compression (ParquetCompression | str | None): The compression of a DataFrame saved in parquet.
+                If None, `parquet_compression` of the configuration is used.
+            compression_level (int | None): The compression level. If None, the level of the configuration is
+                used with its compression, and the codec default with another one.
+            arrow_compression (ArrowCompression | str | None): The compression of a DataFrame or a pyarrow Table
+                saved in arrow. If None, `arrow_compression` of the configuration is used.
+            file_compression (FileCompression | str | None): The compression of a result saved in pkl, json or txt.
+                If None, `file_compression` of the configuration is used.
         Returns:
             tuple[str, datetime]: The result path and event time.
         """
-        if isinstance(result, pd.DataFrame):
-            if output_format == "csv":
-                func = self._save_dataframe_to_csv
-            else:
-                output_format = "parquet.gz"
-                func = self._save_dataframe_to_parquet
+        table_type = get_table_type(result)
+        if table_type is not None:
+            if not isinstance(result, pd.DataFrame):
+                result = table_type.to_arrow(result)
+            func, output_format = self._get_table_writer(
+                result, output_format, compression, compression_level, arrow_compression,
+            )
+        elif is_plain_array(result) and output_format in (None, "npy"):
+            output_format = "npy"
+            func = self._save_array
+        elif is_array_dict(result) and output_format in (None, "npz"):
+            output_format = "npz"
+            func = self._save_arrays
         elif output_format == "txt":
             func = self._save_to_text
         elif output_format == "json":
@@ -288,9 +1058,15 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         else:
             output_format = "pkl"
             func = self._save_to_pickle
+        if output_format in STREAMED_FORMATS:
+            file_compression = self.get_file_compression(file_compression)
+            output_format = f"{output_format}{file_compression.suffix}"
+            func = functools.partial(func, compression=file_compression)
 
-        event_time: datetime = datetime.now(self.config.timezone)
-        result_path = self.result_path(func_name, event_time, output_folder, output_format)
+        event_time = event_time or datetime.now(self.config.timezone)
+        result_path = self.result_path(func_name, event_time, output_folder, output_format, hashed_arguments)
+        if self.config.layout == Layout.HASHED:
+            self._create_parent_folder(result_path)
         func(result=result, result_path=result_path)
         return result_path, event_time
 
@@ -305,7 +1081,9 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         """
         raise NotImplementedError
 
-    def _save_metadata(self, func_name: str, metadata: Metadata, output_folder: str) -> None:
+    def _save_metadata(
+        self, func_name: str, metadata: Metadata, output_folder: str, update_index: bool = True,
+    ) -> Metadata:
         """
         Save the metadata based on the function name and metadata.
 
@@ -313,9 +1091,52 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             func_name (str): The function name.
             metadata (Metadata): The metadata to save.
             output_folder (str): The output folder.
+            update_index (bool): If False, the metadata is not registered in the function index,
+                which is left to the caller, for example with `add_to_index` after saving a batch.
+        Returns:
+            Metadata: The saved metadata.
         """
-        metadata_path: str = self.metadata_path(func_name, metadata.event_time, output_folder)
+        metadata_path: str = self.metadata_path(
+            func_name, metadata.event_time, output_folder, metadata.hashed_arguments,
+        )
+        if self.config.layout == Layout.HASHED:
+            self._create_parent_folder(metadata_path)
         self._write_metadata(metadata_path, metadata)
+        if update_index:
+            self._update_index(func_name, metadata, output_folder)
+        return metadata
+
+    def _update_index(self, func_name: str, metadata: Metadata, output_folder: str) -> None:
+        """
+        Register the metadata in the function index.
+
+        Args:
+            func_name (str): The function name.
+            metadata (Metadata): The saved metadata.
+            output_folder (str): The output folder.
+        """
+        self.add_to_index(func_name, output_folder, [metadata])
+
+    def add_to_index(self, func_name: str, output_folder: str, metadata: list[Metadata]) -> None:
+        """
+        Register many saved metadata in the function index with a single write.
+
+        Args:
+            func_name (str): The function name.
+            output_folder (str): The output folder.
+            metadata (list[Metadata]): The saved metadata.
+        """
+        if not metadata:
+            return
+
+        def add(index: MetadataIndex | None) -> MetadataIndex:
+            if index is None:
+                index = self._build_index(func_name, output_folder)
+            for entry in sorted(metadata, key=lambda m: m.event_time):
+                index.add(entry)
+            return index
+
+        self._modify_index(self.index_path(func_name, output_folder), add)
 
     def save_success_metadata(
         self,
@@ -326,7 +1147,12 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         result_path: str,
         result_type: str,
         extra_metadata: dict,
-    ) -> None:
+        update_index: bool = True,
+        compression: ParquetCompression | str | None = None,
+        compression_level: int | None = None,
+        arrow_compression: ArrowCompression | str | None = None,
+        file_compression: FileCompression | str | None = None,
+    ) -> Metadata:
         """
         Save success metadata based on the function name, arguments, event time, and result path.
 
@@ -338,6 +1164,16 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             result_path (str): The result path.
             result_type (str): The result type.
             extra_metadata (dict): The extra metadata.
+            update_index (bool): If False, the metadata is not registered in the function index.
+            compression (ParquetCompression | str | None): The compression given to `save_result`,
+                recorded for parquet files.
+            compression_level (int | None): The compression level given to `save_result`.
+            arrow_compression (ArrowCompression | str | None): The compression given to `save_result`,
+                recorded for arrow files.
+            file_compression (FileCompression | str | None): The compression given to `save_result`,
+                recorded for pkl, json and txt files.
+        Returns:
+            Metadata: The saved metadata.
         """
         metadata = MetadataSuccess(
             status=Status.SUCCESS,
@@ -346,8 +1182,12 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             result_path=result_path,
             result_type=result_type,
             extra_metadata=extra_metadata,
+            hash_algorithm=self.config.hash_algorithm,
+            **self._get_format_metadata(
+                result_path, compression, compression_level, arrow_compression, file_compression,
+            ),
         )
-        self._save_metadata(func_name, metadata, output_folder)
+        return self._save_metadata(func_name, metadata, output_folder, update_index)
 
     def save_failed_metadata(
         self,
@@ -358,7 +1198,8 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
         error_message: str,
         data: dict,
         extra_metadata: dict,
-    ) -> None:
+        update_index: bool = True,
+    ) -> Metadata:
         """
         Save failed metadata based on the function name, arguments, event time, error message, and data.
 
@@ -369,6 +1210,9 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             event_time (datetime): The event time.
             error_message (str): The error message.
             data (dict): The data to save.
+            update_index (bool): If False, the metadata is not registered in the function index.
+        Returns:
+            Metadata: The saved metadata.
         """
         metadata = MetadataFail(
             status=Status.FAIL,
@@ -377,5 +1221,6 @@ class ResnapService(ABC, metaclass=SingletonABCMeta):
             error_message=error_message,
             data=data,
             extra_metadata=extra_metadata,
+            hash_algorithm=self.config.hash_algorithm,
         )
-        self._save_metadata(func_name, metadata, output_folder)
+        return self._save_metadata(func_name, metadata, output_folder, update_index)
@@ -0,0 +1,193 @@
+import importlib
+import re
+import sys
+import uuid
+from unittest.mock import AsyncMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from resnap.boto import S3Config
+
+AsyncS3Client = pytest.importorskip("resnap.boto.async_client").AsyncS3Client
+
+
+@pytest.fixture
+def client(s3_secrets: dict[str, str]) -> AsyncS3Client:
+    return AsyncS3Client(S3Config(**s3_secrets))
+
+
+@pytest.fixture
+def folder() -> str:
+    return f"folder-{uuid.uuid4().hex}"
+
+
+@pytest.mark.asyncio
+class TestAsyncS3Client:
+    async def test_should_put_and_get_object(self, client: AsyncS3Client, folder: str) -> None:
+        # Given
+        await client.put_object(b"content", f"/{folder}/file.txt")
+
+        # When
+        content = await client.get_object(f"{folder}/file.txt")
+
+        # Then
+        assert content == b"content"
+
+    async def test_should_raise_file_not_found_if_object_does_not_exist(
+        self, client: AsyncS3Client, folder: str,
+    ) -> None:
+        # When / Then
+        with pytest.raises(FileNotFoundError, match=f"The object '{folder}/file.txt' doesn't exist."):
+            await client.get_object(f"{folder}/file.txt")
+
+    async def test_should_raise_other_errors(self, s3_secrets: dict[str, str], folder: str) -> None:
+        # Given
+        client = AsyncS3Client(S3Config(**{**s3_secrets, "bucket_name": "missing-bucket"}))
+
+        # When / Then
+        with pytest.raises(ClientError, match="NoSuchBucket"):
+            await client.get_object(f"{folder}/file.txt")
+
+    async def test_should_list_files(self, client: AsyncS3Client, folder: str) -> None:
+        # Given
+        await client.mkdir(folder)
+        await client.put_object(b"", f"{folder}/a.txt")
+        await client.put_object(b"", f"{folder}/sub/b.txt")
+
+        # When
+        files = await client.list_files(folder)
+        all_files = await client.list_files(f"{folder}/", recursive=True)
+        missing_files = await client.list_files(f"{folder}/missing")
+
+        # Then
+        assert files == [f"{folder}/a.txt"]
+        assert sorted(all_files) == [f"{folder}/a.txt", f"{folder}/sub/b.txt"]
+        assert missing_files == []
+
+    async def test_should_create_folder(self, client: AsyncS3Client, folder: str) -> None:
+        # Given
+        assert not await client.object_exists(f"{folder}/")
+
+        # When
+        await client.mkdir(folder)
+
+        # Then
+        assert await client.object_exists(f"{folder}/")
+
+    async def test_should_raise_other_errors_when_checking_object(
+        self, client: AsyncS3Client, folder: str, mocker,
+    ) -> None:
+        # Given
+        connection = AsyncMock()
+        connection.head_object.side_effect = ClientError({"Error": {"Code": "403"}}, "HeadObject")
+        mocker.patch.object(client, "_get_connection").return_value.__aenter__.return_value = connection
+
+        # When / Then
+        with pytest.raises(ClientError, match="403"):
+            await client.object_exists(folder)
+
+
+@pytest.mark.asyncio
+class TestAsyncS3ClientConditionalWrites:
+    async def test_should_create_object_only_once(self, client: AsyncS3Client, folder: str) -> None:
+        # When
+        first = await client.create_object(b"first", f"/{folder}/create.lease")
+        second = await client.create_object(b"second", f"{folder}/create.lease")
+
+        # Then
+        assert (first, second) == (True, False)
+        data, _ = await client.read_object(f"{folder}/create.lease")
+        assert data == b"first"
+
+    async def test_should_replace_object_only_if_not_modified(self, client: AsyncS3Client, folder: str) -> None:
+        # Given
+        await client.create_object(b"first", f"{folder}/replace.lease")
+        _, etag = await client.read_object(f"{folder}/replace.lease")
+
+        # When
+        first = await client.replace_object(b"second", f"{folder}/replace.lease", etag)
+        second = await client.replace_object(b"third", f"{folder}/replace.lease", etag)
+
+        # Then
+        assert (first, second) == (True, False)
+        data, _ = await client.read_object(f"{folder}/replace.lease")
+        assert data == b"second"
+
+    async def test_should_not_read_missing_object(self, client: AsyncS3Client, folder: str) -> None:
+        # When
+        result = await client.read_object(f"{folder}/missing.lease")
+
+        # Then
+        assert result is None
+
+    @pytest.mark.parametrize("exists, expected", [(False, True), (True, False)])
+    async def test_should_fall_back_to_existence_check_without_conditional_writes(
+        self, exists: bool, expected: bool, client: AsyncS3Client, mocker,
+    ) -> None:
+        # Given
+        connection = AsyncMock()
+        connection.put_object.side_effect = ClientError({"Error": {"Code": "NotImplemented"}}, "PutObject")
+        mocker.patch.object(client, "_get_connection").return_value.__aenter__.return_value = connection
+        mocker.patch.object(client, "object_exists", AsyncMock(return_value=exists))
+        mock_put = mocker.patch.object(client, "put_object", AsyncMock())
+
+        # When
+        result = await client.create_object(b"data", "file.lease")
+
+        # Then
+        assert result is expected
+        assert mock_put.called is expected
+
+    @pytest.mark.parametrize(
+        "current, expected",
+        [
+            ((b"old", '"etag"'), True),
+            ((b"new", '"other"'), False),
+            (None, False),
+        ],
+    )
+    async def test_should_fall_back_to_etag_check_without_conditional_writes(
+        self, current: tuple | None, expected: bool, client: AsyncS3Client, mocker,
+    ) -> None:
+        # Given
+        connection = AsyncMock()
+        connection.put_object.side_effect = ClientError({"Error": {"Code": "501"}}, "PutObject")
+        mocker.patch.object(client, "_get_connection").return_value.__aenter__.return_value = connection
+        mocker.patch.object(client, "read_object", AsyncMock(return_value=current))
+        mock_put = mocker.patch.object(client, "put_object", AsyncMock())
+
+        # When
+        result = await client.replace_object(b"data", "file.lease", '"etag"')
+
+        # Then
+        assert result is expected
+        assert mock_put.called is expected
+
+    @pytest.mark.parametrize("operation", ["put_object", "get_object"])
+    async def test_should_raise_unexpected_error_of_conditional_writes(
+        self, operation: str, client: AsyncS3Client, mocker,
+    ) -> None:
+        # Given
+        connection = AsyncMock()
+        getattr(connection, operation).side_effect = ClientError({"Error": {"Code": "403"}}, operation)
+        mocker.patch.object(client, "_get_connection").return_value.__aenter__.return_value = connection
+
+        # When / Then
+        with pytest.raises(ClientError, match="403"):
+            if operation == "put_object":
+                await client.create_object(b"data", "file.lease")
+            else:
+                await client.read_object("file.lease")
+
+
+def test_should_raise_without_aiobotocore(mocker) -> None:
+    # Given
+    mocker.patch("importlib.util.find_spec", return_value=None)
+
+    # When / Then
+    with pytest.raises(
+        ImportError,
+        match=re.escape("Please install aiobotocore to use the asynchronous S3 service: `pip install resnap[async-boto]`"),
+    ):
+        importlib.reload(sys.modules["resnap.boto.async_client"])
@@ -1,6 +1,8 @@
 import io
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, call, patch
 
+import numpy as np
 import pandas as pd
 import pytest
 from botocore.exceptions import ClientError
@@ -171,6 +173,15 @@ class TestS3Client:
             Bucket="test_bucket", Key="file1.txt"
         )
 
+    def test_should_copy_object(self, mock_s3_client: S3Client, mock_connection: MagicMock) -> None:
+        # When
+        mock_s3_client.copy_object("/folder/file1.txt", "folder/ab/file1.txt")
+
+        # Then
+        mock_connection.return_value.__enter__.return_value.copy.assert_called_once_with(
+            {"Bucket": "test_bucket", "Key": "folder/file1.txt"}, "test_bucket", "folder/ab/file1.txt"
+        )
+
     @pytest.mark.parametrize(
         "keys",
         [
@@ -242,6 +253,47 @@ class TestS3Client:
         # Then
         assert result is False
 
+    def test_should_return_last_modified(self, mock_s3_client: S3Client, mock_connection: MagicMock) -> None:
+        # Given
+        last_modified = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        mock_connection.return_value.__enter__.return_value.head_object.return_value = {"LastModified": last_modified}
+
+        # When
+        result = mock_s3_client.get_last_modified("/folder/file.lock")
+
+        # Then
+        assert result == last_modified
+        mock_connection.return_value.__enter__.return_value.head_object.assert_called_once_with(
+            Bucket="test_bucket", Key="folder/file.lock"
+        )
+
+    @pytest.mark.parametrize("code", ["404", "NoSuchKey"])
+    def test_should_return_no_last_modified_if_object_not_exists(
+        self, code: str, mock_s3_client: S3Client, mock_connection: MagicMock
+    ) -> None:
+        # Given
+        mock_connection.return_value.__enter__.return_value.head_object.side_effect = ClientError(
+            {"Error": {"Code": code}}, "HeadObject"
+        )
+
+        # When
+        result = mock_s3_client.get_last_modified("file.lock")
+
+        # Then
+        assert result is None
+
+    def test_should_raise_unexpected_error_when_getting_last_modified(
+        self, mock_s3_client: S3Client, mock_connection: MagicMock
+    ) -> None:
+        # Given
+        mock_connection.return_value.__enter__.return_value.head_object.side_effect = ClientError(
+            {"Error": {"Code": "403"}}, "HeadObject"
+        )
+
+        # When / Then
+        with pytest.raises(ClientError):
+            mock_s3_client.get_last_modified("file.lock")
+
     @pytest.mark.parametrize(
         "path",
         [
@@ -283,6 +335,23 @@ class TestS3Client:
             nrows=10,
         )
 
+    def test_should_stream_array_from_file(self, mock_s3_client: S3Client, mock_connection: MagicMock) -> None:
+        # Given
+        array = np.arange(12).reshape(3, 4)
+        body = io.BytesIO()
+        np.save(body, array)
+        body.seek(0)
+        mock_connection.return_value.__enter__.return_value.get_object.return_value = {"Body": body}
+
+        # When
+        result = mock_s3_client.get_array_from_file("/arrays/test.npy")
+
+        # Then
+        np.testing.assert_array_equal(result, array)
+        mock_connection.return_value.__enter__.return_value.get_object.assert_called_once_with(
+            Bucket="test_bucket", Key="arrays/test.npy"
+        )
+
     def test_should_raise_if_file_not_exists(self, mock_s3_client: S3Client, mock_dataframe_handler: MagicMock) -> None:
         # When / Then
         with pytest.raises(FileNotFoundError, match="File test.csv not exists in bucket test_bucket"):
@@ -336,3 +405,103 @@ class TestS3Client:
             call(["folder1/", "folder2/"]),
         ]
         mock_s3_client.delete_objects.assert_has_calls(calls)
+
+
+@pytest.fixture
+def s3_client(s3_secrets: dict[str, str]) -> S3Client:
+    return S3Client(S3Config(**s3_secrets))
+
+
+class TestS3ClientConditionalWrites:
+    def test_should_create_object_only_once(self, s3_client: S3Client) -> None:
+        # When
+        first = s3_client.create_object(b"first", "/conditional/create.lease")
+        second = s3_client.create_object(b"second", "conditional/create.lease")
+
+        # Then
+        assert (first, second) == (True, False)
+        data, _ = s3_client.read_object("conditional/create.lease")
+        assert data == b"first"
+
+    def test_should_replace_object_only_if_not_modified(self, s3_client: S3Client) -> None:
+        # Given
+        s3_client.create_object(b"first", "conditional/replace.lease")
+        _, etag = s3_client.read_object("conditional/replace.lease")
+
+        # When
+        first = s3_client.replace_object(b"second", "conditional/replace.lease", etag)
+        second = s3_client.replace_object(b"third", "conditional/replace.lease", etag)
+
+        # Then
+        assert (first, second) == (True, False)
+        data, _ = s3_client.read_object("conditional/replace.lease")
+        assert data == b"second"
+
+    def test_should_not_read_missing_object(self, s3_client: S3Client) -> None:
+        # When
+        result = s3_client.read_object("conditional/missing.lease")
+
+        # Then
+        assert result is None
+
+    @pytest.mark.parametrize("exists, expected", [(False, True), (True, False)])
+    def test_should_fall_back_to_existence_check_without_conditional_writes(
+        self, exists: bool, expected: bool, mock_s3_client: S3Client, mock_connection: MagicMock, mocker,
+    ) -> None:
+        # Given
+        mock_connection.return_value.__enter__.return_value.put_object.side_effect = ClientError(
+            {"Error": {"Code": "NotImplemented"}}, "PutObject"
+        )
+        mocker.patch.object(S3Client, "object_exists", return_value=exists)
+        mock_upload = mocker.patch.object(S3Client, "upload_file")
+
+        # When
+        result = mock_s3_client.create_object(b"data", "file.lease")
+
+        # Then
+        assert result is expected
+        assert mock_upload.called is expected
+
+    @pytest.mark.parametrize(
+        "current, expected",
+        [
+            ((b"old", '"etag"'), True),
+            ((b"new", '"other"'), False),
+            (None, False),
+        ],
+    )
+    def test_should_fall_back_to_etag_check_without_conditional_writes(
+        self, current: tuple | None, expected: bool, mock_s3_client: S3Client, mock_connection: MagicMock, mocker,
+    ) -> None:
+        # Given
+        mock_connection.return_value.__enter__.return_value.put_object.side_effect = ClientError(
+            {"Error": {"Code": "501"}}, "PutObject"
+        )
+        mocker.patch.object(S3Client, "read_object", return_value=current)
+        mock_upload = mocker.patch.object(S3Client, "upload_file")
+
+        # When
+        result = mock_s3_client.replace_object(b"data", "file.lease", '"etag"')
+
+        # Then
+        assert result is expected
+        assert mock_upload.called is expected
+
+    @pytest.mark.parametrize(
+        "operation, call_client",
+        [
+            ("put_object", lambda client: client.create_object(b"data", "file.lease")),
+            ("get_object", lambda client: client.read_object("file.lease")),
+        ],
+    )
+    def test_should_raise_unexpected_error_of_conditional_writes(
+        self, operation: str, call_client, mock_s3_client: S3Client, mock_connection: MagicMock,
+    ) -> None:
+        # Given
+        getattr(mock_connection.return_value.__enter__.return_value, operation).side_effect = ClientError(
+            {"Error": {"Code": "403"}}, operation
+        )
+
+        # When / Then
+        with pytest.raises(ClientError):
+            call_client(mock_s3_client)
@@ -0,0 +1,226 @@
+import io
+from unittest.mock import MagicMock
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from pyarrow import parquet as pq
+
+from resnap.boto.client import S3Client
+from resnap.boto.config import S3Config
+from resnap.boto.objects import PART_SIZE, S3ObjectReader, S3ObjectWriter
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def mock_connection() -> MagicMock:
+    connection = MagicMock()
+    connection.head_object.return_value = {"ContentLength": len(DATA)}
+
+    def get_object(Bucket: str, Key: str, Range: str) -> dict:
+        start, end = map(int, Range.removeprefix("bytes=").split("-"))
+        return {"Body": io.BytesIO(DATA[start:end + 1])}
+
+    connection.get_object.side_effect = get_object
+    return connection
+
+
+class TestS3ObjectReader:
+    def test_should_read_requested_range(self, mock_connection: MagicMock) -> None:
+        # Given
+        reader = S3ObjectReader(mock_connection, "bucket", "key")
+
+        # When
+        reader.seek(10)
+        data = reader.read(5)
+
+        # Then
+        assert data == DATA[10:15]
+        assert reader.tell() == 15
+        mock_connection.get_object.assert_called_once_with(Bucket="bucket", Key="key", Range="bytes=10-14")
+
+    @pytest.mark.parametrize(
+        "offset, whence, expected",
+        [
+            (4, io.SEEK_SET, 4),
+            (4, io.SEEK_CUR, 104),
+            (-4, io.SEEK_END, len(DATA) - 4),
+        ],
+    )
+    def test_should_seek(self, offset: int, whence: int, expected: int, mock_connection: MagicMock) -> None:
+        # Given
+        reader = S3ObjectReader(mock_connection, "bucket", "key")
+        reader.seek(100)
+
+        # When
+        position = reader.seek(offset, whence)
+
+        # Then
+        assert position == reader.tell() == expected
+        assert reader.seekable() and reader.readable()
+
+    @pytest.mark.parametrize("offset, whence", [(-1, io.SEEK_SET), (0, 3)])
+    def test_should_not_seek_out_of_object(self, offset: int, whence: int, mock_connection: MagicMock) -> None:
+        # Given
+        reader = S3ObjectReader(mock_connection, "bucket", "key")
+
+        # When / Then
+        with pytest.raises(ValueError):
+            reader.seek(offset, whence)
+
+    def test_should_read_rest_of_object_with_single_request(self, mock_connection: MagicMock) -> None:
+        # Given
+        reader = S3ObjectReader(mock_connection, "bucket", "key")
+        reader.seek(1000)
+
+        # When
+        data = reader.read()
+        end = reader.read(10)
+
+        # Then
+        assert data == DATA[1000:]
+        assert end == b""
+        assert reader.size == len(DATA)
+        mock_connection.get_object.assert_called_once()
+
+
+class TestS3ObjectWriter:
+    def test_should_put_small_object_with_single_request(self) -> None:
+        # Given
+        connection = MagicMock()
+        writer = S3ObjectWriter(connection, "bucket", "key", part_size=100)
+
+        # When
+        size = writer.write(DATA[:10])
+        writer.close()
+        writer.close()
+
+        # Then
+        assert size == 10
+        assert writer.writable() and writer.closed
+        connection.put_object.assert_called_once_with(Bucket="bucket", Key="key", Body=DATA[:10])
+        connection.create_multipart_upload.assert_not_called()
+
+    def test_should_upload_large_object_in_parts(self) -> None:
+        # Given
+        connection = MagicMock()
+        connection.create_multipart_upload.return_value = {"UploadId": "upload"}
+        connection.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+        writer = S3ObjectWriter(connection, "bucket", "key", part_size=400)
+
+        # When
+        writer.write(DATA[:300])
+        writer.write(DATA[300:])
+        writer.close()
+
+        # Then
+        bodies = [call.kwargs["Body"] for call in connection.upload_part.call_args_list]
+        assert bodies == [DATA[:400], DATA[400:800], DATA[800:]]
+        connection.complete_multipart_upload.assert_called_once_with(
+            Bucket="bucket",
+            Key="key",
+            UploadId="upload",
+            MultipartUpload={"Parts": [{"ETag": f"etag-{n}", "PartNumber": n} for n in (1, 2, 3)]},
+        )
+        connection.put_object.assert_not_called()
+
+    def test_should_abort_upload_when_completion_fails(self) -> None:
+        # Given
+        connection = MagicMock()
+        connection.create_multipart_upload.return_value = {"UploadId": "upload"}
+        connection.upload_part.return_value = {"ETag": "etag"}
+        connection.complete_multipart_upload.side_effect = RuntimeError("failed")
+        writer = S3ObjectWriter(connection, "bucket", "key", part_size=512)
+        writer.write(DATA)
+
+        # When / Then
+        with pytest.raises(RuntimeError):
+            writer.close()
+        connection.abort_multipart_upload.assert_called_once_with(Bucket="bucket", Key="key", UploadId="upload")
+        assert writer.closed
+
+    @pytest.mark.parametrize("size", [10, len(DATA)])
+    def test_should_not_create_object_when_with_block_raises(self, size: int) -> None:
+        # Given
+        connection = MagicMock()
+        connection.create_multipart_upload.return_value = {"UploadId": "upload"}
+        connection.upload_part.return_value = {"ETag": "etag"}
+
+        # When
+        with pytest.raises(RuntimeError), S3ObjectWriter(connection, "bucket", "key", part_size=512) as writer:
+            writer.write(DATA[:size])
+            raise RuntimeError("failed")
+
+        # Then
+        assert writer.closed
+        connection.put_object.assert_not_called()
+        connection.complete_multipart_upload.assert_not_called()
+        if size > 512:
+            connection.abort_multipart_upload.assert_called_once_with(Bucket="bucket", Key="key", UploadId="upload")
+        else:
+            connection.abort_multipart_upload.assert_not_called()
+
+    def test_should_abort_upload_when_closed_after_failed_write(self) -> None:
+        # Given
+        connection = MagicMock()
+        connection.create_multipart_upload.return_value = {"UploadId": "upload"}
+        connection.upload_part.side_effect = [{"ETag": "etag"}, RuntimeError("failed")]
+        writer = S3ObjectWriter(connection, "bucket", "key", part_size=400)
+        with pytest.raises(RuntimeError):
+            writer.write(DATA)
+
+        # When
+        writer.close()
+
+        # Then
+        assert writer.closed
+        connection.complete_multipart_upload.assert_not_called()
+        connection.abort_multipart_upload.assert_called_once_with(Bucket="bucket", Key="key", UploadId="upload")
+
+    def test_should_not_write_to_aborted_writer(self) -> None:
+        # Given
+        connection = MagicMock()
+        writer = S3ObjectWriter(connection, "bucket", "key", part_size=100)
+        writer.write(DATA[:10])
+
+        # When
+        writer.abort()
+        writer.abort()
+        writer.close()
+
+        # Then
+        with pytest.raises(ValueError):
+            writer.write(DATA[:10])
+        connection.put_object.assert_not_called()
+        connection.abort_multipart_upload.assert_not_called()
+
+
+def test_should_write_object_in_parts_to_s3(s3_secrets: dict[str, str]) -> None:
+    # Given
+    client = S3Client(S3Config(**s3_secrets))
+    data = np.random.bytes(PART_SIZE + 1024)
+
+    # When
+    with client.open_object_writer("/objects/written.bin") as writer:
+        writer.write(data)
+
+    # Then
+    with client.open_object("objects/written.bin") as reader:
+        assert reader.read() == data
+
+
+def test_should_read_parquet_columns_and_row_groups_from_s3(s3_secrets: dict[str, str]) -> None:
+    # Given
+    client = S3Client(S3Config(**s3_secrets))
+    table = pa.table({"day": np.arange(10_000) // 1_000, "price": np.random.rand(10_000)})
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, row_group_size=1_000)
+    client.upload_file(io.BytesIO(sink.getvalue().to_pybytes()), "objects/result.parquet")
+
+    # When
+    with client.open_object("/objects/result.parquet") as reader:
+        result = pq.read_table(reader, columns=["price"], filters=[("day", "=", 3)])
+
+    # Then
+    assert result.equals(table.slice(3_000, 1_000).select(["price"]))
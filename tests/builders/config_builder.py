@@ -2,7 +2,15 @@ from dataclasses import dataclass
 
 from typing_extensions import Self
 
-from resnap.helpers.config import Config, Services
+from resnap.helpers.config import (
+    ArrowCompression,
+    Config,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+    Services,
+)
+from resnap.helpers.hashing import HashAlgorithm
 from resnap.helpers.time_utils import TimeUnit
 
 
@@ -15,6 +23,19 @@ class ConfigBuilder:
     _enable_remove_old_files: bool = False
     _max_history_files_length: int = 3
     _max_history_files_time_unit: TimeUnit = TimeUnit.HOUR
+    _layout: Layout = Layout.FLAT
+    _memory_cache_max_bytes: int = 0
+    _cleanup_interval_seconds: int = 60
+    _cleanup_in_background: bool = False
+    _hash_algorithm: HashAlgorithm = HashAlgorithm.SHA256
+    _async_native_io: bool = False
+    _lease_poll_interval_seconds: float = 1
+    _parquet_compression: ParquetCompression = ParquetCompression.GZIP
+    _compression_level: int | None = None
+    _parquet_row_group_size: int = 131072
+    _arrow_compression: ArrowCompression = ArrowCompression.NONE
+    _file_compression: FileCompression = FileCompression.NONE
+    _mmap_arrays: bool = False
 
     @classmethod
     def a_config(cls) -> Self:
@@ -48,6 +69,55 @@ class ConfigBuilder:
         self._max_history_files_time_unit = max_history_files_time_unit
         return self
 
+    def with_layout(self, layout: Layout) -> Self:
+        self._layout = layout
+        return self
+
+    def with_memory_cache_max_bytes(self, memory_cache_max_bytes: int) -> Self:
+        self._memory_cache_max_bytes = memory_cache_max_bytes
+        return self
+
+    def with_cleanup_interval_seconds(self, cleanup_interval_seconds: int) -> Self:
+        self._cleanup_interval_seconds = cleanup_interval_seconds
+        return self
+
+    def with_cleanup_in_background(self, cleanup_in_background: bool) -> Self:
+        self._cleanup_in_background = cleanup_in_background
+        return self
+
+    def with_hash_algorithm(self, hash_algorithm: HashAlgorithm) -> Self:
+        self._hash_algorithm = hash_algorithm
+        return self
+
+    def with_async_native_io(self, async_native_io: bool) -> Self:
+        self._async_native_io = async_native_io
+        return self
+
+    def with_lease_poll_interval_seconds(self, lease_poll_interval_seconds: float) -> Self:
+        self._lease_poll_interval_seconds = lease_poll_interval_seconds
+        return self
+
+    def with_parquet_compression(self, parquet_compression: ParquetCompression, level: int | None = None) -> Self:
+        self._parquet_compression = parquet_compression
+        self._compression_level = level
+        return self
+
+    def with_parquet_row_group_size(self, parquet_row_group_size: int) -> Self:
+        self._parquet_row_group_size = parquet_row_group_size
+        return self
+
+    def with_arrow_compression(self, arrow_compression: ArrowCompression) -> Self:
+        self._arrow_compression = arrow_compression
+        return self
+
+    def with_file_compression(self, file_compression: FileCompression) -> Self:
+        self._file_compression = file_compression
+        return self
+
+    def with_mmap_arrays(self, mmap_arrays: bool) -> Self:
+        self._mmap_arrays = mmap_arrays
+        return self
+
     def build(self) -> Config:
         return Config(
             enabled=self._enabled,
@@ -57,4 +127,17 @@ class ConfigBuilder:
             enable_remove_old_files=self._enable_remove_old_files,
             max_history_files_length=self._max_history_files_length,
             max_history_files_time_unit=self._max_history_files_time_unit,
+            layout=self._layout,
+            memory_cache_max_bytes=self._memory_cache_max_bytes,
+            cleanup_interval_seconds=self._cleanup_interval_seconds,
+            cleanup_in_background=self._cleanup_in_background,
+            hash_algorithm=self._hash_algorithm,
+            async_native_io=self._async_native_io,
+            lease_poll_interval_seconds=self._lease_poll_interval_seconds,
+            parquet_compression=self._parquet_compression,
+            compression_level=self._compression_level,
+            parquet_row_group_size=self._parquet_row_group_size,
+            arrow_compression=self._arrow_compression,
+            file_compression=self._file_compression,
+            mmap_arrays=self._mmap_arrays,
         )
@@ -4,6 +4,7 @@ from typing import Any
 
 from typing_extensions import Self
 
+from resnap.helpers.hashing import KEY_VERSION, HashAlgorithm
 from resnap.helpers.metadata import MetadataFail, MetadataSuccess
 from resnap.helpers.status import Status
 from resnap.helpers.utils import hash_arguments
@@ -13,6 +14,8 @@ class MetadataBuilder(ABC):
     _event_time: datetime = datetime.fromisoformat("2021-01-01T00:00:00")
     _hashed_arguments: str = ""
     _extra_metadata: dict[str, Any] = {}
+    _hash_algorithm: HashAlgorithm = HashAlgorithm.SHA256
+    _key_version: int = KEY_VERSION
 
     @classmethod
     def a_metadata(cls) -> Self:
@@ -26,6 +29,11 @@ class MetadataBuilder(ABC):
         self._hashed_arguments = hash_arguments(arguments)
         return self
 
+    def with_key_scheme(self, hash_algorithm: HashAlgorithm, key_version: int = KEY_VERSION) -> Self:
+        self._hash_algorithm = hash_algorithm
+        self._key_version = key_version
+        return self
+
     def with_extra_metadata(self, extra_metadata: dict[str, Any]) -> Self:
         self._extra_metadata = extra_metadata
         return self
@@ -52,6 +60,8 @@ class MetadataSuccessBuilder(MetadataBuilder):
             result_path=self._result_path,
             result_type=self._result_type,
             extra_metadata=self._extra_metadata,
+            hash_algorithm=self._hash_algorithm,
+            key_version=self._key_version,
         )
 
 
@@ -76,4 +86,6 @@ class MetadataFailBuilder(MetadataBuilder):
             error_message=self._error_message,
             data=self._data,
             extra_metadata=self._extra_metadata,
+            hash_algorithm=self._hash_algorithm,
+            key_version=self._key_version,
         )
@@ -1,8 +1,14 @@
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from resnap import factory
+from resnap.helpers import executor
 from resnap.helpers.singleton import SingletonABCMeta
 
+S3_BUCKET_NAME = "resnap-bucket"
+
 
 @pytest.fixture(autouse=True)
 def reset_singleton() -> None:
@@ -13,3 +19,44 @@ def reset_singleton() -> None:
 def reset_factory_globals() -> None:
     factory._resnap_config = None
     factory._service = None
+    factory._async_service = None
+
+
+@pytest.fixture(autouse=True)
+def reset_async_executor() -> Iterator[None]:
+    yield
+    if isinstance(executor._executor, ThreadPoolExecutor):
+        executor._executor.shutdown(wait=False)
+    executor._executor = None
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint_url() -> Iterator[str]:
+    """Local S3 stand-in, shared by the tests of the asynchronous S3 client and service."""
+    moto_server = pytest.importorskip("moto.server")
+    boto3 = pytest.importorskip("boto3")
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint_url = f"http://{host}:{port}"
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",
+        region_name="us-east-1",
+    )
+    client.create_bucket(Bucket=S3_BUCKET_NAME)
+    yield endpoint_url
+    server.stop()
+
+
+@pytest.fixture
+def s3_secrets(s3_endpoint_url: str) -> dict[str, str]:
+    return {
+        "access_key": "key",
+        "secret_key": "secret",
+        "bucket_name": S3_BUCKET_NAME,
+        "endpoint_url": s3_endpoint_url,
+        "region_name": "us-east-1",
+    }
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+
+from resnap.helpers import arrays
+from resnap.helpers.arrays import is_array_dict, is_plain_array, read_array_stream
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param(np.arange(3), True, id="array"),
+        pytest.param(np.zeros((2, 2), dtype=[("a", "i4"), ("b", "f8")]), True, id="structured array"),
+        pytest.param(np.array(["a", None], dtype=object), False, id="object array"),
+        pytest.param(np.ma.masked_array([1, 2], mask=[0, 1]), False, id="array subclass"),
+        pytest.param([1, 2], False, id="list"),
+    ],
+)
+def test_should_tell_plain_arrays(value: object, expected: bool) -> None:
+    # When / Then
+    assert is_plain_array(value) is expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param({"a": np.arange(3), "b": np.ones(2)}, True, id="arrays"),
+        pytest.param({}, False, id="empty"),
+        pytest.param({"a": np.arange(3), "b": 1}, False, id="not an array"),
+        pytest.param({1: np.arange(3)}, False, id="not a string key"),
+        pytest.param(np.arange(3), False, id="array"),
+    ],
+)
+def test_should_tell_dicts_of_arrays(value: object, expected: bool) -> None:
+    # When / Then
+    assert is_array_dict(value) is expected
+
+
+def npy_stream(array: np.ndarray, version: tuple[int, int] | None = None) -> io.BytesIO:
+    stream = io.BytesIO()
+    if version is None:
+        np.save(stream, array)
+    else:
+        np.lib.format.write_array(stream, array, version=version)
+    stream.seek(0)
+    return stream
+
+
+@pytest.mark.parametrize(
+    "array, version",
+    [
+        pytest.param(np.arange(12.0).reshape(3, 4), None, id="c order"),
+        pytest.param(np.asfortranarray(np.arange(12).reshape(3, 4)), None, id="fortran order"),
+        pytest.param(np.array(5), None, id="scalar"),
+        pytest.param(np.zeros((0, 3)), None, id="empty"),
+        pytest.param(np.arange(4), (2, 0), id="version 2"),
+    ],
+)
+def test_should_read_array_from_stream(array: np.ndarray, version: tuple[int, int] | None) -> None:
+    # When
+    result = read_array_stream(npy_stream(array, version))
+
+    # Then
+    np.testing.assert_array_equal(result, array)
+    assert result.dtype == array.dtype
+    assert result.flags.f_contiguous == array.flags.f_contiguous
+
+
+def test_should_read_array_stream_in_chunks(mocker) -> None:
+    # Given
+    mocker.patch.object(arrays, "CHUNK_SIZE", 10)
+    array = np.arange(10, dtype=np.int64)
+    stream = npy_stream(array)
+    spy_read = mocker.spy(stream, "read")
+
+    # When
+    result = read_array_stream(stream)
+
+    # Then
+    np.testing.assert_array_equal(result, array)
+    assert [call.args[0] for call in spy_read.call_args_list[-8:]] == [10] * 8
+
+
+def test_should_raise_if_array_stream_is_truncated() -> None:
+    # Given
+    data = npy_stream(np.arange(10)).getvalue()[:-8]
+
+    # When / Then
+    with pytest.raises(ValueError, match="The array stream ended after 72 of 80 bytes"):
+        read_array_stream(io.BytesIO(data))
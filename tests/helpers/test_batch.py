@@ -0,0 +1,160 @@
+from concurrent.futures import Future
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import freezegun
+import pytest
+
+from resnap.exceptions import ResnapError
+from resnap.helpers.batch import BatchWriter, as_call, call_decorated
+from resnap.helpers.context import add_metadata, clear_metadata, get_metadata
+from resnap.helpers.results_retriever import ResultsRetriever
+
+
+@pytest.mark.parametrize(
+    "item, expected",
+    [
+        pytest.param((1, 2), ((1, 2), {}), id="tuple"),
+        pytest.param({"a": 1}, ((), {"a": 1}), id="mapping"),
+        pytest.param([1, 2], (([1, 2],), {}), id="single argument"),
+    ],
+)
+def test_should_get_the_arguments_of_a_call(item: object, expected: tuple) -> None:
+    # When
+    call = as_call(item)
+
+    # Then
+    assert call == expected
+
+
+def test_should_call_undecorated_function_with_its_own_metadata() -> None:
+    # Given
+    def func(a: int, b: int = 0) -> int:
+        add_metadata("a", a)
+        return a + b
+
+    decorated = MagicMock(__wrapped__=func)
+    clear_metadata()
+    add_metadata("caller", True)
+
+    # When
+    result = call_decorated(decorated, (1,), {"b": 2})
+
+    # Then
+    assert result == (3, {"a": 1})
+    decorated.assert_not_called()
+    assert get_metadata() == {"caller": True}
+
+    # Finally
+    clear_metadata()
+
+
+def done(result: object = None, error: BaseException | None = None) -> Future:
+    future: Future = Future()
+    if error is None:
+        future.set_result(result)
+    else:
+        future.set_exception(error)
+    return future
+
+
+@pytest.fixture
+def service() -> MagicMock:
+    service = MagicMock()
+    service.config.timezone = None
+    service.get_cached_result.return_value = (False, None)
+    service.save_result.side_effect = lambda *args: (f"path_{args[4]}", args[5])
+    service.save_success_metadata.side_effect = lambda **kwargs: kwargs["hashed_arguments"]
+    service.save_failed_metadata.side_effect = lambda **kwargs: kwargs["error_message"]
+    return service
+
+
+def a_retriever(service: MagicMock, hashed_arguments: str) -> ResultsRetriever:
+    retriever = ResultsRetriever(service, {"output_folder": "folder"})
+    retriever.func_name = "func"
+    retriever.hashed_arguments = hashed_arguments
+    return retriever
+
+
+NOW = datetime.fromisoformat("2021-01-01T00:00:00")
+
+
+@freezegun.freeze_time(NOW)
+class TestBatchWriter:
+    def test_should_save_results_and_index_them_once(self, service: MagicMock) -> None:
+        # Given
+        writer = BatchWriter(service, {"output_format": "txt"}, max_workers=1)
+
+        # When
+        writer.save_when_done(a_retriever(service, "hash_1"), done((1, {"key": "value"})))
+        writer.save_when_done(a_retriever(service, "hash_2"), done((2, {})))
+        writer.close("func", "folder")
+
+        # Then
+        second_event_time = NOW.replace(microsecond=1)
+        service.save_result.assert_any_call("func", 1, "folder", "txt", "hash_1", NOW)
+        service.save_result.assert_any_call("func", 2, "folder", "txt", "hash_2", second_event_time)
+        service.save_success_metadata.assert_any_call(
+            func_name="func",
+            output_folder="folder",
+            hashed_arguments="hash_1",
+            event_time=NOW,
+            result_path="path_hash_1",
+            result_type="int",
+            extra_metadata={"key": "value"},
+            update_index=False,
+        )
+        service.cache_result.assert_any_call("func", "folder", "hash_1", 1, NOW)
+        service.add_to_index.assert_called_once_with("func", "folder", ["hash_1", "hash_2"])
+
+    def test_should_save_failed_metadata(self, service: MagicMock) -> None:
+        # Given
+        writer = BatchWriter(service, {}, max_workers=1)
+
+        # When
+        writer.save_when_done(a_retriever(service, "hash_1"), done(error=ResnapError("resnap error", {"a": 1})))
+        writer.save_when_done(a_retriever(service, "hash_2"), done(error=ValueError("value error")))
+        writer.close("func", "folder")
+
+        # Then
+        service.save_failed_metadata.assert_any_call(
+            func_name="func",
+            output_folder="folder",
+            hashed_arguments="hash_1",
+            event_time=NOW,
+            error_message="resnap error",
+            data={"a": 1},
+            extra_metadata={},
+            update_index=False,
+        )
+        assert service.save_failed_metadata.call_args.kwargs["data"] == {}
+        service.save_result.assert_not_called()
+        service.add_to_index.assert_called_once_with("func", "folder", ["resnap error", "value error"])
+
+    def test_should_not_save_cancelled_computations(self, service: MagicMock) -> None:
+        # Given
+        writer = BatchWriter(service, {})
+        computation: Future = Future()
+
+        # When
+        writer.save_when_done(a_retriever(service, "hash_1"), computation)
+        computation.cancel()
+        writer.close("func", "folder")
+
+        # Then
+        service.save_result.assert_not_called()
+        service.add_to_index.assert_called_once_with("func", "folder", [])
+
+    def test_should_log_failed_saves(self, service: MagicMock, caplog: pytest.LogCaptureFixture) -> None:
+        # Given
+        writer = BatchWriter(service, {}, max_workers=1)
+        service.save_result.side_effect = [OSError("disk full"), ("path", NOW)]
+
+        # When
+        writer.save_when_done(a_retriever(service, "hash_1"), done((1, {})))
+        writer.save_when_done(a_retriever(service, "hash_2"), done((2, {})))
+        writer.close("func", "folder")
+
+        # Then
+        assert "Save of a result of func failed" in caplog.text
+        service.add_to_index.assert_called_once_with("func", "folder", ["hash_2"])
@@ -0,0 +1,68 @@
+import gzip
+import io
+
+import pyarrow as pa
+import pytest
+
+from resnap.helpers.compression import (
+    compress_bytes,
+    compress_stream,
+    decompress_bytes,
+    decompress_stream,
+    read_decompressed,
+)
+from resnap.helpers.config import FileCompression
+
+DATA = b"toto" * 10_000
+
+
+@pytest.mark.parametrize("compression", list(FileCompression))
+def test_should_decompress_compressed_bytes(compression: FileCompression) -> None:
+    # Given
+    compressed = compress_bytes(DATA, compression)
+
+    # When
+    with decompress_stream(io.BytesIO(compressed), compression) as stream:
+        result = stream.read()
+
+    # Then
+    assert result == DATA
+    assert decompress_bytes(compressed, compression) == DATA
+    assert bytes(read_decompressed(io.BytesIO(compressed), compression)) == DATA
+
+
+@pytest.mark.parametrize("compression", [FileCompression.ZSTD, FileCompression.LZ4, FileCompression.GZIP])
+def test_should_compress_data_written_in_chunks(compression: FileCompression) -> None:
+    # Given
+    sink = pa.BufferOutputStream()
+
+    # When
+    with compress_stream(sink, compression) as stream:
+        for start in range(0, len(DATA), 4_000):
+            stream.write(DATA[start:start + 4_000])
+    compressed = sink.getvalue().to_pybytes()
+
+    # Then
+    assert len(compressed) < len(DATA) / 10
+    assert decompress_bytes(compressed, compression) == DATA
+
+
+def test_should_write_gzip_frames_readable_by_gzip() -> None:
+    # When
+    compressed = compress_bytes(DATA, FileCompression.GZIP)
+
+    # Then
+    assert gzip.decompress(compressed) == DATA
+
+
+def test_should_return_the_file_without_compression() -> None:
+    # Given
+    file = io.BytesIO(DATA)
+
+    # When / Then
+    assert compress_stream(file, FileCompression.NONE) is file
+    assert decompress_stream(file, FileCompression.NONE) is file
+    assert compress_bytes(DATA, FileCompression.NONE) is DATA
+    read = read_decompressed(file, FileCompression.NONE)
+    assert not read.readonly
+    assert bytes(read) == DATA
@@ -5,7 +5,13 @@ from zoneinfo import ZoneInfo
 import pytest
 from pydantic import ValidationError
 
-from resnap.helpers.config import Config, Services
+from resnap.helpers.config import (
+    ArrowCompression,
+    Config,
+    FileCompression,
+    ParquetCompression,
+    Services,
+)
 
 
 class TestServices:
@@ -78,6 +84,127 @@ class TestConfig:
                 },
                 id="wrong timezone type",
             ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "layout": "test",
+                },
+                id="wrong layout value",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "memory_cache_max_bytes": -1,
+                },
+                id="negative memory cache size",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "cleanup_interval_seconds": -1,
+                },
+                id="negative cleanup interval",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "async_max_workers": 0,
+                },
+                id="no async worker",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "single_flight_timeout_seconds": 0,
+                },
+                id="no single flight wait",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "lease_ttl_seconds": 0,
+                },
+                id="no lease ttl",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "lease_poll_interval_seconds": -1,
+                },
+                id="negative lease poll interval",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "write_behind_max_workers": 0,
+                },
+                id="no write-behind worker",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "write_behind_max_pending": 0,
+                },
+                id="no write-behind slot",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "parquet_compression": "brotli",
+                },
+                id="unknown parquet compression",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "parquet_compression": "snappy",
+                    "compression_level": 3,
+                },
+                id="compression level without support",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "parquet_row_group_size": 0,
+                },
+                id="empty parquet row groups",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "arrow_compression": "gzip",
+                },
+                id="unknown arrow compression",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "file_compression": "snappy",
+                },
+                id="unknown file compression",
+            ),
+            pytest.param(
+                {
+                    "enabled": True,
+                    "save_to": Services.LOCAL,
+                    "hash_algorithm": "md5",
+                },
+                id="unknown hash algorithm",
+            ),
         ],
     )
     def test_should_failed_with_wrong_config(self, config: dict[str, Any]) -> None:
@@ -85,6 +212,14 @@ class TestConfig:
         with pytest.raises(ValueError):
             Config(**config)
 
+    def test_should_raise_if_hash_algorithm_is_not_available(self, mocker) -> None:
+        # Given
+        mocker.patch("resnap.helpers.hashing.importlib.util.find_spec", return_value=None)
+
+        # When / Then
+        with pytest.raises(ValidationError, match="the xxhash package is required to use the xxh3_128 hash algorithm"):
+            Config(enabled=True, hash_algorithm="xxh3_128")
+
     def test_should_not_raise_if_not_enabled_and_save_to_is_not_local(self) -> None:
         # Given
         input_config = {"enabled": False, "save_to": Services.S3}
@@ -114,6 +249,27 @@ class TestConfig:
             "max_history_files_length": 5,
             "max_history_files_time_unit": "day",
             "timezone": None,
+            "layout": "hashed",
+            "memory_cache_max_bytes": 1024,
+            "memory_cache_policy": "lfu",
+            "cleanup_interval_seconds": 0,
+            "cleanup_in_background": True,
+            "hash_algorithm": "blake2b",
+            "hash_memo": True,
+            "async_max_workers": 8,
+            "async_native_io": True,
+            "single_flight": False,
+            "single_flight_timeout_seconds": 30.0,
+            "lease_ttl_seconds": 120.0,
+            "lease_poll_interval_seconds": 0.5,
+            "write_behind_max_workers": 4,
+            "write_behind_max_pending": 16,
+            "parquet_compression": ParquetCompression.ZSTD,
+            "parquet_row_group_size": 10000,
+            "compression_level": 6,
+            "arrow_compression": ArrowCompression.LZ4,
+            "file_compression": FileCompression.ZSTD,
+            "mmap_arrays": True,
         }
 
         # When
@@ -122,6 +278,14 @@ class TestConfig:
         # Then
         assert input_config == config.model_dump()
 
+    def test_should_save_dataframes_with_gzip_by_default(self) -> None:
+        # When
+        config = Config(enabled=True)
+
+        # Then
+        assert config.parquet_compression == ParquetCompression.GZIP
+        assert config.parquet_compression.extension == "parquet.gz"
+
     @pytest.mark.parametrize(
         "input_timezone, expected_timezone",
         [
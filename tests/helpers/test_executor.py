@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resnap.helpers.context import (
+    add_metadata,
+    clear_metadata,
+    get_metadata,
+    restore_metadata,
+)
+from resnap.helpers.executor import (
+    get_async_executor,
+    run_in_executor,
+    set_async_executor,
+)
+
+
+def test_should_create_default_thread_pool_once() -> None:
+    # When
+    executor = get_async_executor(3)
+
+    # Then
+    assert isinstance(executor, ThreadPoolExecutor)
+    assert executor._max_workers == 3
+    assert get_async_executor(5) is executor
+
+
+def test_should_use_custom_executor() -> None:
+    # Given
+    custom_executor = ThreadPoolExecutor(max_workers=1)
+
+    # When
+    set_async_executor(custom_executor)
+
+    # Then
+    assert get_async_executor(3) is custom_executor
+    custom_executor.shutdown()
+
+
+def test_should_reset_to_default_executor() -> None:
+    # Given
+    custom_executor = ThreadPoolExecutor(max_workers=1)
+    set_async_executor(custom_executor)
+
+    # When
+    set_async_executor(None)
+
+    # Then
+    assert get_async_executor(3) is not custom_executor
+    custom_executor.shutdown()
+
+
+def test_should_not_set_other_objects_as_executor() -> None:
+    # When / Then
+    with pytest.raises(TypeError, match="Expected Executor"):
+        set_async_executor("executor")
+
+
+@pytest.mark.asyncio
+async def test_should_run_function_off_the_event_loop_with_the_caller_context() -> None:
+    # Given
+    token = clear_metadata()
+    add_metadata("key", "value")
+
+    def read_context(suffix: str, separator: str = "-") -> tuple[str, dict]:
+        return f"{threading.current_thread().name}{separator}{suffix}", get_metadata()
+
+    # When
+    thread_name, metadata = await run_in_executor(get_async_executor(1), read_context, "end", separator="_")
+
+    # Then
+    assert thread_name.startswith("resnap-async")
+    assert thread_name.endswith("_end")
+    assert metadata == {"key": "value"}
+    restore_metadata(token)
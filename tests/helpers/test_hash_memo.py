@@ -0,0 +1,218 @@
+import gc
+import weakref
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from resnap.helpers.hash_memo import (
+    MEMO_MIN_BYTES,
+    HashMemo,
+    fingerprint,
+    freeze,
+    hash_memo,
+)
+
+
+@pytest.fixture
+def large_array() -> np.ndarray:
+    return np.arange(MEMO_MIN_BYTES // 8, dtype=np.float64)
+
+
+@pytest.fixture
+def large_dataframe() -> pd.DataFrame:
+    return pd.DataFrame({"a": np.arange(MEMO_MIN_BYTES // 8), "b": "x"})
+
+
+class TestFingerprint:
+    def test_should_change_when_a_sampled_value_changes(self, large_array: np.ndarray) -> None:
+        # Given
+        before = fingerprint(large_array)
+
+        # When
+        large_array[-1] = -1.0
+
+        # Then
+        assert fingerprint(large_array) != before
+
+    def test_should_change_when_a_sampled_row_of_a_dataframe_changes(self, large_dataframe: pd.DataFrame) -> None:
+        # Given
+        before = fingerprint(large_dataframe)
+
+        # When
+        large_dataframe.loc[0, "b"] = "y"
+
+        # Then
+        assert fingerprint(large_dataframe) != before
+        assert fingerprint(large_dataframe) == fingerprint(large_dataframe)
+
+    def test_should_depend_on_column_names(self) -> None:
+        # When
+        first = fingerprint(pd.DataFrame({"a": [1]}))
+        second = fingerprint(pd.DataFrame({"b": [1]}))
+
+        # Then
+        assert first != second
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            np.array([[1], "a"], dtype=object),
+            pd.Series([[1], [2]]),
+        ],
+    )
+    def test_should_not_fingerprint_objects(self, value: np.ndarray | pd.Series) -> None:
+        # When
+        result = fingerprint(value)
+
+        # Then
+        assert result is None
+
+
+class TestHashMemo:
+    def test_should_reuse_digest_while_fingerprint_is_unchanged(self, large_array: np.ndarray) -> None:
+        # Given
+        memo = HashMemo()
+        digest, value_fingerprint = memo.get(large_array, "sha256", True)
+        memo.put(large_array, "sha256", b"digest", value_fingerprint)
+
+        # When
+        reused = memo.get(large_array, "sha256", True)
+        other_algorithm = memo.get(large_array, "blake2b", True)
+        large_array[0] = -1.0
+        changed = memo.get(large_array, "sha256", True)
+
+        # Then
+        assert digest is None
+        assert reused == (b"digest", value_fingerprint)
+        assert other_algorithm == (None, value_fingerprint)
+        assert changed == (None, fingerprint(large_array))
+
+    def test_should_memoize_large_dataframe(self, large_dataframe: pd.DataFrame) -> None:
+        # Given
+        memo = HashMemo()
+
+        # When
+        digest, value_fingerprint = memo.get(large_dataframe, "sha256", True)
+
+        # Then
+        assert digest is None
+        assert value_fingerprint == fingerprint(large_dataframe)
+
+    def test_should_replace_digests_when_fingerprint_changes(self, large_array: np.ndarray) -> None:
+        # Given
+        memo = HashMemo()
+        memo.put(large_array, "sha256", b"old", b"old fingerprint")
+        memo.put(large_array, "blake2b", b"old", b"old fingerprint")
+
+        # When
+        memo.put(large_array, "sha256", b"new", b"new fingerprint")
+
+        # Then
+        assert memo._entries[id(large_array)].digests == {"sha256": b"new"}
+
+    @pytest.mark.parametrize(
+        "value, enabled",
+        [
+            (np.arange(10), True),
+            (np.arange(MEMO_MIN_BYTES), False),
+            ([1, 2, 3], True),
+            (np.array([None] * MEMO_MIN_BYTES, dtype=object), True),
+        ],
+    )
+    def test_should_not_memoize(self, value: object, enabled: bool) -> None:
+        # Given
+        memo = HashMemo()
+
+        # When
+        digest, value_fingerprint = memo.get(value, "sha256", enabled)
+        memo.put(value, "sha256", b"digest", value_fingerprint)
+
+        # Then
+        assert digest is None
+        assert value_fingerprint is None
+        assert len(memo) == 0
+
+    def test_should_always_reuse_digest_of_frozen_objects(self) -> None:
+        # Given
+        memo = HashMemo()
+        value = pd.DataFrame({"a": [1, 2]})
+        memo.freeze(value)
+        first = memo.get(value, "sha256", False)
+        memo.put(value, "sha256", b"digest", None)
+
+        # When
+        value.loc[0, "a"] = 3
+        second = memo.get(value, "sha256", False)
+
+        # Then
+        assert first == (None, None)
+        assert second == (b"digest", None)
+
+    def test_should_not_freeze_other_objects(self) -> None:
+        # When / Then
+        with pytest.raises(TypeError, match="list can not be frozen"):
+            HashMemo().freeze([1, 2])
+
+    def test_should_evict_entries_of_garbage_collected_objects(self) -> None:
+        # Given
+        memo = HashMemo()
+        value = np.arange(10)
+        memo.freeze(value)
+
+        # When
+        del value
+        gc.collect()
+
+        # Then
+        assert len(memo) == 0
+
+    def test_should_not_evict_new_entry_with_the_id_of_a_dead_object(self) -> None:
+        # Given
+        memo = HashMemo()
+        value = np.arange(10)
+        memo.freeze(value)
+
+        # When
+        memo._evict(id(value), weakref.ref(np.arange(2)))
+
+        # Then
+        assert len(memo) == 1
+
+    def test_should_not_return_entry_of_another_object_with_the_same_id(self) -> None:
+        # Given
+        memo = HashMemo()
+        value = np.arange(10)
+        other = np.arange(10)
+        memo.freeze(other)
+        memo._entries[id(value)] = memo._entries.pop(id(other))
+
+        # When
+        result = memo.get(value, "sha256", True)
+
+        # Then
+        assert result == (None, None)
+
+    def test_should_clear_entries(self) -> None:
+        # Given
+        memo = HashMemo()
+        value = np.arange(10)
+        memo.freeze(value)
+
+        # When
+        memo.clear()
+
+        # Then
+        assert len(memo) == 0
+
+
+def test_should_freeze_and_return_object() -> None:
+    # Given
+    value = np.arange(10)
+
+    # When
+    result = freeze(value)
+
+    # Then
+    assert result is value
+    assert hash_memo._entries[id(value)].frozen
@@ -0,0 +1,285 @@
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from enum import Enum, IntEnum
+from typing import Any
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from resnap.helpers import hashing
+from resnap.helpers.hash_memo import MEMO_MIN_BYTES, freeze
+from resnap.helpers.hashing import (
+    ArgumentHasher,
+    HashAlgorithm,
+    is_algorithm_available,
+    new_hash_object,
+    register_hasher,
+)
+from resnap.helpers.lazy import LazyResult
+from resnap.helpers.utils import hash_arguments
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Level(IntEnum):
+    LOW = 1
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class Vector:
+    def __init__(self, x: int, y: int) -> None:
+        self.x = x
+        self.y = y
+
+
+class Opaque:
+    __slots__ = ("value",)
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+
+def hash_value(value: Any) -> str:
+    hasher = ArgumentHasher()
+    hasher.update(value)
+    return hasher.hexdigest()
+
+
+class TestArgumentHasher:
+    @pytest.mark.parametrize(
+        "first, second",
+        [
+            pytest.param({"a": 1, "b": 2}, {"b": 2, "a": 1}, id="dict order"),
+            pytest.param({"a": (1, 2), 3: [4]}, {3: [4], "a": (1, 2)}, id="dict order with mixed keys"),
+            pytest.param({"x", "y", "z"}, {"z", "y", "x"}, id="set order"),
+            pytest.param(
+                pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}),
+                pd.DataFrame({"b": ["x", "y"], "a": [1, 2]}),
+                id="dataframe column order",
+            ),
+        ],
+    )
+    def test_should_not_depend_on_order_of_unordered_values(self, first: Any, second: Any) -> None:
+        assert hash_value(first) == hash_value(second)
+
+    @pytest.mark.parametrize(
+        "first, second",
+        [
+            pytest.param(1, True, id="int and bool"),
+            pytest.param(1, 1.0, id="int and float"),
+            pytest.param("1", 1, id="str and int"),
+            pytest.param(b"a", "a", id="bytes and str"),
+            pytest.param([1, 2], (1, 2), id="list and tuple"),
+            pytest.param(["a", "b"], ["ab"], id="list items"),
+            pytest.param([Vector(1, 2)], [Vector(1, 3)], id="list of objects"),
+            pytest.param({(1, 2): 3}, {(1, 2): 4}, id="dict with tuple keys"),
+            pytest.param({1: "x"}, {"1": "x"}, id="int and str keys"),
+            pytest.param({None: "x"}, {"null": "x"}, id="none and str keys"),
+            pytest.param([(1, 2)], [[1, 2]], id="nested tuple and list"),
+            pytest.param({"a": (1, 2)}, {"a": [1, 2]}, id="tuple and list values"),
+            pytest.param([Level.LOW], [1], id="int enum and int"),
+            pytest.param({"a": [{2: "x"}]}, {"a": [{"2": "x"}]}, id="deeply nested keys"),
+            pytest.param(Point(1, 2), Vector(1, 2), id="dataclass and object"),
+            pytest.param(Color.RED, "red", id="enum and value"),
+            pytest.param(np.array([1, 2], dtype=np.int64), np.array([1, 2], dtype=np.int32), id="array dtype"),
+            pytest.param(np.zeros((2, 3)), np.zeros((3, 2)), id="array shape"),
+            pytest.param(
+                pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [1.0, 2.0]}), id="dataframe dtype"
+            ),
+            pytest.param(pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [2, 1]}), id="dataframe values"),
+            pytest.param(
+                pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [1, 2]}, index=[5, 6]), id="dataframe index"
+            ),
+            pytest.param(pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"b": [1, 2]}), id="dataframe columns"),
+            pytest.param(pd.Series([1, 2], name="a"), pd.Series([1, 2], name="b"), id="series name"),
+            pytest.param(Opaque(1), Opaque(2), id="object without attributes"),
+        ],
+    )
+    def test_should_hash_different_values_differently(self, first: Any, second: Any) -> None:
+        assert hash_value(first) != hash_value(second)
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            None,
+            np.float64(1.5),
+            np.array([[1, 2], [3, 4]])[:, 0],
+            np.array([{"a": 1}, None], dtype=object),
+            pd.Index(["a", "b"]),
+            pd.DataFrame({"a": [[1], [2, 3]], "b": [{"x": 1}, {"y": 2}]}),
+            memoryview(b"abc"),
+            bytearray(b"abc"),
+        ],
+    )
+    def test_should_hash_supported_values_deterministically(self, value: Any) -> None:
+        assert hash_value(value) == hash_value(value)
+
+    @pytest.mark.parametrize(
+        "value, expected_calls",
+        [
+            pytest.param({"a": [1, 2.5, None, {"b": True}]}, 1, id="json tree"),
+            pytest.param({1: "x"}, 0, id="int keys"),
+            pytest.param([(1, 2)], 1, id="tuple serialized on its own"),
+            pytest.param([Level.LOW], 0, id="int enum"),
+        ],
+    )
+    def test_should_serialize_only_json_trees_with_json(self, mocker, value: Any, expected_calls: int) -> None:
+        # Given
+        dumps = mocker.spy(hashing.json, "dumps")
+
+        # When
+        hash_value(value)
+
+        # Then
+        assert dumps.call_count == expected_calls
+
+    def test_should_hash_dataframe_from_its_buffers(self, mocker) -> None:
+        # Given
+        df = pd.DataFrame({"a": np.arange(1000), "b": np.random.default_rng(0).random(1000)})
+        mock_to_dict = mocker.patch.object(pd.DataFrame, "to_dict")
+
+        # When
+        result = hash_value(df)
+
+        # Then
+        assert result == hash_value(df.copy())
+        mock_to_dict.assert_not_called()
+
+    def test_should_use_registered_hasher(self) -> None:
+        # Given
+        class Model:
+            def __init__(self, name: str, weights: list[float]) -> None:
+                self.name = name
+                self.weights = weights
+
+        register_hasher(Model, lambda value, hasher: hasher.update(value.name))
+
+        # When
+        first = hash_value(Model("model", [1.0]))
+        second = hash_value(Model("model", [2.0]))
+
+        # Then
+        assert first == second
+        assert first != hash_value(Model("other", [1.0]))
+
+    def test_should_hash_lazy_result_with_its_key(self) -> None:
+        # Given
+        load = MagicMock(return_value=pd.DataFrame({"a": [1]}))
+        lazy_result = LazyResult(("func", "folder", "hash"), load)
+
+        # When
+        result = hash_value(lazy_result)
+
+        # Then
+        assert result == hash_value(LazyResult.of(("func", "folder", "hash"), pd.DataFrame({"a": [2]})))
+        assert result != hash_value(LazyResult(("func", "folder", "other"), load))
+        assert result != hash_value(("func", "folder", "hash"))
+        load.assert_not_called()
+
+    def test_should_be_stable_across_processes(self) -> None:
+        # Given
+        code = (
+            "import pandas as pd\n"
+            "from resnap.helpers.utils import hash_arguments\n"
+            "print(hash_arguments({'a': {'x', 'y', 'z'}, 'b': {('k', 1): 'v'}, 'c': pd.DataFrame({'s': ['x', 'y']})}))"
+        )
+        expected = hash_arguments(
+            {"a": {"x", "y", "z"}, "b": {("k", 1): "v"}, "c": pd.DataFrame({"s": ["x", "y"]})}
+        )
+
+        # When
+        results = {
+            subprocess.run(
+                [sys.executable, "-c", code],
+                capture_output=True,
+                text=True,
+                check=True,
+                env={**os.environ, "PYTHONHASHSEED": seed, "PYTHONPATH": os.getcwd()},
+            ).stdout.strip()
+            for seed in ("1", "2")
+        }
+
+        # Then
+        assert results == {expected}
+
+
+class TestNewHashObject:
+    @pytest.mark.parametrize(
+        "algorithm, expected_length",
+        [
+            (HashAlgorithm.SHA256, 64),
+            (HashAlgorithm.BLAKE2B, 64),
+            pytest.param(
+                HashAlgorithm.XXH3_128,
+                32,
+                marks=pytest.mark.skipif(not is_algorithm_available(HashAlgorithm.XXH3_128), reason="needs xxhash"),
+            ),
+        ],
+    )
+    def test_should_hash_arguments_with_algorithm(self, algorithm: HashAlgorithm, expected_length: int) -> None:
+        # When
+        result = hash_arguments({"a": 1}, algorithm)
+
+        # Then
+        assert len(result) == expected_length
+        assert result == hash_arguments({"a": 1}, algorithm)
+        assert result != hash_arguments({"a": 2}, algorithm)
+
+    def test_should_hash_differently_with_each_algorithm(self) -> None:
+        # When
+        results = {hash_arguments({"a": 1}, algorithm) for algorithm in (HashAlgorithm.SHA256, HashAlgorithm.BLAKE2B)}
+
+        # Then
+        assert len(results) == 2
+
+    def test_should_raise_if_xxhash_is_not_installed(self, mocker) -> None:
+        # Given
+        mocker.patch("resnap.helpers.hashing.importlib.util.find_spec", return_value=None)
+
+        # When / Then
+        with pytest.raises(ImportError, match="Please install xxhash"):
+            new_hash_object(HashAlgorithm.XXH3_128)
+
+
+class TestHashMemoization:
+    def test_should_hash_frozen_dataframe_once(self, mocker) -> None:
+        # Given
+        df = freeze(pd.DataFrame({"a": np.arange(1000), "b": np.random.default_rng(0).random(1000)}))
+        expected = hash_arguments({"df": df.copy()})
+        spy = mocker.spy(pd.util, "hash_pandas_object")
+
+        # When
+        first = hash_arguments({"df": df})
+        second = hash_arguments({"df": df, "x": 1})
+
+        # Then
+        assert first == expected
+        assert second != first
+        assert spy.call_count == 3  # the index and the two columns, on the first call only
+
+    def test_should_reuse_digest_of_unchanged_large_array(self, mocker) -> None:
+        # Given
+        array = np.random.default_rng(0).random(MEMO_MIN_BYTES // 8)
+        expected = hash_arguments({"array": array.copy()})
+        write_ndarray = mocker.spy(hashing, "_write_ndarray")
+
+        # When
+        first = hash_arguments({"array": array}, memo=True)
+        second = hash_arguments({"array": array}, memo=True)
+        array[0] = -1.0
+        third = hash_arguments({"array": array}, memo=True)
+
+        # Then
+        assert first == second == expected != third
+        assert write_ndarray.call_count == 2
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+from resnap.helpers.index import INDEX_VERSION, MetadataIndex
+from tests.builders.metadata_builder import MetadataFailBuilder, MetadataSuccessBuilder
+
+
+class TestMetadataIndex:
+    def test_should_keep_latest_success_for_each_arguments(self) -> None:
+        # Given
+        old = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).with_result_path("old").build()
+        other = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_arguments({"a": 2})
+            .with_event_time(datetime.fromisoformat("2021-01-02T00:00:00"))
+            .build()
+        )
+        new = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_arguments({"a": 1})
+            .with_event_time(datetime.fromisoformat("2021-01-03T00:00:00"))
+            .with_result_path("new")
+            .build()
+        )
+
+        # When
+        index = MetadataIndex.from_metadata([old, other, new])
+
+        # Then
+        assert index.get(new.hashed_arguments) == new
+        assert index.get(other.hashed_arguments) == other
+        assert index.get() == new
+        assert index.latest == new.hashed_arguments
+
+    def test_should_not_return_failed_metadata(self) -> None:
+        # Given
+        metadata = MetadataFailBuilder.a_metadata().with_arguments({"a": 1}).with_error_message("error").build()
+
+        # When
+        index = MetadataIndex.from_metadata([metadata])
+
+        # Then
+        assert index.get(metadata.hashed_arguments) is None
+        assert index.get() is None
+        assert index.fail == {metadata.hashed_arguments: metadata.to_dict()}
+
+    def test_should_serialize_index(self) -> None:
+        # Given
+        success = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        fail = MetadataFailBuilder.a_metadata().with_arguments({"a": 2}).build()
+        index = MetadataIndex.from_metadata([success, fail])
+
+        # When
+        data = index.to_dict()
+
+        # Then
+        assert data == {
+            "version": INDEX_VERSION,
+            "latest": success.hashed_arguments,
+            "success": {success.hashed_arguments: success.to_dict()},
+            "fail": {fail.hashed_arguments: fail.to_dict()},
+        }
+        assert MetadataIndex.from_dict(data) == index
+
+    def test_should_not_load_index_with_other_version(self) -> None:
+        # When
+        index = MetadataIndex.from_dict({"version": INDEX_VERSION + 1, "success": {}})
+
+        # Then
+        assert index is None
+
+    def test_should_prune_expired_entries(self) -> None:
+        # Given
+        expired_success = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        expired_fail = MetadataFailBuilder.a_metadata().with_arguments({"a": 1}).build()
+        kept = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_arguments({"a": 2})
+            .with_event_time(datetime.fromisoformat("2021-01-03T00:00:00"))
+            .build()
+        )
+        latest = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_arguments({"a": 3})
+            .with_event_time(datetime.fromisoformat("2021-01-02T00:00:00"))
+            .build()
+        )
+        index = MetadataIndex.from_metadata([kept, expired_success, expired_fail, latest])
+        index.latest = expired_success.hashed_arguments
+
+        # When
+        pruned = index.prune(datetime.fromisoformat("2021-01-02T00:00:00"))
+
+        # Then
+        assert pruned is True
+        assert index.get(expired_success.hashed_arguments) is None
+        assert index.fail == {}
+        assert index.get() == kept
+
+    def test_should_not_prune_recent_entries(self) -> None:
+        # Given
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        index = MetadataIndex.from_metadata([metadata])
+
+        # When
+        pruned = index.prune(datetime.fromisoformat("2020-01-01T00:00:00"))
+
+        # Then
+        assert pruned is False
+        assert index.get() == metadata
@@ -0,0 +1,242 @@
+import json
+import sys
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from resnap.helpers import json_codec
+from resnap.helpers.json_codec import (
+    JsonEngine,
+    MsgspecJsonEngine,
+    OrjsonEngine,
+    StdlibJsonEngine,
+    decode_json,
+    encode_json,
+    get_json_engine,
+    is_engine_available,
+)
+
+VALUE = {"status": "SUCCESS", "sizes": [1, 2.5, None, True], "extra_metadata": {"name": "é"}}
+
+
+class StrictEngine(JsonEngine):
+    """An engine rejecting what the strict JSON engines reject."""
+
+    name = "strict"
+
+    def _encode(self, value: Any) -> bytes:
+        raise TypeError("Integer exceeds 64-bit range")
+
+    def _decode(self, data: bytes | str) -> Any:
+        raise ValueError("NaN is not valid JSON")
+
+
+class StubDecodeError(ValueError):
+    """The error of the optional engines, all subclasses of ValueError."""
+
+
+@pytest.fixture
+def stub_orjson(mocker) -> MagicMock:
+    module = MagicMock(name="orjson")
+    mocker.patch.dict(sys.modules, {"orjson": module})
+    return module
+
+
+@pytest.fixture
+def stub_msgspec(mocker) -> MagicMock:
+    module = MagicMock(name="msgspec")
+    mocker.patch.dict(sys.modules, {"msgspec": module})
+    return module
+
+
+@pytest.fixture
+def clear_engine() -> None:
+    get_json_engine.cache_clear()
+    yield
+    get_json_engine.cache_clear()
+
+
+def new_engine(name: str) -> JsonEngine:
+    if not is_engine_available(name):
+        pytest.skip(f"needs {name}")
+    return {"orjson": OrjsonEngine, "msgspec": MsgspecJsonEngine, "json": StdlibJsonEngine}[name]()
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_should_encode_compact_json_and_decode_it(name: str) -> None:
+    # Given
+    engine = new_engine(name)
+
+    # When
+    data = engine.encode(VALUE)
+
+    # Then
+    assert isinstance(data, bytes)
+    assert data.startswith(b'{"status":"SUCCESS","sizes":[1,2.5,null,true],')
+    assert json.loads(data) == VALUE
+    assert engine.decode(data) == engine.decode(data.decode()) == VALUE
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_should_handle_values_only_valid_for_json_module(name: str) -> None:
+    # Given
+    engine = new_engine(name)
+
+    # When
+    data = engine.encode({1: 2**70, 2: float("nan"), 3: float("inf")})
+    decoded = engine.decode(b'{"a": NaN}')
+
+    # Then
+    assert data == b'{"1":1180591620717411303424,"2":NaN,"3":Infinity}'
+    assert decoded["a"] != decoded["a"]
+
+
+def test_should_fall_back_on_json_module() -> None:
+    # Given
+    engine = StrictEngine()
+
+    # When
+    data = engine.encode({"a": 2**70})
+    decoded = engine.decode(data)
+
+    # Then
+    assert data == b'{"a":1180591620717411303424}'
+    assert decoded == {"a": 2**70}
+
+
+def test_should_raise_json_decode_error_for_invalid_document() -> None:
+    # When / Then
+    with pytest.raises(json.JSONDecodeError):
+        StrictEngine().decode(b'{"a": ')
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+@pytest.mark.parametrize("data", [b'{"a": ', b'{"a": "\xff"}'], ids=["truncated", "invalid utf-8"])
+def test_should_raise_json_decode_error_with_each_engine(name: str, data: bytes) -> None:
+    # Given
+    engine = new_engine(name)
+
+    # When / Then
+    with pytest.raises(json.JSONDecodeError):
+        engine.decode(data)
+
+
+def test_should_encode_and_decode_with_orjson(stub_orjson: MagicMock) -> None:
+    # Given
+    engine = OrjsonEngine()
+    stub_orjson.dumps.return_value = b'{"a":1}'
+    stub_orjson.loads.return_value = {"a": 1}
+
+    # When
+    data = engine.encode({"a": 1})
+    decoded = engine.decode(data)
+
+    # Then
+    assert data == b'{"a":1}'
+    assert decoded == {"a": 1}
+    stub_orjson.dumps.assert_called_once_with({"a": 1}, option=stub_orjson.OPT_NON_STR_KEYS)
+    stub_orjson.loads.assert_called_once_with(b'{"a":1}')
+
+
+def test_should_reuse_msgspec_encoder_and_decoder(stub_msgspec: MagicMock) -> None:
+    # Given
+    engine = MsgspecJsonEngine()
+    encoder = stub_msgspec.json.Encoder.return_value
+    decoder = stub_msgspec.json.Decoder.return_value
+    encoder.encode.return_value = b'{"a":1}'
+    decoder.decode.return_value = {"a": 1}
+
+    # When
+    results = [engine.decode(engine.encode({"a": 1})) for _ in range(2)]
+
+    # Then
+    assert results == [{"a": 1}, {"a": 1}]
+    stub_msgspec.json.Encoder.assert_called_once_with()
+    stub_msgspec.json.Decoder.assert_called_once_with()
+    assert encoder.encode.call_count == decoder.decode.call_count == 2
+
+
+@pytest.mark.parametrize("engine_type", [OrjsonEngine, MsgspecJsonEngine])
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param({"a": float("nan")}, b'{"a":NaN}', id="nan"),
+        pytest.param({"a": [1.5, {"b": (float("-inf"),)}]}, b'{"a":[1.5,{"b":[-Infinity]}]}', id="nested infinity"),
+    ],
+)
+def test_should_encode_non_finite_floats_with_json_module(
+    stub_orjson: MagicMock, stub_msgspec: MagicMock, engine_type: type[JsonEngine], value: Any, expected: bytes,
+) -> None:
+    # Given
+    engine = engine_type()
+
+    # When
+    data = engine.encode(value)
+
+    # Then
+    assert data == expected
+    stub_orjson.dumps.assert_not_called()
+    stub_msgspec.json.Encoder.return_value.encode.assert_not_called()
+
+
+@pytest.mark.parametrize("engine_type", [OrjsonEngine, MsgspecJsonEngine])
+def test_should_encode_documents_with_null_with_engine(
+    stub_orjson: MagicMock, stub_msgspec: MagicMock, engine_type: type[JsonEngine]
+) -> None:
+    # Given
+    encoded = b'{"latest":null,"error":"null","sizes":[1.5]}'
+    stub_orjson.dumps.return_value = encoded
+    stub_msgspec.json.Encoder.return_value.encode.return_value = encoded
+    engine = engine_type()
+
+    # When
+    data = engine.encode({"latest": None, "error": "null", "sizes": [1.5]})
+
+    # Then
+    assert data == encoded
+
+
+@pytest.mark.parametrize("engine_type", [OrjsonEngine, MsgspecJsonEngine])
+def test_should_fall_back_on_json_module_for_errors_of_optional_engines(
+    stub_orjson: MagicMock, stub_msgspec: MagicMock, engine_type: type[JsonEngine]
+) -> None:
+    # Given
+    stub_orjson.dumps.side_effect = TypeError("Integer exceeds 64-bit range")
+    stub_orjson.loads.side_effect = StubDecodeError("unexpected character")
+    stub_msgspec.json.Encoder.return_value.encode.side_effect = TypeError("Integer exceeds 64-bit range")
+    stub_msgspec.json.Decoder.return_value.decode.side_effect = StubDecodeError("JSON is malformed")
+    engine = engine_type()
+
+    # When
+    data = engine.encode({"a": 2**70})
+    decoded = engine.decode(b'{"a": NaN}')
+
+    # Then
+    assert data == b'{"a":1180591620717411303424}'
+    assert decoded["a"] != decoded["a"]
+    with pytest.raises(json.JSONDecodeError):
+        engine.decode(b'{"a": ')
+
+
+@pytest.mark.usefixtures("clear_engine")
+def test_should_use_first_available_engine(mocker) -> None:
+    # Given
+    mocker.patch.object(json_codec, "is_engine_available", side_effect=lambda name: name == "json")
+
+    # When
+    engine = get_json_engine()
+
+    # Then
+    assert isinstance(engine, StdlibJsonEngine)
+    assert get_json_engine() is engine
+    assert decode_json(encode_json(VALUE)) == VALUE
+
+
+def test_should_check_if_engine_is_available(mocker) -> None:
+    # Given
+    mocker.patch("resnap.helpers.json_codec.importlib.util.find_spec", return_value=None)
+
+    # When / Then
+    assert is_engine_available("json")
+    assert not is_engine_available("orjson")
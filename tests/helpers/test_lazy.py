@@ -0,0 +1,101 @@
+import copy
+import pickle
+import threading
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from resnap.helpers.lazy import LazyResult
+
+KEY = ("func", "folder", "hash")
+
+
+def test_should_not_read_result_until_used() -> None:
+    # Given
+    load = MagicMock(return_value=pd.DataFrame({"a": [1, 2, 3]}))
+    lazy_result = LazyResult(KEY, load)
+
+    # When
+    representation = repr(lazy_result)
+    shape = lazy_result.shape
+    total = lazy_result["a"].sum()
+
+    # Then
+    assert representation == "<LazyResult of func (not loaded)>"
+    assert shape == (3, 1) and total == 6
+    assert lazy_result.is_loaded
+    assert repr(lazy_result) == repr(lazy_result.value)
+    load.assert_called_once()
+
+
+def test_should_read_result_once_across_threads() -> None:
+    # Given
+    load = MagicMock(return_value=[1, 2])
+    lazy_result = LazyResult(KEY, load)
+
+    # When
+    threads = [threading.Thread(target=lambda: lazy_result.value) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    load.assert_called_once()
+
+
+def test_should_not_read_wrapped_result() -> None:
+    # When
+    lazy_result = LazyResult.of(KEY, 3)
+
+    # Then
+    assert lazy_result.is_loaded
+    assert lazy_result.value == 3
+
+
+def test_should_forward_operators_to_result() -> None:
+    # Given
+    number = LazyResult.of(KEY, 6)
+    array = LazyResult.of(KEY, np.array([1, 2]))
+    items = LazyResult.of(KEY, {"a": 1})
+
+    # Then
+    assert (number + 1, 1 + number, number - 1, 8 - number, number * 2, number / 4, 13 // number) == (
+        7, 7, 5, 2, 12, 1.5, 2,
+    )
+    assert (number % 4, 2 ** number, number & 3, 3 | number, number ^ 1, -number, +number, abs(number), ~number) == (
+        2, 64, 2, 7, 7, -6, 6, 6, -7,
+    )
+    assert number == 6 and number != 5 and 5 < number <= 6 and 7 > number >= 6
+    assert (array @ np.array([1, 1])) == 3
+    assert bool(number) and str(number) == "6" and hash(number) == hash(6)
+    assert len(items) == 1 and "a" in items and list(items) == ["a"] and items["a"] == 1
+    assert LazyResult.of(KEY, len)("abc") == 3
+
+
+def test_should_pickle_and_copy_its_result() -> None:
+    # Given
+    lazy_result = LazyResult(KEY, lambda: {"a": [1]})
+
+    # When
+    unpickled = pickle.loads(pickle.dumps(lazy_result))
+    copied = copy.deepcopy(lazy_result)
+
+    # Then
+    assert unpickled == copied == {"a": [1]}
+    assert type(unpickled) is type(copied) is dict
+
+
+@pytest.mark.parametrize(
+    "lazy_result, name",
+    [
+        pytest.param(LazyResult.of(KEY, 3), "missing", id="attribute of result"),
+        pytest.param(LazyResult.__new__(LazyResult), "value", id="proxy not initialized"),
+    ],
+)
+def test_should_raise_attribute_error(lazy_result: LazyResult, name: str) -> None:
+    # When / Then
+    with pytest.raises(AttributeError):
+        getattr(lazy_result, name)
@@ -0,0 +1,57 @@
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from resnap.helpers.lease import Lease, new_lease_owner
+
+
+def test_should_create_unique_lease_owners() -> None:
+    # When
+    owners = {new_lease_owner() for _ in range(10)}
+
+    # Then
+    assert len(owners) == 10
+    assert all(f":{os.getpid()}:" in owner for owner in owners)
+
+
+class TestLease:
+    def test_should_renew_lease_until_released(self) -> None:
+        # Given
+        renewed = threading.Event()
+        renew = MagicMock(side_effect=lambda: renewed.set() or True)
+        release = MagicMock()
+
+        # When
+        with Lease(renew, release, ttl_seconds=0.03) as lease:
+            assert renewed.wait(1)
+
+        # Then
+        assert not lease._heartbeat.is_alive()
+        release.assert_called_once()
+
+    def test_should_stop_renewing_a_lost_lease(self, caplog: pytest.LogCaptureFixture) -> None:
+        # Given
+        renew = MagicMock(return_value=False)
+
+        # When
+        lease = Lease(renew, MagicMock(), ttl_seconds=0.03)
+        lease._heartbeat.join(1)
+
+        # Then
+        assert not lease._heartbeat.is_alive()
+        renew.assert_called_once()
+        assert "taken over by another process" in caplog.text
+
+    def test_should_keep_renewing_after_a_failed_renewal(self, caplog: pytest.LogCaptureFixture) -> None:
+        # Given
+        renew = MagicMock(side_effect=[OSError("boom"), False])
+
+        # When
+        lease = Lease(renew, MagicMock(), ttl_seconds=0.03)
+        lease._heartbeat.join(1)
+
+        # Then
+        assert renew.call_count == 2
+        assert "Renewal of the compute lease failed" in caplog.text
@@ -0,0 +1,263 @@
+import asyncio
+import sys
+import threading
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from resnap.helpers.memory_cache import EvictionPolicy, MemoryCache, get_size
+
+EVENT_TIME = datetime.fromisoformat("2021-01-01T00:00:00")
+
+
+def value_of_size(size: int) -> bytes:
+    return b"x" * (size - sys.getsizeof(b""))
+
+
+class Point:
+    def __init__(self, coordinates: np.ndarray) -> None:
+        self.coordinates = coordinates
+
+
+class TestGetSize:
+    def test_should_return_deep_memory_usage_of_dataframe(self) -> None:
+        # Given
+        df = pd.DataFrame({"a": ["toto", "titi"]})
+
+        # When
+        result = get_size(df)
+
+        # Then
+        assert result == df.memory_usage(deep=True).sum()
+
+    def test_should_return_buffer_size_of_table(self) -> None:
+        # Given
+        table = pa.table({"a": list(range(1000))})
+
+        # When
+        result = get_size(table)
+
+        # Then
+        assert result == table.nbytes
+
+    def test_should_return_deep_memory_usage_of_dataframe_only_if_it_can_fit(self) -> None:
+        # Given
+        df = pd.DataFrame({"a": ["toto"] * 1000})
+
+        # When
+        result = get_size(df, limit=100)
+
+        # Then
+        assert result == df.memory_usage(deep=False).sum()
+
+    def test_should_return_buffer_size_of_array(self) -> None:
+        # Given
+        array = np.arange(1000, dtype=np.float64)
+
+        # When
+        result = get_size(array[500:])
+
+        # Then
+        assert result == 4000
+
+    def test_should_return_size_of_container_and_items(self) -> None:
+        # Given
+        value = {"a": [1, np.arange(10)], "b": print}
+
+        # When
+        result = get_size(value)
+
+        # Then
+        assert result == (
+            sys.getsizeof(value) + sys.getsizeof("a") + sys.getsizeof(value["a"]) + sys.getsizeof(1) + 80
+            + sys.getsizeof("b")
+        )
+
+    def test_should_return_size_of_object_attributes(self) -> None:
+        # Given
+        point = Point(np.arange(10))
+
+        # When
+        result = get_size(point)
+
+        # Then
+        assert result == sys.getsizeof(point) + sys.getsizeof(vars(point)) + sys.getsizeof("coordinates") + 80
+
+    def test_should_extrapolate_size_of_items_of_large_containers(self) -> None:
+        # When
+        result = get_size(list(range(10_000)))
+
+        # Then
+        assert result == sys.getsizeof(list(range(10_000))) + 10_000 * sys.getsizeof(1)
+
+    def test_should_not_measure_items_of_container_larger_than_limit(self) -> None:
+        # Given
+        value = ["x" * 100] * 1000
+
+        # When
+        result = get_size(value, limit=100)
+
+        # Then
+        assert result == sys.getsizeof(value)
+
+    def test_should_measure_values_which_can_not_be_pickled(self) -> None:
+        # Given
+        lock = threading.Lock()
+
+        # When
+        result = get_size(lock)
+
+        # Then
+        assert result == sys.getsizeof(lock)
+
+
+class TestMemoryCache:
+    @pytest.mark.parametrize("max_bytes, expected", [(0, False), (10, True)])
+    def test_should_return_if_cache_is_enabled(self, max_bytes: int, expected: bool) -> None:
+        assert MemoryCache(max_bytes).is_enabled is expected
+
+    def test_should_count_hits_and_misses(self) -> None:
+        # Given
+        cache = MemoryCache(1000)
+        cache.put("key", "value", EVENT_TIME)
+
+        # When
+        hit = cache.get("key")
+        miss = cache.get("other")
+
+        # Then
+        assert hit == (True, "value")
+        assert miss == (False, None)
+        stats = cache.stats
+        assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+        assert stats.size_bytes == get_size("value")
+
+    def test_should_expire_entries_older_than_limit_time(self) -> None:
+        # Given
+        cache = MemoryCache(1000)
+        cache.put("key", "value", EVENT_TIME)
+
+        # When
+        result = cache.get("key", datetime.fromisoformat("2021-01-02T00:00:00"))
+
+        # Then
+        assert result == (False, None)
+        assert cache.stats.entries == 0
+        assert cache.stats.size_bytes == 0
+
+    def test_should_evict_least_recently_used_entries(self) -> None:
+        # Given
+        cache = MemoryCache(300, EvictionPolicy.LRU)
+        cache.put("first", value_of_size(100), EVENT_TIME)
+        cache.put("second", value_of_size(100), EVENT_TIME)
+        cache.put("third", value_of_size(100), EVENT_TIME)
+        cache.get("first")
+
+        # When
+        cache.put("fourth", value_of_size(100), EVENT_TIME)
+
+        # Then
+        assert cache.get("second")[0] is False
+        assert all(cache.get(key)[0] for key in ("first", "third", "fourth"))
+        assert cache.stats.evictions == 1
+        assert cache.stats.size_bytes == 300
+
+    def test_should_evict_least_frequently_used_entries(self) -> None:
+        # Given
+        cache = MemoryCache(300, EvictionPolicy.LFU)
+        cache.put("first", value_of_size(100), EVENT_TIME)
+        cache.put("second", value_of_size(100), EVENT_TIME)
+        cache.put("third", value_of_size(100), EVENT_TIME)
+        cache.get("first")
+        cache.get("first")
+        cache.get("second")
+        cache.get("third")
+
+        # When
+        cache.put("fourth", value_of_size(100), EVENT_TIME)
+
+        # Then
+        assert cache.get("second")[0] is False
+        assert all(cache.get(key)[0] for key in ("first", "third", "fourth"))
+
+    def test_should_replace_existing_entry(self) -> None:
+        # Given
+        cache = MemoryCache(1000)
+        cache.put("key", "old", EVENT_TIME)
+
+        # When
+        cache.put("key", "new", EVENT_TIME)
+
+        # Then
+        assert cache.get("key") == (True, "new")
+        assert cache.stats.entries == 1
+
+    def test_should_not_cache_values_larger_than_budget(self, mocker) -> None:
+        # Given
+        cache = MemoryCache(100)
+        value = value_of_size(200)
+        mock_get_size: MagicMock = mocker.patch("resnap.helpers.memory_cache.get_size", wraps=get_size)
+
+        # When
+        cached = cache.put("key", value, EVENT_TIME)
+
+        # Then
+        assert cached is False
+        assert cache.get("key") == (False, None)
+        mock_get_size.assert_called_once_with(value, 100)
+
+    def test_should_return_the_cached_object(self) -> None:
+        # Given
+        cache = MemoryCache(1000)
+        value = [1, 2]
+        cache.put("key", value, EVENT_TIME)
+
+        # When
+        _, result = cache.get("key")
+
+        # Then
+        assert result is value
+
+    def test_should_clear_cache(self) -> None:
+        # Given
+        cache = MemoryCache(1000)
+        cache.put("key", "value", EVENT_TIME)
+        cache.get("key")
+
+        # When
+        cache.clear()
+
+        # Then
+        assert cache.get("key") == (False, None)
+        assert cache.stats.hits == 0
+
+    def test_should_be_shared_by_threads_and_event_loops(self) -> None:
+        # Given
+        cache = MemoryCache(10_000)
+
+        def worker(index: int) -> None:
+            for i in range(100):
+                cache.put(f"{index}-{i % 10}", i, EVENT_TIME)
+                cache.get(f"{index}-{i % 10}")
+
+        async def async_worker() -> bool:
+            return cache.get("0-9")[0]
+
+        # When
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        found = asyncio.run(async_worker())
+
+        # Then
+        stats = cache.stats
+        assert found is True
+        assert stats.hits == 801
+        assert stats.entries == 80
+        assert stats.size_bytes == sum(get_size(i) for i in range(90, 100)) * 8
@@ -3,7 +3,13 @@ from typing import Any
 
 import pytest
 
-from resnap.helpers.metadata import Metadata, MetadataFail, MetadataSuccess
+from resnap.helpers.hashing import KEY_VERSION, HashAlgorithm
+from resnap.helpers.metadata import (
+    LEGACY_KEY_VERSION,
+    Metadata,
+    MetadataFail,
+    MetadataSuccess,
+)
 from resnap.helpers.status import Status
 from resnap.helpers.utils import hash_arguments
 
@@ -65,6 +71,8 @@ class TestMetadataSuccess:
             "hashed_arguments": hashed_arguments,
             "result_path": "/path/to/result",
             "result_type": "str",
+            "hash_algorithm": "sha256",
+            "key_version": KEY_VERSION,
             "extra_metadata": {"key": "value"},
         }
 
@@ -89,6 +97,141 @@ class TestMetadataSuccess:
         assert metadata.result_path == "/path/to/result"
         assert metadata.result_type == "str"
         assert metadata.extra_metadata == {"key": "value"}
+        assert metadata.hash_algorithm == HashAlgorithm.SHA256
+        assert metadata.key_version == LEGACY_KEY_VERSION
+
+    def test_should_read_key_scheme_from_dict(self) -> None:
+        # Given
+        data = {
+            "status": "SUCCESS",
+            "event_time": "2021-01-01T00:00:00",
+            "hashed_arguments": hashed_arguments,
+            "result_path": "/path/to/result",
+            "result_type": "str",
+            "hash_algorithm": "blake2b",
+            "key_version": KEY_VERSION,
+        }
+
+        # When
+        metadata = MetadataSuccess.from_dict(data)
+
+        # Then
+        assert metadata.hash_algorithm == HashAlgorithm.BLAKE2B
+        assert metadata.key_version == KEY_VERSION
+        assert metadata.to_dict() == data
+
+    def test_should_read_result_format_and_compression_from_dict(self) -> None:
+        # Given
+        data = {
+            "status": "SUCCESS",
+            "event_time": "2021-01-01T00:00:00",
+            "hashed_arguments": hashed_arguments,
+            "result_path": "/path/to/result.resnap.parquet",
+            "result_type": "DataFrame",
+            "hash_algorithm": "sha256",
+            "key_version": KEY_VERSION,
+            "result_format": "parquet",
+            "compression": "zstd",
+            "compression_level": 3,
+        }
+
+        # When
+        metadata = MetadataSuccess.from_dict(data)
+
+        # Then
+        assert (metadata.file_format, metadata.compression, metadata.compression_level) == ("parquet", "zstd", 3)
+        assert metadata.to_dict() == data
+
+    @pytest.mark.parametrize(
+        "result_path, expected",
+        [
+            pytest.param("/path/to/result.resnap.parquet.gz", "parquet", id="legacy parquet"),
+            pytest.param("/path/to/result.resnap.csv", "csv", id="csv"),
+            pytest.param("/path/to/result.resnap.pkl", "pkl", id="pickle"),
+            pytest.param("/path/to/result.resnap.pkl.zst", "pkl", id="zstd pickle"),
+            pytest.param("/path/to/result.resnap.json.gz", "json", id="gzip json"),
+        ],
+    )
+    def test_should_get_format_from_suffix_if_not_recorded(self, result_path: str, expected: str) -> None:
+        # Given
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+            hashed_arguments=hashed_arguments,
+            result_path=result_path,
+            result_type="DataFrame",
+        )
+
+        # When
+        result_format = metadata.file_format
+
+        # Then
+        assert result_format == expected
+        assert "result_format" not in metadata.to_dict()
+
+    @pytest.mark.parametrize(
+        "hash_algorithm, key_version, expected",
+        [
+            (HashAlgorithm.SHA256, KEY_VERSION, True),
+            (HashAlgorithm.BLAKE2B, KEY_VERSION, False),
+            (HashAlgorithm.SHA256, LEGACY_KEY_VERSION, False),
+        ],
+    )
+    def test_should_check_key_scheme(self, hash_algorithm: HashAlgorithm, key_version: int, expected: bool) -> None:
+        # Given
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+            hashed_arguments=hashed_arguments,
+            result_path="/path/to/result",
+            result_type="str",
+            hash_algorithm=hash_algorithm,
+            key_version=key_version,
+        )
+
+        # When
+        result = metadata.is_keyed_with(HashAlgorithm.SHA256)
+
+        # Then
+        assert result is expected
+
+    @pytest.mark.parametrize(
+        "metadata",
+        [
+            pytest.param(
+                MetadataSuccess(
+                    status=Status.SUCCESS,
+                    event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+                    hashed_arguments=hashed_arguments,
+                    result_path="/path/to/result.parquet",
+                    result_type="DataFrame",
+                    result_format="parquet",
+                    compression="zstd",
+                    extra_metadata={"key": "value"},
+                ),
+                id="success",
+            ),
+            pytest.param(
+                MetadataFail(
+                    status=Status.FAIL,
+                    event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+                    hashed_arguments=hashed_arguments,
+                    error_message="oopsi an error",
+                    data={"key": "value"},
+                    extra_metadata={},
+                ),
+                id="fail",
+            ),
+        ],
+    )
+    def test_should_encode_and_decode_json(self, metadata: Metadata) -> None:
+        # When
+        data = metadata.to_json()
+        decoded = Metadata.from_json(data)
+
+        # Then
+        assert decoded == metadata
+        assert isinstance(data, bytes) and b"\n" not in data
 
 
 class TestMetadataFail:
@@ -112,6 +255,8 @@ class TestMetadataFail:
             "event_time": "2021-01-01T00:00:00",
             "hashed_arguments": hashed_arguments,
             "error_message": "oopsi an error",
+            "hash_algorithm": "sha256",
+            "key_version": KEY_VERSION,
         }
 
     def test_should_return_dict_with_data(self) -> None:
@@ -134,6 +279,8 @@ class TestMetadataFail:
             "event_time": "2021-01-01T00:00:00",
             "hashed_arguments": hashed_arguments,
             "error_message": "oopsi an error",
+            "hash_algorithm": "sha256",
+            "key_version": KEY_VERSION,
             "data": {"key": "value"},
             "extra_metadata": {"key": "value"},
         }
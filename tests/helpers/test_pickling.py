@@ -0,0 +1,93 @@
+import io
+import pickle
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from resnap.helpers.pickling import (
+    ALIGNMENT,
+    OUT_OF_BAND_MIN_BYTES,
+    dumps_pickle,
+    is_pickle_container,
+    load_pickle,
+    write_pickle,
+)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        pytest.param(dumps_pickle(1), True, id="container"),
+        pytest.param(pickle.dumps(1), False, id="plain pickle"),
+        pytest.param(b"", False, id="empty"),
+    ],
+)
+def test_should_tell_pickle_containers(data: bytes, expected: bool) -> None:
+    # When / Then
+    assert is_pickle_container(data) is expected
+
+
+def test_should_store_large_buffers_out_of_band_and_aligned() -> None:
+    # Given
+    large = np.arange(OUT_OF_BAND_MIN_BYTES // 8, dtype=np.float64)
+    small = np.arange(10)
+    buffer = io.BytesIO()
+
+    # When
+    write_pickle({"large": large, "small": small, "text": "value"}, buffer)
+
+    # Then
+    data = buffer.getvalue()
+    offset = data.find(large.tobytes())
+    assert offset > 0
+    assert offset % ALIGNMENT == 0
+    assert data.count(large.tobytes()) == 1
+
+
+@pytest.mark.parametrize(
+    "data_type",
+    [bytes, bytearray, memoryview],
+)
+def test_should_load_container(data_type: type) -> None:
+    # Given
+    result = {
+        "array": np.arange(100_000.0),
+        "fortran": np.asfortranarray(np.ones((300, 300))),
+        "table": pa.table({"a": np.arange(50_000)}),
+        "bytes": bytearray(OUT_OF_BAND_MIN_BYTES),
+        "text": "value",
+    }
+    data = data_type(dumps_pickle(result))
+
+    # When
+    loaded = load_pickle(data)
+
+    # Then
+    np.testing.assert_array_equal(loaded["array"], result["array"])
+    assert loaded["array"].flags.writeable
+    assert loaded["fortran"].flags.f_contiguous
+    assert loaded["table"].equals(result["table"])
+    assert loaded["bytes"] == result["bytes"]
+    assert loaded["text"] == "value"
+
+
+def test_should_reference_writable_buffers_without_copy() -> None:
+    # Given
+    data = bytearray(dumps_pickle({"array": np.arange(100_000.0)}))
+
+    # When
+    loaded = load_pickle(data)
+    loaded["array"][0] = -1.0
+
+    # Then
+    assert not loaded["array"].flags.owndata
+    assert np.float64(-1.0).tobytes() in data
+
+
+def test_should_load_plain_pickle() -> None:
+    # When
+    loaded = load_pickle(pickle.dumps({"key": np.arange(3)}))
+
+    # Then
+    np.testing.assert_array_equal(loaded["key"], np.arange(3))
@@ -1,20 +1,27 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from resnap.helpers.results_retriever import ResultsRetriever
+from resnap.helpers.lazy import LazyResult
+from resnap.helpers.metadata import MetadataSuccess
+from resnap.helpers.results_retriever import (
+    AsyncResultsRetriever,
+    BatchResultsRetriever,
+    ResultsRetriever,
+)
 from tests.builders.metadata_builder import MetadataSuccessBuilder
 
 
 @pytest.fixture
 def mock_service(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch("resnap.helpers.results_retriever.ResnapService", return_value=MagicMock())
+    mock.return_value.get_cached_result.return_value = (False, None)
     return mock
 
 
 @pytest.fixture
-def mock_get_function_signature(mocker) -> MagicMock:
-    mock: MagicMock = mocker.patch("resnap.helpers.results_retriever.get_function_signature")
+def mock_write_behind_get(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch("resnap.helpers.results_retriever.write_behind.get", return_value=(True, 42))
     return mock
 
 
@@ -30,7 +37,7 @@ class TestResultsRetriever:
         retriever = ResultsRetriever(mock_service(), {"enable_recovery": False})
 
         # When
-        result, is_recovery = retriever._get_saved_result()
+        result, is_recovery = retriever.get_saved_result()
 
         # Then
         assert result is None
@@ -40,30 +47,32 @@ class TestResultsRetriever:
     def test_should_not_return_results__if_no_metadata(self, mock_service: MagicMock) -> None:
         # Given
         retriever = ResultsRetriever(mock_service(), {"enable_recovery": True})
-        mock_service.return_value.get_success_metadata.return_value = []
+        mock_service.return_value.find_success_metadata.return_value = None
 
         # When
-        result, is_recovery = retriever._get_saved_result()
+        result, is_recovery = retriever.get_saved_result()
 
         # Then
         assert result is None
         assert not is_recovery
-        mock_service.return_value.get_success_metadata.assert_called_once()
+        mock_service.return_value.find_success_metadata.assert_called_once()
         mock_service.return_value.read_result.assert_not_called()
 
     def test_should_not_check_arguments_if_disabled(self, mock_service: MagicMock) -> None:
         # Given
         retriever = ResultsRetriever(mock_service(), {"enable_recovery": True, "consider_args": False})
+        retriever.hashed_arguments = "toto"
         metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 30}).build()
-        mock_service.return_value.get_success_metadata.return_value = [metadata]
+        mock_service.return_value.find_success_metadata.return_value = metadata
         mock_service.return_value.read_result.return_value = 30
 
         # When
-        result, is_recovery = retriever._get_saved_result()
+        result, is_recovery = retriever.get_saved_result()
 
         # Then
         assert result == 30
         assert is_recovery is True
+        mock_service.return_value.find_success_metadata.assert_called_once_with("", "", None)
         mock_service.return_value.read_result.assert_called_once_with(metadata)
         mock_service.return_value.save_result.assert_not_called()
 
@@ -71,54 +80,473 @@ class TestResultsRetriever:
         # Given
         retriever = ResultsRetriever(mock_service(), {})
         expected_metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 30}).build()
-        other_metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 666}).build()
         retriever.hashed_arguments = expected_metadata.hashed_arguments
-        mock_service.return_value.get_success_metadata.return_value = [other_metadata, expected_metadata]
+        mock_service.return_value.find_success_metadata.return_value = expected_metadata
         mock_service.return_value.read_result.return_value = 30
 
         # When
-        result, is_recovery = retriever._get_saved_result()
+        result, is_recovery = retriever.get_saved_result()
 
         # Then
         assert result == 30
         assert is_recovery is True
+        mock_service.return_value.find_success_metadata.assert_called_once_with(
+            "", "", expected_metadata.hashed_arguments
+        )
         mock_service.return_value.read_result.assert_called_once_with(expected_metadata)
 
     def test_should_not_return_results_if_arguments_not_match(self, mock_service: MagicMock) -> None:
         # Given
         retriever = ResultsRetriever(mock_service(), {})
-        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 30}).build()
         retriever.hashed_arguments = "toto"
-        mock_service.return_value.get_success_metadata.return_value = [metadata]
+        mock_service.return_value.find_success_metadata.return_value = None
 
         # When
-        result, is_recovery = retriever._get_saved_result()
+        result, is_recovery = retriever.get_saved_result()
 
         # Then
         assert result is None
         assert is_recovery is False
+        mock_service.return_value.find_success_metadata.assert_called_once_with("", "", "toto")
         mock_service.return_value.read_result.assert_not_called()
 
-    def test_should_return_saved_result(
+    def test_should_return_result_from_memory_without_reading_store(self, mock_service: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {"output_folder": "folder"})
+        retriever.func_name = "func"
+        retriever.hashed_arguments = "toto"
+        mock_service.return_value.get_cached_result.return_value = (True, 30)
+
+        # When
+        result, is_recovery = retriever.get_saved_result()
+
+        # Then
+        assert result == 30
+        assert is_recovery is True
+        mock_service.return_value.get_cached_result.assert_called_once_with("func", "folder", "toto")
+        mock_service.return_value.find_success_metadata.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "options, expected",
+        [
+            pytest.param({}, (42, True), id="arguments considered"),
+            pytest.param({"consider_args": False}, (None, False), id="arguments not considered"),
+        ],
+    )
+    def test_should_return_result_being_saved(
+        self, options: dict, expected: tuple, mock_service: MagicMock, mock_write_behind_get: MagicMock,
+    ) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), options)
+        retriever.func_name = "func"
+        retriever.hashed_arguments = "toto"
+        mock_service.return_value.find_success_metadata.return_value = None
+
+        # When
+        result = retriever.get_saved_result()
+
+        # Then
+        assert result == expected
+        assert mock_write_behind_get.call_count == int(expected[1])
+
+    def test_should_keep_read_result_in_memory(self, mock_service: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {})
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 30}).build()
+        retriever.hashed_arguments = metadata.hashed_arguments
+        mock_service.return_value.find_success_metadata.return_value = metadata
+        mock_service.return_value.read_result.return_value = 30
+
+        # When
+        retriever.get_saved_result()
+
+        # Then
+        mock_service.return_value.cache_result.assert_called_once_with(
+            "", "", metadata.hashed_arguments, 30, metadata.event_time
+        )
+
+    def test_should_read_lazy_result_on_first_use(self, mock_service: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {"lazy": True})
+        retriever.func_name, retriever.hashed_arguments = "func", "hash"
+        metadata = MetadataSuccessBuilder.a_metadata().build()
+        mock_service.return_value.find_success_metadata.return_value = metadata
+        mock_service.return_value.read_result.return_value = [1, 2]
+
+        # When
+        result, is_recovery = retriever.get_saved_result()
+
+        # Then
+        assert is_recovery
+        assert isinstance(result, LazyResult) and result.key == ("func", "", "hash")
+        mock_service.return_value.read_result.assert_not_called()
+        assert result.value == [1, 2]
+        mock_service.return_value.read_result.assert_called_once_with(metadata)
+        mock_service.return_value.cache_result.assert_called_once()
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_should_not_return_result_whose_file_was_deleted(self, lazy: bool, mock_service: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {"lazy": lazy})
+        mock_service.return_value.find_success_metadata.return_value = MetadataSuccessBuilder.a_metadata().build()
+        mock_service.return_value.result_exists.return_value = False
+        mock_service.return_value.read_result.side_effect = FileNotFoundError
+
+        # When
+        result, is_recovery = retriever.get_saved_result()
+
+        # Then
+        assert (result, is_recovery) == (None, False)
+        mock_service.return_value.cache_result.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "options, result, expected_type",
+        [
+            pytest.param({"lazy": True}, 30, LazyResult, id="lazy"),
+            pytest.param({"lazy": True}, LazyResult(("func", "", "hash"), lambda: 30), LazyResult, id="proxy"),
+            pytest.param({}, 30, int, id="not lazy"),
+        ],
+    )
+    def test_should_wrap_result_of_lazy_function(
+        self, options: dict, result: object, expected_type: type, mock_service: MagicMock,
+    ) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), options)
+
+        # When
+        wrapped = retriever.wrap_result(result)
+
+        # Then
+        assert type(wrapped) is expected_type
+        assert wrapped == 30
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            pytest.param({"memory_cache": False}, id="memory cache disabled"),
+            pytest.param({"consider_args": False}, id="arguments not considered"),
+        ],
+    )
+    def test_should_not_use_memory(self, options: dict, mock_service: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), options)
+        metadata = MetadataSuccessBuilder.a_metadata().build()
+        mock_service.return_value.find_success_metadata.return_value = metadata
+
+        # When
+        retriever.get_saved_result()
+        retriever.cache_result(30, metadata.event_time)
+
+        # Then
+        mock_service.return_value.get_cached_result.assert_not_called()
+        mock_service.return_value.cache_result.assert_not_called()
+
+    def test_should_open_saved_table(self, mock_service: MagicMock, mock_hash_arguments: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {"output_folder": "folder"})
+        binder = MagicMock(func_name="func")
+        mock_hash_arguments.return_value = "toto"
+        metadata = MetadataSuccessBuilder.a_metadata().build()
+        mock_service.return_value.find_success_metadata.return_value = metadata
+
+        # When
+        handle = retriever.open_saved_table(binder, (1,), {})
+
+        # Then
+        assert handle is mock_service.return_value.open_result.return_value
+        mock_service.return_value.create_output_folder.assert_called_once_with("folder")
+        mock_service.return_value.find_success_metadata.assert_called_once_with("func", "folder", "toto")
+        mock_service.return_value.open_result.assert_called_once_with(metadata)
+        mock_service.return_value.read_result.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "options, cached, metadata",
+        [
+            pytest.param({"enable_recovery": False}, False, MetadataSuccessBuilder.a_metadata().build(), id="no recovery"),
+            pytest.param({}, True, MetadataSuccessBuilder.a_metadata().build(), id="in memory"),
+            pytest.param({}, False, None, id="not saved"),
+        ],
+    )
+    def test_should_not_open_saved_table(
         self,
+        options: dict,
+        cached: bool,
+        metadata: MetadataSuccess | None,
         mock_service: MagicMock,
-        mock_get_function_signature: MagicMock,
         mock_hash_arguments: MagicMock,
     ) -> None:
         # Given
-        def func() -> None:
-            pass
+        retriever = ResultsRetriever(mock_service(), options)
+        mock_service.return_value.get_cached_result.return_value = (cached, 30)
+        mock_service.return_value.find_success_metadata.return_value = metadata
+
+        # When
+        handle = retriever.open_saved_table(MagicMock(func_name="func"), (1,), {})
+
+        # Then
+        assert handle is None
+        mock_service.return_value.open_result.assert_not_called()
+
+    def test_should_not_open_saved_table_whose_file_was_deleted(
+        self, mock_service: MagicMock, mock_hash_arguments: MagicMock,
+    ) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {})
+        mock_service.return_value.find_success_metadata.return_value = MetadataSuccessBuilder.a_metadata().build()
+        mock_service.return_value.open_result.side_effect = FileNotFoundError
+
+        # When
+        handle = retriever.open_saved_table(MagicMock(func_name="func"), (1,), {})
+
+        # Then
+        assert handle is None
+
+    def test_should_find_saved_stream(self, mock_service: MagicMock, mock_hash_arguments: MagicMock) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {"output_folder": "folder"})
+        mock_hash_arguments.return_value = "toto"
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_type("Iterator[DataFrame]").build()
+        mock_service.return_value.find_success_metadata.return_value = metadata
+
+        # When
+        saved_stream = retriever.find_saved_stream(MagicMock(func_name="func"), (1,), {})
+
+        # Then
+        assert saved_stream is metadata
+        mock_service.return_value.create_output_folder.assert_called_once_with("folder")
+        mock_service.return_value.find_success_metadata.assert_called_once_with("func", "folder", "toto")
+        mock_service.return_value.read_result.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "options, metadata",
+        [
+            pytest.param(
+                {"enable_recovery": False}, MetadataSuccessBuilder.a_metadata().with_result_type("Iterator").build(),
+                id="no recovery",
+            ),
+            pytest.param({}, None, id="not saved"),
+            pytest.param({}, MetadataSuccessBuilder.a_metadata().with_result_type("list").build(), id="not a stream"),
+        ],
+    )
+    def test_should_not_find_saved_stream(
+        self, options: dict, metadata: MetadataSuccess | None, mock_service: MagicMock, mock_hash_arguments: MagicMock,
+    ) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), options)
+        mock_service.return_value.find_success_metadata.return_value = metadata
 
+        # When
+        saved_stream = retriever.find_saved_stream(MagicMock(func_name="func"), (1,), {})
+
+        # Then
+        assert saved_stream is None
+
+    def test_should_not_find_saved_stream_whose_file_was_deleted(
+        self, mock_service: MagicMock, mock_hash_arguments: MagicMock,
+    ) -> None:
+        # Given
+        retriever = ResultsRetriever(mock_service(), {})
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_type("Iterator").build()
+        mock_service.return_value.find_success_metadata.return_value = metadata
+        mock_service.return_value.result_exists.return_value = False
+
+        # When
+        saved_stream = retriever.find_saved_stream(MagicMock(func_name="func"), (1,), {})
+
+        # Then
+        assert saved_stream is None
+        mock_service.return_value.result_exists.assert_called_once_with(metadata)
+
+    def test_should_return_saved_result(
+        self,
+        mock_service: MagicMock,
+        mock_hash_arguments: MagicMock,
+    ) -> None:
+        # Given
         retriever = ResultsRetriever(mock_service(), {"enable_recovery": False, "output_folder": "folder_name"})
-        mock_get_function_signature.return_value = ("func_name", {"arg_1": 1, "arg_2": "value"})
+        binder = MagicMock(func_name="func_name")
+        binder.bind.return_value = {"arg_1": 1, "arg_2": "value"}
         mock_hash_arguments.return_value = "hashed_arguments"
 
         # When
-        result, is_recovery = retriever.get_results(func, (1,), {})
+        result, is_recovery = retriever.get_results(binder, (1,), {})
 
         # Then
         assert result is None
         assert not is_recovery
+        assert retriever.func_name == "func_name"
+        assert retriever.hashed_arguments == "hashed_arguments"
         mock_service.return_value.create_output_folder.assert_called_once_with("folder_name")
-        mock_get_function_signature.assert_called_once_with(func, (1,), {}, [])
-        mock_hash_arguments.assert_called_once_with({"arg_1": 1, "arg_2": "value"})
+        binder.bind.assert_called_once_with((1,), {})
+        mock_hash_arguments.assert_called_once_with(
+            {"arg_1": 1, "arg_2": "value"},
+            mock_service.return_value.config.hash_algorithm,
+            mock_service.return_value.config.hash_memo,
+        )
+
+
+@pytest.mark.asyncio
+class TestAsyncResultsRetriever:
+    async def test_should_not_return_results_if_recovery_is_disabled(self) -> None:
+        # Given
+        service = AsyncMock()
+        retriever = AsyncResultsRetriever(service, {"enable_recovery": False})
+
+        # When
+        result, is_recovery = await retriever.get_saved_result()
+
+        # Then
+        assert result is None
+        assert not is_recovery
+        service.find_success_metadata.assert_not_called()
+
+    async def test_should_return_result_from_memory_without_reading_store(self) -> None:
+        # Given
+        service = AsyncMock()
+        service.get_cached_result = MagicMock(return_value=(True, 42))
+        retriever = AsyncResultsRetriever(service, {})
+
+        # When
+        result, is_recovery = await retriever.get_saved_result()
+
+        # Then
+        assert result == 42
+        assert is_recovery
+        service.find_success_metadata.assert_not_called()
+
+    async def test_should_return_result_being_saved(self, mock_write_behind_get: MagicMock) -> None:
+        # Given
+        service = AsyncMock()
+        service.get_cached_result = MagicMock(return_value=(False, None))
+        retriever = AsyncResultsRetriever(service, {})
+        retriever.func_name = "func"
+        retriever.hashed_arguments = "toto"
+
+        # When
+        result, is_recovery = await retriever.get_saved_result()
+
+        # Then
+        assert (result, is_recovery) == (42, True)
+        mock_write_behind_get.assert_called_once_with(("func", "", "toto"))
+        service.find_success_metadata.assert_not_called()
+
+    async def test_should_not_return_result_whose_file_was_deleted(self) -> None:
+        # Given
+        service = AsyncMock()
+        service.get_cached_result = MagicMock(return_value=(False, None))
+        service.find_success_metadata.return_value = MetadataSuccessBuilder.a_metadata().build()
+        service.read_result.side_effect = FileNotFoundError
+        retriever = AsyncResultsRetriever(service, {})
+
+        # When
+        result, is_recovery = await retriever.get_saved_result()
+
+        # Then
+        assert (result, is_recovery) == (None, False)
+
+
+class TestBatchResultsRetriever:
+    @pytest.fixture
+    def binder(self, mock_hash_arguments: MagicMock) -> MagicMock:
+        mock_hash_arguments.side_effect = lambda arguments, *_: f"hash_{arguments['magic_number']}"
+        binder = MagicMock(func_name="func")
+        binder.bind.side_effect = lambda args, kwargs: {"magic_number": args[0] if args else kwargs["magic_number"]}
+        return binder
+
+    def test_should_find_saved_results_with_a_single_lookup(
+        self, mock_service: MagicMock, binder: MagicMock,
+    ) -> None:
+        # Given
+        service = mock_service()
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_path("path_1").build()
+        service.find_many_success_metadata.return_value = {"hash_1": metadata}
+        service.read_result.return_value = 10
+        retriever = BatchResultsRetriever(service, {"output_folder": "folder"})
+
+        # When
+        results = retriever.get_results(binder, [((1,), {}), ((2,), {}), ((), {"magic_number": 1})], max_workers=2)
+
+        # Then
+        assert results == {0: 10, 2: 10}
+        assert [r.hashed_arguments for r in retriever.retrievers] == ["hash_1", "hash_2", "hash_1"]
+        service.create_output_folder.assert_called_once_with("folder")
+        service.find_many_success_metadata.assert_called_once_with("func", "folder", ["hash_1", "hash_2", "hash_1"])
+        service.read_result.assert_called_once_with(metadata)
+
+    def test_should_not_return_results_whose_file_was_deleted(
+        self, mock_service: MagicMock, binder: MagicMock,
+    ) -> None:
+        # Given
+        service = mock_service()
+        service.find_many_success_metadata.return_value = {
+            "hash_1": MetadataSuccessBuilder.a_metadata().with_result_path("path_1").build(),
+            "hash_2": MetadataSuccessBuilder.a_metadata().with_result_path("deleted").build(),
+        }
+
+        def read_result(metadata: MetadataSuccess) -> int:
+            if metadata.result_path == "deleted":
+                raise FileNotFoundError(metadata.result_path)
+            return 10
+
+        service.read_result.side_effect = read_result
+        retriever = BatchResultsRetriever(service, {})
+
+        # When
+        results = retriever.get_results(binder, [((1,), {}), ((2,), {})])
+
+        # Then
+        assert results == {0: 10}
+
+    def test_should_not_look_up_results_found_in_memory(self, mock_service: MagicMock, binder: MagicMock) -> None:
+        # Given
+        service = mock_service()
+        service.get_cached_result.return_value = (True, 30)
+        retriever = BatchResultsRetriever(service, {})
+
+        # When
+        results = retriever.get_results(binder, [((1,), {}), ((2,), {})])
+
+        # Then
+        assert results == {0: 30, 1: 30}
+        service.find_many_success_metadata.assert_not_called()
+        service.read_result.assert_not_called()
+
+    def test_should_not_return_results_if_recovery_is_disabled(
+        self, mock_service: MagicMock, binder: MagicMock,
+    ) -> None:
+        # Given
+        service = mock_service()
+        retriever = BatchResultsRetriever(service, {"enable_recovery": False})
+
+        # When
+        results = retriever.get_results(binder, [((1,), {})])
+
+        # Then
+        assert results == {}
+        assert len(retriever.retrievers) == 1
+        service.get_cached_result.assert_not_called()
+        service.find_many_success_metadata.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "metadata, expected",
+        [
+            pytest.param(MetadataSuccessBuilder.a_metadata().build(), {0: 10, 1: 10}, id="saved result"),
+            pytest.param(None, {}, id="no saved result"),
+        ],
+    )
+    def test_should_return_the_last_result_if_arguments_not_considered(
+        self, metadata: MetadataSuccess | None, expected: dict, mock_service: MagicMock, binder: MagicMock,
+    ) -> None:
+        # Given
+        service = mock_service()
+        service.find_success_metadata.return_value = metadata
+        service.read_result.return_value = 10
+        retriever = BatchResultsRetriever(service, {"consider_args": False})
+
+        # When
+        results = retriever.get_results(binder, [((1,), {}), ((2,), {})])
+
+        # Then
+        assert results == expected
+        service.find_success_metadata.assert_called_once_with("func", "")
+        service.find_many_success_metadata.assert_not_called()
@@ -1,8 +1,9 @@
+import inspect
 from typing import Any
 
 import pytest
 
-from resnap.helpers.signature import get_function_signature
+from resnap.helpers.signature import ArgumentBinder, get_function_signature
 
 
 def function_to_test(test: str = "test") -> None:
@@ -27,6 +28,82 @@ class MockClass:
         pass
 
 
+def function_with_all_kinds(a: int, /, b: int, *args: int, c: int = 3, **kwargs: int) -> None:
+    pass
+
+
+def function_with_var_args(a: int, b: int = 2, *args: int, c: int, d: int = 4, **kwargs: int) -> None:
+    pass
+
+
+class TestArgumentBinder:
+    @pytest.mark.parametrize(
+        "func, args, kwargs",
+        [
+            (function_to_test, (), {}),
+            (function_to_test, ("toto",), {}),
+            (function_to_test, (), {"test": "toto"}),
+            (function_with_var_args, (1,), {"c": 3}),
+            (function_with_var_args, (1, 2, 3, 4), {"c": 3, "e": 5}),
+            (function_with_var_args, (), {"a": 1, "c": 3, "d": 5}),
+            (function_with_all_kinds, (1, 2, 3), {"d": 4}),
+            (MockClass.static_method, ("toto",), {"titi": 1}),
+        ],
+    )
+    def test_should_bind_like_inspect(self, func: Any, args: tuple, kwargs: dict) -> None:
+        # Given
+        binder = ArgumentBinder(func)
+        bound_args = inspect.signature(func).bind(*args, **kwargs)
+        bound_args.apply_defaults()
+
+        # When
+        result = binder.bind(args, kwargs)
+
+        # Then
+        assert result == bound_args.arguments
+
+    @pytest.mark.parametrize(
+        "func, args, kwargs",
+        [
+            pytest.param(function_to_test, ("toto", "titi"), {}, id="too many arguments"),
+            pytest.param(function_to_test, ("toto",), {"test": "titi"}, id="multiple values"),
+            pytest.param(function_to_test, (), {"toto": "titi"}, id="unexpected keyword"),
+            pytest.param(function_with_var_args, (1,), {}, id="missing keyword only argument"),
+            pytest.param(function_with_all_kinds, (), {"a": 1, "b": 2}, id="positional only as keyword"),
+        ],
+    )
+    def test_should_raise_like_inspect_on_invalid_calls(self, func: Any, args: tuple, kwargs: dict) -> None:
+        # Given
+        binder = ArgumentBinder(func)
+
+        # When / Then
+        with pytest.raises(TypeError):
+            binder.bind(args, kwargs)
+
+    def test_should_replace_instance_with_considered_attributes(self) -> None:
+        # Given
+        binder = ArgumentBinder(MockClass.method, ["MAX_VALUE", "_min_value"])
+
+        # When
+        result = binder.bind((MockClass(5),), {"test": "toto"})
+
+        # Then
+        assert binder.func_name == "MockClass.method"
+        assert result == {"MAX_VALUE": 10, "_min_value": 5, "test": "toto", "kwargs": {}}
+
+    def test_should_reuse_the_signature_computed_at_creation(self, mocker) -> None:
+        # Given
+        binder = ArgumentBinder(function_to_test)
+        mock_signature = mocker.patch("resnap.helpers.signature.inspect.signature")
+
+        # When
+        binder.bind(("toto",), {})
+        binder.bind((), {})
+
+        # Then
+        mock_signature.assert_not_called()
+
+
 class TestGetFunctionSignature:
     @pytest.mark.parametrize(
         "my_args, expected_result",
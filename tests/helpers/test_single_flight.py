@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resnap.helpers.single_flight import SingleFlight
+
+KEY = ("func", "", "hash")
+
+
+class LegacyTimeoutError(Exception):
+    """The timeout error of `concurrent.futures` and `asyncio` before Python 3.11, which is not the builtin one."""
+
+
+class TestSingleFlight:
+    def test_should_run_function_once_for_concurrent_callers(self) -> None:
+        # Given
+        flight = SingleFlight()
+        calls = 0
+
+        def func() -> object:
+            nonlocal calls
+            calls += 1
+            time.sleep(0.2)
+            return object()
+
+        # When
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: flight.run(KEY, func), range(8)))
+
+        # Then
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert len(flight) == 0
+
+    def test_should_raise_the_exception_of_the_leader(self) -> None:
+        # Given
+        flight = SingleFlight()
+        started = threading.Event()
+        error = ValueError("boom")
+
+        def func() -> None:
+            started.set()
+            time.sleep(0.2)
+            raise error
+
+        # When
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.run, KEY, func)
+            started.wait()
+            follower = executor.submit(flight.run, KEY, lambda: 42)
+
+            # Then
+            assert follower.exception() is error
+            assert leader.exception() is error
+        assert len(flight) == 0
+
+    def test_should_run_function_again_after_the_wait_timeout(self) -> None:
+        # Given
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def func() -> str:
+            started.set()
+            time.sleep(0.5)
+            return "leader"
+
+        # When
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.run, KEY, func)
+            started.wait()
+            follower = flight.run(KEY, lambda: "follower", timeout=0.05)
+
+            # Then
+            assert follower == "follower"
+            assert leader.result() == "leader"
+
+    def test_should_run_function_again_after_the_wait_timeout_before_python_3_11(self, mocker) -> None:
+        # Given
+        mocker.patch("concurrent.futures.TimeoutError", LegacyTimeoutError)
+        mocker.patch("concurrent.futures.Future.result", side_effect=LegacyTimeoutError)
+        flight = SingleFlight()
+        flight._join(KEY)
+
+        # When
+        result = flight.run(KEY, lambda: "follower", timeout=0.05)
+
+        # Then
+        assert result == "follower"
+
+    def test_should_raise_timeout_error_of_the_leader(self) -> None:
+        # Given
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def func() -> None:
+            started.set()
+            time.sleep(0.1)
+            raise TimeoutError("leader timeout")
+
+        # When
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(flight.run, KEY, func)
+            started.wait()
+
+            # Then
+            with pytest.raises(TimeoutError, match="leader timeout"):
+                flight.run(KEY, lambda: "follower", timeout=1)
+
+    def test_should_not_share_calls_of_other_keys(self) -> None:
+        # Given
+        flight = SingleFlight()
+
+        # When
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(lambda key: flight.run(key, lambda: key), ["a", "b"]))
+
+        # Then
+        assert results == ["a", "b"]
+
+
+@pytest.mark.asyncio
+class TestAsyncSingleFlight:
+    async def test_should_run_coroutine_once_for_concurrent_tasks(self) -> None:
+        # Given
+        flight = SingleFlight()
+        calls = 0
+
+        async def func() -> object:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return object()
+
+        # When
+        results = await asyncio.gather(*(flight.run_async(KEY, func) for _ in range(32)))
+
+        # Then
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert len(flight) == 0
+
+    async def test_should_raise_the_exception_of_the_leader(self) -> None:
+        # Given
+        flight = SingleFlight()
+        error = ValueError("boom")
+
+        async def func() -> None:
+            await asyncio.sleep(0.1)
+            raise error
+
+        # When
+        results = await asyncio.gather(
+            flight.run_async(KEY, func), flight.run_async(KEY, func), return_exceptions=True,
+        )
+
+        # Then
+        assert results == [error, error]
+
+    async def test_should_run_coroutine_again_after_the_wait_timeout(self) -> None:
+        # Given
+        flight = SingleFlight()
+
+        async def leader() -> str:
+            await asyncio.sleep(0.3)
+            return "leader"
+
+        async def follower() -> str:
+            return "follower"
+
+        # When
+        leader_task = asyncio.create_task(flight.run_async(KEY, leader))
+        await asyncio.sleep(0)
+        follower_result = await flight.run_async(KEY, follower, timeout=0.05)
+
+        # Then
+        assert follower_result == "follower"
+        assert await leader_task == "leader"
+
+    async def test_should_run_coroutine_again_after_the_wait_timeout_before_python_3_11(self, mocker) -> None:
+        # Given
+        mocker.patch("asyncio.TimeoutError", LegacyTimeoutError)
+        mocker.patch("asyncio.wait_for", side_effect=LegacyTimeoutError)
+        flight = SingleFlight()
+        flight._join(KEY)
+
+        async def follower() -> str:
+            return "follower"
+
+        # When
+        result = await flight.run_async(KEY, follower, timeout=0.05)
+
+        # Then
+        assert result == "follower"
+
+    async def test_should_raise_timeout_error_of_the_leader(self) -> None:
+        # Given
+        flight = SingleFlight()
+
+        async def leader() -> None:
+            await asyncio.sleep(0.05)
+            raise TimeoutError("leader timeout")
+
+        # When
+        leader_task = asyncio.create_task(flight.run_async(KEY, leader))
+        await asyncio.sleep(0)
+
+        # Then
+        with pytest.raises(TimeoutError, match="leader timeout"):
+            await flight.run_async(KEY, leader, timeout=1)
+        with pytest.raises(TimeoutError, match="leader timeout"):
+            await leader_task
+
+    async def test_should_wait_for_a_leader_thread(self) -> None:
+        # Given
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def func() -> str:
+            started.set()
+            time.sleep(0.1)
+            return "thread"
+
+        async def follower() -> str:
+            return "task"
+
+        # When
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            leader = executor.submit(flight.run, KEY, func)
+            started.wait()
+            result = await flight.run_async(KEY, follower)
+
+        # Then
+        assert result == "thread"
+        assert leader.result() == "thread"
@@ -0,0 +1,152 @@
+import io
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from resnap.helpers.config import FileCompression
+from resnap.helpers.streams import (
+    PickleStreamWriter,
+    TableStreamWriter,
+    get_item_type,
+    get_stream_type,
+    is_stream_type,
+    read_pickles,
+    read_tables,
+)
+from resnap.helpers.tables import find_table_type
+
+EVENT_TIME = datetime(2025, 1, 1)
+
+
+class KeptFile(io.BytesIO):
+    """A file keeping its content once closed."""
+
+    def close(self) -> None:
+        self.content = self.getvalue()
+        super().close()
+
+
+@pytest.mark.parametrize(
+    "item_type, expected",
+    [
+        pytest.param(None, "Iterator", id="pickles"),
+        pytest.param("DataFrame", "Iterator[DataFrame]", id="tables"),
+    ],
+)
+def test_should_record_type_of_stream(item_type: str | None, expected: str) -> None:
+    # When
+    result_type = get_stream_type(item_type)
+
+    # Then
+    assert result_type == expected
+    assert is_stream_type(result_type)
+    assert get_item_type(result_type) == item_type
+
+
+@pytest.mark.parametrize("result_type", ["DataFrame", "Iterators", "dict"])
+def test_should_not_detect_stream_type(result_type: str) -> None:
+    # When / Then
+    assert not is_stream_type(result_type)
+
+
+@pytest.mark.parametrize("compression", [FileCompression.NONE, FileCompression.GZIP])
+def test_should_write_and_read_pickles_one_by_one(compression: FileCompression) -> None:
+    # Given
+    file = KeptFile()
+    writer = PickleStreamWriter(file, "path", EVENT_TIME, "Iterator", MagicMock(), compression)
+
+    # When
+    for item in ({"a": 1}, [1, 2], "text"):
+        writer.write(item)
+    writer.close()
+    writer.close()
+    items = read_pickles(io.BytesIO(file.content), compression)
+
+    # Then
+    assert next(items) == {"a": 1}
+    assert list(items) == [[1, 2], "text"]
+
+
+def test_should_read_pickles_from_raw_file(tmp_path: Path) -> None:
+    # Given
+    path = tmp_path / "result.pkls"
+    with path.open("wb") as file:
+        writer = PickleStreamWriter(file, str(path), EVENT_TIME, "Iterator", MagicMock())
+        writer.write(1)
+        writer.write(2)
+        writer.close()
+
+    # When
+    raw_file = io.FileIO(path)
+    items = list(read_pickles(raw_file))
+
+    # Then
+    assert items == [1, 2]
+    assert raw_file.closed
+
+
+def test_should_write_tables_in_row_groups_with_schema_of_first_one() -> None:
+    # Given
+    file = KeptFile()
+    table_type = find_table_type("Table")
+    writer = TableStreamWriter(file, "path", EVENT_TIME, "Iterator[Table]", MagicMock(), table_type)
+
+    # When
+    writer.write(pa.table({"a": pa.array([1, 2], pa.int64())}))
+    writer.write(pa.table({"a": pa.array([3], pa.int32())}))
+    writer.write(pa.table({"a": pa.array([], pa.int64())}))
+    writer.close()
+    tables = list(read_tables(pa.BufferReader(file.content), table_type))
+
+    # Then
+    assert [table.to_pydict() for table in tables] == [{"a": [1, 2]}, {"a": [3]}, {"a": []}]
+    assert all(table.schema == pa.schema([("a", pa.int64())]) for table in tables)
+
+
+def test_should_write_dataframes_with_their_index() -> None:
+    # Given
+    file = KeptFile()
+    table_type = find_table_type("DataFrame")
+    writer = TableStreamWriter(file, "path", EVENT_TIME, "Iterator[DataFrame]", MagicMock(), table_type)
+    dfs = [pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]}, index=[2])]
+
+    # When
+    for df in dfs:
+        writer.write(df)
+    writer.close()
+    result = list(read_tables(pa.BufferReader(file.content), table_type))
+
+    # Then
+    for df, expected in zip(result, dfs):
+        pd.testing.assert_frame_equal(df, expected, check_index_type=False)
+
+
+def test_should_close_empty_table_stream() -> None:
+    # Given
+    file = KeptFile()
+    writer = TableStreamWriter(file, "path", EVENT_TIME, "Iterator[Table]", MagicMock(), find_table_type("Table"))
+
+    # When
+    writer.close()
+
+    # Then
+    assert file.closed
+
+
+def test_should_delete_aborted_stream_even_if_closing_fails() -> None:
+    # Given
+    file = MagicMock()
+    file.close.side_effect = OSError("upload failed")
+    delete = MagicMock()
+    writer = TableStreamWriter(file, "path", EVENT_TIME, "Iterator[Table]", delete, find_table_type("Table"))
+
+    # When
+    writer.abort()
+
+    # Then
+    file.close.assert_called_once()
+    delete.assert_called_once()
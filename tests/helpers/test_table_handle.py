@@ -0,0 +1,147 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+from pyarrow import feather
+from pyarrow import parquet as pq
+
+from resnap.helpers.table_handle import TableHandle, to_expression
+from resnap.helpers.tables import find_table_type
+
+TABLE = pa.table({"day": [d // 100 for d in range(1000)], "price": [float(p) for p in range(1000)], "id": range(1000)})
+
+
+class CountingFile(io.RawIOBase):
+    """A file counting the bytes read from it."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self._file = io.BytesIO(path.read_bytes())
+        self.read_bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        size = self._file.readinto(buffer)
+        self.read_bytes += size
+        return size
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        pytest.param(None, None, id="no filters"),
+        pytest.param(pc.field("day") == 1, pc.field("day") == 1, id="expression"),
+        pytest.param([("day", "=", 1)], pc.field("day") == 1, id="predicates"),
+        pytest.param(
+            [[("day", "=", 1)], [("day", "=", 2)]], (pc.field("day") == 1) | (pc.field("day") == 2), id="disjunction",
+        ),
+    ],
+)
+def test_should_convert_filters_to_expression(filters: object, expected: pc.Expression | None) -> None:
+    # When
+    expression = to_expression(filters)
+
+    # Then
+    assert expression is None if expected is None else expression.equals(expected)
+
+
+def test_should_read_only_row_groups_matching_filters(tmp_path: Path) -> None:
+    # Given
+    path = tmp_path / "result.parquet"
+    table = pa.table({"day": np.arange(100_000) // 10_000, "price": np.random.rand(100_000), "id": range(100_000)})
+    pq.write_table(table, path, row_group_size=10_000)
+    file = CountingFile(path)
+
+    # When
+    with TableHandle.from_file(file, "parquet", find_table_type("Table")) as handle:
+        result = handle.read(columns=["price"], filters=[("day", "=", 3)])
+
+    # Then
+    assert result.equals(table.slice(30_000, 10_000).select(["price"]))
+    assert file.read_bytes < path.stat().st_size / 5
+    assert file.closed
+
+
+def test_should_read_arrow_file(tmp_path: Path) -> None:
+    # Given
+    path = tmp_path / "result.arrow"
+    feather.write_feather(TABLE, str(path), chunksize=100)
+
+    # When
+    with TableHandle.from_file(pa.memory_map(str(path)), "arrow", find_table_type("Table")) as handle:
+        result = handle.read(columns=["id"], filters=pc.field("price") < 3)
+
+    # Then
+    assert result.equals(pa.table({"id": [0, 1, 2]}))
+
+
+@pytest.mark.parametrize(
+    "df, expected",
+    [
+        pytest.param(
+            pd.DataFrame({"a": range(10), "b": list("abcdefghij")}), pd.DataFrame({"a": [8, 9]}), id="range index",
+        ),
+        pytest.param(
+            pd.DataFrame({"a": range(10)}, index=pd.Index(list("abcdefghij"), name="b")),
+            pd.DataFrame({"a": [8, 9]}, index=pd.Index(["i", "j"], name="b")),
+            id="index",
+        ),
+    ],
+)
+def test_should_read_dataframe_with_its_index(df: pd.DataFrame, expected: pd.DataFrame) -> None:
+    # Given
+    handle = TableHandle.from_result(df, find_table_type("DataFrame"))
+
+    # When
+    result = handle.read(columns=["a"], filters=[("a", ">=", 8)])
+
+    # Then
+    assert handle.columns == list(df.columns)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_should_describe_result_without_reading_it(tmp_path: Path) -> None:
+    # Given
+    path = tmp_path / "result.parquet"
+    pq.write_table(TABLE, path, row_group_size=100)
+
+    # When
+    with TableHandle.from_file(pa.memory_map(str(path)), "parquet", find_table_type("Table")) as handle:
+        schema, columns = handle.schema, handle.columns
+        rows, matching_rows = handle.count_rows(), handle.count_rows([("day", "<", 2)])
+
+    # Then
+    assert schema == TABLE.schema
+    assert columns == ["day", "price", "id"]
+    assert (rows, matching_rows) == (1000, 200)
+
+
+def test_should_read_whole_result_without_columns_and_filters() -> None:
+    # Given
+    handle = TableHandle.from_result(TABLE, find_table_type("Table"))
+
+    # When
+    result = handle.read()
+    handle.close()
+
+    # Then
+    assert result.equals(TABLE)
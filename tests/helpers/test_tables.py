@@ -0,0 +1,137 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from resnap.helpers import tables
+from resnap.helpers.tables import (
+    find_table_type,
+    get_result_type,
+    get_table_type,
+    register_table_type,
+)
+
+
+class SubFrame(pd.DataFrame):
+    pass
+
+
+class Records:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+
+
+class SubRecords(Records):
+    pass
+
+
+@pytest.fixture
+def registry(mocker) -> None:
+    mocker.patch.dict(tables._TYPES_BY_CLASS)
+    mocker.patch.dict(tables._TYPES_BY_NAME)
+    mocker.patch.dict(tables._LAZY_TYPES)
+
+
+@pytest.mark.parametrize(
+    "result, expected",
+    [
+        pytest.param(pd.DataFrame({"a": [1]}), "DataFrame", id="DataFrame"),
+        pytest.param(SubFrame({"a": [1]}), "DataFrame", id="DataFrame subclass"),
+        pytest.param(pa.table({"a": [1]}), "Table", id="Table"),
+    ],
+)
+def test_should_get_table_type(result: object, expected: str) -> None:
+    # When
+    table_type = get_table_type(result)
+
+    # Then
+    assert table_type.name == expected
+    assert table_type.from_arrow(table_type.to_arrow(result)).equals(result)
+
+
+@pytest.mark.parametrize("result", [{"a": [1]}, pd.Series([1]), None])
+def test_should_not_get_table_type_of_other_results(result: object) -> None:
+    # When / Then
+    assert get_table_type(result) is None
+
+
+@pytest.mark.parametrize(
+    "result_type, expected",
+    [
+        pytest.param("DataFrame", pd.DataFrame, id="DataFrame"),
+        pytest.param("Table", pa.Table, id="Table"),
+        pytest.param("GeoDataFrame", pd.DataFrame, id="DataFrame subclass"),
+        pytest.param("dict", None, id="not tabular"),
+    ],
+)
+def test_should_find_table_type(result_type: str, expected: type | None) -> None:
+    # When
+    table_type = find_table_type(result_type)
+
+    # Then
+    assert (table_type and table_type.cls) is expected
+
+
+@pytest.mark.parametrize(
+    "result, expected",
+    [
+        pytest.param(pd.DataFrame({"a": [1]}), "DataFrame", id="DataFrame"),
+        pytest.param(SubFrame({"a": [1]}), "SubFrame", id="DataFrame subclass"),
+        pytest.param(pa.table({"a": [1]}), "Table", id="Table"),
+        pytest.param({"a": [1]}, "dict", id="not tabular"),
+    ],
+)
+def test_should_get_result_type(result: object, expected: str) -> None:
+    # When / Then
+    assert get_result_type(result) == expected
+
+
+def test_should_register_table_type(registry: None) -> None:
+    # Given
+    register_table_type(
+        Records, "tests.Records", lambda records: pa.Table.from_pylist(records.rows),
+        lambda table: Records(table.to_pylist()),
+    )
+    records = Records([{"a": 1}, {"a": 2}])
+
+    # When
+    table_type = get_table_type(records)
+
+    # Then
+    assert get_result_type(records) == "tests.Records"
+    assert get_result_type(SubRecords([])) == "tests.Records"
+    assert find_table_type("tests.Records") is table_type
+    assert table_type.to_arrow(records).equals(pa.table({"a": [1, 2]}))
+    assert table_type.from_arrow(pa.table({"a": [3]})).rows == [{"a": 3}]
+
+
+def test_should_register_types_of_installed_packages_on_first_use(registry: None, mocker) -> None:
+    # Given
+    register_records = mocker.Mock(side_effect=lambda: register_table_type(Records, "tests.Records", None, None))
+    register_missing = mocker.Mock()
+    tables._LAZY_TYPES.update({"tests": register_records, "not_installed_package": register_missing})
+
+    # When
+    first = get_table_type(Records([]))
+    second = find_table_type("tests.Records")
+    find_table_type("not_installed_package.Frame")
+
+    # Then
+    assert first is second
+    register_records.assert_called_once()
+    register_missing.assert_not_called()
+
+
+class TestPolars:
+    def test_should_convert_polars_dataframe(self) -> None:
+        # Given
+        pl = pytest.importorskip("polars")
+        df = pl.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+
+        # When
+        table_type = get_table_type(df)
+
+        # Then
+        assert get_result_type(df) == "polars.DataFrame"
+        assert find_table_type("polars.DataFrame") is table_type
+        assert table_type.to_arrow(df).equals(df.to_arrow())
+        assert table_type.from_arrow(df.to_arrow()).equals(df)
@@ -50,6 +50,10 @@ def test_calculate_datetime_from_now(value: int, unit: TimeUnit, expected: datet
             Path(f"toto/toto_2021-01-01T00-00-00{META_EXT}"),
             datetime.fromisoformat("2021-01-01T00:00:00"),
         ),
+        (
+            f"output/my_func/ab/abcd/2021-01-01T00-00-00{META_EXT}",
+            datetime.fromisoformat("2021-01-01T00:00:00"),
+        ),
     ],
 )
 def test_should_extract_datetime_from_filename(filename: Path | str, expected: datetime) -> None:
@@ -30,39 +30,39 @@ class TestClass:
     [
         (
             {"arg_str": "test", "arg_int": 42, "arg_list": [1, 2, 3]},
-            "33e639b122556d8ad669ae7dcc9cf6576c0fdb6db6058acf0de5af199822b0be",
+            "287f3c0480d46389f6bd5c5e4e6291873329f3a7e9a56747bd4b8bc4063c5910",
         ),
         (
             {"arg_int": 42, "arg_list": [1, 2, 3], "arg_str": "test"},
-            "33e639b122556d8ad669ae7dcc9cf6576c0fdb6db6058acf0de5af199822b0be",
+            "287f3c0480d46389f6bd5c5e4e6291873329f3a7e9a56747bd4b8bc4063c5910",
         ),
         (
             {"arg_int": 42, "arg_tuple": (1, 2, 3), "arg_str": "test"},
-            "ac616acb116c3f94bce02223d7544c49c41cc431798fe3c39e38f9cefc03ac2b",
+            "a9261aafce189c7b3598ed84ef8591cb3be1ad24a27012629cd1e73717e57bd9",
         ),
         (
             {"arg_int": 42, "arg_set": {1, 2, 3}, "arg_str": "test"},
-            "f3868811a5ec3310128f870c3c25b05d8f32999696cfee883ed07b4862aefc63",
+            "0c6b74c7cf36bf1d5bc65faa6729ace03c5b38e50a7c3370535f0cc99715bdef",
         ),
         (
             {"arg_df": pd.DataFrame({"A": [1, 2, 3], "B": [4, 5, 6]}), "arg_str": "test"},
-            "309f001ffe0ee049f7fa34f32f7668424e589a73795257a20e652dfaf78b73e8",
+            "b5337d5774873086a79069bac82f4fe91a854fd8eaf639f53addf920afbf4743",
         ),
         (
             {"arg_df": pd.DataFrame({"A": [3, 2, 1], "B": [6, 5, 4]}), "arg_str": "test"},
-            "cbaa16e213cf07f92cdd588522e8ffc458bc14b8acf89fce7196539ef1116e50",
+            "a50e1ec2dedfed8515cdae6c367153e255b676a87039dab332159d794ec2502d",
         ),
         (
             {"args_dataclass": TestDataClass("test", 42, [1, 2, 3], arg_df=pd.DataFrame({"A": [1, 2], "B": [3, 4]}))},
-            "cf807ac07815f225022df95c32adec700dc71e7a11331187aa1f0c74f8aa8237",
+            "0bf4ae13beeceeed9b1592ed6a7c69a90c1774e82c194075698763c3670a8fcd",
         ),
         (
             {"args_class": TestClass("test", 42, [1, 2, 3], arg_df=pd.DataFrame({"A": [1, 2], "B": [3, 4]}))},
-            "54af02a514923a8f229e1bf8c39fd5d63e7b2d939a76ea0bf585be82284ffe13",
+            "185fb1ac1f4230412c5aa405584e4f44833e328baee5433b1a42892b2b9d5645",
         ),
         (
             {"arg_slice": slice(1, 5, 2), "arg_str": "test"},
-            "1bdd21fe2e391a88faf9671df103d38d55bcc6f6e17ef3b6d0e373ba89e8bf5c",
+            "c80ef83873eac1e22cab463cd2476b7bd410b05a57803b201ab452230b6bb65c",
         ),
     ],
 )
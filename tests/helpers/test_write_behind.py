@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from resnap.helpers.write_behind import (
+    WriteBehind,
+    WriteBehindStats,
+    flush,
+    write_behind,
+)
+
+KEY = ("func", "", "hash")
+
+
+class TestWriteBehind:
+    def test_should_return_pending_result_until_saved(self) -> None:
+        # Given
+        writer = WriteBehind()
+        release = threading.Event()
+        save = MagicMock(side_effect=lambda: release.wait(1))
+
+        # When
+        writer.submit(KEY, 42, save, max_workers=1, max_pending=2)
+        pending = writer.get(KEY)
+        release.set()
+        flushed = writer.flush(1)
+
+        # Then
+        assert pending == (True, 42)
+        assert flushed is True
+        assert writer.get(KEY) == (False, None)
+        save.assert_called_once()
+        assert writer.stats == WriteBehindStats(submitted=1, saved=1)
+
+    def test_should_wait_for_a_free_slot_when_queue_is_full(self) -> None:
+        # Given
+        writer = WriteBehind()
+        release = threading.Event()
+        saving = threading.Semaphore(0)
+
+        def save() -> None:
+            saving.release()
+            release.wait(1)
+
+        writer.submit(("func", "", "1"), 1, save, max_workers=1, max_pending=1)
+        saving.acquire()
+
+        # When
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            blocked = executor.submit(writer.submit, ("func", "", "2"), 2, save, 1, 1)
+
+            # Then
+            with pytest.raises(TimeoutError):
+                blocked.result(timeout=0.1)
+            assert writer.stats.pending == 1
+            release.set()
+            blocked.result(timeout=1)
+        assert writer.flush(1) is True
+        assert writer.stats.saved == 2
+
+    def test_should_log_failed_saves(self, caplog: pytest.LogCaptureFixture) -> None:
+        # Given
+        writer = WriteBehind()
+
+        # When
+        writer.submit(KEY, 42, MagicMock(side_effect=OSError("disk full")), max_workers=1, max_pending=1)
+        writer.flush(1)
+
+        # Then
+        assert writer.stats == WriteBehindStats(submitted=1, failed=1)
+        assert writer.get(KEY) == (False, None)
+        assert f"Write-behind save of {KEY} failed" in caplog.text
+
+    def test_should_keep_the_last_pending_result_of_a_key(self) -> None:
+        # Given
+        writer = WriteBehind()
+        release = threading.Event()
+        first_save = MagicMock(side_effect=lambda: release.wait(1))
+        second_save = MagicMock(side_effect=lambda: release.wait(1))
+
+        # When
+        writer.submit(KEY, 1, first_save, max_workers=1, max_pending=2)
+        writer.submit(KEY, 2, second_save, max_workers=1, max_pending=2)
+
+        # Then
+        assert writer.get(KEY) == (True, 2)
+        release.set()
+        assert writer.flush(1) is True
+
+    def test_should_save_in_the_caller_after_shutdown(self) -> None:
+        # Given
+        writer = WriteBehind()
+        writer.submit(("func", "", "1"), 1, MagicMock(), max_workers=1, max_pending=1)
+        writer.flush(1)
+        writer._executor.shutdown()
+        save = MagicMock()
+
+        # When
+        writer.submit(KEY, 42, save, max_workers=1, max_pending=1)
+
+        # Then
+        save.assert_called_once()
+        assert writer.get(KEY) == (False, None)
+
+    def test_should_stop_waiting_after_flush_timeout(self) -> None:
+        # Given
+        writer = WriteBehind()
+        release = threading.Event()
+        writer.submit(KEY, 42, lambda: release.wait(1), max_workers=1, max_pending=1)
+
+        # When
+        flushed = writer.flush(0.05)
+
+        # Then
+        assert flushed is False
+        release.set()
+        assert writer.flush(1) is True
+
+
+def test_should_flush_module_writer(mocker) -> None:
+    # Given
+    mock_flush = mocker.patch.object(write_behind, "flush", return_value=True)
+
+    # When
+    result = flush(2)
+
+    # Then
+    assert result is True
+    mock_flush.assert_called_once_with(2)
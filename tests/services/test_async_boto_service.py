@@ -0,0 +1,151 @@
+import asyncio
+import uuid
+
+import pandas as pd
+import pytest
+
+from resnap.helpers.config import Layout, Services
+from resnap.helpers.index import MetadataIndex
+from resnap.helpers.utils import hash_arguments
+from tests.builders.config_builder import ConfigBuilder
+from tests.builders.metadata_builder import MetadataSuccessBuilder
+
+AsyncBotoResnapService = pytest.importorskip("resnap.services.async_boto_service").AsyncBotoResnapService
+
+HASHED_ARGUMENTS = hash_arguments({"test": "toto"})
+
+
+@pytest.fixture
+def service(s3_secrets: dict[str, str], mocker) -> AsyncBotoResnapService:
+    mocker.patch("resnap.services.async_boto_service.load_file", return_value=s3_secrets)
+    return AsyncBotoResnapService(
+        ConfigBuilder.a_config()
+        .save_to(Services.S3)
+        .with_secrets_file_name("secrets.yml")
+        .with_output_base_path(f"output-{uuid.uuid4().hex}")
+        .with_layout(Layout.HASHED)
+        .build()
+    )
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("toto", "toto/"),
+        ("toto/", "toto/"),
+    ],
+)
+def test_should_format_path(path: str, expected: str) -> None:
+    # When
+    result = AsyncBotoResnapService._format_path(path)
+
+    # Then
+    assert result == expected
+
+
+@pytest.mark.asyncio
+class TestAsyncBotoService:
+    async def test_should_create_output_folders(self, service: AsyncBotoResnapService) -> None:
+        # When
+        await service.create_output_folder("toto")
+        await service.create_output_folder("toto")
+        await service._create_folder(f"{service.config.output_base_path}/titi", "")
+
+        # Then
+        assert await service._client.object_exists(f"{service.config.output_base_path}/")
+        assert await service._client.object_exists(f"{service.config.output_base_path}/toto/")
+        assert await service._client.object_exists(f"{service.config.output_base_path}/titi/")
+
+    async def test_should_save_and_find_result(self, service: AsyncBotoResnapService) -> None:
+        # Given
+        await service.create_output_folder("toto")
+        result_path, event_time = await service.save_result(
+            "func", pd.DataFrame({"a": [1, 2]}), "toto", hashed_arguments=HASHED_ARGUMENTS,
+        )
+        await service.save_success_metadata(
+            "func", "toto", HASHED_ARGUMENTS, event_time, result_path, "DataFrame", {"key": "value"},
+        )
+
+        # When
+        metadata = await service.find_success_metadata("func", "toto", HASHED_ARGUMENTS)
+        result = await service.read_result(metadata)
+        all_metadata = await service.get_success_metadata("func", "toto")
+
+        # Then
+        assert metadata.extra_metadata == {"key": "value"}
+        pd.testing.assert_frame_equal(result, pd.DataFrame({"a": [1, 2]}))
+        assert all_metadata == [metadata]
+
+    async def test_should_not_find_result_in_empty_store(self, service: AsyncBotoResnapService) -> None:
+        # When
+        metadata = await service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert metadata is None
+
+    async def test_should_keep_all_entries_of_concurrent_saves(self, service: AsyncBotoResnapService) -> None:
+        # Given
+        await service.create_output_folder("")
+        await service.get_index("func", "")
+        arguments = [hash_arguments({"call": i}) for i in range(10)]
+
+        async def save_call(hashed_arguments: str) -> None:
+            result_path, event_time = await service.save_result("func", 42, "", "json", hashed_arguments)
+            await service.save_success_metadata("func", "", hashed_arguments, event_time, result_path, "int", {})
+
+        # When
+        await asyncio.gather(*(save_call(hashed_arguments) for hashed_arguments in arguments))
+
+        # Then
+        index = service._decode_index((await service._client.read_object(service.index_path("func", "")))[0])
+        assert all(index.get(hashed_arguments) is not None for hashed_arguments in arguments)
+
+    async def test_should_apply_index_update_again_when_index_was_modified(
+        self, service: AsyncBotoResnapService, mocker,
+    ) -> None:
+        # Given
+        await service.create_output_folder("")
+        await service.get_index("func", "")
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        etags = []
+        replace_object = service._client.replace_object
+
+        async def replace_after_concurrent_update(data: bytes, remote_path: str, etag: str) -> bool:
+            etags.append(etag)
+            return len(etags) > 1 and await replace_object(data, remote_path, etag)
+
+        mocker.patch.object(service._client, "replace_object", side_effect=replace_after_concurrent_update)
+
+        # When
+        await service.add_to_index("func", "", [metadata])
+
+        # Then
+        assert len(etags) == 2
+        assert (await service.get_index("func", "")).get(metadata.hashed_arguments) == metadata
+
+    @pytest.mark.parametrize("content", [b"{not json", b'{"version": "\xff"}'])
+    async def test_should_rebuild_corrupted_index(self, service: AsyncBotoResnapService, content: bytes) -> None:
+        # Given
+        await service.create_output_folder("")
+        await service._client.put_object(content, service.index_path("func", ""))
+
+        # When
+        index = await service.get_index("func", "")
+
+        # Then
+        assert index.to_dict() == MetadataIndex.from_metadata([]).to_dict()
+        assert await service._client.get_object(service.index_path("func", "")) != content
+
+    async def test_should_not_write_index_left_unchanged(self, service: AsyncBotoResnapService) -> None:
+        # Given
+        index_path = service.index_path("func", "")
+
+        async def leave_unchanged(index: MetadataIndex | None) -> None:
+            return None
+
+        # When
+        result = await service._modify_index_file(index_path, leave_unchanged)
+
+        # Then
+        assert result is None
+        assert await service._client.read_object(index_path) is None
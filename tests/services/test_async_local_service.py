@@ -0,0 +1,469 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from pyarrow import parquet as pq
+
+from resnap.helpers.config import (
+    ArrowCompression,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from resnap.helpers.constants import INDEX_EXT, LOCK_EXT, META_EXT
+from resnap.helpers.hashing import HashAlgorithm
+from resnap.helpers.singleton import SingletonABCMeta
+from resnap.helpers.status import Status
+from resnap.helpers.tables import get_result_type
+from resnap.helpers.utils import hash_arguments
+from resnap.services.async_local_service import AsyncLocalResnapService
+from resnap.services.local_service import LocalResnapService
+from tests.builders.config_builder import ConfigBuilder
+from tests.builders.metadata_builder import MetadataSuccessBuilder
+
+HASHED_ARGUMENTS = hash_arguments({"test": "toto"})
+
+
+def a_service(tmp_path: Path, layout: Layout = Layout.FLAT) -> AsyncLocalResnapService:
+    return AsyncLocalResnapService(
+        ConfigBuilder.a_config().with_output_base_path(str(tmp_path / "output")).with_layout(layout).build()
+    )
+
+
+async def save(service: AsyncLocalResnapService, result: object, output_format: str | None = None) -> str:
+    result_path, event_time = await service.save_result("func", result, "", output_format, HASHED_ARGUMENTS)
+    await service.save_success_metadata(
+        "func", "", HASHED_ARGUMENTS, event_time, result_path, get_result_type(result), {},
+    )
+    return result_path
+
+
+@pytest.mark.asyncio
+class TestAsyncLocalService:
+    @pytest.mark.parametrize(
+        "result, output_format, extension",
+        [
+            (pd.DataFrame({"a": [1, 2]}), None, "parquet.gz"),
+            (pd.DataFrame({"a": [1, 2]}), "csv", "csv"),
+            (pa.table({"a": [1, 2]}), None, "parquet.gz"),
+            (42, "txt", "txt"),
+            ({"a": [1, 2]}, "json", "json"),
+            ({"a": {1, 2}}, None, "pkl"),
+            (np.arange(6).reshape(2, 3), None, "npy"),
+            ({"a": np.arange(3), "b": np.ones(2)}, None, "npz"),
+        ],
+    )
+    @pytest.mark.parametrize("layout", [Layout.FLAT, Layout.HASHED])
+    async def test_should_save_and_find_result(
+        self, tmp_path: Path, result: object, output_format: str | None, extension: str, layout: Layout,
+    ) -> None:
+        # Given
+        service = a_service(tmp_path, layout)
+        await service.create_output_folder("")
+        result_path = await save(service, result, output_format)
+
+        # When
+        metadata = await service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+        read_result = await service.read_result(metadata)
+
+        # Then
+        assert result_path.endswith(extension)
+        assert metadata.result_path == result_path
+        if isinstance(result, pd.DataFrame):
+            pd.testing.assert_frame_equal(read_result, result)
+        elif isinstance(result, pa.Table):
+            assert read_result.equals(result)
+        elif extension in ("npy", "npz"):
+            np.testing.assert_equal(read_result, result)
+        else:
+            assert read_result == result
+
+    @pytest.mark.parametrize("compression", list(ParquetCompression))
+    async def test_should_save_dataframe_with_parquet_compression(
+        self, tmp_path: Path, compression: ParquetCompression,
+    ) -> None:
+        # Given
+        service = a_service(tmp_path)
+        sync_service = LocalResnapService(service.config)
+        await service.create_output_folder("")
+        result = pd.DataFrame({"a": range(100)})
+
+        # When
+        result_path, event_time = await service.save_result(
+            "func", result, "", hashed_arguments=HASHED_ARGUMENTS, compression=compression,
+        )
+        await service.save_success_metadata(
+            "func", "", HASHED_ARGUMENTS, event_time, result_path, "DataFrame", {}, compression=compression,
+        )
+        metadata = sync_service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert result_path.endswith(compression.extension)
+        assert (metadata.result_format, metadata.compression) == ("parquet", compression.value)
+        pd.testing.assert_frame_equal(await service.read_result(metadata), result)
+        pd.testing.assert_frame_equal(sync_service.read_result(metadata), result)
+
+    @pytest.mark.parametrize(
+        "result, compression",
+        [
+            (pd.DataFrame({"a": range(100)}, index=range(100, 200)), ArrowCompression.NONE),
+            (pa.table({"a": range(100)}), ArrowCompression.LZ4),
+            (pa.table({"a": range(100)}), ArrowCompression.ZSTD),
+        ],
+    )
+    async def test_should_save_result_in_arrow(
+        self, tmp_path: Path, result: pd.DataFrame | pa.Table, compression: ArrowCompression,
+    ) -> None:
+        # Given
+        service = a_service(tmp_path)
+        sync_service = LocalResnapService(service.config)
+        await service.create_output_folder("")
+
+        # When
+        result_path, event_time = await service.save_result(
+            "func", result, "", "arrow", HASHED_ARGUMENTS, arrow_compression=compression,
+        )
+        await service.save_success_metadata(
+            "func", "", HASHED_ARGUMENTS, event_time, result_path, type(result).__name__, {},
+            arrow_compression=compression,
+        )
+        metadata = sync_service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert result_path.endswith(".arrow")
+        assert (metadata.result_format, metadata.compression) == ("arrow", compression.value)
+        assert (await service.read_result(metadata)).equals(result)
+        assert sync_service.read_result(metadata).equals(result)
+
+    @pytest.mark.parametrize(
+        "result, output_format, compression",
+        [
+            ({"a": list(range(100))}, None, FileCompression.ZSTD),
+            ({"a": [1, 2]}, "json", FileCompression.GZIP),
+            ("toto", "txt", FileCompression.LZ4),
+        ],
+    )
+    async def test_should_save_compressed_result(
+        self, tmp_path: Path, result: object, output_format: str | None, compression: FileCompression,
+    ) -> None:
+        # Given
+        service = a_service(tmp_path)
+        sync_service = LocalResnapService(service.config)
+        await service.create_output_folder("")
+
+        # When
+        result_path, event_time = await service.save_result(
+            "func", result, "", output_format, HASHED_ARGUMENTS, file_compression=compression,
+        )
+        await service.save_success_metadata(
+            "func", "", HASHED_ARGUMENTS, event_time, result_path, type(result).__name__, {},
+            file_compression=compression,
+        )
+        metadata = sync_service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert result_path.endswith(compression.suffix)
+        assert metadata.compression == compression.value
+        for read_result in (await service.read_result(metadata), sync_service.read_result(metadata)):
+            assert str(read_result) == str(result)
+
+    @pytest.mark.parametrize("output_format", [None, "arrow"])
+    async def test_should_save_and_read_polars_dataframe(self, tmp_path: Path, output_format: str | None) -> None:
+        # Given
+        pl = pytest.importorskip("polars")
+        service = a_service(tmp_path)
+        sync_service = LocalResnapService(service.config)
+        await service.create_output_folder("")
+        result = pl.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+        await save(service, result, output_format)
+
+        # When
+        metadata = await service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert metadata.result_type == "polars.DataFrame"
+        for read_result in (await service.read_result(metadata), sync_service.read_result(metadata)):
+            assert isinstance(read_result, pl.DataFrame)
+            assert read_result.equals(result)
+
+    @pytest.mark.parametrize("result", [pd.DataFrame({"a": range(1000)}), pa.table({"a": range(1000)})])
+    async def test_should_save_parquet_row_groups(self, tmp_path: Path, result: pd.DataFrame | pa.Table) -> None:
+        # Given
+        service = AsyncLocalResnapService(
+            ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).with_parquet_row_group_size(100).build()
+        )
+        await service.create_output_folder("")
+
+        # When
+        result_path = await save(service, result)
+
+        # Then
+        assert pq.ParquetFile(result_path).metadata.num_row_groups == 10
+
+    async def test_should_share_the_store_with_the_synchronous_service(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path, Layout.HASHED)
+        sync_service = LocalResnapService(service.config)
+        await service.create_output_folder("")
+        await save(service, pd.DataFrame({"a": [1, 2]}))
+
+        # When
+        metadata = sync_service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+        result = sync_service.read_result(metadata)
+
+        # Then
+        pd.testing.assert_frame_equal(result, pd.DataFrame({"a": [1, 2]}))
+
+    @pytest.mark.parametrize("layout", [Layout.FLAT, Layout.HASHED])
+    async def test_should_return_metadata_from_the_most_recent_to_the_oldest(
+        self, tmp_path: Path, layout: Layout,
+    ) -> None:
+        # Given
+        service = a_service(tmp_path, layout)
+        await service.create_output_folder("")
+        await save(service, 1)
+        await service.save_failed_metadata(
+            "func", "", HASHED_ARGUMENTS, datetime.now(), "error", {"key": "value"}, {},
+        )
+        await save(service, 2)
+
+        # When
+        metadata = await service.get_metadata("func", "")
+        success_metadata = await service.get_success_metadata("func", "")
+
+        # Then
+        assert [m.status for m in metadata] == [Status.SUCCESS, Status.FAIL, Status.SUCCESS]
+        assert len(success_metadata) == 2
+        assert await service.read_result(success_metadata[0]) == 2
+
+    async def test_should_rebuild_a_corrupted_index(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        await service.create_output_folder("")
+        await save(service, 42)
+        index_path = Path(service.index_path("func", ""))
+        index_path.write_text("{")
+
+        # When
+        metadata = await service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert metadata is not None
+        assert index_path.read_text() != "{"
+
+    @pytest.mark.parametrize("layout", [Layout.FLAT, Layout.HASHED])
+    async def test_should_keep_all_entries_of_concurrent_saves(self, tmp_path: Path, layout: Layout) -> None:
+        # Given
+        service = a_service(tmp_path, layout)
+        await service.create_output_folder("")
+        await service.get_index("func", "")
+        arguments = [hash_arguments({"call": i}) for i in range(30)]
+
+        async def save_call(hashed_arguments: str) -> None:
+            result_path, event_time = await service.save_result("func", 42, "", "json", hashed_arguments)
+            await service.save_success_metadata("func", "", hashed_arguments, event_time, result_path, "int", {})
+
+        # When
+        await asyncio.gather(*(save_call(hashed_arguments) for hashed_arguments in arguments))
+
+        # Then
+        index = LocalResnapService(service.config).get_index("func", "")
+        assert all(index.get(hashed_arguments) is not None for hashed_arguments in arguments)
+        assert not Path(f"{service.index_path('func', '')}{LOCK_EXT}").exists()
+
+    async def test_should_keep_all_entries_of_concurrent_sync_and_async_saves(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        sync_service = LocalResnapService(service.config)
+        await service.create_output_folder("")
+        metadata = [MetadataSuccessBuilder.a_metadata().with_arguments({"call": i}).build() for i in range(40)]
+
+        # When
+        await asyncio.gather(
+            *(service.add_to_index("func", "", [entry]) for entry in metadata[::2]),
+            *(asyncio.to_thread(sync_service.add_to_index, "func", "", [entry]) for entry in metadata[1::2]),
+        )
+
+        # Then
+        index = await service.get_index("func", "")
+        assert all(index.get(entry.hashed_arguments) == entry for entry in metadata)
+
+    async def test_should_wait_for_index_lock_of_sync_service(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        await service.create_output_folder("")
+        lock_path = Path(f"{service.index_path('func', '')}{LOCK_EXT}")
+        lock_path.write_text("0")
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+
+        # When
+        task = asyncio.create_task(service.add_to_index("func", "", [metadata]))
+        await asyncio.sleep(0.05)
+        is_waiting = not task.done()
+        lock_path.unlink()
+        await task
+
+        # Then
+        assert is_waiting
+        assert (await service.get_index("func", "")).get(metadata.hashed_arguments) == metadata
+        assert not lock_path.exists()
+
+    async def test_should_take_over_index_lock_of_a_dead_process(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        await service.create_output_folder("")
+        lock_path = Path(f"{service.index_path('func', '')}{LOCK_EXT}")
+        lock_path.write_text("0")
+        os.utime(lock_path, (time.time() - 60, time.time() - 60))
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+
+        # When
+        await service.add_to_index("func", "", [metadata])
+
+        # Then
+        assert (await service.get_index("func", "")).get(metadata.hashed_arguments) == metadata
+        assert not lock_path.exists()
+
+    async def test_should_not_write_index_left_unchanged(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        await service.create_output_folder("")
+
+        async def leave_unchanged(index: object) -> None:
+            return None
+
+        # When
+        result = await service._modify_index_file(service.index_path("func", ""), leave_unchanged)
+        await service.add_to_index("func", "", [])
+
+        # Then
+        assert result is None
+        assert list((tmp_path / "output").iterdir()) == []
+
+    async def test_should_find_snapshot_missing_from_the_index(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path, Layout.HASHED)
+        await service.create_output_folder("")
+        await save(service, 42)
+        other_arguments = hash_arguments({"test": "other"})
+        await service.rebuild_index("func", "")
+        metadata_path = service.metadata_path("func", datetime.now(), "", other_arguments)
+        await service._create_parent_folder(metadata_path)
+        await service._write_metadata(
+            metadata_path,
+            MetadataSuccessBuilder.a_metadata().with_arguments({"test": "other"}).build(),
+        )
+
+        # When
+        metadata = await service.find_success_metadata("func", "", other_arguments)
+        index = await service.get_index("func", "")
+
+        # Then
+        assert metadata.hashed_arguments == other_arguments
+        assert index.get(other_arguments) == metadata
+
+    @pytest.mark.parametrize("layout", [Layout.FLAT, Layout.HASHED])
+    async def test_should_not_find_results_hashed_with_another_algorithm(
+        self, tmp_path: Path, layout: Layout,
+    ) -> None:
+        # Given
+        service = a_service(tmp_path, layout)
+        await service.create_output_folder("")
+        await save(service, 42)
+        SingletonABCMeta._instances.clear()
+        other_service = AsyncLocalResnapService(
+            ConfigBuilder.a_config()
+            .with_output_base_path(service.config.output_base_path)
+            .with_layout(layout)
+            .with_hash_algorithm(HashAlgorithm.BLAKE2B)
+            .build()
+        )
+
+        # When
+        metadata = await other_service.find_success_metadata("func", "", HASHED_ARGUMENTS)
+
+        # Then
+        assert metadata is None
+
+    async def test_should_create_output_folders(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+
+        # When
+        await service.create_output_folder("toto")
+        await service.create_output_folder("toto")
+
+        # Then
+        assert (tmp_path / "output" / "toto").is_dir()
+
+    async def test_should_list_nothing_in_a_missing_folder(self, tmp_path: Path) -> None:
+        # When
+        metadata = await a_service(tmp_path).get_metadata("func", "")
+
+        # Then
+        assert metadata == []
+
+    async def test_should_not_read_table_from_csv_file(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        file_path = tmp_path / "result.csv"
+        file_path.write_bytes(b"")
+        metadata = (
+            MetadataSuccessBuilder.a_metadata().with_result_path(str(file_path)).with_result_type("Table").build()
+        )
+
+        # When / Then
+        with pytest.raises(NotImplementedError, match="Unsupported result type: Table"):
+            await service.read_result(metadata)
+
+    async def test_should_not_read_unsupported_file(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path)
+        file_path = tmp_path / "result.xml"
+        file_path.write_bytes(b"")
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_path(str(file_path)).build()
+
+        # When / Then
+        with pytest.raises(NotImplementedError, match="Unsupported result type: str"):
+            await service.read_result(metadata)
+
+    async def test_should_run_concurrent_lookups(self, tmp_path: Path) -> None:
+        # Given
+        service = a_service(tmp_path, Layout.HASHED)
+        await service.create_output_folder("")
+        await save(service, 42)
+
+        # When
+        results = await asyncio.gather(
+            *(service.find_success_metadata("func", "", HASHED_ARGUMENTS) for _ in range(50))
+        )
+
+        # Then
+        assert len({metadata.result_path for metadata in results}) == 1
+        assert not [f for f in (tmp_path / "output").iterdir() if f.name.endswith(".tmp")]
+        assert (tmp_path / "output" / f"func{INDEX_EXT}").is_file()
+        assert len(list((tmp_path / "output").rglob(f"*{META_EXT}"))) == 1
+
+
+def test_should_lock_index_in_each_event_loop(tmp_path: Path) -> None:
+    # Given
+    service = a_service(tmp_path)
+    asyncio.run(service.create_output_folder(""))
+    metadata = [MetadataSuccessBuilder.a_metadata().with_arguments({"call": i}).build() for i in range(20)]
+
+    async def add_all(entries: list) -> None:
+        await asyncio.gather(*(service.add_to_index("func", "", [entry]) for entry in entries))
+
+    # When
+    asyncio.run(add_all(metadata[:10]))
+    asyncio.run(add_all(metadata[10:]))
+
+    # Then
+    index = LocalResnapService(service.config).get_index("func", "")
+    assert all(index.get(entry.hashed_arguments) == entry for entry in metadata)
@@ -1,17 +1,31 @@
+import io
 import json
 import pickle
-from datetime import datetime
-from unittest.mock import ANY, MagicMock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import ANY, MagicMock, patch
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pytest
-
-from resnap.helpers.constants import EXT, META_EXT
+from botocore.exceptions import ClientError
+
+from resnap.helpers.config import (
+    ArrowCompression,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from resnap.helpers.constants import CLEANUP_LOCK, EXT, INDEX_EXT, LEASE_EXT, META_EXT
+from resnap.helpers.index import MetadataIndex
 from resnap.helpers.metadata import Metadata, MetadataSuccess
 from resnap.helpers.status import Status
 from resnap.helpers.utils import hash_arguments
 from resnap.services.boto_service import BotoResnapService
 from tests.builders.config_builder import ConfigBuilder
+from tests.builders.metadata_builder import MetadataSuccessBuilder
 
 s3_secrets: dict = {
     "endpoint_url": "http://s3-server",
@@ -29,6 +43,12 @@ def mock_load_file(mocker) -> MagicMock:
     return mock
 
 
+@pytest.fixture
+def moto_service(request: pytest.FixtureRequest, mock_load_file: MagicMock) -> BotoResnapService:
+    mock_load_file.return_value = request.getfixturevalue("s3_secrets")
+    return BotoResnapService(ConfigBuilder.a_config().with_output_base_path(f"leases/{request.node.name}").build())
+
+
 @pytest.fixture
 def mock_s3_client_object_exists(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch("resnap.services.boto_service.S3Client.object_exists")
@@ -160,6 +180,47 @@ class TestBotoService:
         assert mock_s3_client_list_objects.call_count == 2
         assert mock_s3_client_delete_objects.call_count == int(is_deleted)
 
+    def test_should_prune_indexes_when_clearing_old_saves(
+        self,
+        mock_s3_client_object_exists: MagicMock,
+        mock_s3_client_list_objects: MagicMock,
+        mock_s3_client_delete_objects: MagicMock,
+        mocker,
+    ) -> None:
+        # Given
+        mock_s3_client_object_exists.return_value = True
+        mock_s3_client_list_objects.return_value = [f"test{INDEX_EXT}"]
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_prune_indexes: MagicMock = mocker.patch.object(service, "_prune_indexes")
+
+        # When
+        service.clear_old_saves()
+
+        # Then
+        mock_s3_client_delete_objects.assert_not_called()
+        mock_prune_indexes.assert_called_once_with([f"test{INDEX_EXT}"], ANY)
+
+    def test_should_prune_indexes_before_deleting_files(
+        self,
+        mock_s3_client_object_exists: MagicMock,
+        mock_s3_client_list_objects: MagicMock,
+        mock_s3_client_delete_objects: MagicMock,
+        mocker,
+    ) -> None:
+        # Given
+        mock_s3_client_object_exists.return_value = True
+        mock_s3_client_list_objects.return_value = [f"test{INDEX_EXT}", f"test_2021-01-01T00-00-00{EXT}.pkl"]
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        calls: list[str] = []
+        mocker.patch.object(service, "_prune_indexes", side_effect=lambda *_: calls.append("prune"))
+        mock_s3_client_delete_objects.side_effect = lambda _: calls.append("delete")
+
+        # When
+        service.clear_old_saves()
+
+        # Then
+        assert calls == ["prune", "delete"]
+
     def test_should_not_clear_old_saves_if_folder_does_not_exist(
         self,
         mock_s3_client_object_exists: MagicMock,
@@ -276,11 +337,17 @@ class TestBotoService:
         result_path = "test.parquet"
 
         # When
-        service._save_dataframe_to_parquet(result, result_path)
+        service._save_dataframe_to_parquet(result, result_path, ParquetCompression.ZSTD, 3, 1000)
 
         # Then
         mock_s3_client_push_df_to_file.assert_called_once_with(
-            result, "test.parquet", compression="gzip", file_format="parquet"
+            result,
+            "test.parquet",
+            compression="zstd",
+            file_format="parquet",
+            compression_level=3,
+            row_group_size=1000,
+            write_statistics=True,
         )
 
     def test_should_save_dataframe_to_csv(self, mock_s3_client_push_df_to_file: MagicMock) -> None:
@@ -295,6 +362,62 @@ class TestBotoService:
         # Then
         mock_s3_client_push_df_to_file.assert_called_once_with(result, "test.csv", file_format="csv")
 
+    def test_should_save_to_arrow(self, mock_s3_client_upload_file: MagicMock) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        result = pa.table({"a": [1, 2]})
+        uploaded: dict[str, bytes] = {}
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.update({path: buffer.getvalue()})
+
+        # When
+        service._save_to_arrow(result, "test.arrow", ArrowCompression.ZSTD)
+
+        # Then
+        assert pa.ipc.open_file(pa.py_buffer(uploaded["test.arrow"])).read_all().equals(result)
+
+    def test_should_save_array(self, mock_s3_client_upload_file: MagicMock) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        result = np.arange(6).reshape(2, 3)
+        uploaded: dict[str, bytes] = {}
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.update({path: buffer.getvalue()})
+
+        # When
+        service._save_array(result, "test.npy")
+
+        # Then
+        np.testing.assert_array_equal(np.load(io.BytesIO(uploaded["test.npy"])), result)
+
+    def test_should_save_and_read_arrays(
+        self, mock_s3_client_upload_file: MagicMock, mock_s3_client_download_file: MagicMock,
+    ) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        result = {"a": np.arange(3), "b": np.ones(2)}
+        uploaded: dict[str, bytes] = {}
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.update({path: buffer.getvalue()})
+        mock_s3_client_download_file.side_effect = lambda buffer, path: buffer.write(uploaded[path])
+
+        # When
+        service._save_arrays(result, "test.npz")
+        arrays = service._read_arrays("test.npz")
+
+        # Then
+        assert arrays.keys() == result.keys()
+        np.testing.assert_array_equal(arrays["a"], result["a"])
+
+    def test_should_read_array(self, mocker) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_get_array = mocker.patch("resnap.boto.client.S3Client.get_array_from_file")
+
+        # When
+        result = service._read_array("test.npy")
+
+        # Then
+        assert result is mock_get_array.return_value
+        mock_get_array.assert_called_once_with("test.npy")
+
     def test_should_save_to_pickle(self, mock_s3_client_upload_file: MagicMock) -> None:
         # Given
         service = BotoResnapService(ConfigBuilder.a_config().build())
@@ -309,6 +432,153 @@ class TestBotoService:
         args, _ = mock_s3_client_upload_file.call_args
         assert args[1] == "test.pkl"
 
+    def test_should_save_and_read_pickle_with_out_of_band_arrays(
+        self, mock_s3_client_upload_file: MagicMock, mock_s3_client_download_file: MagicMock,
+    ) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        result = {"key": "value", "array": np.arange(100_000.0)}
+        uploaded: dict[str, bytes] = {}
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.update({path: buffer.read()})
+        mock_s3_client_download_file.side_effect = lambda buffer, path: buffer.write(uploaded[path])
+
+        # When
+        service._save_to_pickle(result, "test.pkl")
+        read_result = service._read_pickle("test.pkl")
+
+        # Then
+        assert read_result["key"] == "value"
+        np.testing.assert_array_equal(read_result["array"], result["array"])
+        assert read_result["array"].flags.writeable
+
+    @pytest.mark.parametrize("compression", [FileCompression.ZSTD, FileCompression.LZ4, FileCompression.GZIP])
+    @pytest.mark.parametrize(
+        "save, read, result",
+        [
+            ("_save_to_pickle", "_read_pickle", ["toto"] * 10_000),
+            ("_save_to_json", "_read_json", ["toto"] * 10_000),
+            ("_save_to_text", "_read_text", "toto" * 10_000),
+        ],
+    )
+    def test_should_save_and_read_compressed_file(
+        self,
+        mock_s3_client_upload_file: MagicMock,
+        mock_s3_client_download_file: MagicMock,
+        compression: FileCompression,
+        save: str,
+        read: str,
+        result: Any,
+    ) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        uploaded: dict[str, bytes] = {}
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.update({path: buffer.read()})
+        mock_s3_client_download_file.side_effect = lambda buffer, path: buffer.write(uploaded[path])
+
+        # When
+        getattr(service, save)(result, "test", compression=compression)
+        read_result = getattr(service, read)("test", compression=compression)
+
+        # Then
+        assert read_result == result
+        assert len(uploaded["test"]) < 10_000
+
+    def test_should_save_and_read_table_in_parquet(
+        self, mock_s3_client_upload_file: MagicMock, mock_s3_client_download_file: MagicMock,
+    ) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        result = pa.table({"a": [1, 2], "b": ["x", "y"]})
+        uploaded: dict[str, bytes] = {}
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.update({path: buffer.read()})
+        mock_s3_client_download_file.side_effect = lambda buffer, path: buffer.write(uploaded[path])
+
+        # When
+        service._save_table_to_parquet(result, "test.parquet", ParquetCompression.ZSTD)
+        table = service._read_parquet_to_table("test.parquet")
+
+        # Then
+        assert table.equals(result)
+        mock_s3_client_download_file.assert_called_once_with(ANY, "test.parquet")
+
+    def test_should_open_file_for_ranged_reads(self, mocker) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_open_object = mocker.patch("resnap.services.boto_service.S3Client.open_object")
+
+        # When
+        file = service._open_file("test.parquet")
+
+        # Then
+        assert file is mock_open_object.return_value
+        mock_open_object.assert_called_once_with("test.parquet")
+
+    def test_should_open_saved_table_on_s3(self, moto_service: BotoResnapService) -> None:
+        # Given
+        result = pa.table({"day": [i // 100 for i in range(1000)], "price": range(1000)})
+        result_path, _ = moto_service.save_result("test", result, "")
+        metadata = MetadataSuccess.from_dict({
+            "status": "SUCCESS",
+            "event_time": "2021-01-01T00:00:00",
+            "hashed_arguments": "",
+            "result_path": result_path,
+            "result_type": "Table",
+        })
+
+        # When
+        with moto_service.open_result(metadata) as handle:
+            read_result = handle.read(columns=["price"], filters=[("day", ">=", 9)])
+
+        # Then
+        assert read_result.equals(pa.table({"price": range(900, 1000)}))
+
+    @pytest.mark.parametrize(
+        "items",
+        [
+            pytest.param([pa.table({"a": [1, 2]}), pa.table({"a": [3]})], id="tables"),
+            pytest.param([{"a": 1}, [2]], id="pickles"),
+        ],
+    )
+    def test_should_write_and_replay_stream_on_s3(self, moto_service: BotoResnapService, items: list) -> None:
+        # Given
+        writer = moto_service.open_stream("test", items[0], "")
+        for item in items:
+            writer.write(item)
+        writer.close()
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_path(writer.result_path).with_result_type(
+            writer.result_type
+        ).build()
+
+        # When
+        read_items = list(moto_service.read_stream(metadata))
+
+        # Then
+        assert read_items == items
+
+    def test_should_delete_aborted_stream_on_s3(self, moto_service: BotoResnapService) -> None:
+        # Given
+        writer = moto_service.open_stream("test", 1, "")
+        writer.write(1)
+
+        # When
+        writer.abort()
+
+        # Then
+        assert not moto_service._client.object_exists(writer.result_path)
+
+    def test_should_not_publish_aborted_stream_on_s3(self, moto_service: BotoResnapService) -> None:
+        # Given
+        with patch.object(moto_service, "_delete_file") as delete_file:
+            writer = moto_service.open_stream("test", 1, "")
+        writer.write(1)
+
+        # When
+        writer.abort()
+
+        # Then
+        delete_file.assert_called_once_with(writer.result_path)
+        assert not moto_service._client.object_exists(writer.result_path)
+
     def test_should_save_to_text(self, mock_s3_client_upload_file: MagicMock) -> None:
         # Given
         service = BotoResnapService(ConfigBuilder.a_config().build())
@@ -379,6 +649,22 @@ class TestBotoService:
         assert result == expected_data
         mock_s3_client_download_file.assert_called_once_with(ANY, str(file_path))
 
+    def test_should_read_arrow(self, mock_s3_client_download_file: MagicMock) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        expected_data = pa.table({"a": [1, 2]})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, expected_data.schema) as writer:
+            writer.write_table(expected_data)
+        mock_s3_client_download_file.side_effect = lambda buffer, path: buffer.write(sink.getvalue().to_pybytes())
+
+        # When
+        result = service._read_arrow("test.arrow")
+
+        # Then
+        assert result.equals(expected_data)
+        mock_s3_client_download_file.assert_called_once_with(ANY, "test.arrow")
+
     def test_should_read_text(self, mock_s3_client_download_file: MagicMock) -> None:
         # Given
         service = BotoResnapService(ConfigBuilder.a_config().build())
@@ -447,3 +733,339 @@ class TestBotoService:
         # Then
         assert mock_s3_client_object_exists.call_count == exist_count
         assert mock_s3_client_mkdir.call_count == mkdir_count
+
+    def test_should_read_index(self, mock_s3_client_download_file: MagicMock) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_s3_client_download_file.side_effect = lambda buffer, path: buffer.write(b'{"version": 1}')
+
+        # When
+        result = service._read_index(f"test{INDEX_EXT}")
+
+        # Then
+        assert result == {"version": 1}
+
+    @pytest.mark.parametrize(
+        "side_effect",
+        [
+            ClientError({"Error": {"Code": "404"}}, "GetObject"),
+            ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"),
+            lambda buffer, path: buffer.write(b"{not json"),
+            lambda buffer, path: buffer.write(b'{"version": "\xff"}'),
+        ],
+    )
+    def test_should_not_read_missing_or_corrupted_index(
+        self, side_effect, mock_s3_client_download_file: MagicMock
+    ) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_s3_client_download_file.side_effect = side_effect
+
+        # When
+        result = service._read_index(f"test{INDEX_EXT}")
+
+        # Then
+        assert result is None
+
+    def test_should_raise_unexpected_error_when_reading_index(self, mock_s3_client_download_file: MagicMock) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_s3_client_download_file.side_effect = ClientError({"Error": {"Code": "403"}}, "GetObject")
+
+        # When / Then
+        with pytest.raises(ClientError):
+            service._read_index(f"test{INDEX_EXT}")
+
+    def test_should_write_index(self, mock_s3_client_upload_file: MagicMock) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        uploaded: list[bytes] = []
+        mock_s3_client_upload_file.side_effect = lambda buffer, path: uploaded.append(buffer.getvalue())
+
+        # When
+        service._write_index(f"test{INDEX_EXT}", {"version": 1})
+
+        # Then
+        mock_s3_client_upload_file.assert_called_once_with(ANY, f"test{INDEX_EXT}")
+        assert json.loads(uploaded[0]) == {"version": 1}
+
+    def test_should_list_metadata_files(self, mocker) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_list = mocker.patch(
+            "resnap.services.boto_service.S3Client.list_folders_and_files",
+            return_value=([], [f"test/a{META_EXT}", f"test/a{EXT}.pkl"]),
+        )
+
+        # When
+        result = service._list_metadata_files("test", recursive=True)
+
+        # Then
+        assert result == [f"test/a{META_EXT}"]
+        mock_list.assert_called_once_with("test", True)
+
+    def test_should_not_list_metadata_files_of_missing_folder(self, mocker) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mocker.patch(
+            "resnap.services.boto_service.S3Client.list_folders_and_files", side_effect=FileNotFoundError
+        )
+
+        # When
+        result = service._list_metadata_files("test")
+
+        # Then
+        assert result == []
+
+    def test_should_return_metadata_with_hashed_layout(self, mocker) -> None:
+        # Given
+        service = BotoResnapService(
+            ConfigBuilder.a_config().with_output_base_path("output").with_layout(Layout.HASHED).build()
+        )
+        mock_list = mocker.patch(
+            "resnap.services.boto_service.BotoResnapService._list_metadata_files",
+            return_value=[f"output/test/bb/bbbb/2021-01-02T00-00-00{META_EXT}", f"output/test/aa/aaaa/2021-01-03T00-00-00{META_EXT}"],
+        )
+        mock_read = mocker.patch(
+            "resnap.services.boto_service.BotoResnapService._read_metadata", side_effect=lambda path: path
+        )
+
+        # When
+        result = service.get_metadata("test", "")
+
+        # Then
+        mock_list.assert_called_once_with("output/test", True)
+        assert result == [f"output/test/aa/aaaa/2021-01-03T00-00-00{META_EXT}", f"output/test/bb/bbbb/2021-01-02T00-00-00{META_EXT}"]
+        assert mock_read.call_count == 2
+
+    def test_should_move_file(self, mocker) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().build())
+        mock_copy = mocker.patch("resnap.services.boto_service.S3Client.copy_object")
+        mock_delete = mocker.patch("resnap.services.boto_service.S3Client.delete_object")
+
+        # When
+        service._move_file("source", "target")
+
+        # Then
+        mock_copy.assert_called_once_with("source", "target")
+        mock_delete.assert_called_once_with("source")
+
+    @pytest.mark.parametrize(
+        "last_modified, expected",
+        [
+            pytest.param(None, True, id="no lock"),
+            pytest.param(timedelta(seconds=120), True, id="expired lock"),
+            pytest.param(timedelta(seconds=10), False, id="recent lock"),
+        ],
+    )
+    def test_should_acquire_cleanup_lock(
+        self,
+        last_modified: timedelta | None,
+        expected: bool,
+        mock_s3_client_upload_file: MagicMock,
+        mocker,
+    ) -> None:
+        # Given
+        service = BotoResnapService(ConfigBuilder.a_config().with_output_base_path("output").build())
+        mock_get_last_modified = mocker.patch(
+            "resnap.services.boto_service.S3Client.get_last_modified",
+            return_value=None if last_modified is None else datetime.now(timezone.utc) - last_modified,
+        )
+
+        # When
+        result = service._acquire_cleanup_lock(60)
+
+        # Then
+        assert result is expected
+        mock_get_last_modified.assert_called_once_with(f"output/{CLEANUP_LOCK}")
+        assert mock_s3_client_upload_file.call_count == int(expected)
+
+
+class TestBotoServiceLease:
+    hashed_arguments: str = hash_arguments({"test": "toto"})
+
+    def lease_path(self, service: BotoResnapService) -> str:
+        return f"{service.config.output_base_path}/test_{self.hashed_arguments}{LEASE_EXT}"
+
+    def read_lease(self, service: BotoResnapService) -> dict | None:
+        current = service._client.read_object(self.lease_path(service))
+        return None if current is None else json.loads(current[0])
+
+    def test_should_acquire_lease_once(self, moto_service: BotoResnapService) -> None:
+        # When
+        lease = moto_service.acquire_lease("test", "", self.hashed_arguments, 60)
+        second = moto_service.acquire_lease("test", "", self.hashed_arguments, 60)
+
+        # Then
+        assert lease is not None
+        assert second is None
+        content = self.read_lease(moto_service)
+        assert content["ttl_seconds"] == 60
+        assert datetime.fromisoformat(content["expires_at"]) - datetime.fromisoformat(content["heartbeat"]) == (
+            timedelta(seconds=60)
+        )
+        lease.release()
+        assert self.read_lease(moto_service) is None
+
+    def test_should_give_lease_to_a_single_thread(self, moto_service: BotoResnapService) -> None:
+        # When
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            leases = list(executor.map(
+                lambda _: moto_service.acquire_lease("test", "", self.hashed_arguments, 60), range(8),
+            ))
+
+        # Then
+        acquired = [lease for lease in leases if lease is not None]
+        assert len(acquired) == 1
+        acquired[0].release()
+
+    def test_should_take_over_expired_lease_once(self, moto_service: BotoResnapService) -> None:
+        # Given
+        moto_service._client.create_object(
+            json.dumps({"owner": "dead-owner", "expires_at": "2025-01-01T00:00:00+00:00"}).encode(),
+            self.lease_path(moto_service),
+        )
+
+        # When
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leases = list(executor.map(
+                lambda _: moto_service.acquire_lease("test", "", self.hashed_arguments, 60), range(4),
+            ))
+
+        # Then
+        acquired = [lease for lease in leases if lease is not None]
+        assert len(acquired) == 1
+        assert self.read_lease(moto_service)["owner"] != "dead-owner"
+        acquired[0].release()
+
+    def test_should_not_acquire_lease_released_meanwhile(self, moto_service: BotoResnapService, mocker) -> None:
+        # Given
+        mocker.patch.object(moto_service._client, "create_object", return_value=False)
+
+        # When
+        lease = moto_service.acquire_lease("test", "", self.hashed_arguments, 60)
+
+        # Then
+        assert lease is None
+
+    def test_should_renew_and_delete_only_owned_lease(self, moto_service: BotoResnapService) -> None:
+        # Given
+        lease_path = self.lease_path(moto_service)
+        moto_service._create_lease(lease_path, "owner", 60)
+        heartbeat = datetime.fromisoformat(self.read_lease(moto_service)["heartbeat"])
+
+        # When
+        lost = moto_service._renew_lease(lease_path, "other-owner")
+        moto_service._delete_lease(lease_path, "other-owner")
+        renewed = moto_service._renew_lease(lease_path, "owner")
+
+        # Then
+        assert (lost, renewed) == (False, True)
+        assert datetime.fromisoformat(self.read_lease(moto_service)["heartbeat"]) > heartbeat
+        moto_service._delete_lease(lease_path, "owner")
+        assert self.read_lease(moto_service) is None
+        assert moto_service._renew_lease(lease_path, "owner") is False
+        moto_service._delete_lease(lease_path, "owner")
+
+
+class TestBotoServiceIndex:
+    def index_path(self, service: BotoResnapService) -> str:
+        return service.index_path("test", "")
+
+    def test_should_keep_all_entries_of_concurrent_index_updates(self, moto_service: BotoResnapService) -> None:
+        # Given
+        metadata = [MetadataSuccessBuilder.a_metadata().with_arguments({"call": i}).build() for i in range(16)]
+
+        def add(entry: Metadata) -> None:
+            # the lock of the threads of the service is bypassed, as if each update came from another process
+            moto_service._modify_index_file(
+                self.index_path(moto_service), lambda index: MetadataIndex.from_metadata([entry] + (
+                    [MetadataSuccess.from_dict(m) for m in index.success.values()] if index else []
+                )),
+            )
+
+        # When
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(add, metadata))
+
+        # Then
+        index = moto_service.get_index("test", "")
+        assert all(index.get(entry.hashed_arguments) == entry for entry in metadata)
+
+    def test_should_apply_index_update_again_after_a_concurrent_update(
+        self, moto_service: BotoResnapService, mocker,
+    ) -> None:
+        # Given
+        first = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        concurrent = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 2}).build()
+        index_path = self.index_path(moto_service)
+        moto_service.create_output_folder("")
+        moto_service.add_to_index("test", "", [first])
+        read_object = moto_service._client.read_object
+
+        def read_then_update(path: str) -> tuple[bytes, str] | None:
+            current = read_object(path)
+            if mock_read_object.call_count == 1:
+                moto_service._client.upload_file(io.BytesIO(json.dumps(
+                    MetadataIndex.from_metadata([first, concurrent]).to_dict()
+                ).encode()), path)
+            return current
+
+        mock_read_object: MagicMock = mocker.patch.object(
+            moto_service._client, "read_object", side_effect=read_then_update,
+        )
+        added = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 3}).build()
+
+        # When
+        moto_service.add_to_index("test", "", [added])
+
+        # Then
+        assert mock_read_object.call_count == 2
+        index = MetadataIndex.from_dict(moto_service._read_index(index_path))
+        assert [index.get(m.hashed_arguments) for m in (first, concurrent, added)] == [first, concurrent, added]
+
+    def test_should_rebuild_corrupted_index(self, moto_service: BotoResnapService) -> None:
+        # Given
+        moto_service._client.upload_file(io.BytesIO(b"{not json"), self.index_path(moto_service))
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+
+        # When
+        moto_service.add_to_index("test", "", [metadata])
+
+        # Then
+        assert moto_service.get_index("test", "").get(metadata.hashed_arguments) == metadata
+
+    def test_should_not_write_index_left_unchanged(self, moto_service: BotoResnapService) -> None:
+        # When
+        result = moto_service._modify_index_file(self.index_path(moto_service), lambda index: None)
+
+        # Then
+        assert result is None
+        assert moto_service._client.read_object(self.index_path(moto_service)) is None
+
+    def test_should_raise_file_not_found_when_reading_missing_result(self, moto_service: BotoResnapService) -> None:
+        # Given
+        result_path, _ = moto_service.save_result("test", pa.table({"a": [1]}), "")
+        moto_service._delete_file(result_path)
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_path(result_path).with_result_type("Table").build()
+
+        # When / Then
+        assert not moto_service.result_exists(metadata)
+        with pytest.raises(FileNotFoundError):
+            moto_service.read_result(metadata)
+        with pytest.raises(FileNotFoundError):
+            moto_service.open_result(metadata)
+
+    def test_should_raise_unexpected_error_when_reading_result(self, moto_service: BotoResnapService, mocker) -> None:
+        # Given
+        error = ClientError({"Error": {"Code": "500"}}, "GetObject")
+        mocker.patch("resnap.services.service.ResnapService.read_result", side_effect=error)
+        mocker.patch("resnap.services.service.ResnapService.open_result", side_effect=error)
+        metadata = MetadataSuccessBuilder.a_metadata().build()
+
+        # When / Then
+        with pytest.raises(ClientError):
+            moto_service.read_result(metadata)
+        with pytest.raises(ClientError):
+            moto_service.open_result(metadata)
@@ -1,20 +1,52 @@
+import gzip
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from typing import Any
+from unittest.mock import ANY, MagicMock, patch
 
 import freezegun
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pytest
-
-from resnap.helpers.constants import EXT, META_EXT
+from pyarrow import parquet as pq
+
+from resnap.helpers.config import (
+    ArrowCompression,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from resnap.helpers.constants import (
+    CLEANUP_LOCK,
+    EXT,
+    INDEX_EXT,
+    LEASE_EXT,
+    LOCK_EXT,
+    META_EXT,
+)
+from resnap.helpers.index import MetadataIndex
 from resnap.helpers.metadata import Metadata, MetadataSuccess
 from resnap.helpers.status import Status
 from resnap.helpers.time_utils import TimeUnit
 from resnap.helpers.utils import hash_arguments
 from resnap.services.local_service import LocalResnapService
 from tests.builders.config_builder import ConfigBuilder
+from tests.builders.metadata_builder import MetadataSuccessBuilder
 
 MOCK_NOW = datetime(year=2025, month=7, day=15, hour=6)
+FRAME_MAGIC = {
+    FileCompression.ZSTD: b"\x28\xb5\x2f\xfd",
+    FileCompression.LZ4: b"\x04\x22\x4d\x18",
+    FileCompression.GZIP: b"\x1f\x8b",
+}
 
 
 @pytest.fixture
@@ -42,6 +74,23 @@ def get_mock_path_file(name: str, is_file: bool) -> MagicMock:
     return mock
 
 
+def try_cleanup_lock(output_base_path: str, barrier) -> bool:
+    service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(output_base_path).build())
+    barrier.wait()
+    return service._acquire_cleanup_lock(60)
+
+
+def add_to_index(output_base_path: str, barrier, process: int) -> None:
+    service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(output_base_path).build())
+    metadata = [
+        MetadataSuccessBuilder.a_metadata().with_arguments({"process": process, "call": call}).build()
+        for call in range(10)
+    ]
+    barrier.wait()
+    for entry in metadata:
+        service.add_to_index("test", "", [entry])
+
+
 class TestLocalService:
     hashed_arguments: str = hash_arguments({"test": "toto"})
 
@@ -136,6 +185,36 @@ class TestLocalService:
         # Then
         expired_file.unlink.assert_called_once()
 
+    def test_clear_old_saves_should_prune_indexes(self, mock_path_rglob: MagicMock, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        mock_prune_indexes: MagicMock = mocker.patch.object(service, "_prune_indexes")
+        index_file = get_mock_path_file(f"test{INDEX_EXT}", True)
+        mock_path_rglob.return_value = [index_file]
+
+        # When
+        service.clear_old_saves()
+
+        # Then
+        index_file.unlink.assert_not_called()
+        mock_prune_indexes.assert_called_once_with([str(index_file)], ANY)
+
+    def test_clear_old_saves_should_prune_indexes_before_deleting_files(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        old_file = tmp_path / f"test_2021-01-01T00-00-00{EXT}.pkl"
+        old_file.write_bytes(b"")
+        (tmp_path / f"test{INDEX_EXT}").write_bytes(b"{}")
+        existing_files_when_pruning: list[bool] = []
+        service._prune_indexes = lambda index_paths, limit_time: existing_files_when_pruning.append(old_file.exists())
+
+        # When
+        service.clear_old_saves()
+
+        # Then
+        assert existing_files_when_pruning == [True]
+        assert not old_file.exists()
+
     def test_should_read_metadata(self) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
@@ -203,11 +282,7 @@ class TestLocalService:
         # Then
         assert len(result) == 0
 
-    @patch("json.dump")
-    @patch("builtins.open")
-    def test_should_write_metadata(
-        self, mock_open: MagicMock, mock_json_dump: MagicMock
-    ) -> None:
+    def test_should_write_metadata(self, tmp_path: Path) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
         metadata = MetadataSuccess(
@@ -217,33 +292,78 @@ class TestLocalService:
             result_type="str",
             hashed_arguments=self.hashed_arguments,
         )
+        metadata_path = tmp_path / f"test_2021-01-01T00-00-00{META_EXT}"
 
         # When
-        service._write_metadata(f"test_2021-01-01T00-00-00{META_EXT}", metadata)
+        service._write_metadata(str(metadata_path), metadata)
 
         # Then
-        mock_open.assert_called_once()
-        mock_json_dump.assert_called_once_with(
-            metadata.to_dict(), mock_open.return_value.__enter__(), indent=4
+        written = metadata_path.read_bytes()
+        assert json.loads(written) == metadata.to_dict()
+        assert b"\n" not in written
+        assert [f.name for f in tmp_path.iterdir()] == [metadata_path.name]
+
+    def test_should_replace_metadata_atomically(self, tmp_path: Path, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+            result_path=f"test_2021-01-01T00-00-00{EXT}.pkl",
+            result_type="str",
+            hashed_arguments=self.hashed_arguments,
         )
+        metadata_path = tmp_path / f"test_2021-01-01T00-00-00{META_EXT}"
+        metadata_path.write_bytes(b"previous")
+        mock_replace: MagicMock = mocker.patch("os.replace")
 
+        # When
+        service._write_metadata(str(metadata_path), metadata)
+
+        # Then
+        tmp_file = Path(mock_replace.call_args.args[0])
+        mock_replace.assert_called_once_with(str(tmp_file), str(metadata_path))
+        assert metadata_path.read_bytes() == b"previous"
+        assert not tmp_file.name.endswith(META_EXT)
+        assert json.loads(tmp_file.read_bytes()) == metadata.to_dict()
+
+    @pytest.mark.parametrize(
+        "compression, compression_level, expected_codec",
+        [
+            (ParquetCompression.ZSTD, None, "zstd"),
+            (ParquetCompression.GZIP, 9, "gzip"),
+            (ParquetCompression.NONE, None, None),
+        ],
+    )
     @patch("pandas.DataFrame.to_parquet")
-    def test_should_save_dataframe_to_parquet(self, mock_to_parquet: MagicMock) -> None:
+    def test_should_save_dataframe_to_parquet(
+        self,
+        mock_to_parquet: MagicMock,
+        compression: ParquetCompression,
+        compression_level: int | None,
+        expected_codec: str | None,
+    ) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
         result = pd.DataFrame({"col1": [1, 2], "col2": [3, 4]})
         result_path = "test.parquet"
 
         # When
-        service._save_dataframe_to_parquet(result, result_path)
+        service._save_dataframe_to_parquet(result, result_path, compression, compression_level, 1000)
 
         # Then
-        mock_to_parquet.assert_called_once_with(result_path, compression="gzip")
+        mock_to_parquet.assert_called_once_with(
+            result_path,
+            compression=expected_codec,
+            compression_level=compression_level,
+            row_group_size=1000,
+            write_statistics=True,
+        )
 
-    @patch("pickle.dump")
+    @patch("resnap.services.local_service.write_pickle")
     @patch("builtins.open")
     def test_should_save_to_pickle(
-        self, mock_open: MagicMock, mock_pickle_dump: MagicMock
+        self, mock_open: MagicMock, mock_write_pickle: MagicMock
     ) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
@@ -255,7 +375,7 @@ class TestLocalService:
 
         # Then
         mock_open.assert_called_once_with(result_path, "wb")
-        mock_pickle_dump.assert_called_once_with(
+        mock_write_pickle.assert_called_once_with(
             result, mock_open.return_value.__enter__()
         )
 
@@ -276,57 +396,60 @@ class TestLocalService:
         mock_read_parquet.assert_called_once_with(file_path)
         pd.testing.assert_frame_equal(result, expected_df)
 
-    @patch("pickle.load")
-    @patch("builtins.open")
-    def test_should_read_pickle(
-        self, mock_open: MagicMock, mock_pickle_load: MagicMock
-    ) -> None:
+    def test_should_read_plain_pickle(self, tmp_path: Path) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
-        file_path = "test.pkl"
+        file_path = tmp_path / "test.pkl"
         expected_data = {"key": "value"}
-        mock_pickle_load.return_value = expected_data
+        file_path.write_bytes(pickle.dumps(expected_data))
 
         # When
-        result = service._read_pickle(file_path)
+        result = service._read_pickle(str(file_path))
 
         # Then
-        mock_open.assert_called_once_with(file_path, "rb")
-        mock_pickle_load.assert_called_once_with(mock_open.return_value.__enter__())
         assert result == expected_data
 
-    @patch("json.load")
-    @patch("builtins.open")
-    def test_should_read_json(
-        self, mock_open: MagicMock, mock_json_load: MagicMock
-    ) -> None:
+    def test_should_save_and_read_pickle_with_arrays_mapped_from_the_file(self, tmp_path: Path) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
-        file_path = "test.json"
+        file_path = str(tmp_path / "test.pkl")
+        result = {"key": "value", "array": np.arange(100_000.0)}
+        service._save_to_pickle(result, file_path)
+
+        # When
+        read_result = service._read_pickle(file_path)
+        read_result["array"][0] = -1.0
+
+        # Then
+        assert read_result["key"] == "value"
+        np.testing.assert_array_equal(read_result["array"][1:], result["array"][1:])
+        assert not read_result["array"].flags.owndata
+        assert service._read_pickle(file_path)["array"][0] == 0.0
+
+    def test_should_read_json(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        file_path = tmp_path / "test.json"
         expected_data = {"key": "value"}
-        mock_json_load.return_value = expected_data
+        file_path.write_text(json.dumps(expected_data, indent=4))
 
         # When
-        result = service._read_json(file_path)
+        result = service._read_json(str(file_path))
 
         # Then
-        mock_open.assert_called_once_with(file_path, "r")
-        mock_json_load.assert_called_once_with(mock_open.return_value.__enter__())
         assert result == expected_data
 
-    @patch("builtins.open")
-    def test_should_read_text(self, mock_open: MagicMock) -> None:
+    def test_should_read_text(self, tmp_path: Path) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
-        file_path = "test.txt"
+        file_path = tmp_path / "test.txt"
         expected_data = "test"
-        mock_open.return_value.__enter__().read.return_value = expected_data
+        file_path.write_text(expected_data)
 
         # When
-        result = service._read_text(file_path)
+        result = service._read_text(str(file_path))
 
         # Then
-        mock_open.assert_called_once_with(file_path, "r")
         assert result == expected_data
 
     @patch("pandas.DataFrame.to_csv")
@@ -357,38 +480,81 @@ class TestLocalService:
         mock_read_csv.assert_called_once_with(file_path, index_col=False)
         pd.testing.assert_frame_equal(result, expected_df)
 
-    @patch("builtins.open")
-    def test_should_save_to_text(self, mock_open: MagicMock) -> None:
+    def test_should_save_to_text(self, tmp_path: Path) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
         result = "toto"
-        result_path = "test.text"
+        result_path = tmp_path / "test.txt"
 
         # When
-        service._save_to_text(result, result_path)
+        service._save_to_text(result, str(result_path))
 
         # Then
-        mock_open.assert_called_once_with(result_path, "w")
-        mock_open.return_value.__enter__().write.assert_called_once_with(result)
+        assert result_path.read_text() == result
 
-    @patch("json.dump")
-    @patch("builtins.open")
-    def test_should_save_to_json(
-        self, mock_open: MagicMock, mock_json_dump: MagicMock
+    def test_should_save_to_json(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = {"key": "value"}
+        result_path = tmp_path / "test.json"
+
+        # When
+        service._save_to_json(result, str(result_path))
+
+        # Then
+        assert result_path.read_text() == json.dumps(result, indent=4)
+
+    @pytest.mark.parametrize("compression", [FileCompression.ZSTD, FileCompression.LZ4, FileCompression.GZIP])
+    @pytest.mark.parametrize(
+        "save, read, result",
+        [
+            ("_save_to_pickle", "_read_pickle", {"key": "value"}),
+            ("_save_to_json", "_read_json", {"key": "value"}),
+            ("_save_to_text", "_read_text", "toto"),
+        ],
+    )
+    def test_should_save_and_read_compressed_file(
+        self, tmp_path: Path, compression: FileCompression, save: str, read: str, result: Any,
     ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result_path = str(tmp_path / "test")
+
+        # When
+        getattr(service, save)(result, result_path, compression=compression)
+        read_result = getattr(service, read)(result_path, compression=compression)
+
+        # Then
+        assert read_result == result
+        assert Path(result_path).read_bytes().startswith(FRAME_MAGIC[compression])
+
+    def test_should_save_gzip_file_readable_by_gzip(self, tmp_path: Path) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
         result = {"key": "value"}
-        result_path = "test.json"
+        result_path = tmp_path / "test.json.gz"
 
         # When
-        service._save_to_json(result, result_path)
+        service._save_to_json(result, str(result_path), compression=FileCompression.GZIP)
 
         # Then
-        mock_open.assert_called_once_with(result_path, "w")
-        mock_json_dump.assert_called_once_with(
-            result, mock_open.return_value.__enter__(), indent=4
-        )
+        with gzip.open(result_path, "rt") as f:
+            assert json.load(f) == result
+
+    def test_should_read_compressed_pickle_with_writable_arrays(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        file_path = str(tmp_path / "test.pkl.zst")
+        result = {"array": np.arange(100_000.0)}
+        service._save_to_pickle(result, file_path, compression=FileCompression.ZSTD)
+
+        # When
+        read_result = service._read_pickle(file_path, compression=FileCompression.ZSTD)
+
+        # Then
+        np.testing.assert_array_equal(read_result["array"], result["array"])
+        assert read_result["array"].flags.writeable
+        assert Path(file_path).stat().st_size < result["array"].nbytes
 
     @pytest.mark.parametrize(
         "path, folder_name",
@@ -408,3 +574,598 @@ class TestLocalService:
 
         # Then
         assert mock_path_mkdir.call_count == 1
+
+    def test_should_read_parquet_snapshot_saved_before_the_format_was_recorded(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        result = pd.DataFrame({"a": [1, 2]})
+        result_path = str(tmp_path / f"test_2021-01-01T00-00-00{EXT}.parquet.gz")
+        result.to_parquet(result_path, compression="gzip")
+        metadata = MetadataSuccess.from_dict({
+            "status": "SUCCESS",
+            "event_time": "2021-01-01T00:00:00",
+            "hashed_arguments": "",
+            "result_path": result_path,
+            "result_type": "DataFrame",
+        })
+
+        # When
+        read_result = service.read_result(metadata)
+
+        # Then
+        pd.testing.assert_frame_equal(read_result, result)
+
+    @pytest.mark.parametrize("compression", list(ArrowCompression))
+    def test_should_save_and_read_dataframe_in_arrow(self, tmp_path: Path, compression: ArrowCompression) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}, index=["i", "j"])
+        result_path = str(tmp_path / f"test{EXT}.arrow")
+
+        # When
+        service._save_to_arrow(result, result_path, compression)
+        table = service._read_arrow(result_path)
+
+        # Then
+        pd.testing.assert_frame_equal(table.to_pandas(), result)
+
+    def test_should_read_uncompressed_arrow_through_a_memory_map(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = pa.table({"a": list(range(1000))})
+        result_path = str(tmp_path / f"test{EXT}.arrow")
+        service._save_to_arrow(result, result_path)
+        allocated_bytes = pa.total_allocated_bytes()
+
+        # When
+        table = service._read_arrow(result_path)
+
+        # Then
+        assert table.equals(result)
+        assert pa.total_allocated_bytes() == allocated_bytes
+
+    @pytest.mark.parametrize("compression", [ParquetCompression.ZSTD, ParquetCompression.NONE])
+    def test_should_save_and_read_table_in_parquet(self, tmp_path: Path, compression: ParquetCompression) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = pa.table({"a": [1, 2], "b": ["x", "y"]})
+        result_path = str(tmp_path / f"test{EXT}.parquet")
+
+        # When
+        service._save_table_to_parquet(result, result_path, compression)
+        table = service._read_parquet_to_table(result_path)
+
+        # Then
+        assert table.equals(result)
+
+    @pytest.mark.parametrize("output_format", [None, "arrow"])
+    def test_should_save_and_read_polars_dataframe(self, tmp_path: Path, output_format: str | None) -> None:
+        # Given
+        pl = pytest.importorskip("polars")
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        result = pl.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+        result_path, _ = service.save_result("test", result, "", output_format)
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_path(result_path).with_result_type(
+            "polars.DataFrame"
+        ).build()
+
+        # When
+        read_result = service.read_result(metadata)
+
+        # Then
+        assert isinstance(read_result, pl.DataFrame)
+        assert read_result.equals(result)
+
+    @pytest.mark.parametrize("output_format", [None, "arrow"])
+    def test_should_open_result_to_read_some_columns_and_rows(self, tmp_path: Path, output_format: str | None) -> None:
+        # Given
+        config = ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).with_parquet_row_group_size(100).build()
+        service = LocalResnapService(config=config)
+        result = pd.DataFrame({"day": [i // 100 for i in range(1000)], "price": range(1000)})
+        result_path, _ = service.save_result("test", result, "", output_format)
+        metadata = MetadataSuccessBuilder.a_metadata().with_result_path(result_path).with_result_type("DataFrame").build()
+
+        # When
+        with service.open_result(metadata) as handle:
+            read_result = handle.read(columns=["price"], filters=[("day", "=", 3)])
+
+        # Then
+        pd.testing.assert_frame_equal(read_result, pd.DataFrame({"price": range(300, 400)}))
+
+    @pytest.mark.parametrize(
+        "items, output_format, file_compression, extension",
+        [
+            pytest.param([pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]})], None, None, ".parquet.gz", id="tables"),
+            pytest.param([{"a": 1}, [2]], None, FileCompression.ZSTD, ".pkls.zst", id="pickles"),
+            pytest.param([pd.DataFrame({"a": [1]})], "pickle", None, ".pkls", id="tables as pickles"),
+        ],
+    )
+    def test_should_write_and_replay_stream(
+        self, tmp_path: Path, items: list, output_format: str | None, file_compression: FileCompression | None,
+        extension: str,
+    ) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        writer = service.open_stream("test", items[0], "", output_format, file_compression=file_compression)
+        for item in items:
+            writer.write(item)
+        writer.close()
+        metadata = service.save_success_metadata(
+            "test", "", "", writer.event_time, writer.result_path, writer.result_type, {},
+            file_compression=file_compression,
+        )
+
+        # When
+        read_items = service.read_result(metadata)
+
+        # Then
+        assert writer.result_path.endswith(extension)
+        assert service.open_result(metadata) is None
+        for read_item, item in zip(read_items, items, strict=True):
+            if isinstance(item, pd.DataFrame):
+                pd.testing.assert_frame_equal(read_item, item, check_index_type=False)
+            else:
+                assert read_item == item
+
+    @pytest.mark.parametrize("layout", [Layout.FLAT, Layout.HASHED])
+    def test_should_delete_aborted_stream(self, tmp_path: Path, layout: Layout) -> None:
+        # Given
+        config = ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).with_layout(layout).build()
+        service = LocalResnapService(config)
+        writer = service.open_stream("test", 1, "", hashed_arguments=hash_arguments({"a": 1}))
+        writer.write(1)
+
+        # When
+        writer.abort()
+
+        # Then
+        assert not Path(writer.result_path).exists()
+
+    def test_should_save_parquet_row_groups_with_statistics(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result_path = str(tmp_path / f"test{EXT}.parquet")
+
+        # When
+        service._save_table_to_parquet(pa.table({"a": range(1000)}), result_path, row_group_size=100)
+
+        # Then
+        metadata = pq.ParquetFile(result_path).metadata
+        assert metadata.num_row_groups == 10
+        statistics = metadata.row_group(3).column(0).statistics
+        assert (statistics.min, statistics.max) == (300, 399)
+
+    def test_should_read_array_through_a_copy_on_write_memory_map(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_mmap_arrays(True).build())
+        result = np.arange(12.0).reshape(3, 4)
+        result_path = str(tmp_path / f"test{EXT}.npy")
+        service._save_array(result, result_path)
+
+        # When
+        array = service._read_array(result_path)
+        array[0, 0] = 42
+
+        # Then
+        assert isinstance(array, np.memmap)
+        assert array[0, 0] == 42
+        np.testing.assert_array_equal(array[1:], result[1:])
+        np.testing.assert_array_equal(np.load(result_path), result)
+
+    def test_should_read_array_in_memory_by_default(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = np.arange(12.0).reshape(3, 4)
+        result_path = str(tmp_path / f"test{EXT}.npy")
+        service._save_array(result, result_path)
+
+        # When
+        array = service._read_array(result_path)
+
+        # Then
+        assert type(array) is np.ndarray
+        assert array.flags.writeable
+        np.testing.assert_array_equal(array, result)
+
+    def test_should_save_and_read_arrays(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = {"a": np.arange(3), "b": np.ones((2, 2))}
+        result_path = str(tmp_path / f"test{EXT}.npz")
+
+        # When
+        service._save_arrays(result, result_path)
+        arrays = service._read_arrays(result_path)
+
+        # Then
+        assert arrays.keys() == result.keys()
+        for name, array in result.items():
+            np.testing.assert_array_equal(arrays[name], array)
+
+    def test_should_write_and_read_index(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        index = MetadataIndex.from_metadata([MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()])
+        index_path = str(tmp_path / f"test{INDEX_EXT}")
+
+        # When
+        service._write_index(index_path, index.to_dict())
+        result = service._read_index(index_path)
+
+        # Then
+        assert result == index.to_dict()
+        assert [f.name for f in tmp_path.iterdir()] == [f"test{INDEX_EXT}"]
+
+    def test_should_keep_all_entries_of_concurrent_index_updates_of_threads(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        metadata = [MetadataSuccessBuilder.a_metadata().with_arguments({"call": i}).build() for i in range(40)]
+
+        # When
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda entry: service.add_to_index("test", "", [entry]), metadata))
+
+        # Then
+        index = service.get_index("test", "")
+        assert all(index.get(entry.hashed_arguments) == entry for entry in metadata)
+        assert [f.name for f in tmp_path.iterdir()] == [f"test{INDEX_EXT}"]
+
+    def test_should_keep_all_entries_of_concurrent_index_updates_of_processes(self, tmp_path: Path) -> None:
+        # Given
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Manager().Barrier(4)
+
+        # When
+        with context.Pool(4) as pool:
+            pool.starmap(add_to_index, [(str(tmp_path), barrier, process) for process in range(4)])
+
+        # Then
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        assert len(service.get_index("test", "").success) == 40
+
+    def test_should_wait_for_index_lock(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        index_path = str(tmp_path / f"test{INDEX_EXT}")
+        entered = threading.Event()
+
+        def hold_lock() -> None:
+            with service._lock_index(index_path):
+                entered.set()
+                time.sleep(0.1)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        entered.wait()
+
+        # When
+        start = time.monotonic()
+        with service._lock_index(index_path):
+            waited = time.monotonic() - start
+        holder.join()
+
+        # Then
+        assert waited >= 0.05
+        assert not (tmp_path / f"test{INDEX_EXT}{LOCK_EXT}").exists()
+
+    def test_should_take_over_index_lock_of_a_dead_process(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        index_path = str(tmp_path / f"test{INDEX_EXT}")
+        lock_path = tmp_path / f"test{INDEX_EXT}{LOCK_EXT}"
+        lock_path.write_text("0")
+        os.utime(lock_path, (time.time() - 60, time.time() - 60))
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+
+        # When
+        service.add_to_index("test", "", [metadata])
+
+        # Then
+        index = MetadataIndex.from_dict(service._read_index(index_path))
+        assert index.get(metadata.hashed_arguments) == metadata
+        assert not lock_path.exists()
+
+    def test_should_not_write_index_left_unchanged(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        index_path = str(tmp_path / f"test{INDEX_EXT}")
+
+        # When
+        result = service._modify_index_file(index_path, lambda index: None)
+
+        # Then
+        assert result is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_should_check_if_file_exists(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        (tmp_path / "file.pkl").write_bytes(b"")
+
+        # When / Then
+        assert service._file_exists(str(tmp_path / "file.pkl"))
+        assert not service._file_exists(str(tmp_path / "other.pkl"))
+
+    @pytest.mark.parametrize("content", [None, b"{not json", b'{"version": "\xff"}'])
+    def test_should_not_read_missing_or_corrupted_index(self, content: bytes | None, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        index_path = tmp_path / f"test{INDEX_EXT}"
+        if content is not None:
+            index_path.write_bytes(content)
+
+        # When
+        result = service._read_index(str(index_path))
+
+        # Then
+        assert result is None
+
+    def test_should_create_parent_folder(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        path = tmp_path / "test" / "ab" / "abcd" / "file.json"
+
+        # When
+        service._create_parent_folder(str(path))
+
+        # Then
+        assert path.parent.is_dir()
+
+    def test_should_list_metadata_files(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().build())
+        (tmp_path / "sub").mkdir()
+        (tmp_path / f"a{META_EXT}").write_text("{}")
+        (tmp_path / f"a{EXT}.pkl").write_text("")
+        (tmp_path / "sub" / f"b{META_EXT}").write_text("{}")
+
+        # When
+        flat = service._list_metadata_files(str(tmp_path))
+        recursive = service._list_metadata_files(str(tmp_path), recursive=True)
+        missing = service._list_metadata_files(str(tmp_path / "missing"))
+
+        # Then
+        assert flat == [str(tmp_path / f"a{META_EXT}")]
+        assert sorted(recursive) == [str(tmp_path / f"a{META_EXT}"), str(tmp_path / "sub" / f"b{META_EXT}")]
+        assert missing == []
+
+    def test_should_migrate_layout_and_back(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        first_time = datetime.fromisoformat("2021-01-01T00:00:00")
+        second_time = datetime.fromisoformat("2021-01-02T00:00:00")
+        fail_time = datetime.fromisoformat("2021-01-03T00:00:00")
+        service.create_output_folder("folder")
+        for event_time, arguments in ((first_time, {"a": 1}), (second_time, {"a": 2})):
+            with freezegun.freeze_time(event_time):
+                result_path, _ = service.save_result("test", "toto", "folder", "txt")
+            service.save_success_metadata(
+                "test", "folder", hash_arguments(arguments), event_time, result_path, "str", {},
+            )
+        service.save_failed_metadata("test", "folder", hash_arguments({"a": 3}), fail_time, "error", {}, {})
+        hashed = hash_arguments({"a": 1})
+
+        # When
+        migrated = service.migrate_layout(Layout.HASHED)
+        resumed = service.migrate_layout(Layout.HASHED)
+
+        # Then
+        folder = Path(service.snapshot_folder("test", "folder", hashed))
+        assert migrated == 3
+        assert resumed == 0
+        assert service.config.layout == Layout.HASHED
+        assert sorted(f.name for f in folder.iterdir()) == [
+            f"2021-01-01T00-00-00{EXT}.txt", f"2021-01-01T00-00-00{META_EXT}",
+        ]
+        metadata = service.find_success_metadata("test", "folder", hashed)
+        assert metadata.result_path == str(folder / f"2021-01-01T00-00-00{EXT}.txt")
+        assert service.read_result(metadata) == "toto"
+        assert [m.event_time for m in service.get_metadata("test", "folder")] == [fail_time, second_time, first_time]
+
+        # When
+        migrated = service.migrate_layout(Layout.FLAT)
+
+        # Then
+        assert migrated == 3
+        assert service.find_success_metadata("test", "folder", hashed).result_path == (
+            f"{tmp_path}/folder/test_2021-01-01T00-00-00{EXT}.txt"
+        )
+        assert sorted(f.name for f in (tmp_path / "folder").iterdir() if f.is_file()) == sorted([
+            f"test_2021-01-01T00-00-00{EXT}.txt",
+            f"test_2021-01-01T00-00-00{META_EXT}",
+            f"test_2021-01-02T00-00-00{EXT}.txt",
+            f"test_2021-01-02T00-00-00{META_EXT}",
+            f"test_2021-01-03T00-00-00{META_EXT}",
+            f"test{INDEX_EXT}",
+        ])
+
+    def test_should_acquire_cleanup_lock_once_per_interval(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+
+        # When
+        first = service._acquire_cleanup_lock(60)
+        second = service._acquire_cleanup_lock(60)
+
+        # Then
+        assert (first, second) == (True, False)
+        assert (tmp_path / CLEANUP_LOCK).read_text() == str(os.getpid())
+
+    def test_should_take_over_expired_cleanup_lock(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        lock_path = tmp_path / CLEANUP_LOCK
+        lock_path.write_text("0")
+        expired = time.time() - 120
+        os.utime(lock_path, (expired, expired))
+
+        # When
+        result = service._acquire_cleanup_lock(60)
+
+        # Then
+        assert result is True
+        assert lock_path.stat().st_mtime > expired
+
+    def test_should_not_acquire_cleanup_lock_if_output_folder_does_not_exist(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path / "missing")).build())
+
+        # When
+        result = service._acquire_cleanup_lock(60)
+
+        # Then
+        assert result is False
+
+    def test_should_give_cleanup_lock_to_a_single_process(self, tmp_path: Path) -> None:
+        # Given
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Manager().Barrier(4)
+
+        # When
+        with context.Pool(4) as pool:
+            results = pool.starmap(try_cleanup_lock, [(str(tmp_path), barrier)] * 4)
+
+        # Then
+        assert sorted(results) == [False, False, False, True]
+
+    def test_should_keep_cleanup_lock_when_clearing_old_saves(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        service._acquire_cleanup_lock(60)
+
+        # When
+        service.clear_old_saves()
+
+        # Then
+        assert (tmp_path / CLEANUP_LOCK).exists()
+
+    def test_should_acquire_lease_once(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+
+        # When
+        lease = service.acquire_lease("test", "", self.hashed_arguments, 60)
+        second = service.acquire_lease("test", "", self.hashed_arguments, 60)
+
+        # Then
+        assert lease is not None
+        assert second is None
+        lease_path = tmp_path / f"test_{self.hashed_arguments}{LEASE_EXT}"
+        assert f":{os.getpid()}:" in lease_path.read_text()
+        lease.release()
+        assert not lease_path.exists()
+
+    def test_should_acquire_lease_in_snapshot_folder_with_hashed_layout(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(
+            ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).with_layout(Layout.HASHED).build()
+        )
+
+        # When
+        with service.acquire_lease("test", "", self.hashed_arguments, 60):
+            lease_path = Path(service.snapshot_folder("test", "", self.hashed_arguments)) / (
+                f"{self.hashed_arguments}{LEASE_EXT}"
+            )
+
+            # Then
+            assert lease_path.exists()
+
+    def test_should_take_over_expired_lease(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        lease_path = tmp_path / f"test_{self.hashed_arguments}{LEASE_EXT}"
+        lease_path.write_text("dead-owner")
+        expired = time.time() - 120
+        os.utime(lease_path, (expired, expired))
+
+        # When
+        with service.acquire_lease("test", "", self.hashed_arguments, 60) as lease:
+
+            # Then
+            assert lease is not None
+            assert lease_path.read_text() != "dead-owner"
+            assert not Path(f"{lease_path}.takeover").exists()
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.parametrize(
+        "guard_age, guard_exists",
+        [
+            (0, True),
+            (120, False),
+        ],
+    )
+    def test_should_not_take_over_lease_being_taken_over(
+        self, tmp_path: Path, guard_age: int, guard_exists: bool,
+    ) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        lease_path = tmp_path / f"test_{self.hashed_arguments}{LEASE_EXT}"
+        guard_path = Path(f"{lease_path}.takeover")
+        expired = time.time() - 120
+        for path in (lease_path, guard_path):
+            path.write_text("other-owner")
+        os.utime(lease_path, (expired, expired))
+        os.utime(guard_path, (time.time() - guard_age,) * 2)
+
+        # When
+        lease = service.acquire_lease("test", "", self.hashed_arguments, 60)
+
+        # Then
+        assert lease is None
+        assert guard_path.exists() is guard_exists
+
+    def test_should_not_take_over_lease_renewed_meanwhile(self, tmp_path: Path, mocker) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        lease_path = tmp_path / f"test_{self.hashed_arguments}{LEASE_EXT}"
+        lease_path.write_text("other-owner")
+        mocker.patch.object(LocalResnapService, "_is_lease_expired", side_effect=[True, False])
+
+        # When
+        lease = service.acquire_lease("test", "", self.hashed_arguments, 60)
+
+        # Then
+        assert lease is None
+        assert lease_path.read_text() == "other-owner"
+        assert not Path(f"{lease_path}.takeover").exists()
+
+    def test_should_renew_and_delete_only_owned_lease(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        lease_path = tmp_path / f"test{LEASE_EXT}"
+        lease_path.write_text("other-owner")
+        expired = time.time() - 120
+        os.utime(lease_path, (expired, expired))
+
+        # When
+        renewed = service._renew_lease(str(lease_path), "owner")
+        service._delete_lease(str(lease_path), "owner")
+
+        # Then
+        assert renewed is False
+        assert lease_path.stat().st_mtime == pytest.approx(expired)
+        assert service._renew_lease(str(lease_path), "other-owner") is True
+        assert lease_path.stat().st_mtime > expired
+        assert service._renew_lease(str(tmp_path / "missing"), "owner") is False
+
+    def test_should_take_over_lease_released_meanwhile(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+
+        # When
+        expired = service._is_lease_expired(str(tmp_path / f"test{LEASE_EXT}"), 60)
+
+        # Then
+        assert expired is True
+
+    def test_should_keep_leases_when_clearing_old_saves(self, tmp_path: Path) -> None:
+        # Given
+        service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+        lease = service.acquire_lease("test", "", self.hashed_arguments, 60)
+
+        # When
+        service.clear_old_saves()
+
+        # Then
+        assert (tmp_path / f"test_{self.hashed_arguments}{LEASE_EXT}").exists()
+        lease.release()
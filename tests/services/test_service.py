@@ -1,17 +1,31 @@
+from contextlib import nullcontext
 from datetime import datetime
 from typing import Any
 from unittest.mock import MagicMock, call
 
 import freezegun
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pytest
 
-from resnap.helpers.constants import EXT, META_EXT
-from resnap.helpers.metadata import MetadataFail, MetadataSuccess
+from resnap.helpers.compression import STREAMED_FORMATS
+from resnap.helpers.config import (
+    ArrowCompression,
+    FileCompression,
+    Layout,
+    ParquetCompression,
+)
+from resnap.helpers.constants import EXT, INDEX_EXT, META_EXT
+from resnap.helpers.hashing import KEY_VERSION, HashAlgorithm
+from resnap.helpers.index import MetadataIndex
+from resnap.helpers.metadata import LEGACY_KEY_VERSION, MetadataFail, MetadataSuccess
 from resnap.helpers.status import Status
 from resnap.helpers.utils import hash_arguments
 from resnap.services.local_service import LocalResnapService
+from resnap.services.service import ResnapService
 from tests.builders.config_builder import ConfigBuilder
+from tests.builders.metadata_builder import MetadataFailBuilder, MetadataSuccessBuilder
 
 
 @pytest.fixture(autouse=True)
@@ -22,6 +36,38 @@ def mock_read_parquet_to_dataframe(mocker) -> MagicMock:
     return mock
 
 
+@pytest.fixture(autouse=True)
+def mock_read_parquet_to_table(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._read_parquet_to_table"
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_read_arrow(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._read_arrow"
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_read_array(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._read_array"
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_read_arrays(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._read_arrays"
+    )
+    return mock
+
+
 @pytest.fixture(autouse=True)
 def mock_read_csv_to_dataframe(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch(
@@ -62,6 +108,14 @@ def mock_save_dataframe_to_parquet(mocker) -> MagicMock:
     return mock
 
 
+@pytest.fixture(autouse=True)
+def mock_save_table_to_parquet(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._save_table_to_parquet"
+    )
+    return mock
+
+
 @pytest.fixture(autouse=True)
 def mock_save_dataframe_to_csv(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch(
@@ -70,6 +124,30 @@ def mock_save_dataframe_to_csv(mocker) -> MagicMock:
     return mock
 
 
+@pytest.fixture(autouse=True)
+def mock_save_to_arrow(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._save_to_arrow"
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_save_array(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._save_array"
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_save_arrays(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._save_arrays"
+    )
+    return mock
+
+
 @pytest.fixture(autouse=True)
 def mock_save_to_pickle(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch(
@@ -102,6 +180,54 @@ def mock_write_metadata(mocker) -> MagicMock:
     return mock
 
 
+@pytest.fixture(autouse=True)
+def mock_read_index(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._read_index", return_value=None
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_write_index(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._write_index"
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_lock_index(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._lock_index", return_value=nullcontext()
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_get_metadata(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService.get_metadata", return_value=[]
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_list_metadata_files(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._list_metadata_files", return_value=[]
+    )
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_create_parent_folder(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch(
+        "resnap.services.local_service.LocalResnapService._create_parent_folder"
+    )
+    return mock
+
+
 @pytest.fixture(autouse=True)
 def mock_create_folder(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch(
@@ -185,6 +311,8 @@ class TestServicce:
             ),
             (f"test_2021-01-01T00-00-00{EXT}.txt", "mock_read_text", "str"),
             (f"test_2021-01-01T00-00-00{EXT}.json", "mock_read_json", "str"),
+            (f"test_2021-01-01T00-00-00{EXT}.npy", "mock_read_array", "ndarray"),
+            (f"test_2021-01-01T00-00-00{EXT}.npz", "mock_read_arrays", "dict"),
         ],
     )
     def test_should_read_result(
@@ -208,9 +336,98 @@ class TestServicce:
         # When
         service.read_result(metadata)
 
+        # Then
+        mock.assert_called_once()
+        assert mock.call_args.args == (metadata.result_path,)
+
+    @pytest.mark.parametrize(
+        "result_format, expected_mock",
+        [
+            ("parquet", "mock_read_parquet_to_dataframe"),
+            ("csv", "mock_read_csv_to_dataframe"),
+        ],
+    )
+    def test_should_read_result_in_recorded_format(
+        self, result_format: str, expected_mock: str, request: type[pytest.FixtureRequest],
+    ) -> None:
+        # Given
+        mock: MagicMock = request.getfixturevalue(expected_mock)
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+            hashed_arguments=hash_arguments({}),
+            result_path=f"test_2021-01-01T00-00-00{EXT}.parquet.gz",
+            result_type="DataFrame",
+            result_format=result_format,
+        )
+
+        # When
+        service.read_result(metadata)
+
         # Then
         mock.assert_called_once_with(metadata.result_path)
 
+    @pytest.mark.parametrize(
+        "compression, expected",
+        [
+            (None, FileCompression.NONE),
+            ("none", FileCompression.NONE),
+            ("zstd", FileCompression.ZSTD),
+        ],
+    )
+    def test_should_read_result_with_its_recorded_compression(
+        self, mock_read_json: MagicMock, compression: str | None, expected: FileCompression,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+            hashed_arguments=hash_arguments({}),
+            result_path=f"test_2021-01-01T00-00-00{EXT}.json.zst",
+            result_type="dict",
+            result_format="json",
+            compression=compression,
+        )
+
+        # When
+        service.read_result(metadata)
+
+        # Then
+        mock_read_json.assert_called_once_with(metadata.result_path, compression=expected)
+
+    @pytest.mark.parametrize(
+        "result_type, expected",
+        [
+            ("DataFrame", pd.DataFrame({"A": [1, 2]})),
+            ("Table", pa.table({"A": [1, 2]})),
+        ],
+    )
+    def test_should_read_arrow_result(
+        self, result_type: str, expected: pd.DataFrame | pa.Table, mock_read_arrow: MagicMock,
+    ) -> None:
+        # Given
+        mock_read_arrow.return_value = pa.table({"A": [1, 2]})
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        metadata = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=datetime.fromisoformat("2021-01-01T00:00:00"),
+            hashed_arguments=hash_arguments({}),
+            result_path=f"test_2021-01-01T00-00-00{EXT}.arrow",
+            result_type=result_type,
+            result_format="arrow",
+            compression="none",
+        )
+
+        # When
+        result = service.read_result(metadata)
+
+        # Then
+        mock_read_arrow.assert_called_once_with(metadata.result_path)
+        assert type(result) is type(expected)
+        assert result.equals(expected)
+
     @pytest.mark.parametrize(
         "result_type, result",
         [
@@ -245,6 +462,7 @@ class TestServicce:
         [
             (f"test_2021-01-01T00-00-00{EXT}.toto", "str"),
             (f"test_2021-01-01T00-00-00{EXT}.toto", "pd.DataFrame"),
+            (f"test_2021-01-01T00-00-00{EXT}.csv", "Table"),
         ],
     )
     def test_should_raise_not_implemented_error_when_reading_unknown_result_type(
@@ -278,19 +496,13 @@ class TestServicce:
             (False, None, "", "mock_save_to_pickle", "pkl"),
             ({"test": 1}, "json", "", "mock_save_to_json", "json"),
             ({"test": 1}, "json", "toto", "mock_save_to_json", "json"),
-            (
-                pd.DataFrame(
-                    {
-                        "A": [1, 2, 3],
-                        "B": [4, 5, 6],
-                        "C": [7, 8, 9],
-                    }
-                ),
-                None,
-                "",
-                "mock_save_dataframe_to_parquet",
-                "parquet.gz",
-            ),
+            (np.arange(3), None, "", "mock_save_array", "npy"),
+            (np.arange(3), "pkl", "", "mock_save_to_pickle", "pkl"),
+            (np.array(["a", None], dtype=object), None, "", "mock_save_to_pickle", "pkl"),
+            (np.ma.masked_array([1, 2], mask=[0, 1]), None, "", "mock_save_to_pickle", "pkl"),
+            ({"a": np.arange(3), "b": np.ones(2)}, None, "", "mock_save_arrays", "npz"),
+            ({"a": np.arange(3), "b": 1}, None, "", "mock_save_to_pickle", "pkl"),
+            ({}, None, "", "mock_save_to_pickle", "pkl"),
             (
                 pd.DataFrame(
                     {
@@ -324,6 +536,10 @@ class TestServicce:
             f"{output_path}test_2021-01-01T00-00-00{EXT}.{expected_result_ext}"
         )
 
+        expected_options = (
+            {"compression": FileCompression.NONE} if expected_result_ext in STREAMED_FORMATS else {}
+        )
+
         # When
         result_path, event_time = service.save_result(
             "test", func_result, output_folder, output_format
@@ -331,14 +547,197 @@ class TestServicce:
 
         # Then
         mock.assert_called_once_with(
-            result=func_result, result_path=expected_result_path
+            result=func_result, result_path=expected_result_path, **expected_options
         )
         assert result_path == expected_result_path
         assert event_time == expected_event_time
 
-    def test_should_save_success_metadata(self, mock_write_metadata: MagicMock) -> None:
+    @freezegun.freeze_time("2021-01-01")
+    @pytest.mark.parametrize(
+        "config_compression, config_level, compression, compression_level, expected, expected_ext",
+        [
+            (ParquetCompression.ZSTD, None, None, None, (ParquetCompression.ZSTD, None), "parquet"),
+            (ParquetCompression.ZSTD, 7, None, None, (ParquetCompression.ZSTD, 7), "parquet"),
+            (ParquetCompression.ZSTD, 7, "gzip", None, (ParquetCompression.GZIP, None), "parquet.gz"),
+            (ParquetCompression.ZSTD, 7, "zstd", 3, (ParquetCompression.ZSTD, 3), "parquet"),
+            (ParquetCompression.GZIP, 9, ParquetCompression.NONE, None, (ParquetCompression.NONE, None), "parquet"),
+        ],
+    )
+    def test_should_save_dataframe_with_parquet_compression(
+        self,
+        mock_save_dataframe_to_parquet: MagicMock,
+        config_compression: ParquetCompression,
+        config_level: int | None,
+        compression: str | None,
+        compression_level: int | None,
+        expected: tuple[ParquetCompression, int | None],
+        expected_ext: str,
+    ) -> None:
+        # Given
+        config = ConfigBuilder.a_config().with_parquet_compression(config_compression, config_level).build()
+        service = LocalResnapService(config=config)
+        result = pd.DataFrame({"A": [1, 2, 3]})
+
+        # When
+        result_path, _ = service.save_result(
+            "test", result, "", compression=compression, compression_level=compression_level,
+        )
+        metadata = service.save_success_metadata(
+            "test", "", self.hashed_arguments, datetime.fromisoformat("2021-01-01T00:00:00"), result_path,
+            "DataFrame", {}, compression=compression, compression_level=compression_level,
+        )
+
+        # Then
+        assert result_path == f"test_2021-01-01T00-00-00{EXT}.{expected_ext}"
+        mock_save_dataframe_to_parquet.assert_called_once_with(
+            result=result,
+            result_path=result_path,
+            compression=expected[0],
+            compression_level=expected[1],
+            row_group_size=131072,
+        )
+        assert (metadata.result_format, metadata.compression, metadata.compression_level) == (
+            "parquet", expected[0].value, expected[1],
+        )
+
+    @freezegun.freeze_time("2021-01-01")
+    @pytest.mark.parametrize(
+        "result, arrow_compression, expected_compression",
+        [
+            (pd.DataFrame({"A": [1, 2, 3]}), None, ArrowCompression.LZ4),
+            (pa.table({"A": [1, 2, 3]}), "zstd", ArrowCompression.ZSTD),
+            (pa.table({"A": [1, 2, 3]}), ArrowCompression.NONE, ArrowCompression.NONE),
+        ],
+    )
+    def test_should_save_result_in_arrow(
+        self,
+        mock_save_to_arrow: MagicMock,
+        result: pd.DataFrame | pa.Table,
+        arrow_compression: str | None,
+        expected_compression: ArrowCompression,
+    ) -> None:
+        # Given
+        config = ConfigBuilder.a_config().with_arrow_compression(ArrowCompression.LZ4).build()
+        service = LocalResnapService(config=config)
+
+        # When
+        result_path, _ = service.save_result("test", result, "", "arrow", arrow_compression=arrow_compression)
+        metadata = service.save_success_metadata(
+            "test", "", self.hashed_arguments, datetime.fromisoformat("2021-01-01T00:00:00"), result_path,
+            type(result).__name__, {}, arrow_compression=arrow_compression,
+        )
+
+        # Then
+        assert result_path == f"test_2021-01-01T00-00-00{EXT}.arrow"
+        mock_save_to_arrow.assert_called_once_with(
+            result=result, result_path=result_path, compression=expected_compression,
+        )
+        assert (metadata.result_format, metadata.compression) == ("arrow", expected_compression.value)
+
+    @pytest.mark.parametrize("output_format", [None, "csv", "pkl"])
+    def test_should_save_table_in_parquet_without_arrow_format(
+        self, mock_save_table_to_parquet: MagicMock, mock_save_to_pickle: MagicMock, output_format: str | None,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        result = pa.table({"A": [1]})
+
+        # When
+        result_path, _ = service.save_result("test", result, "", output_format, compression="lz4")
+
+        # Then
+        assert result_path.endswith(".parquet")
+        mock_save_table_to_parquet.assert_called_once_with(
+            result=result,
+            result_path=result_path,
+            compression=ParquetCompression.LZ4,
+            compression_level=None,
+            row_group_size=131072,
+        )
+        mock_save_to_pickle.assert_not_called()
+
+    def test_should_read_table_saved_in_parquet(self, mock_read_parquet_to_table: MagicMock) -> None:
         # Given
         service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        table = pa.table({"A": [1]})
+        mock_read_parquet_to_table.return_value = table
+        metadata = (
+            MetadataSuccessBuilder.a_metadata().with_result_path(f"test{EXT}.parquet").with_result_type("Table").build()
+        )
+
+        # When
+        result = service.read_result(metadata)
+
+        # Then
+        assert result is table
+        mock_read_parquet_to_table.assert_called_once_with(metadata.result_path)
+
+    def test_should_read_table_pickled_by_previous_versions(self, mock_read_pickle: MagicMock) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        metadata = (
+            MetadataSuccessBuilder.a_metadata().with_result_path(f"test{EXT}.pkl").with_result_type("Table").build()
+        )
+
+        # When
+        service.read_result(metadata)
+
+        # Then
+        mock_read_pickle.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "extension, result_type",
+        [
+            ("csv", "DataFrame"),
+            ("pkl", "Table"),
+            ("parquet", "dict"),
+        ],
+    )
+    def test_should_not_open_result_which_is_not_read_partially(
+        self, extension: str, result_type: str, mocker,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        mock_open_file = mocker.patch.object(LocalResnapService, "_open_file")
+        metadata = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_result_path(f"test{EXT}.{extension}")
+            .with_result_type(result_type)
+            .build()
+        )
+
+        # When
+        handle = service.open_result(metadata)
+
+        # Then
+        assert handle is None
+        mock_open_file.assert_not_called()
+
+    def test_should_close_file_which_cannot_be_opened_as_table(self, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        mock_open_file = mocker.patch.object(LocalResnapService, "_open_file")
+        mocker.patch("resnap.services.service.TableHandle.from_file", side_effect=pa.ArrowInvalid("corrupted"))
+        metadata = (
+            MetadataSuccessBuilder.a_metadata().with_result_path(f"test{EXT}.parquet").with_result_type("Table").build()
+        )
+
+        # When / Then
+        with pytest.raises(pa.ArrowInvalid):
+            service.open_result(metadata)
+        mock_open_file.return_value.close.assert_called_once()
+
+    def test_should_raise_if_compression_does_not_support_a_level(self) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+
+        # When / Then
+        with pytest.raises(ValueError, match="The snappy compression does not support a compression level"):
+            service.save_result("test", pd.DataFrame({"A": [1]}), "", compression="snappy", compression_level=3)
+
+    def test_should_save_success_metadata(self, mock_write_metadata: MagicMock) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_hash_algorithm(HashAlgorithm.BLAKE2B).build())
         expected_event_time: datetime = datetime.fromisoformat("2021-01-01T00:00:00")
         expected_result_path: str = f"test_2021-01-01T00-00-00{EXT}.pkl"
         metadata = MetadataSuccess(
@@ -347,7 +746,11 @@ class TestServicce:
             hashed_arguments=self.hashed_arguments,
             result_path=expected_result_path,
             result_type="str",
+            result_format="pkl",
+            compression="none",
             extra_metadata={},
+            hash_algorithm=HashAlgorithm.BLAKE2B,
+            key_version=KEY_VERSION,
         )
 
         # When
@@ -422,3 +825,526 @@ class TestServicce:
 
         # Then
         mock_create_folder.assert_has_calls(calls=expected_calls, any_order=True)
+
+    @pytest.mark.parametrize(
+        "output_path, output_folder, expected",
+        [
+            ("", "", f"test{INDEX_EXT}"),
+            ("output", "", f"output/test{INDEX_EXT}"),
+            ("output", "test", f"output/test/test{INDEX_EXT}"),
+        ],
+    )
+    def test_should_return_index_path(self, output_path: str, output_folder: str, expected: str) -> None:
+        # Given
+        service = LocalResnapService(
+            config=ConfigBuilder.a_config().with_output_base_path(output_path).build()
+        )
+
+        # When
+        result = service.index_path("test", output_folder)
+
+        # Then
+        assert result == expected
+
+    def test_should_return_only_success_metadata(self, mock_get_metadata: MagicMock) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        success = MetadataSuccessBuilder.a_metadata().build()
+        mock_get_metadata.return_value = [success, MetadataFailBuilder.a_metadata().build()]
+
+        # When
+        result = service.get_success_metadata("test", "")
+
+        # Then
+        assert result == [success]
+
+    def test_should_rebuild_index_if_it_does_not_exist(
+        self, mock_get_metadata: MagicMock, mock_write_index: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        old = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).with_result_path("old").build()
+        new = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_arguments({"a": 1})
+            .with_event_time(datetime.fromisoformat("2021-01-02T00:00:00"))
+            .with_result_path("new")
+            .build()
+        )
+        mock_get_metadata.return_value = [new, old]
+
+        # When
+        result = service.find_success_metadata("test", "", new.hashed_arguments)
+
+        # Then
+        assert result == new
+        mock_get_metadata.assert_called_once_with("test", "")
+        mock_write_index.assert_called_once_with(
+            f"test{INDEX_EXT}", MetadataIndex.from_metadata([old, new]).to_dict()
+        )
+
+    def test_should_find_metadata_with_a_single_index_read(
+        self, mock_read_index: MagicMock, mock_get_metadata: MagicMock, mock_write_index: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        mock_read_index.return_value = MetadataIndex.from_metadata([metadata]).to_dict()
+
+        # When
+        result = service.find_success_metadata("test", "folder", metadata.hashed_arguments)
+        latest = service.find_success_metadata("test", "folder")
+        missing = service.find_success_metadata("test", "folder", "toto")
+
+        # Then
+        assert result == metadata
+        assert latest == metadata
+        assert missing is None
+        mock_read_index.assert_called_with(f"folder/test{INDEX_EXT}")
+        assert mock_read_index.call_count == 3
+        mock_get_metadata.assert_not_called()
+        mock_write_index.assert_not_called()
+
+    def test_should_not_find_metadata_keyed_with_another_scheme(
+        self, mock_read_index: MagicMock, mock_write_index: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_hash_algorithm(HashAlgorithm.BLAKE2B).build())
+        metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        mock_read_index.return_value = MetadataIndex.from_metadata([metadata]).to_dict()
+
+        # When
+        result = service.find_success_metadata("test", "folder", metadata.hashed_arguments)
+        latest = service.find_success_metadata("test", "folder")
+
+        # Then
+        assert result is None
+        assert latest == metadata
+        mock_write_index.assert_not_called()
+
+    def test_should_update_index_when_saving_metadata(
+        self, mock_read_index: MagicMock, mock_write_index: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        previous = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 2}).build()
+        mock_read_index.return_value = MetadataIndex.from_metadata([previous]).to_dict()
+        event_time = datetime.fromisoformat("2021-01-02T00:00:00")
+        expected = MetadataSuccess(
+            status=Status.SUCCESS,
+            event_time=event_time,
+            hashed_arguments=self.hashed_arguments,
+            result_path="result.txt",
+            result_type="str",
+            result_format="txt",
+            compression="none",
+            extra_metadata={},
+        )
+        failed = MetadataFail(
+            status=Status.FAIL,
+            event_time=event_time,
+            hashed_arguments=self.hashed_arguments,
+            error_message="error",
+            data={},
+            extra_metadata={},
+        )
+
+        # When
+        service.save_success_metadata("test", "", self.hashed_arguments, event_time, "result.txt", "str", {})
+        service.save_failed_metadata("test", "", self.hashed_arguments, event_time, "error", {}, {})
+
+        # Then
+        success_index = MetadataIndex.from_dict(mock_write_index.call_args_list[0].args[1])
+        fail_index = MetadataIndex.from_dict(mock_write_index.call_args_list[1].args[1])
+        assert success_index.get(self.hashed_arguments) == expected
+        assert success_index.get(previous.hashed_arguments) == previous
+        assert success_index.get() == expected
+        assert fail_index.fail == {self.hashed_arguments: failed.to_dict()}
+
+    def test_should_find_many_metadata_with_a_single_index_read(
+        self, mock_read_index: MagicMock, mock_get_metadata: MagicMock, mock_write_index: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        first = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        second = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 2}).build()
+        mock_read_index.return_value = MetadataIndex.from_metadata([first, second]).to_dict()
+
+        # When
+        result = service.find_many_success_metadata(
+            "test", "folder", [first.hashed_arguments, "toto", second.hashed_arguments, first.hashed_arguments],
+        )
+
+        # Then
+        assert result == {first.hashed_arguments: first, second.hashed_arguments: second}
+        mock_read_index.assert_called_once_with(f"folder/test{INDEX_EXT}")
+        mock_get_metadata.assert_not_called()
+        mock_write_index.assert_not_called()
+
+    def test_should_find_many_metadata_in_snapshot_folders_with_a_single_index_write(
+        self, mock_read_index: MagicMock, mock_list_metadata_files: MagicMock, mock_write_index: MagicMock, mocker,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_layout(Layout.HASHED).build())
+        first = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        second = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 2}).build()
+        mock_read_index.return_value = MetadataIndex().to_dict()
+        mock_list_metadata_files.side_effect = [["first"], ["second"], []]
+        mocker.patch(
+            "resnap.services.local_service.LocalResnapService._read_metadata", side_effect=[first, second]
+        )
+
+        # When
+        result = service.find_many_success_metadata(
+            "test", "", [first.hashed_arguments, second.hashed_arguments, "toto"],
+        )
+
+        # Then
+        assert result == {first.hashed_arguments: first, second.hashed_arguments: second}
+        mock_write_index.assert_called_once_with(
+            f"test{INDEX_EXT}", MetadataIndex.from_metadata([first, second]).to_dict()
+        )
+
+    def test_should_add_many_metadata_to_index_with_a_single_write(
+        self, mock_read_index: MagicMock, mock_write_index: MagicMock, mock_write_metadata: MagicMock,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        mock_read_index.return_value = MetadataIndex().to_dict()
+        event_time = datetime.fromisoformat("2021-01-02T00:00:00")
+
+        # When
+        saved = [
+            service.save_success_metadata(
+                "test", "", f"hash_{i}", event_time.replace(second=i), "result", "str", {}, update_index=False,
+            )
+            for i in (2, 1)
+        ]
+        failed = service.save_failed_metadata("test", "", "hash_3", event_time, "error", {}, {}, update_index=False)
+        service.add_to_index("test", "", [*saved, failed])
+        service.add_to_index("test", "", [])
+
+        # Then
+        assert mock_write_metadata.call_count == 3
+        mock_write_index.assert_called_once()
+        index = MetadataIndex.from_dict(mock_write_index.call_args.args[1])
+        assert index.get("hash_1") == saved[1]
+        assert index.get("hash_2") == saved[0]
+        assert index.get() == saved[0]
+        assert index.fail == {"hash_3": failed.to_dict()}
+
+    def test_should_save_result_at_the_given_event_time(self, mock_save_to_pickle: MagicMock) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        event_time = datetime.fromisoformat("2022-01-01T00:00:00.000001")
+
+        # When
+        result_path, saved_event_time = service.save_result("test", 42, "", event_time=event_time)
+
+        # Then
+        assert saved_event_time == event_time
+        assert result_path == f"test_2022-01-01T00-00-00.000001{EXT}.pkl"
+        mock_save_to_pickle.assert_called_once_with(result=42, result_path=result_path, compression=FileCompression.NONE)
+
+    @freezegun.freeze_time("2021-01-01")
+    @pytest.mark.parametrize(
+        "output_format, file_compression, expected_mock, expected, expected_ext",
+        [
+            (None, None, "mock_save_to_pickle", FileCompression.ZSTD, "pkl.zst"),
+            ("json", "gzip", "mock_save_to_json", FileCompression.GZIP, "json.gz"),
+            ("txt", FileCompression.LZ4, "mock_save_to_text", FileCompression.LZ4, "txt.lz4"),
+            ("pkl", "none", "mock_save_to_pickle", FileCompression.NONE, "pkl"),
+        ],
+    )
+    def test_should_save_result_with_file_compression(
+        self,
+        mock_write_metadata: MagicMock,
+        output_format: str | None,
+        file_compression: str | None,
+        expected_mock: str,
+        expected: FileCompression,
+        expected_ext: str,
+        request: type[pytest.FixtureRequest],
+    ) -> None:
+        # Given
+        mock: MagicMock = request.getfixturevalue(expected_mock)
+        config = ConfigBuilder.a_config().with_file_compression(FileCompression.ZSTD).build()
+        service = LocalResnapService(config=config)
+
+        # When
+        result_path, _ = service.save_result("test", {"a": 1}, "", output_format, file_compression=file_compression)
+        service.save_success_metadata(
+            "test", "", self.hashed_arguments, datetime.now(), result_path, "dict", {},
+            file_compression=file_compression,
+        )
+
+        # Then
+        assert result_path == f"test_2021-01-01T00-00-00{EXT}.{expected_ext}"
+        mock.assert_called_once_with(result={"a": 1}, result_path=result_path, compression=expected)
+        metadata = mock_write_metadata.call_args.args[1]
+        assert (metadata.file_format, metadata.compression) == (output_format or "pkl", expected.value)
+
+    def test_should_prune_indexes(self, mock_read_index: MagicMock, mock_write_index: MagicMock) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        expired = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        mock_read_index.side_effect = [
+            MetadataIndex.from_metadata([expired]).to_dict(),
+            MetadataIndex.from_metadata([]).to_dict(),
+            None,
+        ]
+
+        # When
+        service._prune_indexes(["first", "second", "third"], datetime.fromisoformat("2022-01-01T00:00:00"))
+
+        # Then
+        mock_write_index.assert_called_once_with("first", MetadataIndex().to_dict())
+
+    @pytest.mark.parametrize(
+        "output_path, output_folder, expected_folder",
+        [
+            ("", "", "test/ab/abcd"),
+            ("output", "", "output/test/ab/abcd"),
+            ("output", "folder", "output/folder/test/ab/abcd"),
+        ],
+    )
+    def test_should_return_hashed_paths(self, output_path: str, output_folder: str, expected_folder: str) -> None:
+        # Given
+        service = LocalResnapService(
+            config=ConfigBuilder.a_config().with_output_base_path(output_path).with_layout(Layout.HASHED).build()
+        )
+        event_time = datetime.fromisoformat("2021-01-01T00:00:00")
+
+        # When
+        metadata_path = service.metadata_path("test", event_time, output_folder, "abcd")
+        result_path = service.result_path("test", event_time, output_folder, "ext", "abcd")
+        flat_path = service.metadata_path("test", event_time, output_folder, "abcd", Layout.FLAT)
+
+        # Then
+        assert service.snapshot_folder("test", output_folder, "abcd") == expected_folder
+        assert metadata_path == f"{expected_folder}/2021-01-01T00-00-00{META_EXT}"
+        assert result_path == f"{expected_folder}/2021-01-01T00-00-00{EXT}.ext"
+        assert flat_path.endswith(f"test_2021-01-01T00-00-00{META_EXT}")
+
+    def test_should_raise_if_hashed_path_has_no_hashed_arguments(self) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_layout(Layout.HASHED).build())
+
+        # When / Then
+        with pytest.raises(ValueError, match="hashed_arguments is required"):
+            service.metadata_path("test", datetime.fromisoformat("2021-01-01T00:00:00"), "")
+
+    def test_should_create_parent_folders_when_saving_with_hashed_layout(
+        self, mock_create_parent_folder: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_layout(Layout.HASHED).build())
+        event_time = datetime.fromisoformat("2021-01-01T00:00:00")
+
+        # When
+        with freezegun.freeze_time(event_time):
+            result_path, _ = service.save_result("test", "toto", "", "txt", self.hashed_arguments)
+        service.save_success_metadata("test", "", self.hashed_arguments, event_time, result_path, "str", {})
+
+        # Then
+        folder = service.snapshot_folder("test", "", self.hashed_arguments)
+        assert result_path == f"{folder}/2021-01-01T00-00-00{EXT}.txt"
+        mock_create_parent_folder.assert_has_calls(
+            [call(result_path), call(f"{folder}/2021-01-01T00-00-00{META_EXT}")]
+        )
+
+    def test_should_find_metadata_in_snapshot_folder_when_index_misses(
+        self,
+        mock_read_index: MagicMock,
+        mock_list_metadata_files: MagicMock,
+        mock_write_index: MagicMock,
+        mocker,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_layout(Layout.HASHED).build())
+        success = MetadataSuccessBuilder.a_metadata().with_arguments({"a": 1}).build()
+        fail = MetadataFailBuilder.a_metadata().with_arguments({"a": 1}).build()
+        mock_read_index.return_value = MetadataIndex().to_dict()
+        mock_list_metadata_files.return_value = ["first", "second"]
+        mock_read_metadata = mocker.patch(
+            "resnap.services.local_service.LocalResnapService._read_metadata", side_effect=[fail, success]
+        )
+
+        # When
+        result = service.find_success_metadata("test", "", success.hashed_arguments)
+
+        # Then
+        assert result == success
+        mock_list_metadata_files.assert_called_once_with(service.snapshot_folder("test", "", success.hashed_arguments))
+        mock_read_metadata.assert_has_calls([call("second"), call("first")])
+        mock_write_index.assert_called_once_with(f"test{INDEX_EXT}", MetadataIndex.from_metadata([success]).to_dict())
+
+    def test_should_skip_snapshot_metadata_keyed_with_another_scheme(
+        self, mock_read_index: MagicMock, mock_list_metadata_files: MagicMock, mock_write_index: MagicMock, mocker,
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_layout(Layout.HASHED).build())
+        legacy = (
+            MetadataSuccessBuilder.a_metadata()
+            .with_arguments({"a": 1})
+            .with_key_scheme(HashAlgorithm.SHA256, LEGACY_KEY_VERSION)
+            .build()
+        )
+        mock_read_index.return_value = MetadataIndex().to_dict()
+        mock_list_metadata_files.return_value = ["first"]
+        mocker.patch("resnap.services.local_service.LocalResnapService._read_metadata", return_value=legacy)
+
+        # When
+        result = service.find_success_metadata("test", "", legacy.hashed_arguments)
+
+        # Then
+        assert result is None
+        mock_write_index.assert_not_called()
+
+    def test_should_not_find_metadata_in_empty_snapshot_folder(
+        self, mock_read_index: MagicMock, mock_write_index: MagicMock
+    ) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_layout(Layout.HASHED).build())
+        mock_read_index.return_value = MetadataIndex().to_dict()
+
+        # When
+        result = service.find_success_metadata("test", "", self.hashed_arguments)
+
+        # Then
+        assert result is None
+        mock_write_index.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "metadata_path, expected",
+        [
+            (f"output/test_2021-01-01T00-00-00{META_EXT}", ("test", "", Layout.FLAT)),
+            (f"output/folder/my_func_2021-01-01T00-00-00{META_EXT}", ("my_func", "folder", Layout.FLAT)),
+            (f"output/test/ab/abcd/2021-01-01T00-00-00{META_EXT}", ("test", "", Layout.HASHED)),
+            (f"output/folder/test/ab/abcd/2021-01-01T00-00-00{META_EXT}", ("test", "folder", Layout.HASHED)),
+        ],
+    )
+    def test_should_parse_metadata_path(self, metadata_path: str, expected: tuple[str, str, Layout]) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_output_base_path("output").build())
+
+        # When
+        result = service._parse_metadata_path(metadata_path)
+
+        # Then
+        assert result == expected
+
+    def test_should_not_use_memory_tier_if_disabled(self) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+
+        # When
+        service.cache_result("test", "", self.hashed_arguments, 42, datetime.now())
+        result = service.get_cached_result("test", "", self.hashed_arguments)
+
+        # Then
+        assert result == (False, None)
+        assert service.memory_cache.stats.misses == 0
+
+    def test_should_get_cached_result_from_memory_tier(self) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_memory_cache_max_bytes(1024).build())
+        service.cache_result("test", "", self.hashed_arguments, 42, datetime.now())
+        service.cache_result("expired", "", self.hashed_arguments, 42, datetime.fromisoformat("2021-01-01T00:00:00"))
+
+        # When
+        result = service.get_cached_result("test", "", self.hashed_arguments)
+        other_folder = service.get_cached_result("test", "folder", self.hashed_arguments)
+        expired = service.get_cached_result("expired", "", self.hashed_arguments)
+
+        # Then
+        assert result == (True, 42)
+        assert other_folder == (False, None)
+        assert expired == (False, None)
+        assert service.memory_cache.stats.hits == 1
+
+    def test_should_clear_old_saves_at_most_once_per_interval(self, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_cleanup_interval_seconds(60).build())
+        mock_acquire = mocker.patch(
+            "resnap.services.local_service.LocalResnapService._acquire_cleanup_lock", return_value=True
+        )
+        mock_clear = mocker.patch("resnap.services.local_service.LocalResnapService.clear_old_saves")
+
+        # When
+        first = service.clear_old_saves_if_due()
+        second = service.clear_old_saves_if_due()
+
+        # Then
+        assert (first, second) == (True, False)
+        mock_acquire.assert_called_once_with(60)
+        mock_clear.assert_called_once()
+
+    def test_should_clear_old_saves_on_each_call_without_interval(self, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_cleanup_interval_seconds(0).build())
+        mocker.patch("resnap.services.local_service.LocalResnapService._acquire_cleanup_lock", return_value=True)
+        mock_clear = mocker.patch("resnap.services.local_service.LocalResnapService.clear_old_saves")
+
+        # When
+        service.clear_old_saves_if_due()
+        service.clear_old_saves_if_due()
+
+        # Then
+        assert mock_clear.call_count == 2
+
+    def test_should_not_clear_old_saves_if_another_process_holds_the_lock(self, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        mocker.patch("resnap.services.local_service.LocalResnapService._acquire_cleanup_lock", return_value=False)
+        mock_clear = mocker.patch("resnap.services.local_service.LocalResnapService.clear_old_saves")
+
+        # When
+        result = service.clear_old_saves_if_due()
+
+        # Then
+        assert result is False
+        mock_clear.assert_not_called()
+
+    def test_should_clear_old_saves_in_background(self, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().with_cleanup_in_background(True).build())
+        mocker.patch("resnap.services.local_service.LocalResnapService._acquire_cleanup_lock", return_value=True)
+        mock_thread = mocker.patch("resnap.services.service.threading.Thread")
+
+        # When
+        result = service.clear_old_saves_if_due()
+
+        # Then
+        assert result is True
+        mock_thread.assert_called_once_with(target=service._run_cleanup, name="resnap-janitor", daemon=True)
+        mock_thread.return_value.start.assert_called_once()
+
+    def test_should_log_background_cleanup_errors(self, mocker, caplog: pytest.LogCaptureFixture) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        mocker.patch(
+            "resnap.services.local_service.LocalResnapService.clear_old_saves", side_effect=OSError("disk error")
+        )
+
+        # When
+        service._run_cleanup()
+
+        # Then
+        assert "Background cleanup of old saves failed" in caplog.text
+
+    def test_should_let_every_process_compute_without_lease_support(self, mocker) -> None:
+        # Given
+        service = LocalResnapService(config=ConfigBuilder.a_config().build())
+        for method in ("_create_lease", "_renew_lease", "_delete_lease"):
+            mocker.patch.object(LocalResnapService, method, getattr(ResnapService, method))
+
+        # When
+        first = service.acquire_lease("test", "", "hash", 60)
+        second = service.acquire_lease("test", "", "hash", 60)
+
+        # Then
+        assert first is not None and second is not None
+        assert service._renew_lease("test_hash.lease", "owner") is True
+        first.release()
+        second.release()
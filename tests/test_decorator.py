@@ -1,22 +1,39 @@
 import asyncio
+import multiprocessing
 import re
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from unittest.mock import MagicMock
 
 import freezegun
+import numpy as np
+import pandas as pd
+import pyarrow as pa
 import pytest
 
 from resnap.decorators import async_resnap, resnap
 from resnap.exceptions import ResnapError
+from resnap.factory import set_resnap_service
 from resnap.helpers.context import add_metadata
-from resnap.helpers.metadata import Metadata
+from resnap.helpers.lazy import LazyResult
+from resnap.helpers.table_handle import TableHandle
 from resnap.helpers.utils import hash_arguments
-from tests.builders.metadata_builder import MetadataFailBuilder, MetadataSuccessBuilder
+from resnap.helpers.write_behind import flush
+from resnap.services.async_local_service import AsyncLocalResnapService
+from resnap.services.local_service import LocalResnapService
+from tests.builders.config_builder import ConfigBuilder
+from tests.builders.metadata_builder import MetadataSuccessBuilder
 
 
 @pytest.fixture(autouse=True)
 def mock_service(mocker) -> MagicMock:
     mock: MagicMock = mocker.patch("resnap.decorators.ResnapServiceFactory.get_service", return_value=MagicMock())
+    mock.return_value.get_cached_result.return_value = (False, None)
+    mock.return_value.config.async_max_workers = 2
     return mock
 
 
@@ -90,6 +107,21 @@ async def async_func_str(magic_number: int = 40) -> int:
     return magic_number + 2
 
 
+@resnap(lease=True, output_format="txt")
+def leased_func(counter_path: str) -> str:
+    with open(counter_path, "a") as counter:
+        counter.write("executed\n")
+    time.sleep(0.5)
+    return "done"
+
+
+def call_leased_func(output_base_path: str, counter_path: str, barrier) -> str:
+    config = ConfigBuilder.a_config().with_output_base_path(output_base_path).with_lease_poll_interval_seconds(0.05)
+    set_resnap_service(LocalResnapService(config.build()))
+    barrier.wait()
+    return leased_func(counter_path)
+
+
 def test_should_not_use_service_if_disabled_sync(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = False
@@ -105,15 +137,9 @@ def test_should_not_use_service_if_disabled_sync(mock_service: MagicMock) -> Non
 def test_should_return_result_if_metadata_exists_sync(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = [
-        MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 40}).build(),
-        (
-            MetadataSuccessBuilder.a_metadata()
-            .with_event_time(datetime.fromisoformat("2021-01-02T00:00:00"))
-            .with_arguments({"magic_number": 5})
-            .build()
-        ),
-    ]
+    mock_service.return_value.find_success_metadata.return_value = (
+        MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 40}).build()
+    )
     mock_service.return_value.read_result.return_value = 42
 
     # When
@@ -121,23 +147,15 @@ def test_should_return_result_if_metadata_exists_sync(mock_service: MagicMock) -
 
     # Then
     assert result == 42
-    mock_service.return_value.clear_old_saves.assert_called_once()
-    mock_service.return_value.get_success_metadata.assert_called_once()
+    mock_service.return_value.clear_old_saves_if_due.assert_called_once()
+    mock_service.return_value.find_success_metadata.assert_called_once()
     mock_service.return_value.read_result.assert_called_once()
 
 
-@pytest.mark.parametrize(
-    "metadata",
-    [
-        None,
-        MetadataFailBuilder.a_metadata().build(),
-        MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 10}).build(),
-    ],
-)
-def test_should_return_result_sync(metadata: Metadata | None, mock_service: MagicMock) -> None:
+def test_should_return_result_sync(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = [metadata] if metadata else []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result", now_time)
 
@@ -147,9 +165,9 @@ def test_should_return_result_sync(metadata: Metadata | None, mock_service: Magi
     # Then
     mock_service.return_value.read_result.assert_not_called()
     assert result == 42
-    mock_service.return_value.clear_old_saves.assert_called_once()
-    mock_service.return_value.get_success_metadata.assert_called_once()
-    mock_service.return_value.save_result.assert_called_with("func", 42, "", None)
+    mock_service.return_value.clear_old_saves_if_due.assert_called_once()
+    mock_service.return_value.find_success_metadata.assert_called_once()
+    mock_service.return_value.save_result.assert_called_with("func", 42, "", None, hash_arguments({"magic_number": 40}))
     mock_service.return_value.save_success_metadata.assert_called_once_with(
         func_name="func",
         output_folder="",
@@ -159,12 +177,34 @@ def test_should_return_result_sync(metadata: Metadata | None, mock_service: Magi
         result_type=int.__name__,
         extra_metadata={},
     )
+    mock_service.return_value.cache_result.assert_called_once_with(
+        "func", "", hash_arguments({"magic_number": 40}), 42, now_time
+    )
+
+
+def test_should_use_parquet_compression_options_sync(mock_service: MagicMock) -> None:
+    # Given
+    mock_service.return_value.is_enabled = True
+    mock_service.return_value.find_success_metadata.return_value = None
+    mock_service.return_value.save_result.return_value = ("/path/to/result", datetime.now())
+
+    @resnap(parquet_compression="zstd", compression_level=5)
+    def frame_func() -> pd.DataFrame:
+        return pd.DataFrame({"a": [1]})
+
+    # When
+    frame_func()
+
+    # Then
+    assert mock_service.return_value.save_result.call_args.kwargs == {"compression": "zstd", "compression_level": 5}
+    assert mock_service.return_value.save_success_metadata.call_args.kwargs["compression"] == "zstd"
+    assert mock_service.return_value.save_success_metadata.call_args.kwargs["compression_level"] == 5
 
 
 def test_should_use_output_format_option_sync(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result", now_time)
 
@@ -173,13 +213,15 @@ def test_should_use_output_format_option_sync(mock_service: MagicMock) -> None:
 
     # Then
     assert result == 42
-    mock_service.return_value.save_result.assert_called_with("func_str", 42, "", "str")
+    mock_service.return_value.save_result.assert_called_with(
+        "func_str", 42, "", "str", hash_arguments({"magic_number": 40})
+    )
 
 
 def test_should_add_custom_metadata(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result", now_time)
 
@@ -188,7 +230,9 @@ def test_should_add_custom_metadata(mock_service: MagicMock) -> None:
 
     # Then
     assert result == 42
-    mock_service.return_value.save_result.assert_called_with("func_str_with_custom_metadata", 42, "", None)
+    mock_service.return_value.save_result.assert_called_with(
+        "func_str_with_custom_metadata", 42, "", None, hash_arguments({"magic_number": 40})
+    )
     mock_service.return_value.save_success_metadata.assert_called_once_with(
         func_name="func_str_with_custom_metadata",
         output_folder="",
@@ -212,7 +256,9 @@ def test_should_not_check_result_if_disabled(mock_service: MagicMock) -> None:
     # Then
     assert result == 42
     mock_service.return_value.read_result.assert_not_called()
-    mock_service.return_value.save_result.assert_called_with("func_disable_recovery", 42, "", None)
+    mock_service.return_value.save_result.assert_called_with(
+        "func_disable_recovery", 42, "", None, hash_arguments({"magic_number": 40})
+    )
 
 
 def test_should_not_check_arguments_if_disabled(mock_service: MagicMock) -> None:
@@ -220,7 +266,7 @@ def test_should_not_check_arguments_if_disabled(mock_service: MagicMock) -> None
     mock_service.return_value.is_enabled = True
     mock_service.return_value.read_result.return_value = 30
     metadata = MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 30}).build()
-    mock_service.return_value.get_success_metadata.return_value = [metadata]
+    mock_service.return_value.find_success_metadata.return_value = metadata
 
     # When
     result = func_not_consider_args(12)
@@ -248,7 +294,7 @@ def test_should_raise_error_sync(
 ) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     mock_service.return_value.config.timezone = None
 
     # When
@@ -270,7 +316,7 @@ def test_should_raise_error_sync(
 def test_should_use_output_folder_sync(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result/toto", now_time)
 
@@ -279,7 +325,9 @@ def test_should_use_output_folder_sync(mock_service: MagicMock) -> None:
 
     # Then
     assert result == 42
-    mock_service.return_value.save_result.assert_called_with("func_output_folder", 42, "toto", None)
+    mock_service.return_value.save_result.assert_called_with(
+        "func_output_folder", 42, "toto", None, hash_arguments({"magic_number": 40})
+    )
     mock_service.return_value.save_success_metadata.assert_called_once_with(
         func_name="func_output_folder",
         output_folder="toto",
@@ -295,7 +343,7 @@ def test_should_use_output_folder_sync(mock_service: MagicMock) -> None:
 async def test_should_add_custom_metadata_async(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result", now_time)
 
@@ -304,7 +352,9 @@ async def test_should_add_custom_metadata_async(mock_service: MagicMock) -> None
 
     # Then
     assert result == 42
-    mock_service.return_value.save_result.assert_called_with("async_func_str_with_custom_metadata", 42, "", None)
+    mock_service.return_value.save_result.assert_called_with(
+        "async_func_str_with_custom_metadata", 42, "", None, hash_arguments({"magic_number": 40})
+    )
     mock_service.return_value.save_success_metadata.assert_called_once_with(
         func_name="async_func_str_with_custom_metadata",
         output_folder="",
@@ -333,9 +383,9 @@ async def test_should_not_use_service_if_disabled_async(mock_service: MagicMock)
 async def test_should_return_result_if_metadata_exists_async(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = [
+    mock_service.return_value.find_success_metadata.return_value = (
         MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 40}).build()
-    ]
+    )
     mock_service.return_value.read_result.return_value = 42
 
     # When
@@ -343,24 +393,16 @@ async def test_should_return_result_if_metadata_exists_async(mock_service: Magic
 
     # Then
     assert result == 42
-    mock_service.return_value.clear_old_saves.assert_called_once()
-    mock_service.return_value.get_success_metadata.assert_called_once()
+    mock_service.return_value.clear_old_saves_if_due.assert_called_once()
+    mock_service.return_value.find_success_metadata.assert_called_once()
     mock_service.return_value.read_result.assert_called_once()
 
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize(
-    "metadata",
-    [
-        None,
-        MetadataFailBuilder.a_metadata().build(),
-        MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 10}).build(),
-    ],
-)
-async def test_should_return_result_async(metadata: Metadata | None, mock_service: MagicMock) -> None:
+async def test_should_return_result_async(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = [metadata] if metadata else []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result", now_time)
 
@@ -370,9 +412,11 @@ async def test_should_return_result_async(metadata: Metadata | None, mock_servic
     # Then
     mock_service.return_value.read_result.assert_not_called()
     assert result == 42
-    mock_service.return_value.clear_old_saves.assert_called_once()
-    mock_service.return_value.get_success_metadata.assert_called_once()
-    mock_service.return_value.save_result.assert_called_with("async_func", 42, "", None)
+    mock_service.return_value.clear_old_saves_if_due.assert_called_once()
+    mock_service.return_value.find_success_metadata.assert_called_once()
+    mock_service.return_value.save_result.assert_called_with(
+        "async_func", 42, "", None, hash_arguments({"magic_number": 40})
+    )
     mock_service.return_value.save_success_metadata.assert_called_once_with(
         func_name="async_func",
         output_folder="",
@@ -382,13 +426,46 @@ async def test_should_return_result_async(metadata: Metadata | None, mock_servic
         result_type=int.__name__,
         extra_metadata={},
     )
+    mock_service.return_value.cache_result.assert_called_once_with(
+        "async_func", "", hash_arguments({"magic_number": 40}), 42, now_time
+    )
+
+
+@pytest.mark.asyncio
+async def test_should_not_block_event_loop_while_saving_async(mock_service: MagicMock) -> None:
+    # Given
+    mock_service.return_value.is_enabled = True
+    mock_service.return_value.find_success_metadata.return_value = None
+
+    def slow_save_result(*args) -> tuple[str, datetime]:
+        time.sleep(0.3)
+        return "/path/to/result", datetime.now()
+
+    mock_service.return_value.save_result.side_effect = slow_save_result
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+
+    # When
+    result = await async_func()
+    ticker.cancel()
+
+    # Then
+    assert result == 42
+    assert ticks >= 20
 
 
 @pytest.mark.asyncio
 async def test_should_use_output_format_option_async(mock_service: MagicMock) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     now_time = datetime.now()
     mock_service.return_value.save_result.return_value = ("/path/to/result", now_time)
 
@@ -397,7 +474,9 @@ async def test_should_use_output_format_option_async(mock_service: MagicMock) ->
 
     # Then
     assert result == 42
-    mock_service.return_value.save_result.assert_called_with("async_func_str", 42, "", "str")
+    mock_service.return_value.save_result.assert_called_with(
+        "async_func_str", 42, "", "str", hash_arguments({"magic_number": 40})
+    )
 
 
 @freezegun.freeze_time("2021-01-01", real_asyncio=True)
@@ -418,7 +497,7 @@ async def test_should_raise_error_async(
 ) -> None:
     # Given
     mock_service.return_value.is_enabled = True
-    mock_service.return_value.get_success_metadata.return_value = []
+    mock_service.return_value.find_success_metadata.return_value = None
     mock_service.return_value.config.timezone = None
 
     # When
@@ -435,3 +514,946 @@ async def test_should_raise_error_async(
         data=expected_data,
         extra_metadata={},
     )
+
+
+@pytest.fixture
+def async_service(tmp_path: Path, mocker) -> AsyncLocalResnapService:
+    service = AsyncLocalResnapService(
+        ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).with_async_native_io(True).build()
+    )
+    mocker.patch("resnap.decorators.ResnapServiceFactory.get_async_service", return_value=service)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_should_save_and_recover_result_with_async_service(
+    mock_service: MagicMock, async_service: AsyncLocalResnapService,
+) -> None:
+    # Given
+    mock_service.return_value.is_enabled = True
+    executions = 0
+
+    @async_resnap(output_format="json")
+    async def async_func_counted(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        add_metadata("key", "value")
+        return magic_number + 2
+
+    # When
+    first = await async_func_counted()
+    second = await async_func_counted()
+
+    # Then
+    assert first == second == 42
+    assert executions == 1
+    metadata = await async_service.find_success_metadata("async_func_counted", "", hash_arguments({"magic_number": 40}))
+    assert metadata.extra_metadata == {"key": "value"}
+    assert metadata.result_path.endswith(".json")
+    mock_service.return_value.clear_old_saves_if_due.assert_called()
+    mock_service.return_value.save_result.assert_not_called()
+    mock_service.return_value.find_success_metadata.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_should_return_lazy_result_with_async_service(
+    mock_service: MagicMock, async_service: AsyncLocalResnapService,
+) -> None:
+    # Given
+    mock_service.return_value.is_enabled = True
+
+    @async_resnap(output_format="json", lazy=True, memory_cache=False)
+    async def async_lazy_func(magic_number: int = 40) -> int:
+        return magic_number + 2
+
+    # When
+    first = await async_lazy_func()
+    second = await async_lazy_func()
+
+    # Then
+    assert isinstance(first, LazyResult) and isinstance(second, LazyResult)
+    assert first.key == second.key
+    assert first == second == 42
+
+
+@pytest.mark.asyncio
+async def test_should_save_failed_metadata_with_async_service(
+    mock_service: MagicMock, async_service: AsyncLocalResnapService,
+) -> None:
+    # Given
+    mock_service.return_value.is_enabled = True
+    mock_service.return_value.config.timezone = None
+
+    # When
+    with pytest.raises(ResnapError, match="Magic number should not be null"):
+        await async_func(0)
+
+    # Then
+    metadata = await async_service.get_metadata("async_func", "")
+    assert len(metadata) == 1
+    assert metadata[0].data == {"key": "value"}
+    mock_service.return_value.save_failed_metadata.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_should_save_dataframe_with_parquet_compression_option_with_async_service(
+    mock_service: MagicMock, async_service: AsyncLocalResnapService,
+) -> None:
+    # Given
+    mock_service.return_value.is_enabled = True
+
+    @async_resnap(parquet_compression="gzip", compression_level=1)
+    async def async_frame_func(rows: int = 3) -> pd.DataFrame:
+        return pd.DataFrame({"a": range(rows)})
+
+    # When
+    result = await async_frame_func()
+
+    # Then
+    metadata = await async_service.find_success_metadata(async_frame_func.__qualname__, "", hash_arguments({"rows": 3}))
+    assert metadata.result_path.endswith(".parquet.gz")
+    assert (metadata.compression, metadata.compression_level) == ("gzip", 1)
+    pd.testing.assert_frame_equal(await async_service.read_result(metadata), result)
+
+
+@pytest.fixture
+def cold_service(mock_service: MagicMock) -> MagicMock:
+    mock_service.return_value.is_enabled = True
+    mock_service.return_value.find_success_metadata.return_value = None
+    mock_service.return_value.save_result.return_value = ("/path/to/result", datetime.now())
+    mock_service.return_value.config.single_flight = True
+    mock_service.return_value.config.single_flight_timeout_seconds = None
+    mock_service.return_value.config.timezone = None
+    return mock_service
+
+
+@pytest.mark.parametrize(
+    "single_flight, options, expected_executions",
+    [
+        (True, {}, 1),
+        (False, {}, 8),
+        (True, {"enable_recovery": False}, 8),
+    ],
+)
+def test_should_share_concurrent_calls_sync(
+    cold_service: MagicMock, single_flight: bool, options: dict, expected_executions: int,
+) -> None:
+    # Given
+    cold_service.return_value.config.single_flight = single_flight
+    barrier = threading.Barrier(8)
+    executions = 0
+
+    @resnap(**options)
+    def slow_func(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        time.sleep(0.2)
+        return magic_number + 2
+
+    def call() -> int:
+        barrier.wait()
+        return slow_func()
+
+    # When
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: call(), range(8)))
+
+    # Then
+    assert results == [42] * 8
+    assert executions == expected_executions
+    assert cold_service.return_value.save_result.call_count == expected_executions
+
+
+def test_should_share_the_exception_of_concurrent_calls_sync(cold_service: MagicMock) -> None:
+    # Given
+    barrier = threading.Barrier(4)
+    executions = 0
+
+    @resnap
+    def failing_func() -> int:
+        nonlocal executions
+        executions += 1
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    def call() -> Exception | None:
+        barrier.wait()
+        try:
+            failing_func()
+        except ValueError as e:
+            return e
+        return None
+
+    # When
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        errors = list(executor.map(lambda _: call(), range(4)))
+
+    # Then
+    assert executions == 1
+    assert all(error is errors[0] for error in errors)
+    cold_service.return_value.save_failed_metadata.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "single_flight, expected_executions",
+    [
+        (True, 1),
+        (False, 32),
+    ],
+)
+async def test_should_share_concurrent_calls_async(
+    cold_service: MagicMock, single_flight: bool, expected_executions: int,
+) -> None:
+    # Given
+    cold_service.return_value.config.single_flight = single_flight
+    executions = 0
+
+    @async_resnap
+    async def slow_async_func(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.2)
+        return magic_number + 2
+
+    # When
+    results = await asyncio.gather(*(slow_async_func() for _ in range(32)))
+
+    # Then
+    assert results == [42] * 32
+    assert executions == expected_executions
+    assert cold_service.return_value.save_result.call_count == expected_executions
+
+
+@pytest.fixture
+def leased_service(cold_service: MagicMock) -> MagicMock:
+    cold_service.return_value.config.lease_ttl_seconds = 60
+    cold_service.return_value.config.lease_poll_interval_seconds = 0.01
+    cold_service.return_value.read_result.return_value = 42
+    return cold_service
+
+
+def saved_metadata() -> MetadataSuccessBuilder:
+    return MetadataSuccessBuilder.a_metadata().with_arguments({"magic_number": 40}).build()
+
+
+@pytest.mark.parametrize(
+    "leases, saved_results, expected_executions",
+    [
+        ([MagicMock()], [None, None], 1),
+        ([MagicMock()], [None, "saved"], 0),
+        ([None, None, MagicMock()], [None, None, None, None], 1),
+        ([None], [None, "saved"], 0),
+    ],
+)
+def test_should_compute_result_once_per_lease_sync(
+    leased_service: MagicMock, leases: list, saved_results: list, expected_executions: int,
+) -> None:
+    # Given
+    leased_service.return_value.acquire_lease.side_effect = leases
+    leased_service.return_value.find_success_metadata.side_effect = [
+        saved_metadata() if saved else None for saved in saved_results
+    ]
+    executions = 0
+
+    @resnap(lease=True, lease_ttl_seconds=5)
+    def leased_sync_func(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        return magic_number + 2
+
+    # When
+    result = leased_sync_func()
+
+    # Then
+    assert result == 42
+    assert executions == expected_executions
+    leased_service.return_value.acquire_lease.assert_called_with(
+        leased_sync_func.__qualname__, "", hash_arguments({"magic_number": 40}), 5,
+    )
+    if leases[-1] is not None:
+        leases[-1].__exit__.assert_called_once()
+
+
+@pytest.mark.parametrize("options", [{}, {"lease": True, "enable_recovery": False}])
+def test_should_not_acquire_lease_if_disabled_sync(leased_service: MagicMock, options: dict) -> None:
+    # Given
+    @resnap(**options)
+    def unleased_func(magic_number: int = 40) -> int:
+        return magic_number + 2
+
+    # When
+    result = unleased_func()
+
+    # Then
+    assert result == 42
+    leased_service.return_value.acquire_lease.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "single_flight, leases, saved_results, expected_executions",
+    [
+        (True, [MagicMock()], [None, None], 1),
+        (False, [MagicMock()], [None, "saved"], 0),
+        (True, [None, MagicMock()], [None, None, None], 1),
+        (False, [None], [None, "saved"], 0),
+    ],
+)
+async def test_should_compute_result_once_per_lease_async(
+    leased_service: MagicMock, single_flight: bool, leases: list, saved_results: list, expected_executions: int,
+) -> None:
+    # Given
+    leased_service.return_value.config.single_flight = single_flight
+    leased_service.return_value.acquire_lease.side_effect = leases
+    leased_service.return_value.find_success_metadata.side_effect = [
+        saved_metadata() if saved else None for saved in saved_results
+    ]
+    executions = 0
+
+    @async_resnap(lease=True)
+    async def leased_async_func(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        return magic_number + 2
+
+    # When
+    result = await leased_async_func()
+
+    # Then
+    assert result == 42
+    assert executions == expected_executions
+    leased_service.return_value.acquire_lease.assert_called_with(
+        leased_async_func.__qualname__, "", hash_arguments({"magic_number": 40}), 60,
+    )
+    if leases[-1] is not None:
+        leases[-1].release.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_should_compute_result_under_lease_with_async_service(
+    leased_service: MagicMock, async_service: AsyncLocalResnapService,
+) -> None:
+    # Given
+    lease = MagicMock()
+    leased_service.return_value.acquire_lease.return_value = lease
+    executions = 0
+
+    @async_resnap(lease=True, output_format="json")
+    async def leased_func_with_async_service(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        return magic_number + 2
+
+    # When
+    first = await leased_func_with_async_service()
+    second = await leased_func_with_async_service()
+
+    # Then
+    assert first == second == 42
+    assert executions == 1
+    lease.release.assert_called_once()
+
+
+def test_should_compute_result_once_across_processes(tmp_path: Path) -> None:
+    # Given
+    processes = 8
+    counter_path = tmp_path / "executions.txt"
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Manager().Barrier(processes)
+
+    # When
+    with context.Pool(processes) as pool:
+        results = pool.starmap(call_leased_func, [(str(tmp_path), str(counter_path), barrier)] * processes)
+
+    # Then
+    assert results == ["done"] * processes
+    assert counter_path.read_text().splitlines() == ["executed"]
+
+
+@pytest.fixture
+def slow_save(cold_service: MagicMock) -> Iterator[threading.Event]:
+    cold_service.return_value.config.write_behind_max_workers = 1
+    cold_service.return_value.config.write_behind_max_pending = 4
+    release = threading.Event()
+    save_result = cold_service.return_value.save_result
+    save_result.side_effect = lambda *_: release.wait(1) and save_result.return_value
+    yield release
+    release.set()
+    flush(1)
+
+
+def test_should_return_result_before_it_is_saved_with_write_behind(
+    cold_service: MagicMock, slow_save: threading.Event,
+) -> None:
+    # Given
+    executions = 0
+
+    @resnap(write_behind=True)
+    def write_behind_func(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        return magic_number + 2
+
+    # When
+    first = write_behind_func()
+    second = write_behind_func()
+
+    # Then
+    assert first == second == 42
+    assert executions == 1
+    cold_service.return_value.save_success_metadata.assert_not_called()
+    slow_save.set()
+    assert flush(1) is True
+    cold_service.return_value.save_success_metadata.assert_called_once()
+
+
+def test_should_save_leased_result_before_returning_it(leased_service: MagicMock, slow_save: threading.Event) -> None:
+    # Given
+    leased_service.return_value.acquire_lease.return_value = MagicMock()
+    slow_save.set()
+
+    @resnap(write_behind=True, lease=True)
+    def leased_write_behind_func(magic_number: int = 40) -> int:
+        return magic_number + 2
+
+    # When
+    result = leased_write_behind_func()
+
+    # Then
+    assert result == 42
+    leased_service.return_value.save_success_metadata.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("with_async_service", [False, True])
+async def test_should_return_result_before_it_is_saved_with_write_behind_async(
+    cold_service: MagicMock, slow_save: threading.Event, with_async_service: bool, request: pytest.FixtureRequest,
+) -> None:
+    # Given
+    if with_async_service:
+        request.getfixturevalue("async_service")
+
+    @async_resnap(write_behind=True)
+    async def async_write_behind_func(magic_number: int = 40) -> int:
+        return magic_number + 2
+
+    # When
+    result = await async_write_behind_func()
+
+    # Then
+    assert result == 42
+    cold_service.return_value.save_success_metadata.assert_not_called()
+    slow_save.set()
+    assert flush(1) is True
+    cold_service.return_value.save_success_metadata.assert_called_once()
+
+
+@pytest.fixture
+def local_service(tmp_path: Path, mock_service: MagicMock) -> LocalResnapService:
+    service = LocalResnapService(ConfigBuilder.a_config().with_output_base_path(str(tmp_path)).build())
+    mock_service.return_value = service
+    return service
+
+
+def test_should_save_and_recover_dataframe_in_arrow(local_service: LocalResnapService) -> None:
+    # Given
+    executions = 0
+
+    @resnap(output_format="arrow", arrow_compression="zstd", memory_cache=False)
+    def arrow_func(rows: int = 3) -> pd.DataFrame:
+        nonlocal executions
+        executions += 1
+        return pd.DataFrame({"a": range(rows)})
+
+    # When
+    result = arrow_func()
+    recovered = arrow_func()
+
+    # Then
+    assert executions == 1
+    pd.testing.assert_frame_equal(recovered, result)
+    metadata = local_service.find_success_metadata(arrow_func.__qualname__, "", hash_arguments({"rows": 3}))
+    assert (metadata.result_format, metadata.compression) == ("arrow", "zstd")
+
+
+def test_should_recover_writable_array(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap(memory_cache=False)
+    def array_func(size: int = 6) -> np.ndarray:
+        return np.arange(size, dtype=np.float64)
+
+    # When
+    result = array_func()
+    recovered = array_func()
+    recovered += 1
+
+    # Then
+    assert type(recovered) is np.ndarray
+    np.testing.assert_array_equal(recovered, result + 1)
+    np.testing.assert_array_equal(array_func(), result)
+    metadata = local_service.find_success_metadata(array_func.__qualname__, "", hash_arguments({"size": 6}))
+    assert metadata.result_format == "npy"
+
+
+def test_should_save_and_recover_compressed_json(local_service: LocalResnapService) -> None:
+    # Given
+    executions = 0
+
+    @resnap(output_format="json", file_compression="gzip", memory_cache=False)
+    def json_func(size: int = 3) -> dict:
+        nonlocal executions
+        executions += 1
+        return {"values": list(range(size))}
+
+    # When
+    result = json_func()
+    recovered = json_func()
+
+    # Then
+    assert executions == 1
+    assert recovered == result
+    metadata = local_service.find_success_metadata(json_func.__qualname__, "", hash_arguments({"size": 3}))
+    assert metadata.result_path.endswith(".json.gz")
+    assert (metadata.result_format, metadata.compression) == ("json", "gzip")
+
+
+def test_should_save_and_recover_polars_dataframe(local_service: LocalResnapService) -> None:
+    # Given
+    pl = pytest.importorskip("polars")
+
+    @resnap(memory_cache=False)
+    def polars_func(rows: int = 3) -> pl.DataFrame:
+        return pl.DataFrame({"a": range(rows)})
+
+    # When
+    result = polars_func()
+    recovered = polars_func()
+
+    # Then
+    assert isinstance(recovered, pl.DataFrame)
+    assert recovered.equals(result)
+    metadata = local_service.find_success_metadata(polars_func.__qualname__, "", hash_arguments({"rows": 3}))
+    assert (metadata.result_type, metadata.result_format) == ("polars.DataFrame", "parquet")
+
+
+def test_should_load_some_columns_and_rows_of_saved_dataframe(local_service: LocalResnapService, mocker) -> None:
+    # Given
+    executions = 0
+
+    @resnap
+    def prices_func(days: int = 10) -> pd.DataFrame:
+        nonlocal executions
+        executions += 1
+        return pd.DataFrame({"day": np.repeat(np.arange(days), 100), "price": np.arange(days * 100.0), "id": 1})
+
+    computed = prices_func.load(days=10, columns=["price"], filters=[("day", "=", 2)])
+    read_result = mocker.spy(local_service, "read_result")
+
+    # When
+    loaded = prices_func.load(days=10, columns=["price"], filters=[("day", "=", 2)])
+
+    # Then
+    assert executions == 1
+    expected = pd.DataFrame({"price": np.arange(200.0, 300.0)})
+    pd.testing.assert_frame_equal(computed, expected)
+    pd.testing.assert_frame_equal(loaded, expected)
+    read_result.assert_not_called()
+
+
+def test_should_load_handle_of_saved_table(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap(output_format="arrow")
+    def table_func(rows: int = 10) -> pa.Table:
+        return pa.table({"a": range(rows), "b": range(rows)})
+
+    table_func(rows=10)
+
+    # When
+    with table_func.load(10, lazy=True) as handle:
+        columns, rows = handle.columns, handle.count_rows([("a", "<", 4)])
+        read_result = handle.read(["b"], [("a", "<", 4)])
+
+    # Then
+    assert isinstance(handle, TableHandle)
+    assert (columns, rows) == (["a", "b"], 4)
+    assert read_result.equals(pa.table({"b": range(4)}))
+
+
+@pytest.mark.parametrize("is_enabled, output_format", [(False, None), (True, "csv")])
+def test_should_load_some_columns_and_rows_of_result_in_memory(
+    is_enabled: bool, output_format: str | None, local_service: LocalResnapService, mock_service: MagicMock,
+) -> None:
+    # Given
+    if not is_enabled:
+        mock_service.return_value = MagicMock(is_enabled=False)
+
+    @resnap(output_format=output_format)
+    def frame_func(rows: int = 10) -> pd.DataFrame:
+        return pd.DataFrame({"a": range(rows), "b": range(rows)})
+
+    frame_func(rows=10)
+
+    # When
+    loaded = frame_func.load(rows=10, columns=["a"], filters=[("b", ">=", 8)])
+
+    # Then
+    pd.testing.assert_frame_equal(loaded, pd.DataFrame({"a": [8, 9]}))
+
+
+def test_should_not_load_result_which_is_not_table(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap
+    def dict_func(size: int = 3) -> dict:
+        return {"values": list(range(size))}
+
+    # When / Then
+    with pytest.raises(TypeError, match="dict_func returned a dict, which is not a table"):
+        dict_func.load(3, columns=["values"])
+
+
+def test_should_pass_lazy_result_downstream_without_reading_it(local_service: LocalResnapService, mocker) -> None:
+    # Given
+    executions = []
+
+    @resnap(lazy=True, memory_cache=False)
+    def upstream_func(rows: int = 3) -> pd.DataFrame:
+        executions.append("upstream")
+        return pd.DataFrame({"a": range(rows)})
+
+    @resnap(output_format="json", memory_cache=False)
+    def downstream_func(df: pd.DataFrame) -> int:
+        executions.append("downstream")
+        return int(df["a"].sum())
+
+    computed = downstream_func(upstream_func())
+    read_result = mocker.spy(local_service, "read_result")
+
+    # When
+    upstream = upstream_func()
+    recovered = downstream_func(upstream)
+
+    # Then
+    assert computed == recovered == 3
+    assert executions == ["upstream", "downstream"]
+    assert isinstance(upstream, LazyResult) and not upstream.is_loaded
+    read_result.assert_called_once()
+    pd.testing.assert_frame_equal(upstream.value, pd.DataFrame({"a": range(3)}))
+    assert read_result.call_count == 2
+
+
+def test_should_map_lazy_results(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap(output_format="json", lazy=True)
+    def mapped_func(magic_number: int = 40) -> int:
+        return magic_number + 2
+
+    mapped_func.map([1])
+
+    # When
+    results = mapped_func.map([1, 2])
+
+    # Then
+    assert all(isinstance(result, LazyResult) for result in results)
+    assert results == [3, 4]
+
+
+def test_should_load_some_columns_and_rows_of_lazy_result(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap(output_format="csv", lazy=True)
+    def csv_func(rows: int = 3) -> pd.DataFrame:
+        return pd.DataFrame({"a": range(rows), "b": range(rows)})
+
+    # When
+    loaded = csv_func.load(3, columns=["b"], filters=[("a", ">", 1)])
+
+    # Then
+    pd.testing.assert_frame_equal(loaded, pd.DataFrame({"b": [2]}))
+
+
+def test_should_map_calls_computing_each_missing_result_once(local_service: LocalResnapService) -> None:
+    # Given
+    executions = []
+
+    @resnap(output_format="json")
+    def mapped_func(magic_number: int = 40, offset: int = 2) -> int:
+        executions.append(magic_number)
+        add_metadata("magic_number", magic_number)
+        return magic_number + offset
+
+    # When
+    first = mapped_func.map([1, 2, (1,), {"magic_number": 3, "offset": 0}], max_workers=2)
+    second = mapped_func.map([(1,), 2, 4])
+
+    # Then
+    assert first == [3, 4, 3, 3]
+    assert second == [3, 4, 6]
+    assert sorted(executions) == [1, 2, 3, 4]
+    saved = local_service.find_many_success_metadata(
+        mapped_func.__qualname__, "", [hash_arguments({"magic_number": n, "offset": 2}) for n in (1, 2, 4)],
+    )
+    assert sorted(metadata.extra_metadata["magic_number"] for metadata in saved.values()) == [1, 2, 4]
+
+
+def test_should_map_recovered_results_without_computing(
+    local_service: LocalResnapService, mocker,
+) -> None:
+    # Given
+    executions = 0
+
+    @resnap(output_format="json", memory_cache=False)
+    def mapped_func(magic_number: int = 40) -> int:
+        nonlocal executions
+        executions += 1
+        return magic_number + 2
+
+    mapped_func.map(range(3))
+    spy_find = mocker.spy(local_service, "find_many_success_metadata")
+
+    # When
+    results = mapped_func.map(range(3))
+
+    # Then
+    assert results == [2, 3, 4]
+    assert executions == 3
+    spy_find.assert_called_once()
+
+
+@resnap(output_format="json")
+def mapped_func_in_processes(magic_number: int = 40) -> int:
+    return magic_number + 2
+
+
+def test_should_map_calls_in_processes(local_service: LocalResnapService) -> None:
+    # When
+    results = mapped_func_in_processes.map([1, 2, 3], max_workers=2, executor="process")
+
+    # Then
+    assert results == [3, 4, 5]
+    saved = local_service.find_many_success_metadata(
+        mapped_func_in_processes.__qualname__, "", [hash_arguments({"magic_number": n}) for n in (1, 2, 3)],
+    )
+    assert len(saved) == 3
+
+
+def test_should_stream_mapped_results(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap
+    def mapped_func(magic_number: int = 40) -> int:
+        return magic_number + 2
+
+    # When
+    results = mapped_func.map([1, 2], stream=True)
+
+    # Then
+    assert isinstance(results, Iterator)
+    assert next(results) == 3
+    assert list(results) == [4]
+
+
+def test_should_raise_the_error_of_a_mapped_call(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap
+    def mapped_func(magic_number: int = 40) -> int:
+        if magic_number < 0:
+            raise ValueError("Magic number should be positive")
+        return magic_number + 2
+
+    # When
+    with pytest.raises(ValueError, match="Magic number should be positive"):
+        mapped_func.map([1, -1, 2])
+
+    # Then
+    index = local_service.get_index(mapped_func.__qualname__, "")
+    assert hash_arguments({"magic_number": -1}) in index.fail
+
+
+def test_should_map_calls_without_service_if_disabled(mock_service: MagicMock) -> None:
+    # Given
+    mock_service.return_value.is_enabled = False
+
+    # When
+    results = func.map([1, 2], executor="thread")
+
+    # Then
+    assert results == [3, 4]
+    mock_service.return_value.clear_old_saves.assert_not_called()
+    mock_service.return_value.save_result.assert_not_called()
+
+
+def test_should_map_no_calls(local_service: LocalResnapService) -> None:
+    # When
+    results = func.map([])
+
+    # Then
+    assert results == []
+
+
+def test_should_raise_if_map_executor_is_unknown() -> None:
+    # When / Then
+    with pytest.raises(ValueError, match="Unknown executor 'fiber'"):
+        func.map([1], executor="fiber")
+
+
+def test_should_save_items_of_generator_and_replay_them(local_service: LocalResnapService) -> None:
+    # Given
+    executions = 0
+
+    @resnap
+    def chunks(count: int) -> Iterator[pd.DataFrame]:
+        nonlocal executions
+        executions += 1
+        add_metadata("key", "value")
+        for i in range(count):
+            yield pd.DataFrame({"a": [i, i + 1]})
+
+    # When
+    items = list(chunks(3))
+    replayed = chunks(3)
+
+    # Then
+    assert executions == 1
+    for item, replayed_item in zip(items, replayed, strict=True):
+        pd.testing.assert_frame_equal(replayed_item, item, check_index_type=False)
+    metadata = local_service.find_success_metadata(chunks.__qualname__, "", hash_arguments({"count": 3}))
+    assert (metadata.result_type, metadata.result_format) == ("Iterator[DataFrame]", "parquet")
+    assert metadata.extra_metadata == {"key": "value"}
+
+
+def test_should_save_empty_generator(local_service: LocalResnapService) -> None:
+    # Given
+    executions = 0
+
+    @resnap(output_format="pickle")
+    def no_items() -> Iterator[int]:
+        nonlocal executions
+        executions += 1
+        yield from ()
+
+    # When
+    items, replayed = list(no_items()), list(no_items())
+
+    # Then
+    assert items == replayed == []
+    assert executions == 1
+
+
+def test_should_not_save_generator_closed_before_its_end(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap
+    def numbers() -> Iterator[int]:
+        yield from range(10)
+
+    # When
+    items = numbers()
+    first = next(items)
+    items.close()
+
+    # Then
+    assert first == 0
+    assert local_service.find_success_metadata(numbers.__qualname__, "", hash_arguments({})) is None
+    assert not list(Path(local_service.config.output_base_path).rglob("*.pkls"))
+
+
+def test_should_save_failed_metadata_of_generator(local_service: LocalResnapService) -> None:
+    # Given
+    @resnap
+    def failing_numbers() -> Iterator[int]:
+        yield 1
+        raise ValueError("No more numbers")
+
+    # When
+    with pytest.raises(ValueError, match="No more numbers"):
+        list(failing_numbers())
+
+    # Then
+    index = local_service.get_index(failing_numbers.__qualname__, "")
+    assert hash_arguments({}) in index.fail
+    assert not list(Path(local_service.config.output_base_path).rglob("*.pkls"))
+
+
+def test_should_not_save_generator_if_disabled(mock_service: MagicMock) -> None:
+    # Given
+    mock_service.return_value.is_enabled = False
+
+    @resnap
+    def numbers() -> Iterator[int]:
+        yield from range(3)
+
+    # When
+    items = list(numbers())
+
+    # Then
+    assert items == [0, 1, 2]
+    mock_service.return_value.open_stream.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_should_save_items_of_async_generator_and_replay_them(local_service: LocalResnapService) -> None:
+    # Given
+    executions = 0
+
+    @async_resnap
+    async def async_numbers(count: int) -> AsyncIterator[dict]:
+        nonlocal executions
+        executions += 1
+        for i in range(count):
+            yield {"a": i}
+
+    # When
+    items = [item async for item in async_numbers(3)]
+    replayed = [item async for item in async_numbers(3)]
+
+    # Then
+    assert items == replayed == [{"a": 0}, {"a": 1}, {"a": 2}]
+    assert executions == 1
+
+
+@pytest.mark.asyncio
+async def test_should_save_failed_metadata_of_async_generator(local_service: LocalResnapService) -> None:
+    # Given
+    @async_resnap
+    async def async_failing_numbers() -> AsyncIterator[int]:
+        raise ValueError("No numbers")
+        yield
+
+    # When
+    with pytest.raises(ValueError, match="No numbers"):
+        [item async for item in async_failing_numbers()]
+
+    # Then
+    assert hash_arguments({}) in local_service.get_index(async_failing_numbers.__qualname__, "").fail
+
+
+@pytest.mark.asyncio
+async def test_should_save_empty_async_generator(local_service: LocalResnapService) -> None:
+    # Given
+    @async_resnap
+    async def async_no_items() -> AsyncIterator[int]:
+        return
+        yield
+
+    # When
+    items = [item async for item in async_no_items()]
+
+    # Then
+    assert items == []
+    metadata = local_service.find_success_metadata(async_no_items.__qualname__, "", hash_arguments({}))
+    assert metadata.result_type == "Iterator"
+
+
+@pytest.mark.asyncio
+async def test_should_not_save_async_generator_if_disabled(mock_service: MagicMock) -> None:
+    # Given
+    mock_service.return_value.is_enabled = False
+
+    @async_resnap
+    async def async_numbers() -> AsyncIterator[int]:
+        yield 1
+
+    # When
+    items = [item async for item in async_numbers()]
+
+    # Then
+    assert items == [1]
+    mock_service.return_value.open_stream.assert_not_called()
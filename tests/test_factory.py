@@ -10,6 +10,8 @@ import pytest_mock
 from resnap import factory
 from resnap.helpers.config import Config, Services
 from resnap.helpers.time_utils import TimeUnit
+from resnap.services.async_local_service import AsyncLocalResnapService
+from resnap.services.async_service import AsyncResnapService
 from resnap.services.boto_service import BotoResnapService
 from resnap.services.local_service import LocalResnapService
 from resnap.services.service import ResnapService
@@ -154,3 +156,77 @@ def test_should_raise_without_boto_extra(mock_find_spec: MagicMock, mock_load_fi
         match=re.escape("Please install the boto extra to save to S3: `pip install resnap[boto]`"),
     ):
         factory.ResnapServiceFactory.get_service()
+
+
+def test_should_set_async_service() -> None:
+    # Given
+    custom_service = MagicMock(spec=AsyncResnapService, name="CustomAsyncResnapService")
+
+    # When
+    factory.set_async_resnap_service(custom_service)
+
+    # Then
+    assert factory.ResnapServiceFactory.get_async_service() == custom_service
+
+
+def test_should_not_set_async_service_if_not_async_resnap_service() -> None:
+    # Given
+    custom_service = MagicMock(spec=ResnapService, name="CustomResnapService")
+
+    # When / Then
+    with pytest.raises(
+        TypeError,
+        match=re.escape(f"Expected AsyncResnapService, got {type(custom_service)}"),
+    ):
+        factory.set_async_resnap_service(custom_service)
+
+
+def test_should_not_return_async_service_by_default() -> None:
+    # When
+    service = factory.ResnapServiceFactory.get_async_service()
+
+    # Then
+    assert service is None
+
+
+def test_should_return_async_local_service() -> None:
+    # Given
+    factory.get_config()  # enforce the first load
+    factory._resnap_config.async_native_io = True
+
+    # When
+    service_1 = factory.ResnapServiceFactory.get_async_service()
+    service_2 = factory.ResnapServiceFactory.get_async_service()
+
+    # Then
+    assert isinstance(service_1, AsyncLocalResnapService)
+    assert service_1 is service_2
+
+
+def test_should_return_async_boto_service(mocker: pytest_mock.MockFixture) -> None:
+    # Given
+    async_boto_service = pytest.importorskip("resnap.services.async_boto_service")
+    mocker.patch.object(async_boto_service, "load_file", return_value=s3_secrets)
+    factory.get_config()  # enforce the first load
+    factory._resnap_config.async_native_io = True
+    factory._resnap_config.save_to = "s3"
+
+    # When
+    service = factory.ResnapServiceFactory.get_async_service()
+
+    # Then
+    assert isinstance(service, async_boto_service.AsyncBotoResnapService)
+
+
+def test_should_raise_if_async_service_if_not_implemented() -> None:
+    # Given
+    factory.get_config()  # enforce the first load
+    factory._resnap_config.async_native_io = True
+    factory._resnap_config.save_to = "not_implemented"
+
+    # When / Then
+    with pytest.raises(
+        NotImplementedError,
+        match=re.escape("Resnap service not_implemented is not implemented"),
+    ):
+        factory.ResnapServiceFactory.get_async_service()
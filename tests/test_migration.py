@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from resnap.helpers.config import Layout
+from resnap.migration import main
+
+
+@pytest.fixture
+def mock_get_service(mocker) -> MagicMock:
+    mock: MagicMock = mocker.patch("resnap.migration.ResnapServiceFactory.get_service")
+    return mock
+
+
+@pytest.mark.parametrize("layout", [Layout.FLAT, Layout.HASHED])
+def test_should_migrate_to_layout(layout: Layout, mock_get_service: MagicMock) -> None:
+    # Given
+    mock_get_service.return_value.migrate_layout.return_value = 3
+
+    # When
+    result = main([layout.value])
+
+    # Then
+    assert result == 3
+    mock_get_service.return_value.migrate_layout.assert_called_once_with(layout)
+
+
+def test_should_fail_with_unknown_layout(mock_get_service: MagicMock) -> None:
+    # When / Then
+    with pytest.raises(SystemExit):
+        main(["unknown"])
+    mock_get_service.assert_not_called()